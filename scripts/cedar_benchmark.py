@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmarks for CedarPolicyRunner.
+
+Measures validate_s3_bucket, validate_cloudformation_template and
+authorize_batch on every available backend, plus validate_s3_bucket with a
+decision audit log attached (validate_s3_bucket_logged, whose distance from
+validate_s3_bucket is the cost of logging), then scales one dimension at a
+time from a base configuration:
+
+  policies     the repository policies plus N generated policies that never
+               change a decision
+  entities     the fixture entities plus N generated S3Resource entities
+  concurrency  N threads calling validate_s3_bucket on one shared runner
+
+With the python backend it also times validate_entities, one schema check of
+every entity file in the entities scale, and check_iam_permissions, one pass
+of the IAM permission checker over a tree of copies of the repository
+CloudFormation templates (latency samples are whole passes).
+
+Each scenario reports p50/p95/p99 latency and decisions/sec. `run` writes a
+JSON result file that can be kept as a baseline; `compare` checks a new
+result file against a baseline and exits 1 when a scenario's median latency
+got slower by more than --threshold and a one-sided Mann-Whitney U test on
+the raw latency samples rejects "no slowdown" at --alpha. The effect size
+and the test both look at the centre of the distribution; p95 is reported
+but too noisy at these sample counts to gate on.
+
+`index` grows the policy set with generated policies spread over every
+appliesTo combination in the schema and times the in-process evaluator with
+and without the policy index.
+
+Usage:
+  ./scripts/cedar_benchmark.py run [--backends python,pool,cli] [--quick] [--output FILE]
+  ./scripts/cedar_benchmark.py compare BASELINE CURRENT [--threshold 0.10] [--alpha 0.01]
+  ./scripts/cedar_benchmark.py index [--policies 0,100,1000,10000] [--output FILE]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "tests" / "atdd" / "support"))
+
+from cedar_policy_runner import CedarPolicyRunner  # noqa: E402
+from decision_log import DecisionLog  # noqa: E402
+
+POLICIES_DIR = ROOT_DIR / "cedar_policies"
+TEMPLATE_FILES = [ROOT_DIR / "cf" / "avp-stack.yaml"] + sorted(
+    (ROOT_DIR / "examples" / "cloudformation").glob("*.yaml"))
+IAM_TEMPLATES = 400
+SCHEMA_FILE = ROOT_DIR / "schema.cedarschema"
+FIXTURE_ENTITIES = ROOT_DIR / "tests" / "fixtures" / "entities.json"
+BUCKET = "prod-secure-bucket"
+MAX_STORED_SAMPLES = 5000
+
+GREEN = "\033[0;32m"
+RED = "\033[0;31m"
+YELLOW = "\033[1;33m"
+NC = "\033[0m"
+
+
+# =============================================================================
+# WORKLOAD GENERATION
+# =============================================================================
+
+def write_policy_set(workdir: Path, extra: int) -> Path:
+    """Copy the repository policies and add `extra` generated policies that never match."""
+    policy_dir = workdir / f"policies-{extra}"
+    policy_dir.mkdir()
+    for policy_file in sorted(POLICIES_DIR.glob("*.cedar")):
+        shutil.copy(policy_file, policy_dir / policy_file.name)
+    if extra:
+        generated = []
+        for index in range(extra):
+            if index % 2:
+                generated.append(
+                    f'permit(principal == User::"generated-{index}", action == Action::"s3:GetObject", '
+                    f'resource == Bucket::"generated-{index}");'
+                )
+            else:
+                generated.append(
+                    f'permit(principal, action == Action::"config:EvaluateCompliance", resource)\n'
+                    f'when {{ resource is S3Resource && resource.name == "generated-{index}" }};'
+                )
+        (policy_dir / "zz-generated.cedar").write_text("\n".join(generated) + "\n")
+    return policy_dir
+
+
+def write_indexed_policy_set(workdir: Path, extra: int) -> Path:
+    """Repository policies plus `extra` never-matching policies spread over every appliesTo combination."""
+    from cedar_schema import CedarSchema
+    schema = CedarSchema.from_file(SCHEMA_FILE)
+    combinations = [(name, principal_type, resource_type)
+                    for name, declared in sorted(schema.actions.items())
+                    for principal_type in declared.principal_types
+                    for resource_type in declared.resource_types]
+    policy_dir = workdir / f"indexed-policies-{extra}"
+    policy_dir.mkdir()
+    for policy_file in sorted(POLICIES_DIR.glob("*.cedar")):
+        shutil.copy(policy_file, policy_dir / policy_file.name)
+    generated = []
+    for index in range(extra):
+        action, principal_type, resource_type = combinations[index % len(combinations)]
+        generated.append(f'permit(principal == {principal_type}::"generated-{index}", '
+                         f'action == Action::"{action}", resource is {resource_type});')
+    (policy_dir / "zz-generated.cedar").write_text("\n".join(generated) + "\n")
+    return policy_dir
+
+
+def write_entities(workdir: Path, extra: int, seed: int = 0) -> Path:
+    """Fixture entities plus `extra` generated S3Resource entities."""
+    rng = random.Random(seed)
+    entities = json.loads(FIXTURE_ENTITIES.read_text())
+    for index in range(extra):
+        algorithm = rng.choice(["AES256", "aws:kms", None])
+        attrs: Dict[str, Any] = {
+            "name": f"bench-bucket-{index}",
+            "encryption_enabled": algorithm is not None,
+            "environment": rng.choice(["development", "staging", "production"]),
+            "resource_type": "bucket",
+        }
+        if algorithm:
+            attrs["encryption_algorithm"] = algorithm
+        if algorithm == "aws:kms":
+            attrs["kms_key_id"] = f"arn:aws:kms:us-east-1:123456789012:key/{index}"
+        entities.append({"uid": {"type": "S3Resource", "id": f"bench-bucket-{index}"},
+                         "attrs": attrs, "parents": []})
+    path = workdir / f"entities-{extra}.json"
+    path.write_text(json.dumps(entities))
+    return path
+
+
+def write_template_tree(workdir: Path, count: int) -> Path:
+    """`count` copies of the repository CloudFormation templates, 20 per directory."""
+    tree = workdir / f"templates-{count}"
+    for index in range(count):
+        team = tree / f"team-{index // 20:03d}"
+        team.mkdir(parents=True, exist_ok=True)
+        source = TEMPLATE_FILES[index % len(TEMPLATE_FILES)]
+        shutil.copy(source, team / f"{source.stem}-{index:04d}.yaml")
+    return tree
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of pre-sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    weight = position - lower
+    return sorted_samples[lower] * (1 - weight) + sorted_samples[upper] * weight
+
+
+def summarize(samples: List[float], decisions: int, wall_seconds: float, errors: int) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    stored = samples
+    if len(stored) > MAX_STORED_SAMPLES:
+        stored = random.Random(0).sample(samples, MAX_STORED_SAMPLES)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "decisions_per_sec": decisions / wall_seconds if wall_seconds else 0.0,
+        "samples_ms": [round(sample * 1000, 4) for sample in stored],
+    }
+
+
+def measure_calls(call: Callable[[], Dict[str, Any]], iterations: int, warmup: int,
+                  concurrency: int = 1) -> Dict[str, Any]:
+    """Time `iterations` calls spread over `concurrency` threads."""
+    for _ in range(warmup):
+        call()
+
+    samples: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(count: int) -> None:
+        nonlocal errors
+        local = []
+        local_errors = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            result = call()
+            local.append(time.perf_counter() - start)
+            if result.get("decision") == "ERROR":
+                local_errors += 1
+        with lock:
+            samples.extend(local)
+            errors += local_errors
+
+    shares = [iterations // concurrency + (1 if i < iterations % concurrency else 0) for i in range(concurrency)]
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, shares))
+    return summarize(samples, len(samples), time.perf_counter() - wall_start, errors)
+
+
+def measure_batch(runner: CedarPolicyRunner, requests: List[Dict[str, Any]], entities_file: Path,
+                  repeats: int) -> Dict[str, Any]:
+    """Time whole authorize_batch runs; latency samples are the per-decision times."""
+    list(runner.authorize_batch(requests[:10], str(entities_file)))  # warm up
+    samples: List[float] = []
+    errors = 0
+    wall = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = list(runner.authorize_batch(requests, str(entities_file)))
+        wall += time.perf_counter() - start
+        samples.extend(result["execution_time_seconds"] for result in results)
+        errors += sum(1 for result in results if result["decision"] == "ERROR")
+    return summarize(samples, len(samples), wall, errors)
+
+
+def measure_runs(call: Callable[[], Tuple[int, int]], repeats: int, warmup: int) -> Dict[str, Any]:
+    """Time whole runs of call, which returns (items processed, items in error)."""
+    for _ in range(warmup):
+        call()
+    samples: List[float] = []
+    items = errors = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        processed, failed = call()
+        samples.append(time.perf_counter() - start)
+        items += processed
+        errors += failed
+    return summarize(samples, items, sum(samples), errors)
+
+
+def batch_requests(count: int) -> List[Dict[str, Any]]:
+    fixture_buckets = [e["uid"]["id"] for e in json.loads(FIXTURE_ENTITIES.read_text())
+                       if e["uid"]["type"] == "S3Resource"]
+    return [{
+        "principal": 'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
+        "action": 'Action::"config:EvaluateCompliance"',
+        "resource": f'S3Resource::"{fixture_buckets[index % len(fixture_buckets)]}"',
+        "context": {},
+    } for index in range(count)]
+
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+def available_backends(requested: List[str]) -> Tuple[List[str], List[str]]:
+    """Split requested backends into runnable and skipped ones."""
+    have_cedar = shutil.which("cedar") is not None
+
+    runnable, skipped = [], []
+    for backend in requested:
+        # Pool workers fall back to the Python evaluator, so only cli needs the CLI
+        needs_engine = backend == "cli" and not have_cedar
+        (skipped if needs_engine else runnable).append(backend)
+    return runnable, skipped
+
+
+def run_benchmarks(backends: List[str], policy_scales: List[int], entity_scales: List[int],
+                   concurrency_scales: List[int], iterations: Dict[str, int], batch_size: int,
+                   warmup: int, log: Callable[[str], None]) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="cedar-benchmark-") as tmp:
+        workdir = Path(tmp)
+        policy_dirs = {extra: write_policy_set(workdir, extra) for extra in set(policy_scales) | {0}}
+        entity_files = {extra: write_entities(workdir, extra) for extra in set(entity_scales) | {0}}
+        requests = batch_requests(batch_size)
+
+        def record(operation: str, backend: str, policies: int, entities: int, concurrency: int,
+                   stats: Dict[str, Any]) -> None:
+            name = f"{operation}/{backend}/policies={policies}/entities={entities}/concurrency={concurrency}"
+            stats.update({"name": name, "operation": operation, "backend": backend, "policies": policies,
+                          "entities": entities, "concurrency": concurrency})
+            results.append(stats)
+            log(f"{name:90} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  "
+                f"p99 {stats['p99_ms']:8.3f} ms  {stats['decisions_per_sec']:10.1f}/s"
+                + (f"  {RED}{stats['errors']} errors{NC}" if stats["errors"] else ""))
+
+        def scenario(backend: str, operation: str, policies: int, entities: int, concurrency: int) -> None:
+            decision_log = None
+            if operation == "validate_s3_bucket_logged":
+                decision_log = DecisionLog(str(workdir / f"decisions-{len(results)}"), policy_dirs[policies],
+                                           SCHEMA_FILE)
+            runner = CedarPolicyRunner(policy_dir=str(policy_dirs[policies]), backend=backend,
+                                       pool_size=max(4, concurrency), decision_log=decision_log)
+            entities_file = entity_files[entities]
+            count = iterations[backend]
+            try:
+                if operation in ("validate_s3_bucket", "validate_s3_bucket_logged"):
+                    stats = measure_calls(lambda: runner.validate_s3_bucket(BUCKET, str(entities_file)),
+                                          count, warmup, concurrency)
+                elif operation == "validate_cloudformation_template":
+                    stats = measure_calls(lambda: runner.validate_cloudformation_template(
+                        "examples/cloudformation/s3-encrypted-bucket.yaml", str(entities_file)),
+                        count, warmup, concurrency)
+                else:
+                    stats = measure_batch(runner, requests, entities_file, max(2, count // batch_size * 5))
+            finally:
+                runner.close()
+                if decision_log is not None:
+                    decision_log.close()
+            record(operation, backend, policies, entities, concurrency, stats)
+
+        for backend in backends:
+            for operation in ("validate_s3_bucket", "validate_s3_bucket_logged",
+                              "validate_cloudformation_template", "authorize_batch"):
+                scenario(backend, operation, 0, 0, 1)
+            for extra in policy_scales:
+                if extra:
+                    scenario(backend, "validate_s3_bucket", extra, 0, 1)
+            for extra in entity_scales:
+                if extra:
+                    scenario(backend, "validate_s3_bucket", 0, extra, 1)
+            for concurrency in concurrency_scales:
+                if concurrency > 1:
+                    scenario(backend, "validate_s3_bucket", 0, 0, concurrency)
+
+        if "python" in backends:
+            from entity_validator import EntityValidator
+            validator = EntityValidator.for_schema(SCHEMA_FILE)
+            for extra in sorted(entity_files):
+                entities = json.loads(entity_files[extra].read_text())
+
+                def validate() -> Tuple[int, int]:
+                    result = validator.validate_batch(entities)
+                    return len(entities), len(result.rejected)
+
+                record("validate_entities", "python", 0, extra, 1,
+                       measure_runs(validate, max(5, iterations["python"] // 40), 1))
+
+            from iam_permissions import PolicySet, check_requirements, scan_requirements
+            tree = write_template_tree(workdir, IAM_TEMPLATES)
+            policy_sets = [PolicySet.load(str(ROOT_DIR / "aws_iam_policies"))]
+
+            def check_iam() -> Tuple[int, int]:
+                checked = check_requirements(scan_requirements([str(tree)], str(tree), workers=1), policy_sets)
+                return len(checked), sum(1 for result in checked if result["error"])
+
+            record("check_iam_permissions", "python", 0, 0, 1,
+                   measure_runs(check_iam, max(3, iterations["python"] // 100), 1))
+    return results
+
+
+def run_index_benchmarks(policy_scales: List[int], iterations: int, warmup: int,
+                         log: Callable[[str], None]) -> List[Dict[str, Any]]:
+    """Time one Config compliance check with and without the policy index as the policy set grows."""
+    from cedar_evaluator import CedarEvaluator, EntityStore, EntityUID
+    entities = EntityStore.from_file(str(FIXTURE_ENTITIES))
+    request = batch_requests(1)[0]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="cedar-index-benchmark-") as tmp:
+        for extra in policy_scales:
+            policy_dir = write_indexed_policy_set(Path(tmp), extra)
+            row: Dict[str, Any] = {"policies": None, "candidates": None}
+            for label, use_index in (("indexed", True), ("full", False)):
+                evaluator = CedarEvaluator.from_files(policy_dir, SCHEMA_FILE, use_index=use_index)
+                row["policies"] = len(evaluator.policies)
+                if evaluator.index is not None:
+                    forbids, permits = evaluator.index.candidates(
+                        "ConfigEvaluation", EntityUID("Action", "config:EvaluateCompliance"), "S3Resource")
+                    row["candidates"] = len(forbids) + len(permits)
+                stats = measure_calls(
+                    lambda: {"decision": evaluator.authorize_request(request, entities).decision},
+                    iterations, warmup)
+                row[label] = {key: value for key, value in stats.items() if key != "samples_ms"}
+            row["speedup_p50"] = row["full"]["p50_ms"] / row["indexed"]["p50_ms"] if row["indexed"]["p50_ms"] else 0.0
+            results.append(row)
+            log(f"policies {row['policies']:6d}  candidates {row['candidates']:6d}  "
+                f"indexed p50 {row['indexed']['p50_ms']:8.4f} ms  full p50 {row['full']['p50_ms']:8.4f} ms  "
+                f"{GREEN}x{row['speedup_p50']:.1f}{NC}")
+    return results
+
+
+def environment_info() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cedar_cli": shutil.which("cedar") is not None,
+    }
+
+
+# =============================================================================
+# COMPARISON
+# =============================================================================
+
+def mann_whitney_greater(current: List[float], baseline: List[float]) -> float:
+    """
+    One-sided Mann-Whitney U test (normal approximation with tie correction).
+
+    Returns:
+        p-value for the hypothesis that current samples tend to be larger than baseline samples
+    """
+    n1, n2 = len(current), len(baseline)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    combined = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    index = 0
+    while index < len(combined):
+        end = index
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[index][0]:
+            end += 1
+        average_rank = (index + end) / 2 + 1
+        for position in range(index, end + 1):
+            ranks[position] = average_rank
+        ties = end - index + 1
+        tie_term += ties ** 3 - ties
+        index = end + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u_statistic = rank_sum - n1 * (n1 + 1) / 2
+    total = n1 + n2
+    variance = n1 * n2 / 12 * ((total + 1) - tie_term / (total * (total - 1))) if total > 1 else 0.0
+    if variance <= 0:
+        return 1.0
+    z = (u_statistic - n1 * n2 / 2 - 0.5) / math.sqrt(variance)  # continuity correction
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+                    alpha: float) -> List[Dict[str, Any]]:
+    baseline_by_name = {result["name"]: result for result in baseline["results"]}
+    comparisons = []
+    for result in current["results"]:
+        base = baseline_by_name.get(result["name"])
+        if base is None:
+            comparisons.append({"name": result["name"], "status": "new"})
+            continue
+        p50_ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        p95_ratio = result["p95_ms"] / base["p95_ms"] if base["p95_ms"] else 1.0
+        throughput_ratio = (result["decisions_per_sec"] / base["decisions_per_sec"]
+                            if base["decisions_per_sec"] else 1.0)
+        p_value = mann_whitney_greater(result["samples_ms"], base["samples_ms"])
+        if p50_ratio > 1 + threshold and p_value < alpha:
+            status = "regression"
+        elif p50_ratio < 1 - threshold and mann_whitney_greater(base["samples_ms"], result["samples_ms"]) < alpha:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        comparisons.append({
+            "name": result["name"],
+            "status": status,
+            "p50_ratio": p50_ratio,
+            "p95_ratio": p95_ratio,
+            "throughput_ratio": throughput_ratio,
+            "p_value": p_value,
+        })
+    return comparisons
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def _int_list(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    requested = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    backends, skipped = available_backends(requested)
+    for backend in skipped:
+        print(f"{YELLOW}Skipping {backend} backend: cedar CLI is not installed{NC}", file=sys.stderr)
+    if not backends:
+        print(f"{RED}No runnable backends{NC}", file=sys.stderr)
+        return 1
+
+    if args.quick:
+        policy_scales, entity_scales, concurrency_scales = [0, 100], [0, 1000], [1, 4]
+    else:
+        policy_scales = _int_list(args.policies)
+        entity_scales = _int_list(args.entities)
+        concurrency_scales = _int_list(args.concurrency)
+    base_iterations = 400 if args.quick else args.iterations
+    iterations = {
+        "python": base_iterations,
+        "pool": max(20, base_iterations // 5),
+        "cli": max(10, base_iterations // 20),
+    }
+
+    print("🚀 Cedar benchmark")
+    print("================================")
+    results = run_benchmarks(backends, policy_scales, entity_scales, concurrency_scales, iterations,
+                             args.batch_size, args.warmup, print)
+    report = {"version": 1, "environment": environment_info(), "skipped_backends": skipped, "results": results}
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    comparisons = compare_results(baseline, current, args.threshold, args.alpha)
+
+    colors = {"regression": RED, "improvement": GREEN, "new": YELLOW, "unchanged": ""}
+    for comparison in comparisons:
+        color = colors[comparison["status"]]
+        if comparison["status"] == "new":
+            print(f"{color}NEW        {NC} {comparison['name']}")
+            continue
+        print(f"{color}{comparison['status'].upper():11}{NC} {comparison['name']}  "
+              f"p50 x{comparison['p50_ratio']:.2f}  p95 x{comparison['p95_ratio']:.2f}  "
+              f"throughput x{comparison['throughput_ratio']:.2f}  p={comparison['p_value']:.4f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(comparisons, indent=2))
+
+    regressions = [c for c in comparisons if c["status"] == "regression"]
+    print(f"\n{len(regressions)} regression(s) across {len(comparisons)} scenario(s) "
+          f"(threshold {args.threshold:.0%}, alpha {args.alpha})")
+    return 1 if regressions else 0
+
+
+def cmd_index(args: argparse.Namespace) -> int:
+    print("🚀 Cedar policy index benchmark")
+    print("================================")
+    results = run_index_benchmarks(_int_list(args.policies), args.iterations, args.warmup, print)
+    if args.output:
+        report = {"version": 1, "environment": environment_info(), "results": results}
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark CedarPolicyRunner backends")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the benchmark matrix and write a JSON result file")
+    run.add_argument("--backends", default="python,pool,cli",
+                     help="Comma-separated backends (unavailable ones are skipped)")
+    run.add_argument("--policies", default="0,100,1000", help="Generated policies added per step")
+    run.add_argument("--entities", default="0,1000,10000", help="Generated entities added per step")
+    run.add_argument("--concurrency", default="1,4,16", help="Concurrent callers per step")
+    run.add_argument("--iterations", type=int, default=500, help="Calls per scenario for the python backend")
+    run.add_argument("--batch-size", type=int, default=200, help="Requests per authorize_batch run")
+    run.add_argument("--warmup", type=int, default=5)
+    run.add_argument("--quick", action="store_true", help="Small matrix for local smoke runs")
+    run.add_argument("--output", default="benchmark-results.json")
+    run.set_defaults(handler=cmd_run)
+
+    compare = subparsers.add_parser("compare", help="Fail on significant regressions against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="Minimum relative median slowdown treated as a regression")
+    compare.add_argument("--alpha", type=float, default=0.01, help="Significance level")
+    compare.add_argument("--json", help="Write the comparison as JSON to this file")
+    compare.set_defaults(handler=cmd_compare)
+
+    index = subparsers.add_parser("index", help="Latency with and without the policy index as policies grow")
+    index.add_argument("--policies", default="0,100,1000,10000", help="Generated policies added per step")
+    index.add_argument("--iterations", type=int, default=500, help="Authorizations timed per step")
+    index.add_argument("--warmup", type=int, default=5)
+    index.add_argument("--output", help="Write the results as JSON to this file")
+    index.set_defaults(handler=cmd_index)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Parallel Cedar policy test runner.
+
+Python counterpart of scripts/cedar_testrunner.sh. It validates every policy,
+then runs every request in tests/<suite>/{ALLOW,DENY}/*.json plus the inline
+test blocks in tests/*.test, and reports JUnit XML and a JSON summary.
+
+Backends:
+  python  one batched in-process evaluation (policies, schema and entities
+          are parsed once for the whole run); policies are type-checked
+          against the schema with policy_validator, or only parsed when
+          there is no schema (reported as "parse-only")
+  cli     cedar validate / cedar authorize spread across a process pool
+
+Exit codes match the shell runner: 0 when every policy validates and every
+test passes, 1 otherwise (including a missing Cedar CLI for the cli backend).
+
+Usage:
+  ./scripts/cedar_testrunner.py [--backend python|cli] [--workers N]
+                                [--junit-xml FILE] [--json-summary FILE]
+                                [--policies DIR] [--schema FILE] [--tests DIR] [--entities FILE]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "tests" / "atdd" / "support"))
+
+from cedar_evaluator import (CedarEvaluator, CedarSyntaxError, EntityStore,  # noqa: E402
+                             PolicyParser)
+from cedar_test_files import discover_cases  # noqa: E402
+from policy_validator import PolicyValidator  # noqa: E402
+
+POLICIES_DIR = ROOT_DIR / "cedar_policies"
+SCHEMA_FILE = ROOT_DIR / "schema.cedarschema"
+TEST_SUITES_DIR = ROOT_DIR / "tests"
+FIXTURES_DIR = ROOT_DIR / "tests" / "fixtures"
+
+GREEN = "\033[0;32m"
+RED = "\033[0;31m"
+YELLOW = "\033[1;33m"
+NC = "\033[0m"
+
+
+# =============================================================================
+# POLICY VALIDATION
+# =============================================================================
+
+def _validate_policy_cli(policy_file: str, schema_file: Optional[str]) -> Tuple[str, bool, str]:
+    cmd = ["cedar", "validate", "--policies", policy_file]
+    if schema_file:
+        cmd += ["--schema", schema_file]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return policy_file, result.returncode == 0, (result.stdout + result.stderr).strip()
+
+
+def _validate_policy_python(policy_file: str, validator: Optional[PolicyValidator]) -> Tuple[str, bool, str]:
+    try:
+        policies = PolicyParser(Path(policy_file).read_text(), policy_file).policies()
+    except CedarSyntaxError as e:
+        return policy_file, False, str(e)
+    if validator is None:
+        return policy_file, True, ""
+    problems = validator.validate(policies)
+    return policy_file, not problems, "\n".join(str(problem) for problem in problems)
+
+
+def validation_mode(schema_file: Optional[Path]) -> str:
+    """How policies are checked: "schema" (type-checked) or "parse-only"."""
+    return "schema" if schema_file else "parse-only"
+
+
+def validate_policies(policy_files: List[Path], backend: str, schema_file: Optional[Path],
+                      executor: Optional[ProcessPoolExecutor]) -> List[Tuple[str, bool, str]]:
+    if backend == "cli":
+        schema = str(schema_file) if schema_file else None
+        return list(executor.map(_validate_policy_cli, [str(f) for f in policy_files],
+                                 [schema] * len(policy_files)))
+    validator = PolicyValidator.from_file(schema_file) if schema_file else None
+    return [_validate_policy_python(str(f), validator) for f in policy_files]
+
+
+# =============================================================================
+# TEST EXECUTION
+# =============================================================================
+
+def _run_case_cli(case: Dict[str, Any], policies_dir: str, schema_file: Optional[str]) -> Dict[str, Any]:
+    """Run one case with cedar authorize (executed inside a pool process)."""
+    start = time.time()
+    with tempfile.TemporaryDirectory(prefix="cedar-testrunner-") as workdir:
+        request_file = case.get("source") if case.get("entities_file") else None
+        if request_file is None or not request_file.endswith(".json"):
+            request_file = os.path.join(workdir, "request.json")
+            with open(request_file, "w") as handle:
+                json.dump(case["request"], handle)
+
+        entities_file = case.get("entities_file")
+        if entities_file is None:
+            entities_file = os.path.join(workdir, "entities.json")
+            with open(entities_file, "w") as handle:
+                json.dump(case["entities"], handle)
+
+        cmd = ["cedar", "authorize", "--policies", policies_dir,
+               "--entities", entities_file, "--request-json", request_file]
+        if schema_file:
+            cmd += ["--schema", schema_file]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+
+    output = result.stdout + result.stderr
+    # Same check as the shell runner: the expected decision appears in the output
+    passed = case["expected"] in output
+    return {"passed": passed, "output": output.strip(), "time": time.time() - start}
+
+
+def run_cases_cli(cases: List[Dict[str, Any]], executor: ProcessPoolExecutor, workers: int,
+                  schema_file: Optional[Path], policies_dir: Path = POLICIES_DIR) -> List[Dict[str, Any]]:
+    schema = str(schema_file) if schema_file else None
+    chunksize = max(1, len(cases) // (workers * 4))
+    return list(executor.map(_run_case_cli, cases, [str(policies_dir)] * len(cases),
+                             [schema] * len(cases), chunksize=chunksize))
+
+
+def run_cases_python(cases: List[Dict[str, Any]], schema_file: Optional[Path],
+                     policies_dir: Path = POLICIES_DIR) -> List[Dict[str, Any]]:
+    """Evaluate every case in one batched in-process pass."""
+    evaluator = CedarEvaluator.from_files(policies_dir, schema_file)
+    stores: Dict[str, EntityStore] = {}
+    outcomes = []
+    for case in cases:
+        start = time.time()
+        if case.get("entities_file"):
+            path = case["entities_file"]
+            if path not in stores:
+                stores[path] = EntityStore.from_file(path)
+            entities = stores[path]
+        else:
+            entities = EntityStore.from_json(case["entities"])
+        response = evaluator.authorize_request(case["request"], entities)
+        detail = response.decision
+        if response.determining_policies:
+            detail += f" (policies: {', '.join(response.determining_policies)})"
+        if response.errors:
+            detail += f" (errors: {'; '.join(response.errors)})"
+        outcomes.append({
+            "passed": response.decision == case["expected"],
+            "output": detail,
+            "time": time.time() - start,
+        })
+    return outcomes
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def _suite_name(case: Dict[str, Any]) -> str:
+    if case.get("entities_file"):
+        return case["name"].split("/", 1)[0]
+    return Path(case["source"]).name
+
+
+def write_junit_xml(path: Path, cases: List[Dict[str, Any]], outcomes: List[Dict[str, Any]],
+                    validation: List[Tuple[str, bool, str]]) -> None:
+    root = ET.Element("testsuites")
+    suites: Dict[str, ET.Element] = {}
+
+    def suite(name: str) -> ET.Element:
+        if name not in suites:
+            suites[name] = ET.SubElement(root, "testsuite", name=name)
+        return suites[name]
+
+    for policy_file, ok, output in validation:
+        element = ET.SubElement(suite("policy-validation"), "testcase",
+                                classname="policy-validation", name=Path(policy_file).name, time="0")
+        if not ok:
+            ET.SubElement(element, "failure", message="policy validation failed").text = output
+
+    for case, outcome in zip(cases, outcomes):
+        name = _suite_name(case)
+        element = ET.SubElement(suite(name), "testcase", classname=name,
+                                name=f"{case['name']} (expect: {case['expected']})",
+                                time=f"{outcome['time']:.6f}")
+        if outcome.get("skipped"):
+            ET.SubElement(element, "skipped", message=outcome["output"])
+        elif not outcome["passed"]:
+            ET.SubElement(element, "failure",
+                          message=f"expected {case['expected']}").text = outcome["output"]
+
+    for element in suites.values():
+        testcases = element.findall("testcase")
+        element.set("tests", str(len(testcases)))
+        element.set("failures", str(sum(1 for t in testcases if t.find("failure") is not None)))
+        element.set("skipped", str(sum(1 for t in testcases if t.find("skipped") is not None)))
+        element.set("time", f"{sum(float(t.get('time')) for t in testcases):.6f}")
+
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def build_summary(cases: List[Dict[str, Any]], outcomes: List[Dict[str, Any]],
+                  validation: List[Tuple[str, bool, str]], backend: str, elapsed: float,
+                  mode: str = "schema") -> Dict[str, Any]:
+    failures = [
+        {"name": case["name"], "source": case["source"], "expected": case["expected"],
+         "output": outcome["output"]}
+        for case, outcome in zip(cases, outcomes)
+        if not outcome["passed"] and not outcome.get("skipped")
+    ]
+    return {
+        "backend": backend,
+        "policies_validated": len(validation),
+        "policy_validation": mode,
+        "policy_validation_failures": [f for f, ok, _ in validation if not ok],
+        "total": len(cases),
+        "passed": sum(1 for o in outcomes if o["passed"]),
+        "failed": len(failures),
+        "skipped": sum(1 for o in outcomes if o.get("skipped")),
+        "elapsed_seconds": elapsed,
+        "failures": failures,
+    }
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel Cedar policy test runner")
+    parser.add_argument("--backend", choices=("python", "cli"), default="python",
+                        help="Evaluate in-process (python) or with the cedar CLI across a process pool")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="Process pool size for the cli backend")
+    parser.add_argument("--junit-xml", help="Write JUnit XML results to this file")
+    parser.add_argument("--json-summary", help="Write a JSON summary to this file")
+    parser.add_argument("--quiet", action="store_true", help="Only print failures and the summary")
+    parser.add_argument("--policies", default=str(POLICIES_DIR), help="Policy directory")
+    parser.add_argument("--schema", default=str(SCHEMA_FILE), help="Cedar schema file")
+    parser.add_argument("--tests", default=str(TEST_SUITES_DIR),
+                        help="Directory holding <suite>/{ALLOW,DENY} folders and .test files")
+    parser.add_argument("--entities", default=str(FIXTURES_DIR / "entities.json"),
+                        help="Entities file for the <suite>/{ALLOW,DENY} requests")
+    args = parser.parse_args(argv)
+    policies_dir = Path(args.policies)
+    schema_path = Path(args.schema)
+
+    start = time.time()
+    print("🚀 Starting Cedar Policy Test Runner")
+    print("================================")
+
+    if args.backend == "cli" and shutil.which("cedar") is None:
+        print(f"{RED}[ERROR]{NC} Cedar CLI is not installed. You can install it by running: "
+              "./scripts/install-cedar-fast.sh", file=sys.stderr)
+        return 1
+
+    schema_file = schema_path if schema_path.exists() else None
+    if schema_file is None:
+        print(f"{YELLOW}Warning: Schema file not found at {schema_path}{NC}")
+        print("Validation will proceed without schema validation")
+
+    policy_files = sorted(policies_dir.glob("*.cedar"))
+    if not policy_files:
+        print(f"{RED}No policy files found in {policies_dir}{NC}")
+        return 1
+
+    cases = list(discover_cases(Path(args.tests), Path(args.entities)))
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.backend == "cli" else None
+    try:
+        mode = validation_mode(schema_file)
+        print("🔍 Validating policies..." + (" (parse-only, no schema)" if mode == "parse-only" else ""))
+        validation = validate_policies(policy_files, args.backend, schema_file, executor)
+        for policy_file, ok, output in validation:
+            status = f"{GREEN}PASS{NC}" if ok else f"{RED}FAILED{NC}"
+            print(f"Validating {Path(policy_file).name}... {status}")
+            if not ok:
+                print(output)
+
+        print(f"\n🧪 Running {len(cases)} tests...")
+        runnable = [not c.get("entities_file") or os.path.exists(c["entities_file"]) for c in cases]
+        to_run = [c for c, ok in zip(cases, runnable) if ok]
+        if args.backend == "cli":
+            results = iter(run_cases_cli(to_run, executor, args.workers, schema_file, policies_dir))
+        else:
+            results = iter(run_cases_python(to_run, schema_file, policies_dir))
+        outcomes = [
+            next(results) if ok
+            else {"passed": False, "skipped": True, "output": "no entities.json", "time": 0.0}
+            for ok in runnable
+        ]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for case, outcome in zip(cases, outcomes):
+        label = f"Test {case['name']} (expect: {case['expected']})... "
+        if outcome.get("skipped"):
+            if not args.quiet:
+                print(f"{label}{YELLOW}SKIP{NC} ({outcome['output']})")
+        elif outcome["passed"]:
+            if not args.quiet:
+                print(f"{label}{GREEN}PASS{NC}")
+        else:
+            print(f"{label}{RED}FAIL{NC}")
+            print(f"  Expected: {case['expected']}")
+            print(f"  Got: {outcome['output']}")
+
+    summary = build_summary(cases, outcomes, validation, args.backend, time.time() - start, mode)
+    if args.junit_xml:
+        write_junit_xml(Path(args.junit_xml), cases, outcomes, validation)
+    if args.json_summary:
+        Path(args.json_summary).write_text(json.dumps(summary, indent=2))
+
+    print(f"\n{summary['passed']} passed, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"in {summary['elapsed_seconds']:.2f}s")
+    if summary["policy_validation_failures"] or summary["failed"]:
+        return 1
+
+    print("\n✅ All tests completed successfully!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
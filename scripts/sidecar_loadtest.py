@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Load test for the local authorization sidecar.
+
+Opens --connections kept-alive connections and sends requests from the
+tests/<suite>/{ALLOW,DENY} folders as fast as each connection gets answers,
+for --duration seconds. With --batch-size N each call posts N requests to
+/v1/authorize/batch instead of one to /v1/authorize.
+
+Reports decisions/sec, p50/p95/p99 call latency, the sidecar's micro-batch
+count and any request whose decision differs from its folder (these are
+policy issues, reported the same way by cedar_testrunner.py). --spawn starts
+a sidecar on a free port (or --unix-socket) for the run and stops it after.
+Exits 1 on HTTP errors or throughput below --min-rps.
+
+Usage:
+  ./scripts/sidecar_loadtest.py --spawn [--duration 10] [--connections 32] [--batch-size 0]
+  ./scripts/sidecar_loadtest.py --url http://127.0.0.1:8181 --duration 30
+  ./scripts/sidecar_loadtest.py --spawn --unix-socket /tmp/cedar.sock --min-rps 2000
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "tests" / "atdd" / "support"))
+
+from authorization_sidecar import SidecarClient  # noqa: E402
+from cedar_benchmark import percentile  # noqa: E402
+
+SIDECAR = ROOT_DIR / "tests" / "atdd" / "support" / "authorization_sidecar.py"
+FIXTURE_ENTITIES = ROOT_DIR / "tests" / "fixtures" / "entities.json"
+SUITE_DIR = ROOT_DIR / "tests" / "s3_encryption_suite"
+
+GREEN = "\033[0;32m"
+RED = "\033[0;31m"
+YELLOW = "\033[1;33m"
+NC = "\033[0m"
+
+
+def load_suite(suite_dir: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    """(expected decision, request) for every request file in the suite."""
+    cases = []
+    for expected in ("ALLOW", "DENY"):
+        for path in sorted((suite_dir / expected).glob("*.json")):
+            request = json.loads(path.read_text())
+            request.pop("description", None)
+            request["source"] = path.name
+            cases.append((expected, request))
+    if not cases:
+        raise SystemExit(f"No requests found under {suite_dir}/{{ALLOW,DENY}}")
+    return cases
+
+
+def spawn_sidecar(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Start a sidecar and wait until it reports the address it listens on."""
+    cmd = [sys.executable, str(SIDECAR), "--entities", args.entities, "--port", "0",
+           "--max-batch", str(args.max_batch), "--max-delay-ms", str(args.max_delay_ms)]
+    if args.unix_socket:
+        cmd += ["--unix-socket", args.unix_socket, "--no-tcp"]
+    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    try:
+        address = json.loads(line)["listening"][0]
+    except (ValueError, KeyError, IndexError):
+        process.kill()
+        raise SystemExit(f"Sidecar failed to start: {line}{process.stderr.read()}")
+    return process, address
+
+
+async def run_load(address: str, cases: List[Tuple[str, Dict[str, Any]]], connections: int,
+                   duration: float, batch_size: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    counts = {"decisions": 0, "http_errors": 0, "wrong": 0}
+    wrong: Dict[str, str] = {}
+    deadline = time.perf_counter() + duration
+
+    async def connection(offset: int) -> None:
+        client = SidecarClient(address)
+        await client.connect()
+        position = offset
+        try:
+            while time.perf_counter() < deadline:
+                size = batch_size or 1
+                chunk = [cases[(position + i) % len(cases)] for i in range(size)]
+                position += size
+                start = time.perf_counter()
+                if batch_size:
+                    status, body = await client.request("POST", "/v1/authorize/batch",
+                                                        {"requests": [request for _, request in chunk]})
+                    results = body.get("results", []) if status == 200 else []
+                else:
+                    status, body = await client.request("POST", "/v1/authorize", chunk[0][1])
+                    results = [body] if status == 200 else []
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    counts["http_errors"] += 1
+                    continue
+                for (expected, request), result in zip(chunk, results):
+                    counts["decisions"] += 1
+                    if result["decision"] != expected:
+                        counts["wrong"] += 1
+                        wrong[request["source"]] = result["decision"]
+        finally:
+            await client.close()
+
+    client = SidecarClient(address)
+    _, before = await client.request("GET", "/healthz")
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(index) for index in range(connections)))
+    elapsed = time.perf_counter() - start
+    _, after = await client.request("GET", "/healthz")
+    await client.close()
+
+    ordered = sorted(latencies)
+    batches = after["batches"] - before["batches"]
+    return dict(
+        counts,
+        address=address,
+        connections=connections,
+        batch_size=batch_size,
+        seconds=round(elapsed, 3),
+        decisions_per_sec=counts["decisions"] / elapsed if elapsed else 0.0,
+        p50_ms=percentile(ordered, 0.50) * 1000,
+        p95_ms=percentile(ordered, 0.95) * 1000,
+        p99_ms=percentile(ordered, 0.99) * 1000,
+        sidecar_batches=batches,
+        mean_micro_batch=(after["requests"] - before["requests"]) / batches if batches else 0.0,
+        wrong_decisions=wrong,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the Cedar authorization sidecar")
+    parser.add_argument("--url", help="Sidecar address, http://host:port or unix:/path")
+    parser.add_argument("--spawn", action="store_true", help="Start a sidecar for the run")
+    parser.add_argument("--unix-socket", help="With --spawn, serve and test over this Unix socket")
+    parser.add_argument("--entities", default=str(FIXTURE_ENTITIES), help="Entities for the spawned sidecar")
+    parser.add_argument("--suite", default=str(SUITE_DIR), help="Suite with ALLOW/ and DENY/ request files")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send requests for")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Requests per /v1/authorize/batch call (0 sends single requests)")
+    parser.add_argument("--max-batch", type=int, default=256, help="Spawned sidecar --max-batch")
+    parser.add_argument("--max-delay-ms", type=float, default=1.0, help="Spawned sidecar --max-delay-ms")
+    parser.add_argument("--min-rps", type=float, default=0.0, help="Fail below this many decisions/sec")
+    parser.add_argument("--json", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    if bool(args.url) == args.spawn:
+        parser.error("pass exactly one of --url and --spawn")
+
+    cases = load_suite(Path(args.suite))
+    process: Optional[subprocess.Popen] = None
+    address = args.url
+    if args.spawn:
+        process, address = spawn_sidecar(args)
+    try:
+        report = asyncio.run(run_load(address, cases, args.connections, args.duration, args.batch_size))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"{report['decisions']} decisions in {report['seconds']}s over {args.connections} connection(s) "
+          f"to {address}")
+    print(f"Throughput: {report['decisions_per_sec']:.0f} decisions/sec  "
+          f"(mean micro-batch {report['mean_micro_batch']:.1f})")
+    print(f"Latency per call: p50 {report['p50_ms']:.2f} ms  p95 {report['p95_ms']:.2f} ms  "
+          f"p99 {report['p99_ms']:.2f} ms")
+
+    failed = False
+    if report["http_errors"]:
+        print(f"{RED}HTTP errors: {report['http_errors']}{NC}")
+        failed = True
+    for source, decision in sorted(report["wrong_decisions"].items()):
+        print(f"{YELLOW}Unexpected decision {decision} for {source}{NC}")
+    if args.min_rps and report["decisions_per_sec"] < args.min_rps:
+        print(f"{RED}Below --min-rps {args.min_rps:.0f}{NC}")
+        failed = True
+    if not failed:
+        print(f"{GREEN}OK{NC}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,113 +41,10 @@ cleanup_old_test_stacks() {
     echo ""
 }
 
-# Function to extract actions from CloudFormation template
-extract_cf_actions() {
-    local template=$1
-    echo -e "${YELLOW}Analyzing CloudFormation template: $template${NC}"
-    
-    # Extract resource types and map to required IAM actions
-    local actions=()
-    
-    # Check for VerifiedPermissions resources
-    if grep -q "AWS::VerifiedPermissions::PolicyStore" "$template" 2>/dev/null; then
-        actions+=(
-            "verifiedpermissions:CreatePolicyStore"
-            "verifiedpermissions:GetPolicyStore"
-            "verifiedpermissions:PutSchema"
-            "verifiedpermissions:TagResource"
-        )
-    fi
-    
-    if grep -q "AWS::VerifiedPermissions::Policy" "$template" 2>/dev/null; then
-        actions+=(
-            "verifiedpermissions:CreatePolicy"
-            "verifiedpermissions:GetPolicy"
-        )
-    fi
-    
-    # Check for IAM resources
-    if grep -q "AWS::IAM::Role" "$template" 2>/dev/null; then
-        actions+=(
-            "iam:CreateRole"
-            "iam:GetRole"
-            "iam:PassRole"
-            "iam:AttachRolePolicy"
-            "iam:PutRolePolicy"
-            "iam:TagRole"
-        )
-    fi
-    
-    # Check for S3 resources
-    if grep -q "AWS::S3::Bucket" "$template" 2>/dev/null; then
-        actions+=(
-            "s3:CreateBucket"
-            "s3:PutBucketEncryption"
-            "s3:PutBucketPolicy"
-            "s3:PutBucketTagging"
-        )
-    fi
-    
-    # Check for KMS resources
-    if grep -q "AWS::KMS::Key" "$template" 2>/dev/null; then
-        actions+=(
-            "kms:CreateKey"
-            "kms:CreateAlias"
-            "kms:TagResource"
-        )
-    fi
-    
-    # Return unique actions
-    printf '%s\n' "${actions[@]}" | sort -u
-}
-
-# Function to check if action is allowed in IAM policies
-check_action_in_policies() {
-    local action=$1
-    local policy_dir="aws_iam_policies"
-    local found=false
-    local found_in=""
-    
-    # Search through all policy files
-    for policy_file in "$policy_dir"/*.json; do
-        if grep -q "\"$action\"" "$policy_file" 2>/dev/null; then
-            found=true
-            found_in=$(basename "$policy_file")
-            break
-        fi
-    done
-    
-    if [ "$found" = true ]; then
-        echo -e "  ✅ $action (found in $found_in)"
-    else
-        echo -e "  ${RED}❌ $action (MISSING)${NC}"
-        return 1
-    fi
-}
-
-# Function to validate CloudFormation template permissions
-validate_cf_template() {
-    local template=$1
-    local required_actions
-    required_actions=$(extract_cf_actions "$template")
-    
-    local missing_count=0
-    
-    echo -e "\n${BLUE}Required IAM actions for $template:${NC}"
-    while IFS= read -r action; do
-        if ! check_action_in_policies "$action"; then
-            ((missing_count++))
-        fi
-    done <<< "$required_actions"
-    
-    if [ $missing_count -eq 0 ]; then
-        echo -e "\n${GREEN}✅ All required permissions found${NC}"
-        return 0
-    else
-        echo -e "\n${RED}❌ Missing $missing_count permissions${NC}"
-        return 1
-    fi
-}
+# Required actions per template are checked by the compiled IAM checker, which
+# loads aws_iam_policies/*.json once and honours wildcards, NotAction,
+# resource ARNs and Deny statements
+IAM_CHECKER="$(dirname "$0")/../tests/atdd/support/iam_permissions.py"
 
 # Function to simulate CloudFormation deployment
 simulate_cf_deployment() {
@@ -218,47 +115,18 @@ main() {
         cleanup_old_test_stacks
     fi
     
-    # Validate main CloudFormation template
-    echo -e "\n${BLUE}=== Validating Main CloudFormation Template ===${NC}"
-    if [ -f "cf/avp-stack.yaml" ]; then
-        validate_cf_template "cf/avp-stack.yaml" || exit_code=1
-        
-        # Only simulate if AWS creds are available
-        if aws sts get-caller-identity >/dev/null 2>&1; then
-            simulate_cf_deployment "cf/avp-stack.yaml" || exit_code=1
-        fi
+    # Check every template's required actions against the policies in one pass
+    echo -e "\n${BLUE}=== Validating CloudFormation Template Permissions ===${NC}"
+    local templates=()
+    [ -f "cf/avp-stack.yaml" ] && templates+=("cf/avp-stack.yaml")
+    [ -d "examples/cloudformation" ] && templates+=("examples/cloudformation")
+    python3 "$IAM_CHECKER" "${templates[@]}" --policies aws_iam_policies --common || exit_code=1
+
+    # Only simulate if AWS creds are available
+    if [ -f "cf/avp-stack.yaml" ] && aws sts get-caller-identity >/dev/null 2>&1; then
+        simulate_cf_deployment "cf/avp-stack.yaml" || exit_code=1
     fi
     
-    # Validate example templates
-    echo -e "\n${BLUE}=== Validating Example Templates ===${NC}"
-    for template in examples/cloudformation/*.yaml; do
-        if [ -f "$template" ]; then
-            echo -e "\n${YELLOW}Checking $(basename "$template")...${NC}"
-            validate_cf_template "$template" || exit_code=1
-        fi
-    done
-    
-    # Check for common missing permissions
-    echo -e "\n${BLUE}=== Common Permission Patterns ===${NC}"
-    
-    # Check for tagging permissions
-    echo -e "\n${YELLOW}Tag-related permissions:${NC}"
-    for service in verifiedpermissions iam s3 kms; do
-        action="${service}:TagResource"
-        check_action_in_policies "$action" || true
-    done
-    
-    # Check for describe/get permissions
-    echo -e "\n${YELLOW}Read permissions:${NC}"
-    for action in \
-        "verifiedpermissions:GetPolicyStore" \
-        "verifiedpermissions:GetSchema" \
-        "iam:GetRole" \
-        "s3:GetBucketEncryption" \
-        "kms:DescribeKey"; do
-        check_action_in_policies "$action" || true
-    done
-    
     # Summary
     echo -e "\n${BLUE}=== Summary ===${NC}"
     if [ $exit_code -eq 0 ]; then
@@ -0,0 +1,21 @@
+# ATDD Test: Authorization Metrics
+#
+# User Story:
+# As an operator running Cedar checks in production
+# I want per-phase timings and decision counters exported as metrics files
+# So that I can see where authorization time goes without attaching a profiler
+
+Feature: Per-phase timing and metrics export for Cedar authorizations
+
+  @metrics @python-evaluator
+  Scenario: Every result carries its per-phase timings
+    When I replay every suite request with metrics enabled on the python backend
+    Then every result should report validate and evaluate phase timings
+    And the phase timings should not exceed the end-to-end time
+
+  @metrics @python-evaluator
+  Scenario: Metrics are exported in Prometheus and OTLP formats
+    When I replay every suite request with metrics enabled on the python backend
+    And I export the metrics to Prometheus and OTLP files
+    Then the Prometheus file should count every decision by outcome
+    And the OTLP file should hold the phase duration histogram
@@ -0,0 +1,34 @@
+# ATDD Test: Local Authorization Sidecar
+#
+# User Story:
+# As a platform engineer wiring Cedar checks into deploy pipelines and services
+# I want decisions from a long-running local service instead of a CLI process per check
+# So that authorization keeps up with thousands of requests per second and picks up policy changes live
+
+Feature: Local authorization sidecar with micro-batching and hot policy reload
+
+  @sidecar
+  Scenario: Concurrent requests over TCP and a Unix socket are answered in micro-batches
+    Given an authorization sidecar is serving the fixture entities over TCP and a Unix socket
+    When 20 kept-alive clients each send the 12 suite requests one at a time
+    And a client posts the 12 suite requests as one batch over the Unix socket
+    Then every response should match the decision the Python evaluator gives
+    And the sidecar should have evaluated them in fewer batches than requests
+
+  @sidecar
+  Scenario: Policy changes are swapped in without dropping in-flight requests
+    Given an authorization sidecar is serving a copy of the policies with hot reload
+    And clients keep sending requests for the runtime KMS bucket
+    When I add a policy forbidding compliance checks on that bucket
+    Then the sidecar should serve generation 2 with a new policy hash
+    And the served policy hash should be the hash of the policy files on disk
+    And the bucket should now be denied
+    And no request should have failed while the policies changed
+    When I add a policy file with a syntax error
+    Then the sidecar should keep serving generation 2 and report the reload error
+
+  @sidecar @schema-validation
+  Scenario: A changed policy set that does not type-check against the schema is not swapped in
+    Given an authorization sidecar is serving a copy of the policies with hot reload
+    When I add a policy that reads the undeclared attribute "encrypted" of S3Resource
+    Then the sidecar should keep serving generation 1 and report a reload error mentioning "encrypted"
@@ -0,0 +1,28 @@
+# ATDD Test: Batch Authorization
+#
+# User Story:
+# As a platform engineer authorizing thousands of requests in one run
+# I want every request answered in order, with malformed ones reported in place
+# So that one bad request file or JSONL line never hides the decisions for the rest of the batch
+
+Feature: Batch authorization with CedarPolicyRunner
+
+  @batch
+  Scenario: Malformed batch items become ERROR records without ending the batch
+    Given a batch mixing suite request files, request dicts and request tuples
+    And the batch also holds a dict without a resource, a missing request file and a short tuple
+    When I authorize the batch on the python backend
+    Then there should be one result per batch item in the same order
+    And the malformed items should be ERROR records naming the problem
+    And every other item should get the same decision as in a batch without the malformed items
+
+  @batch @cli
+  Scenario: The batch CLI streams one decision per JSONL line and exits 1 on errors
+    Given a JSONL request file with the suite requests and one line that is not JSON
+    When I run the batch command on the python backend
+    Then it should print one JSON record per request line in order
+    And the line that is not JSON should be an ERROR record
+    And the batch command should exit with code 1
+    When I drop the line that is not JSON and run the batch command again
+    Then the batch command should exit with code 0
+    And the other lines should get the same decisions as before
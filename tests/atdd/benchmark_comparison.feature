@@ -0,0 +1,23 @@
+# ATDD Test: Benchmark Baseline Comparison
+#
+# User Story:
+# As a platform engineer gating changes on authorization latency
+# I want benchmark comparisons to fail only on a real shift in typical latency
+# So that tail noise between runs does not block a merge while genuine slowdowns still do
+
+Feature: Comparing benchmark results against a baseline
+
+  @benchmark @compare
+  Scenario: Comparing a benchmark run with itself reports no regression
+    Given a quick python backend benchmark result
+    When I compare the result against itself
+    Then the comparison should exit 0
+    And every scenario should be reported unchanged
+
+  @benchmark @compare
+  Scenario: A slower latency tail alone is not a regression but a slower median is
+    Given a baseline with 400 latency samples per scenario
+    When the slowest 45% of the samples get 3 times slower
+    Then the comparison should report the scenario unchanged
+    When every sample gets 1.5 times slower
+    Then the comparison should report the scenario as a regression
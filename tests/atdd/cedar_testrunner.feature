@@ -0,0 +1,42 @@
+# ATDD Test: Parallel Cedar Policy Test Runner
+#
+# User Story:
+# As a platform engineer running the Cedar policy suites in CI
+# I want the Python test runner to type-check policies and report results as JUnit XML and JSON
+# So that CI fails on policies the schema rejects and on wrong decisions, with reports it can publish
+
+Feature: Parallel Cedar policy test runner
+
+  @testrunner
+  Scenario: A passing suite exits 0 with matching JUnit XML and JSON reports
+    Given a test tree with the repository policies and one ALLOW and one DENY request
+    When I run the python test runner with JUnit and JSON reports
+    Then the test runner should exit with code 0
+    And the JSON summary should report 2 passed and 0 failed with schema validation
+    And the JUnit report should hold the 2 requests and the policy files without failures
+
+  @testrunner
+  Scenario: A wrong decision exits 1 and is reported as a JUnit failure
+    Given a test tree with the repository policies and one ALLOW and one DENY request
+    And the ALLOW request is filed under DENY as well
+    When I run the python test runner with JUnit and JSON reports
+    Then the test runner should exit with code 1
+    And the JSON summary should report 2 passed and 1 failed with schema validation
+    And the JUnit report should hold 1 failure for the misfiled request
+
+  @testrunner @schema-validation
+  Scenario: A policy that parses but does not type-check against the schema fails validation
+    Given a test tree with the repository policies and one ALLOW and one DENY request
+    And a policy that reads the undeclared attribute "encrypted" of S3Resource
+    When I run the python test runner with JUnit and JSON reports
+    Then the test runner should exit with code 1
+    And the JSON summary should list the new policy file as a validation failure
+    And the JUnit report should hold a policy-validation failure mentioning "encrypted"
+
+  @testrunner @schema-validation
+  Scenario: Without a schema the policies are only parsed and the run says so
+    Given a test tree with the repository policies and one ALLOW and one DENY request
+    And a policy that reads the undeclared attribute "encrypted" of S3Resource
+    When I run the python test runner without a schema
+    Then the test runner should exit with code 0
+    And the JSON summary should report 2 passed and 0 failed with parse-only validation
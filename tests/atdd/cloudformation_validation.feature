@@ -0,0 +1,51 @@
+# ATDD Test: CloudFormation Template Validation
+#
+# User Story:
+# As a platform engineer validating many CloudFormation templates on every commit
+# I want every template in a tree parsed correctly and repeated runs to re-evaluate only what changed
+# So that large template trees stay fast to check without ever reporting stale or spurious decisions
+
+Feature: CloudFormation template validation with Cedar
+
+  @cloudformation @incremental
+  Scenario: Incremental validation re-evaluates edited templates, skips unchanged ones and drops removed ones
+    Given a template tree with AES256 buckets "alpha", "beta" and "gamma"
+    When I validate the tree incrementally
+    Then 3 templates should be evaluated, 0 skipped and 0 removed
+    And no full re-evaluation reason should be reported
+    When I validate the tree incrementally
+    Then 0 templates should be evaluated, 3 skipped and 0 removed
+    When I remove the encryption from "beta" and delete "gamma"
+    And I validate the tree incrementally
+    Then 1 templates should be evaluated, 1 skipped and 1 removed
+    And "beta.yaml" should be reported non-compliant and "alpha.yaml" compliant
+
+  @cloudformation @incremental
+  Scenario: Changing the default environment or backend re-evaluates every template
+    Given a template tree with AES256 buckets "alpha", "beta" and "gamma"
+    When I validate the tree incrementally
+    And I validate the tree incrementally with default environment "production"
+    Then 3 templates should be evaluated, 0 skipped and 0 removed
+    And the full re-evaluation reason should be "default_environment changed"
+    And "alpha.yaml" should be reported non-compliant
+    When I validate the tree incrementally with default environment "production" and the cli backend
+    Then the full re-evaluation reason should be "backend changed"
+
+  @cloudformation @parser
+  Scenario: Intrinsic functions resolve against parameter defaults, conditions and tags
+    Given a template tree with a template using !Ref, !Sub, !Join, !If and !GetAtt
+    When I parse the template tree
+    Then no parse errors should be reported
+    And the buckets should be parsed as
+      | bucket        | name                  | environment | encryption | kms_key_id          |
+      | LogsBucket    | cedar-logs-production | production  | aws:kms    | GetAtt(LogsKey.Arn) |
+      | DataBucket    | cedar-production-data | staging     | AES256     | -                   |
+      | ScratchBucket | ScratchBucket         | production  | -          | -                   |
+
+  @cloudformation @parser
+  Scenario: Non-CloudFormation YAML is skipped and templates differing only by extension stay distinct
+    Given a template tree with a Kubernetes manifest, a Helm chart, a multi-document template and "app.yaml" and "app.json" templates
+    When I parse the template tree
+    Then no parse errors should be reported
+    And the parsed templates should be "app.json", "app.yaml" and "multi.yaml"
+    And every bucket entity id should be distinct
@@ -0,0 +1,51 @@
+# ATDD Test: Bulk Shift-Left vs Shift-Right Consistency
+#
+# User Story:
+# As a security engineer responsible for tens of thousands of S3 buckets
+# I want every deployed bucket checked against the template it came from in one pass
+# So that drift and templates the policies would now reject surface without reading every result
+
+Feature: Bulk consistency between templates and live buckets
+
+  @consistency @shift-left @shift-right
+  Scenario: Only buckets whose template and live decisions disagree are reported
+    Given I have a directory of CloudFormation templates with named, templated and generated bucket names
+    And I have a live inventory where some buckets drifted from their templates
+    When I run the consistency engine in chunks of 2 buckets
+    Then only the drifted buckets should be reported as mismatches
+    And each mismatch should record the join key and the decision and policy hash on both sides
+    And live buckets without a template should only be counted
+
+  @consistency
+  Scenario: Evaluating the two sides with different policy sets is recorded
+    Given I have a directory of CloudFormation templates with named, templated and generated bucket names
+    And I have a live inventory where some buckets drifted from their templates
+    And the live buckets are evaluated with a modified copy of the policies
+    When I run the consistency engine in chunks of 2 buckets
+    Then the summary should report different policy hashes for the two sides
+
+  @consistency
+  Scenario: Untagged template buckets are judged in the environment of their live bucket
+    Given I have an untagged template with AES256 buckets "aes-archive" and "aes-scratch"
+    And the live inventory has "aes-archive" as an AES256 production bucket and "aes-scratch" as an AES256 bucket without an environment
+    When I run the consistency engine in chunks of 2 buckets
+    Then no bucket should be reported as drifted
+    And "aes-scratch" should be reported with an unknown environment
+    And the summary should count 1 template evaluated with the live environment
+
+  @consistency
+  Scenario: One untagged template bucket matched by live buckets in several environments is judged per live bucket
+    Given I have an untagged template with an AES256 bucket named "logs-${AWS::AccountId}"
+    And the live inventory has "logs-222" as an AES256 production bucket and "logs-111" as an AES256 development bucket
+    When I run the consistency engine in chunks of 2 buckets
+    Then no bucket should be reported as drifted
+    And the summary should count 2 templates evaluated with the live environment
+
+  @consistency
+  Scenario: Buckets that cannot be evaluated are reported as errors, not drift
+    Given I have a directory of CloudFormation templates with named, templated and generated bucket names
+    And I have a live inventory where some buckets drifted from their templates
+    And the live buckets are evaluated with a policy set that does not parse
+    When I run the consistency engine in chunks of 2 buckets
+    Then every matched bucket should be reported as an evaluation error
+    And no bucket should be reported as drifted
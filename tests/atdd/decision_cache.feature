@@ -0,0 +1,37 @@
+# ATDD Test: Content-Addressed Decision Cache
+#
+# User Story:
+# As a platform engineer re-running the same checks on every CI build
+# I want repeated authorization checks answered from a cache keyed on policy, schema, entities and request
+# So that unchanged checks cost nothing while any policy edit still forces a fresh evaluation
+
+Feature: Content-addressed decision cache in front of CedarPolicyRunner
+
+  @decision-cache
+  Scenario: Repeated suite requests are answered from the cache with the same decisions
+    When I authorize every suite request twice on the python backend with a decision cache
+    Then the first pass should be all cache misses and the second all cache hits
+    And both passes should return the same decisions
+
+  @decision-cache
+  Scenario: The in-memory cache evicts the least recently used entry
+    Given a decision cache holding at most 3 entries
+    When I store decisions for 3 buckets, read the first one and store a fourth
+    Then the second bucket should have been evicted
+    And the first, third and fourth buckets should still be cached
+
+  @decision-cache
+  Scenario: Editing a policy invalidates cached decisions
+    Given a copy of the policy set with a decision cache over it
+    And a decision cached for the runtime KMS bucket request
+    When a forbid policy is added to the copied policy set
+    Then the request should get a different cache key
+    And the cache should report one invalidation and no cached entries
+
+  @decision-cache @shared-cache
+  Scenario: A fresh cache over the same policies in another checkout hits the on-disk store
+    Given a copy of the policy set with a decision cache over it
+    And a decision cached for the runtime KMS bucket request
+    When a new decision cache over a second copy of the policy set opens the same cache directory
+    Then the policy fingerprints of both copies should be equal
+    And the request should be answered from disk by the new cache
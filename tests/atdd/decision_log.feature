@@ -0,0 +1,23 @@
+# ATDD Test: Decision Audit Log
+#
+# User Story:
+# As a compliance officer reviewing how policies were enforced
+# I want every authorization decision appended to a queryable audit log
+# So that I can find every DENY for a bucket since a given date without scanning gigabytes of logs
+
+Feature: Append-only, segmented and indexed decision audit log
+
+  @decision-log @segments
+  Scenario: Segments rotate and indexed queries match a full scan
+    Given a decision log rotating segments every 32 KB
+    When 3000 decisions for 50 buckets are logged before and after a cutoff time
+    Then the log should have been sealed into several indexed segments
+    And asking for every DENY for bucket "bucket-7" since the cutoff should match a full scan
+    And asking for every ALLOW since the cutoff should match a full scan
+
+  @decision-log @retention
+  Scenario: Old segments expire and unsealed segments are recovered
+    Given a decision log directory holding an unsealed segment with a torn final line
+    When a decision log writer keeping 2 segments opens it and logs 3000 decisions
+    Then the unsealed segment should have been indexed without its torn line
+    And only the 2 newest segments should remain
@@ -0,0 +1,47 @@
+# ATDD Test: Schema-Aware Entity Pre-Validation
+#
+# User Story:
+# As a platform engineer feeding generated inventories into Cedar checks
+# I want malformed entities caught against the schema before evaluation
+# So that bad records are reported instead of costing a cedar round trip or silently becoming DENY
+
+Feature: Schema-aware pre-validation of entities and requests
+
+  @entity-validation @schema
+  Scenario: Malformed entities are reported per entity and dropped from the batch
+    Given the fixture entities plus these malformed S3 buckets
+      | bucket                 | defect                                |
+      | no-environment-bucket  | missing environment                   |
+      | no-type-bucket         | missing resource_type                 |
+      | string-flag-bucket     | encryption_enabled as the string true |
+      | orphan-bucket          | parents omitted                       |
+      | extra-attribute-bucket | undeclared attribute                  |
+      | dev-data-bucket        | duplicate uid                         |
+    When I validate the batch against the schema
+    Then every fixture entity should be kept
+    And each malformed bucket should be rejected with an error naming its defect
+
+  @entity-validation @schema
+  Scenario: Prevalidation keeps bad entities and requests away from the evaluator
+    Given an entities file with the fixtures and a bucket whose encryption flag is the string "true"
+    When I authorize every suite request plus one for that bucket with prevalidation on the python backend
+    Then the suite decisions should match a run without prevalidation
+    And the runner should report the bucket as a dropped entity
+    And the request for that bucket should be answered ERROR naming the schema error
+    And a request with a principal type the action does not allow should be answered ERROR without evaluation
+
+  @entity-validation @indexed-entity-store
+  Scenario: Building an indexed store with a schema leaves invalid entities out
+    Given the fixture entities plus these malformed S3 buckets
+      | bucket                | defect              |
+      | no-environment-bucket | missing environment |
+      | orphan-bucket         | parents omitted     |
+    When I build an indexed entity store from them with the schema
+    Then the store metadata should count 2 rejected entities
+    And the store should hold every fixture entity but none of the malformed buckets
+
+  @entity-validation @schema
+  Scenario: The schema is compiled once and reused for every batch
+    When I validate 20000 generated inventory entities twice
+    Then both passes should use the same compiled validator
+    And every generated entity should be valid
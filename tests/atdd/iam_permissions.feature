@@ -0,0 +1,66 @@
+# ATDD Test: Compiled IAM Permission Checks for CloudFormation Templates
+#
+# User Story:
+# As a platform engineer deploying Cedar stacks through the CI role
+# I want every template's required IAM actions checked against the role policies in one pass
+# So that missing, wildcard-granted or explicitly denied permissions show up before a deploy fails
+
+Feature: Compiled IAM permission checker for CloudFormation templates
+
+  @iam @shift-left
+  Scenario: The repository templates get every permission they need from aws_iam_policies
+    When I check the repository CloudFormation templates against aws_iam_policies
+    Then every template should be reported compliant
+    And "iam:PassRole" should be reported conditional on "iam:PassedToService" for "cf/avp-stack.yaml"
+    And the S3 actions for "examples/cloudformation/s3-encrypted-bucket.yaml" should be scoped to its bucket ARN
+
+  @iam @wildcards
+  Scenario: Wildcards, NotAction and Deny statements are honoured with Deny overriding Allow
+    Given a role policy with these statements
+      | effect | action                           | resource                  |
+      | Allow  | s3:Put*                          | arn:aws:s3:::cedar-*      |
+      | Allow  | s3:Create?ucket                  | arn:aws:s3:::cedar-*      |
+      | Allow  | NOT iam:*, verifiedpermissions:* | arn:aws:kms:*             |
+      | Deny   | kms:CreateAlias                  | *                         |
+      | Deny   | s3:PutBucketPolicy               | arn:aws:s3:::cedar-prod-* |
+    When I check these templates against that role
+      | template   | bucket               |
+      | dev-stack  | cedar-dev-artifacts  |
+      | prod-stack | cedar-prod-artifacts |
+      | other      | team-artifacts       |
+    Then the permissions should be reported as
+      | template   | action              | decision |
+      | dev-stack  | s3:CreateBucket     | allowed  |
+      | dev-stack  | s3:PutBucketPolicy  | allowed  |
+      | dev-stack  | kms:CreateKey       | allowed  |
+      | dev-stack  | kms:CreateAlias     | denied   |
+      | prod-stack | s3:PutBucketPolicy  | denied   |
+      | prod-stack | s3:PutBucketTagging | allowed  |
+      | other      | s3:CreateBucket     | missing  |
+      | other      | kms:TagResource     | allowed  |
+    And no template should be reported compliant
+
+  @iam @wildcards
+  Scenario: Account-scoped policy resources cover template ARNs whose account is not known
+    Given a role policy with these statements
+      | effect | action              | resource                                |
+      | Allow  | iam:*               | arn:aws:iam::123456789012:role/app-role |
+      | Allow  | s3:*                | arn:aws:s3:::logs-123456789012          |
+      | Deny   | s3:PutBucketPolicy  | arn:aws:s3:::logs-*                     |
+      | Deny   | s3:PutBucketTagging | arn:aws:s3:::logs-123456789012          |
+    When I check a template with role "app-role" and a bucket named "logs" plus the account ID against that role
+    Then the permissions should be reported as
+      | template  | action              | decision |
+      | app-stack | iam:CreateRole      | allowed  |
+      | app-stack | iam:PassRole        | allowed  |
+      | app-stack | s3:CreateBucket     | allowed  |
+      | app-stack | s3:PutBucketPolicy  | denied   |
+      | app-stack | s3:PutBucketTagging | allowed  |
+
+  @iam @scale
+  Scenario: A large template tree is checked against every role policy
+    Given a generated tree of 400 CloudFormation templates
+    When I check the tree against aws_iam_policies and a second role without KMS permissions
+    Then every template should have a result for both roles
+    And the decisions should match a statement-by-statement evaluation of each action
+    And only templates with a KMS key should be missing permissions for the second role
@@ -0,0 +1,23 @@
+# ATDD Test: Indexed Entity Store
+#
+# User Story:
+# As a platform engineer sweeping accounts with millions of entities
+# I want each authorization to receive only the entities it can reach
+# So that per-request work tracks the request, not the inventory size
+
+Feature: Indexed entity store slices per-request entity sets
+
+  Background:
+    Given I have built an indexed entity store from the fixtures and example templates
+
+  @entity-store
+  Scenario: A bucket slice holds the bucket, its template and the Config principal
+    When I slice the store for a Config compliance check on a template bucket
+    Then the slice should contain the S3Resource, its CloudFormationTemplate and the ConfigEvaluation principal
+    And the slice should not contain unrelated S3 resources
+    And the slice should not contain the entities that only reference the ConfigEvaluation principal
+
+  @entity-store @python-evaluator
+  Scenario: Decisions against the store match decisions against the whole entities file
+    When I replay every suite request against the store and against the entities file
+    Then every decision should match between the store and the entities file
@@ -0,0 +1,35 @@
+# ATDD Test: Partial Evaluation
+#
+# User Story:
+# As a security engineer reviewing and running the S3 encryption policies
+# I want the policy set specialised per action and environment ahead of time
+# So that runtime checks only evaluate what is left and dead policies stand out in review
+
+Feature: Residual policies per action and environment
+
+  Background:
+    Given I have precomputed residual policies for the repository policy set
+
+  @partial-evaluation
+  Scenario: Production compliance residuals no longer depend on the environment
+    When I render the residual policies for config:EvaluateCompliance in production
+    Then the residual policies should not reference resource.environment
+    And the residual policies should still check encryption_enabled, encryption_algorithm and kms_key_id
+
+  @partial-evaluation @python-evaluator
+  Scenario: Residual evaluation matches full evaluation
+    When I evaluate every combination of bucket encryption settings in every environment with residuals and with the full policy set
+    Then every residual response should match the full policy set response
+    And requests for unknown environments should fall back to the full policy set
+
+  @partial-evaluation
+  Scenario: Always-allow and always-deny residuals are reported
+    When I build the partial evaluation report
+    Then cloudformation:ValidateTemplate should be always-allow in every known environment
+    And s3:GetBucketEncryption by a Human should be always-deny outside production
+
+  @partial-evaluation @batch
+  Scenario: Residuals are refused for backends that cannot use them
+    When I run the batch command with --residuals on the "pool" backend
+    Then the batch command should fail with a usage error naming "--backend python"
+    And a runner asking for residuals on the "cli" backend should be refused
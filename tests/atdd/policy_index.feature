@@ -0,0 +1,22 @@
+# ATDD Test: Policy Index
+#
+# User Story:
+# As a platform engineer managing thousands of generated Cedar policies
+# I want each request to evaluate only the policies that can apply to it
+# So that authorization latency stays flat as the policy set grows
+
+Feature: Policy index by action and entity type
+
+  @policy-index @python-evaluator
+  Scenario: Indexed evaluation matches full evaluation for every request shape
+    Given I have the repository policies plus generated per-account policies
+    When I evaluate every combination of fixture principal, action and resource with and without the index
+    Then every response should be identical with and without the index
+
+  @policy-index
+  Scenario: The selectivity report shows the candidate subset per request type
+    Given I have the repository policies plus generated per-account policies
+    When I build the policy index selectivity report
+    Then every appliesTo combination should evaluate less than half of the policy set
+    And policies opening their first when clause with "resource is" should be candidates for that type only
+    And policies whose scope no declared action accepts should be reported as unreachable
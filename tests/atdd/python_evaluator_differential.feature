@@ -0,0 +1,24 @@
+# ATDD Test: In-Process Python Cedar Evaluator
+#
+# User Story:
+# As a platform engineer running large compliance sweeps
+# I want an in-process evaluator for the policies we ship
+# So that decisions take microseconds while staying identical to the cedar CLI
+
+Feature: Python Cedar evaluator matches the cedar CLI
+
+  Background:
+    Given I have the repository Cedar policy for S3 encryption enforcement
+    And I have the Python Cedar evaluator loaded with the repository policies
+
+  @python-evaluator @differential
+  Scenario: Every suite request and inline test case gets the same decision from both engines
+    When I replay every suite request and inline test case against both engines
+    Then every decision should match between the Python evaluator and the cedar CLI
+
+  @python-evaluator @shift-right
+  Scenario: Python backend keeps the CedarPolicyRunner result shape
+    Given I have a live S3 bucket with AES256 encryption enabled
+    When I run the shift-right validation with the python backend
+    Then the S3 bucket should be marked as COMPLIANT
+    And the result should include decision, compliant, execution time and context
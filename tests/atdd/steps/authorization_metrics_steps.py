@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the authorization metrics tests.
+
+These step definitions implement the scenarios defined in
+authorization_metrics.feature using the behave framework.
+"""
+
+import json
+import sys
+from pathlib import Path
+from behave import when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_metrics import MetricsExporter, MetricsRegistry
+from cedar_policy_runner import CedarPolicyRunner
+from cedar_test_files import iter_suite_cases
+from differential_harness import PROJECT_ROOT
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+
+@when('I replay every suite request with metrics enabled on the python backend')
+def step_when_replay_with_metrics(context):
+    """Authorize each suite request with a MetricsRegistry attached to the runner."""
+    requests = [case["request"] for case in iter_suite_cases(PROJECT_ROOT / "tests", FIXTURE_ENTITIES)]
+    context.metrics = MetricsRegistry()
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python", metrics=context.metrics)
+    context.metrics_results = list(runner.authorize_batch(requests, str(FIXTURE_ENTITIES)))
+    assert context.metrics_results, "No suite requests were discovered"
+
+
+@when('I export the metrics to Prometheus and OTLP files')
+def step_when_export_metrics(context):
+    """Write both exposition formats into a temporary directory."""
+    workdir = scenario_workdir(context, "metrics")
+    context.prometheus_file = workdir / "cedar.prom"
+    context.otlp_file = workdir / "cedar-otlp.json"
+    MetricsExporter(context.metrics, context.prometheus_file, context.otlp_file).write()
+
+
+@then('every result should report validate and evaluate phase timings')
+def step_then_results_have_phases(context):
+    """The python evaluator times schema validation and policy evaluation separately."""
+    missing = [
+        result["request"] for result in context.metrics_results
+        if not {"validate", "evaluate"} <= set(result["phases"])
+    ]
+    assert not missing, f"Results without validate/evaluate phases: {missing[:3]}"
+
+
+@then('the phase timings should not exceed the end-to-end time')
+def step_then_phases_within_total(context):
+    """Phases are disjoint, so together they fit inside the measured execution time."""
+    over = [
+        result for result in context.metrics_results
+        if sum(result["phases"].values()) > result["execution_time_seconds"] + 0.001
+    ]
+    assert not over, f"{len(over)} result(s) report more phase time than end-to-end time"
+
+
+@then('the Prometheus file should count every decision by outcome')
+def step_then_prometheus_counts(context):
+    """cedar_decisions_total sums to the number of results, split by decision."""
+    expected: dict = {}
+    for result in context.metrics_results:
+        expected[result["decision"]] = expected.get(result["decision"], 0) + 1
+
+    counted: dict = {}
+    for line in context.prometheus_file.read_text().splitlines():
+        if line.startswith("cedar_decisions_total{"):
+            labels, value = line.rsplit(" ", 1)
+            decision = labels.split('decision="', 1)[1].split('"', 1)[0]
+            counted[decision] = counted.get(decision, 0) + int(value)
+    assert counted == expected, f"Prometheus decision counts {counted} != {expected}"
+
+
+@then('the OTLP file should hold the phase duration histogram')
+def step_then_otlp_histogram(context):
+    """The OTLP/JSON document carries one data point per observed phase."""
+    with open(context.otlp_file) as handle:
+        document = json.load(handle)
+    metrics = {m["name"]: m for m in document["resourceMetrics"][0]["scopeMetrics"][0]["metrics"]}
+    points = metrics["cedar.phase.duration"]["histogram"]["dataPoints"]
+    phases = {a["value"]["stringValue"] for p in points for a in p["attributes"] if a["key"] == "phase"}
+    assert {"validate", "evaluate"} <= phases, f"Unexpected phases in OTLP export: {phases}"
+    for point in points:
+        assert sum(int(c) for c in point["bucketCounts"]) == int(point["count"]), "Bucket counts do not add up"
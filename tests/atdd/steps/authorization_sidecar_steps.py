@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the authorization sidecar tests.
+
+These step definitions implement the scenarios defined in
+authorization_sidecar.feature using the behave framework.
+"""
+
+import asyncio
+import json
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from authorization_sidecar import AuthorizationSidecar, SidecarClient
+from cedar_evaluator import CedarEvaluator, EntityStore
+from decision_cache import PolicyFingerprint
+from differential_harness import PROJECT_ROOT
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+SUITE_DIR = PROJECT_ROOT / "tests" / "s3_encryption_suite"
+KMS_REQUEST = SUITE_DIR / "ALLOW" / "runtime-bucket-kms.json"
+
+
+def _suite_requests():
+    return [json.loads(path.read_text()) for path in sorted(SUITE_DIR.glob("*/*.json"))]
+
+
+def _start_sidecar(context, **kwargs) -> None:
+    """Run the sidecar on its own event loop thread for the rest of the scenario."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    workdir = scenario_workdir(context, "sidecar")
+    sidecar = AuthorizationSidecar(str(FIXTURE_ENTITIES), **kwargs)
+    socket_path = str(workdir / "cedar.sock")
+    context.sidecar_addresses = asyncio.run_coroutine_threadsafe(
+        sidecar.start(port=0, unix_socket=socket_path), loop).result(timeout=30)
+    context.sidecar = sidecar
+    context.sidecar_loop = loop
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(sidecar.stop(), loop).result(timeout=30)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+    context.add_cleanup(stop)
+
+
+def _run(context, coroutine, timeout: float = 60):
+    return asyncio.run_coroutine_threadsafe(coroutine, context.sidecar_loop).result(timeout=timeout)
+
+
+@given('an authorization sidecar is serving the fixture entities over TCP and a Unix socket')
+def step_given_sidecar(context):
+    _start_sidecar(context, reload_interval=0)
+    assert [address.split(":")[0] for address in context.sidecar_addresses] == ["http", "unix"]
+    context.sidecar_responses = []
+
+
+@when('{clients:d} kept-alive clients each send the {count:d} suite requests one at a time')
+def step_when_clients_send(context, clients, count):
+    requests = _suite_requests()
+    assert len(requests) == count, len(requests)
+
+    async def client(address):
+        connection = SidecarClient(address)
+        responses = []
+        for request in requests:
+            status, body = await connection.request("POST", "/v1/authorize", request)
+            assert status == 200, body
+            responses.append((request, body))
+        await connection.close()
+        return responses
+
+    async def run_all():
+        addresses = [context.sidecar_addresses[index % 2] for index in range(clients)]
+        return await asyncio.gather(*(client(address) for address in addresses))
+
+    for responses in _run(context, run_all()):
+        context.sidecar_responses.extend(responses)
+
+
+@when('a client posts the {count:d} suite requests as one batch over the Unix socket')
+def step_when_batch(context, count):
+    requests = _suite_requests()
+
+    async def post():
+        connection = SidecarClient(context.sidecar_addresses[1])
+        status, body = await connection.request("POST", "/v1/authorize/batch", {"requests": requests})
+        await connection.close()
+        return status, body
+
+    status, body = _run(context, post())
+    assert status == 200, body
+    assert len(body["results"]) == count
+    context.sidecar_responses.extend(zip(requests, body["results"]))
+
+
+@then('every response should match the decision the Python evaluator gives')
+def step_then_match_evaluator(context):
+    evaluator = CedarEvaluator.from_files(PROJECT_ROOT / "cedar_policies", PROJECT_ROOT / "schema.cedarschema")
+    entities = EntityStore.from_file(str(FIXTURE_ENTITIES))
+    for request, response in context.sidecar_responses:
+        expected = evaluator.authorize_request(request, entities).decision
+        assert response["decision"] == expected, (request["description"], response)
+        assert response["generation"] == 1
+
+
+@then('the sidecar should have evaluated them in fewer batches than requests')
+def step_then_fewer_batches(context):
+    stats = context.sidecar.stats
+    assert stats["requests"] == len(context.sidecar_responses), stats
+    assert stats["batches"] < stats["requests"], stats
+
+
+@given('an authorization sidecar is serving a copy of the policies with hot reload')
+def step_given_reloading_sidecar(context):
+    context.sidecar_policies = scenario_workdir(context, "sidecar-policies") / "policies"
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", context.sidecar_policies)
+    _start_sidecar(context, policy_dir=str(context.sidecar_policies), reload_interval=0.05)
+    context.sidecar_first_hash = context.sidecar.generation.policy_hash
+
+
+@given('clients keep sending requests for the runtime KMS bucket')
+def step_given_clients_keep_sending(context):
+    request = json.loads(KMS_REQUEST.read_text())
+    context.sidecar_traffic = []
+    context.sidecar_traffic_stop = False
+
+    async def client():
+        connection = SidecarClient(context.sidecar_addresses[0])
+        while not context.sidecar_traffic_stop:
+            context.sidecar_traffic.append(await connection.request("POST", "/v1/authorize", request))
+        await connection.close()
+
+    context.sidecar_traffic_futures = [asyncio.run_coroutine_threadsafe(client(), context.sidecar_loop)
+                                       for _ in range(4)]
+    deadline = time.time() + 10
+    while not context.sidecar_traffic and time.time() < deadline:
+        time.sleep(0.01)
+    assert context.sidecar_traffic[0][1]["decision"] == "ALLOW", context.sidecar_traffic[0]
+
+
+async def _health(context):
+    connection = SidecarClient(context.sidecar_addresses[0])
+    _, health = await connection.request("GET", "/healthz")
+    await connection.close()
+    return health
+
+
+def _wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@when('I add a policy forbidding compliance checks on that bucket')
+def step_when_add_forbid(context):
+    (context.sidecar_policies / "zz-quarantine.cedar").write_text(
+        'forbid(principal, action == Action::"config:EvaluateCompliance", '
+        'resource == S3Resource::"prod-secure-bucket");\n')
+    assert _wait_for(lambda: context.sidecar.generation.number == 2), context.sidecar.stats
+    # Let traffic run on the new generation for a moment before stopping it
+    count = len(context.sidecar_traffic)
+    assert _wait_for(lambda: len(context.sidecar_traffic) > count + 20)
+    context.sidecar_traffic_stop = True
+    for future in context.sidecar_traffic_futures:
+        future.result(timeout=30)
+
+
+@then('the sidecar should serve generation 2 with a new policy hash')
+def step_then_generation_two(context):
+    generation = context.sidecar.generation
+    assert generation.number == 2
+    assert generation.policy_hash != context.sidecar_first_hash
+
+
+@then('the served policy hash should be the hash of the policy files on disk')
+def step_then_hash_matches_disk(context):
+    on_disk, _ = PolicyFingerprint(context.sidecar_policies, PROJECT_ROOT / "schema.cedarschema",
+                                   check_interval=0).current()
+    assert context.sidecar.generation.policy_hash == on_disk, (context.sidecar.generation.policy_hash, on_disk)
+
+
+@then('the bucket should now be denied')
+def step_then_denied(context):
+    status, body = context.sidecar_traffic[-1]
+    assert status == 200 and body["decision"] == "DENY" and body["generation"] == 2, body
+
+
+@then('no request should have failed while the policies changed')
+def step_then_no_failures(context):
+    for status, body in context.sidecar_traffic:
+        assert status == 200, body
+        expected = "ALLOW" if body["generation"] == 1 else "DENY"
+        assert body["decision"] == expected, body
+    generations = {body["generation"] for _, body in context.sidecar_traffic}
+    assert generations == {1, 2}, generations
+
+
+@when('I add a policy file with a syntax error')
+def step_when_broken_policy(context):
+    (context.sidecar_policies / "zz-broken.cedar").write_text("permit(principal, action, resource\n")
+    assert _wait_for(lambda: context.sidecar.stats["reload_errors"] == 1), context.sidecar.stats
+
+
+@then('the sidecar should keep serving generation 2 and report the reload error')
+def step_then_kept_generation(context):
+    request = json.loads(KMS_REQUEST.read_text())
+
+    async def check():
+        connection = SidecarClient(context.sidecar_addresses[0])
+        decision = await connection.request("POST", "/v1/authorize", request)
+        health = await connection.request("GET", "/healthz")
+        await connection.close()
+        return decision, health
+
+    (status, body), (_, health) = _run(context, check())
+    assert status == 200 and body["generation"] == 2 and body["decision"] == "DENY", body
+    assert health["generation"] == 2 and health["reload_errors"] == 1, health
+    assert health["last_reload_error"], health
+
+
+@when('I add a policy that reads the undeclared attribute "{attr}" of S3Resource')
+def step_when_untyped_policy(context, attr):
+    (context.sidecar_policies / "zz-undeclared.cedar").write_text(
+        'permit(principal, action == Action::"s3:CreateBucket", resource)\n'
+        f'when {{ resource.{attr} == true }};\n')
+    assert _wait_for(lambda: context.sidecar.stats["reload_errors"] == 1), context.sidecar.stats
+
+
+@then('the sidecar should keep serving generation 1 and report a reload error mentioning "{text}"')
+def step_then_kept_first_generation(context, text):
+    health = _run(context, _health(context))
+    assert health["generation"] == 1 and health["policy_hash"] == context.sidecar_first_hash, health
+    assert "PolicyValidationError" in health["last_reload_error"], health
+    assert text in health["last_reload_error"], health
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the batch authorization tests.
+
+These step definitions implement the scenarios defined in
+batch_authorization.feature using the behave framework.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_policy_runner import CedarPolicyRunner
+from differential_harness import PROJECT_ROOT
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+SUITE = PROJECT_ROOT / "tests" / "s3_encryption_suite"
+RUNNER_SCRIPT = PROJECT_ROOT / "tests" / "atdd" / "support" / "cedar_policy_runner.py"
+NOT_JSON = '{"principal": "Human::\\"validator\\"", '
+
+
+def _suite_files():
+    return sorted(SUITE.glob("*/*.json"))
+
+
+def _authorize(items):
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python")
+    try:
+        return list(runner.authorize_batch(items, str(FIXTURE_ENTITIES)))
+    finally:
+        runner.close()
+
+
+def _run_batch(context) -> None:
+    context.batch_process = subprocess.run(
+        [sys.executable, str(RUNNER_SCRIPT), "batch", "--backend", "python",
+         "--entities", str(FIXTURE_ENTITIES), "--requests", str(context.batch_jsonl)],
+        capture_output=True, text=True, timeout=120)
+    context.batch_records = [json.loads(line) for line in context.batch_process.stdout.splitlines()]
+
+
+@given('a batch mixing suite request files, request dicts and request tuples')
+def step_given_mixed_batch(context):
+    context.batch_items = []
+    context.batch_problems = []
+    for index, path in enumerate(_suite_files()):
+        if index % 3 == 0:
+            item = str(path)
+        else:
+            request = json.loads(path.read_text())
+            if index % 3 == 1:
+                item = request
+            else:
+                item = (request["principal"], request["action"], request["resource"], request["context"])
+        context.batch_items.append(item)
+        context.batch_problems.append(None)
+
+
+@given('the batch also holds a dict without a resource, a missing request file and a short tuple')
+def step_given_malformed_items(context):
+    missing_file = scenario_workdir(context, "batch") / "missing-request.json"
+    malformed = [
+        ({"principal": 'Human::"validator"', "action": 'Action::"s3:CreateBucket"'}, "no resource"),
+        (str(missing_file), "missing-request.json"),
+        (('Human::"validator"', 'Action::"s3:CreateBucket"'), "not enough values"),
+    ]
+    # Spread them through the batch so later requests must still be answered
+    for offset, (item, problem) in enumerate(malformed):
+        position = 2 + offset * 5
+        context.batch_items.insert(position, item)
+        context.batch_problems.insert(position, problem)
+
+
+@when('I authorize the batch on the python backend')
+def step_when_authorize_batch(context):
+    context.batch_results = _authorize(context.batch_items)
+
+
+@then('there should be one result per batch item in the same order')
+def step_then_one_per_item(context):
+    assert len(context.batch_results) == len(context.batch_items), len(context.batch_results)
+    for item, result in zip(context.batch_items, context.batch_results):
+        if isinstance(item, str):
+            assert result["request"]["source"] == item, result["request"]
+        elif isinstance(item, dict):
+            assert result["request"]["principal"] == item["principal"], result["request"]
+
+
+@then('the malformed items should be ERROR records naming the problem')
+def step_then_malformed_errors(context):
+    for problem, result in zip(context.batch_problems, context.batch_results):
+        if problem is not None:
+            assert result["decision"] == "ERROR", result
+            assert problem in result["error"], result["error"]
+
+
+@then('every other item should get the same decision as in a batch without the malformed items')
+def step_then_same_decisions(context):
+    clean = [item for item, problem in zip(context.batch_items, context.batch_problems) if problem is None]
+    expected = [result["decision"] for result in _authorize(clean)]
+    actual = [result["decision"] for result, problem in zip(context.batch_results, context.batch_problems)
+              if problem is None]
+    assert "ERROR" not in expected, expected
+    assert actual == expected, f"{actual} != {expected}"
+
+
+@given('a JSONL request file with the suite requests and one line that is not JSON')
+def step_given_jsonl(context):
+    context.batch_lines = [json.dumps(json.loads(path.read_text())) for path in _suite_files()]
+    context.batch_bad_line = 4
+    context.batch_lines.insert(context.batch_bad_line, NOT_JSON)
+    context.batch_jsonl = scenario_workdir(context, "batch") / "requests.jsonl"
+    context.batch_jsonl.write_text("\n".join(context.batch_lines) + "\n")
+
+
+@when('I run the batch command on the python backend')
+def step_when_run_batch(context):
+    _run_batch(context)
+
+
+@when('I drop the line that is not JSON and run the batch command again')
+def step_when_rerun_batch(context):
+    context.batch_first_records = context.batch_records
+    del context.batch_lines[context.batch_bad_line]
+    context.batch_jsonl.write_text("\n".join(context.batch_lines) + "\n")
+    _run_batch(context)
+
+
+@then('it should print one JSON record per request line in order')
+def step_then_records_in_order(context):
+    assert len(context.batch_records) == len(context.batch_lines), context.batch_process.stderr
+    for line, record in zip(context.batch_lines, context.batch_records):
+        if line != NOT_JSON:
+            assert record["request"]["resource"] == json.loads(line)["resource"], record
+
+
+@then('the line that is not JSON should be an ERROR record')
+def step_then_bad_line(context):
+    decisions = [record["decision"] for record in context.batch_records]
+    assert decisions.count("ERROR") == 1, decisions
+    record = context.batch_records[context.batch_bad_line]
+    assert f"requests.jsonl:{context.batch_bad_line + 1}" in record["error"], record
+
+
+@then('the other lines should get the same decisions as before')
+def step_then_same_as_before(context):
+    before = [record["decision"] for index, record in enumerate(context.batch_first_records)
+              if index != context.batch_bad_line]
+    after = [record["decision"] for record in context.batch_records]
+    assert after == before, f"{after} != {before}"
+
+
+@then('the batch command should exit with code {code:d}')
+def step_then_batch_exit(context, code):
+    assert context.batch_process.returncode == code, context.batch_process.stderr
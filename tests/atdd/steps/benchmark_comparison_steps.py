@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the benchmark comparison tests.
+
+These step definitions implement the scenarios defined in
+benchmark_comparison.feature using the behave framework.
+"""
+
+import contextlib
+import io
+import json
+import random
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from differential_harness import PROJECT_ROOT
+from step_fixtures import scenario_workdir
+
+sys.path.append(str(PROJECT_ROOT / "scripts"))
+from cedar_benchmark import compare_results, main as benchmark_main, summarize
+
+SCENARIO = "validate_s3_bucket/python/policies=0/entities=0/concurrency=1"
+
+
+def _report(samples_seconds):
+    stats = summarize(samples_seconds, len(samples_seconds), sum(samples_seconds), 0)
+    stats["name"] = SCENARIO
+    return {"version": 1, "results": [stats]}
+
+
+def _compare(context, current_seconds):
+    comparisons = compare_results(context.benchmark_baseline, _report(current_seconds), 0.10, 0.01)
+    context.benchmark_status = comparisons[0]["status"]
+
+
+@given('a quick python backend benchmark result')
+def step_given_quick_result(context):
+    context.benchmark_file = scenario_workdir(context, "benchmark") / "result.json"
+    with contextlib.redirect_stdout(io.StringIO()):
+        exit_code = benchmark_main(["run", "--backends", "python", "--quick",
+                                    "--output", str(context.benchmark_file)])
+    assert exit_code == 0, exit_code
+
+
+@when('I compare the result against itself')
+def step_when_compare_self(context):
+    comparison_file = context.benchmark_file.with_name("comparison.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        context.benchmark_exit = benchmark_main(["compare", str(context.benchmark_file),
+                                                 str(context.benchmark_file), "--json", str(comparison_file)])
+    context.benchmark_comparisons = json.loads(comparison_file.read_text())
+
+
+@then('the comparison should exit {code:d}')
+def step_then_exit_code(context, code):
+    assert context.benchmark_exit == code, context.benchmark_comparisons
+
+
+@then('every scenario should be reported unchanged')
+def step_then_all_unchanged(context):
+    assert context.benchmark_comparisons, "No scenarios were compared"
+    statuses = {c["name"]: c["status"] for c in context.benchmark_comparisons if c["status"] != "unchanged"}
+    assert not statuses, statuses
+
+
+@given('a baseline with {count:d} latency samples per scenario')
+def step_given_baseline(context, count):
+    rng = random.Random(7)
+    context.benchmark_samples = [rng.lognormvariate(-9, 0.3) for _ in range(count)]
+    context.benchmark_baseline = _report(context.benchmark_samples)
+
+
+@when('the slowest {percent:d}% of the samples get {factor:g} times slower')
+def step_when_tail_slower(context, percent, factor):
+    cutoff = sorted(context.benchmark_samples)[int(len(context.benchmark_samples) * (100 - percent) / 100)]
+    _compare(context, [s * factor if s >= cutoff else s for s in context.benchmark_samples])
+
+
+@when('every sample gets {factor:g} times slower')
+def step_when_all_slower(context, factor):
+    _compare(context, [s * factor for s in context.benchmark_samples])
+
+
+@then('the comparison should report the scenario unchanged')
+def step_then_unchanged(context):
+    assert context.benchmark_status == "unchanged", context.benchmark_status
+
+
+@then('the comparison should report the scenario as a regression')
+def step_then_regression(context):
+    assert context.benchmark_status == "regression", context.benchmark_status
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the Cedar policy test runner tests.
+
+These step definitions implement the scenarios defined in
+cedar_testrunner.feature using the behave framework.
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from differential_harness import PROJECT_ROOT
+from step_fixtures import scenario_workdir
+
+RUNNER = PROJECT_ROOT / "scripts" / "cedar_testrunner.py"
+SUITE = PROJECT_ROOT / "tests" / "s3_encryption_suite"
+ALLOW_REQUEST = SUITE / "ALLOW" / "runtime-bucket-kms.json"
+DENY_REQUEST = SUITE / "DENY" / "runtime-bucket-no-encryption.json"
+
+
+def _run(context, *extra) -> None:
+    tree = context.testrunner_tree
+    context.testrunner_junit = tree / "report.xml"
+    context.testrunner_json = tree / "summary.json"
+    context.testrunner_process = subprocess.run(
+        [sys.executable, str(RUNNER), "--quiet", "--policies", str(tree / "policies"),
+         "--tests", str(tree / "tests"), "--entities", str(PROJECT_ROOT / "tests" / "fixtures" / "entities.json"),
+         "--junit-xml", str(context.testrunner_junit), "--json-summary", str(context.testrunner_json), *extra],
+        capture_output=True, text=True, timeout=120)
+    context.testrunner_summary = json.loads(context.testrunner_json.read_text())
+
+
+def _testcases(context):
+    return ET.parse(context.testrunner_junit).getroot().iter("testcase")
+
+
+@given('a test tree with the repository policies and one ALLOW and one DENY request')
+def step_given_test_tree(context):
+    tree = context.testrunner_tree = scenario_workdir(context, "testrunner")
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", tree / "policies")
+    shutil.copy(PROJECT_ROOT / "schema.cedarschema", tree / "schema.cedarschema")
+    for request, expected in ((ALLOW_REQUEST, "ALLOW"), (DENY_REQUEST, "DENY")):
+        (tree / "tests" / "suite" / expected).mkdir(parents=True)
+        shutil.copy(request, tree / "tests" / "suite" / expected / request.name)
+    context.testrunner_policy_count = len(list((tree / "policies").glob("*.cedar")))
+
+
+@given('the ALLOW request is filed under DENY as well')
+def step_given_misfiled(context):
+    shutil.copy(ALLOW_REQUEST, context.testrunner_tree / "tests" / "suite" / "DENY" / ALLOW_REQUEST.name)
+
+
+@given('a policy that reads the undeclared attribute "{attr}" of S3Resource')
+def step_given_bad_policy(context, attr):
+    context.testrunner_bad_policy = context.testrunner_tree / "policies" / "zz-undeclared.cedar"
+    context.testrunner_bad_policy.write_text(
+        'permit(principal, action == Action::"s3:CreateBucket", resource)\n'
+        f'when {{ resource.{attr} == true }};\n')
+    context.testrunner_policy_count += 1
+
+
+@when('I run the python test runner with JUnit and JSON reports')
+def step_when_run(context):
+    _run(context, "--schema", str(context.testrunner_tree / "schema.cedarschema"))
+
+
+@when('I run the python test runner without a schema')
+def step_when_run_without_schema(context):
+    _run(context, "--schema", str(context.testrunner_tree / "missing.cedarschema"))
+
+
+@then('the test runner should exit with code {code:d}')
+def step_then_exit(context, code):
+    process = context.testrunner_process
+    assert process.returncode == code, f"{process.returncode}\n{process.stdout}\n{process.stderr}"
+
+
+@then('the JSON summary should report {passed:d} passed and {failed:d} failed with {mode} validation')
+def step_then_summary(context, passed, failed, mode):
+    summary = context.testrunner_summary
+    assert (summary["passed"], summary["failed"]) == (passed, failed), summary
+    assert summary["policy_validation"] == mode, summary["policy_validation"]
+    assert summary["policies_validated"] == context.testrunner_policy_count, summary
+
+
+@then('the JUnit report should hold the {count:d} requests and the policy files without failures')
+def step_then_junit_clean(context, count):
+    testcases = list(_testcases(context))
+    requests = [t for t in testcases if t.get("classname") != "policy-validation"]
+    assert len(requests) == count, [t.get("name") for t in requests]
+    assert len(testcases) - len(requests) == context.testrunner_policy_count, len(testcases)
+    assert not any(t.find("failure") is not None for t in testcases)
+
+
+@then('the JUnit report should hold {count:d} failure for the misfiled request')
+def step_then_junit_failure(context, count):
+    failed = [t for t in _testcases(context) if t.find("failure") is not None]
+    assert len(failed) == count, [t.get("name") for t in failed]
+    assert ALLOW_REQUEST.stem in failed[0].get("name") and "expect: DENY" in failed[0].get("name"), failed[0].get("name")
+
+
+@then('the JSON summary should list the new policy file as a validation failure')
+def step_then_validation_failure(context):
+    assert context.testrunner_summary["policy_validation_failures"] == [str(context.testrunner_bad_policy)], \
+        context.testrunner_summary["policy_validation_failures"]
+
+
+@then('the JUnit report should hold a policy-validation failure mentioning "{text}"')
+def step_then_junit_validation(context, text):
+    failed = [t for t in _testcases(context)
+              if t.get("classname") == "policy-validation" and t.find("failure") is not None]
+    assert [t.get("name") for t in failed] == [context.testrunner_bad_policy.name], [t.get("name") for t in failed]
+    assert text in failed[0].find("failure").text, failed[0].find("failure").text
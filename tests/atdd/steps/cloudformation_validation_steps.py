@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the CloudFormation template validation tests.
+
+These step definitions implement the scenarios defined in
+cloudformation_validation.feature using the behave framework.
+"""
+
+import json
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from differential_harness import PROJECT_ROOT
+from cloudformation_entities import scan_templates
+from step_fixtures import scenario_workdir
+from template_manifest import validate_incremental
+
+TEMPLATE = """AWSTemplateFormatVersion: '2010-09-09'
+Resources:
+  DataBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: {bucket}
+{encryption}"""
+
+AES256 = """      BucketEncryption:
+        ServerSideEncryptionConfiguration:
+          - ServerSideEncryptionByDefault:
+              SSEAlgorithm: AES256
+"""
+
+INTRINSICS = """AWSTemplateFormatVersion: '2010-09-09'
+Parameters:
+  Environment:
+    Type: String
+    Default: production
+  BucketPrefix:
+    Type: String
+    Default: cedar
+Conditions:
+  IsProduction: !Equals [!Ref Environment, production]
+Resources:
+  LogsKey:
+    Type: AWS::KMS::Key
+  LogsBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: !Sub '${BucketPrefix}-logs-${Environment}'
+      BucketEncryption:
+        ServerSideEncryptionConfiguration:
+          - ServerSideEncryptionByDefault:
+              SSEAlgorithm: !If [IsProduction, 'aws:kms', AES256]
+              KMSMasterKeyID: !GetAtt LogsKey.Arn
+  DataBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: !Join ['-', [!Ref BucketPrefix, !Ref Environment, data]]
+      Tags:
+        - Key: Environment
+          Value: staging
+      BucketEncryption:
+        ServerSideEncryptionConfiguration:
+          - ServerSideEncryptionByDefault:
+              SSEAlgorithm: !If [IsProduction, AES256, 'aws:kms']
+  ScratchBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: !GetAtt LogsKey.KeyId
+"""
+
+KUBERNETES_MANIFEST = """apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: cedar-config
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: cedar
+"""
+
+HELM_CHART = """{{- if .Values.enabled }}
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: {{ .Values.name }}
+{{- end }}
+"""
+
+
+def _write_template(tree: Path, name: str, encrypted: bool = True) -> None:
+    (tree / f"{name}.yaml").write_text(TEMPLATE.format(bucket=f"{name}-data", encryption=AES256 if encrypted else ""))
+
+
+def _summaries(context):
+    return {summary["template_id"]: summary for summary in context.cf_outcome["summaries"]}
+
+
+def _template_tree(context) -> Path:
+    workdir = scenario_workdir(context, "cf")
+    context.cf_tree = workdir / "templates"
+    context.cf_tree.mkdir()
+    context.cf_manifest = workdir / "manifest.json"
+    return context.cf_tree
+
+
+@given('a template tree with AES256 buckets "{first}", "{second}" and "{third}"')
+def step_given_template_tree(context, first, second, third):
+    _template_tree(context)
+    for name in (first, second, third):
+        _write_template(context.cf_tree, name)
+
+
+def _validate(context, default_environment="development", backend="python"):
+    context.cf_outcome = validate_incremental(
+        [str(context.cf_tree)], str(context.cf_tree), context.cf_manifest,
+        PROJECT_ROOT / "cedar_policies", PROJECT_ROOT / "schema.cedarschema",
+        workers=1, default_environment=default_environment, backend=backend)
+
+
+def _buckets(context):
+    return {entity["uid"]["id"].rsplit("/", 1)[1]: entity["attrs"]
+            for parsed in context.cf_parsed for entity in parsed["entities"]
+            if entity["uid"]["type"] == "S3Resource"}
+
+
+@given('a template tree with a template using !Ref, !Sub, !Join, !If and !GetAtt')
+def step_given_intrinsics_tree(context):
+    (_template_tree(context) / "intrinsics.yaml").write_text(INTRINSICS)
+
+
+@given('a template tree with a Kubernetes manifest, a Helm chart, a multi-document template '
+       'and "{yaml_name}" and "{json_name}" templates')
+def step_given_mixed_tree(context, yaml_name, json_name):
+    tree = _template_tree(context)
+    (tree / "deployment.yaml").write_text(KUBERNETES_MANIFEST)
+    (tree / "configmap.yaml").write_text(HELM_CHART)
+    (tree / "multi.yaml").write_text(KUBERNETES_MANIFEST + "---\n" + TEMPLATE.format(
+        bucket="multi-data", encryption=AES256))
+    (tree / yaml_name).write_text(TEMPLATE.format(bucket="app-data", encryption=AES256))
+    (tree / json_name).write_text(json.dumps(
+        {"Resources": {"DataBucket": {"Type": "AWS::S3::Bucket", "Properties": {"BucketName": "app-json-data"}}}}))
+
+
+@when('I parse the template tree')
+def step_when_parse(context):
+    context.cf_parsed = list(scan_templates([str(context.cf_tree)], str(context.cf_tree), workers=1))
+
+
+@when('I validate the tree incrementally')
+def step_when_validate(context):
+    _validate(context)
+
+
+@when('I validate the tree incrementally with default environment "{environment}"')
+def step_when_validate_environment(context, environment):
+    _validate(context, default_environment=environment)
+
+
+@when('I validate the tree incrementally with default environment "{environment}" and the cli backend')
+def step_when_validate_cli(context, environment):
+    # The cli backend only matters for the manifest key here; cedar need not be installed
+    _validate(context, default_environment=environment, backend="cli")
+
+
+@when('I remove the encryption from "{edited}" and delete "{deleted}"')
+def step_when_edit_and_delete(context, edited, deleted):
+    _write_template(context.cf_tree, edited, encrypted=False)
+    (context.cf_tree / f"{deleted}.yaml").unlink()
+
+
+@then('{evaluated:d} templates should be evaluated, {skipped:d} skipped and {removed:d} removed')
+def step_then_counts(context, evaluated, skipped, removed):
+    outcome = context.cf_outcome
+    counts = (len(outcome["evaluated"]), len(outcome["skipped"]), len(outcome["removed"]))
+    assert counts == (evaluated, skipped, removed), outcome
+
+
+@then('no full re-evaluation reason should be reported')
+def step_then_no_reason(context):
+    assert context.cf_outcome["full_reason"] is None, context.cf_outcome["full_reason"]
+
+
+@then('the full re-evaluation reason should be "{reason}"')
+def step_then_reason(context, reason):
+    assert context.cf_outcome["full_reason"] == reason, context.cf_outcome["full_reason"]
+
+
+@then('"{template}" should be reported non-compliant')
+def step_then_non_compliant(context, template):
+    assert not _summaries(context)[template]["compliant"], _summaries(context)[template]
+
+
+@then('"{non_compliant}" should be reported non-compliant and "{compliant}" compliant')
+def step_then_compliance(context, non_compliant, compliant):
+    summaries = _summaries(context)
+    assert set(summaries) == {non_compliant, compliant}, summaries.keys()
+    assert not summaries[non_compliant]["compliant"], summaries[non_compliant]
+    assert summaries[compliant]["compliant"], summaries[compliant]
+
+
+@then('no parse errors should be reported')
+def step_then_no_parse_errors(context):
+    errors = {parsed["template"]: parsed["error"] for parsed in context.cf_parsed if parsed["error"]}
+    assert not errors, errors
+
+
+@then('the buckets should be parsed as')
+def step_then_buckets_parsed(context):
+    buckets = _buckets(context)
+    for row in context.table:
+        attrs = buckets[row["bucket"]]
+        expected = {"name": row["name"], "environment": row["environment"],
+                    "encryption_algorithm": row["encryption"], "kms_key_id": row["kms_key_id"]}
+        actual = {key: attrs.get(key, "-") for key in expected}
+        assert actual == expected, f"{row['bucket']}: {attrs}"
+        assert attrs["encryption_enabled"] == (row["encryption"] != "-"), attrs
+
+
+@then('the parsed templates should be "{first}", "{second}" and "{third}"')
+def step_then_parsed_templates(context, first, second, third):
+    template_ids = sorted(parsed["template_id"] for parsed in context.cf_parsed)
+    assert template_ids == [first, second, third], template_ids
+
+
+@then('every bucket entity id should be distinct')
+def step_then_distinct_ids(context):
+    uids = [bucket["uid"]["id"] for parsed in context.cf_parsed for bucket in parsed["buckets"]]
+    assert len(uids) == len(set(uids)), uids
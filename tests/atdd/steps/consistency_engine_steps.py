@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the consistency engine tests.
+
+These step definitions implement the scenarios defined in
+consistency_engine.feature using the behave framework.
+"""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from consistency_engine import (ENVIRONMENT_UNKNOWN, EVALUATION_ERROR, LIVE_COMPLIANT, TEMPLATE_COMPLIANT,
+                                ConsistencyEngine)
+from differential_harness import PROJECT_ROOT
+from step_fixtures import scenario_workdir
+
+KMS_ENCRYPTION = {"ServerSideEncryptionConfiguration": [{
+    "ServerSideEncryptionByDefault": {"SSEAlgorithm": "aws:kms", "KMSMasterKeyID": "alias/s3"}}]}
+
+# logical ID -> (BucketName property or None, encrypted in the template)
+TEMPLATE_BUCKETS = {
+    "NamedBucket": ("orders-archive", True),
+    "AccountBucket": ({"Fn::Sub": "audit-logs-${AWS::AccountId}"}, True),
+    "GeneratedBucket": (None, False),
+    "SteadyBucket": ("steady-bucket", True),
+}
+
+# live bucket name -> (encrypted in the account, expected mismatch kind and join key)
+LIVE_BUCKETS = {
+    "orders-archive": (False, TEMPLATE_COMPLIANT, "bucket_name"),
+    "audit-logs-123456789012": (False, TEMPLATE_COMPLIANT, "name_pattern"),
+    "data-stack-generatedbucket-1a2b3c4d5e6f": (True, LIVE_COMPLIANT, "generated_name"),
+    "steady-bucket": (True, None, "bucket_name"),
+    "hand-made-bucket": (False, None, None),
+}
+
+
+def _workdir(context) -> Path:
+    if not hasattr(context, "consistency_dir"):
+        context.consistency_dir = scenario_workdir(context, "consistency")
+    return context.consistency_dir
+
+
+@given('I have a directory of CloudFormation templates with named, templated and generated bucket names')
+def step_given_templates(context):
+    template_dir = _workdir(context) / "templates"
+    template_dir.mkdir()
+    resources = {}
+    for logical_id, (bucket_name, encrypted) in TEMPLATE_BUCKETS.items():
+        properties = {}
+        if bucket_name is not None:
+            properties["BucketName"] = bucket_name
+        if encrypted:
+            properties["BucketEncryption"] = KMS_ENCRYPTION
+        resources[logical_id] = {"Type": "AWS::S3::Bucket", "Properties": properties}
+    (template_dir / "data-stack.json").write_text(json.dumps({"Resources": resources}))
+    context.consistency_templates = template_dir
+    context.consistency_policies = None
+
+
+@given('I have a live inventory where some buckets drifted from their templates')
+def step_given_inventory(context):
+    context.consistency_inventory = []
+    for name, (encrypted, _, _) in LIVE_BUCKETS.items():
+        attrs = {"name": name, "encryption_enabled": encrypted,
+                 "environment": "production", "resource_type": "bucket"}
+        if encrypted:
+            attrs.update(encryption_algorithm="aws:kms", kms_key_id="alias/s3")
+        context.consistency_inventory.append(
+            {"uid": {"type": "S3Resource", "id": name}, "attrs": attrs, "parents": []})
+
+
+@given('the live inventory has "{first}" as an AES256 production bucket and "{second}" as an AES256 bucket '
+       'without an environment')
+def step_given_aes256_inventory(context, first, second):
+    _aes256_inventory(context, ((first, "production"), (second, None)))
+
+
+@given('the live inventory has "{first}" as an AES256 production bucket and "{second}" as an AES256 '
+       'development bucket')
+def step_given_aes256_environments(context, first, second):
+    _aes256_inventory(context, ((first, "production"), (second, "development")))
+
+
+@given('the live buckets are evaluated with a modified copy of the policies')
+def step_given_modified_policies(context):
+    policy_dir = _workdir(context) / "live-policies"
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", policy_dir)
+    with open(policy_dir / "zz-extra.cedar", "w") as handle:
+        handle.write('permit(principal, action == Action::"s3:GetObject", resource);\n')
+    context.consistency_policies = str(policy_dir)
+
+
+@when('I run the consistency engine in chunks of {chunk_size:d} buckets')
+def step_when_run_engine(context, chunk_size):
+    with ConsistencyEngine("cedar_policies", context.consistency_policies, chunk_size=chunk_size) as engine:
+        engine.index_templates([str(context.consistency_templates)], str(context.consistency_templates), workers=1)
+        context.consistency_mismatches = list(engine.mismatches(iter(context.consistency_inventory)))
+        context.consistency_summary = engine.summary()
+
+
+@then('only the drifted buckets should be reported as mismatches')
+def step_then_only_drifted(context):
+    reported = {record["bucket"]: record["mismatch"] for record in context.consistency_mismatches}
+    expected = {name: kind for name, (_, kind, _) in LIVE_BUCKETS.items() if kind}
+    assert reported == expected, f"Expected {expected}, got {reported}"
+    assert context.consistency_summary["consistent"] == 1, context.consistency_summary
+
+
+@then('each mismatch should record the join key and the decision and policy hash on both sides')
+def step_then_records_complete(context):
+    summary = context.consistency_summary
+    for record in context.consistency_mismatches:
+        assert record["matched_by"] == LIVE_BUCKETS[record["bucket"]][2], record
+        assert record["template_id"] == "data-stack.json", record
+        for side in ("shift_left", "shift_right"):
+            assert record[side]["compliant"] == (record[side]["decision"] == "ALLOW"), record
+        assert record["shift_left"]["policy_hash"] == summary["shift_left_policy_hash"], record
+        assert record["shift_right"]["policy_hash"] == summary["shift_right_policy_hash"], record
+    assert summary["same_policy_set"], summary
+
+
+@then('live buckets without a template should only be counted')
+def step_then_unmatched_counted(context):
+    summary = context.consistency_summary
+    assert summary["unmatched_live"] == 1, summary
+    assert summary["matched"] == summary["template_buckets"] == len(TEMPLATE_BUCKETS), summary
+    assert summary["unmatched_template"] == 0, summary
+
+
+@then('the summary should report different policy hashes for the two sides')
+def step_then_hashes_differ(context):
+    summary = context.consistency_summary
+    assert not summary["same_policy_set"], summary
+    assert summary["shift_left_policy_hash"] != summary["shift_right_policy_hash"], summary
+    assert all(record["shift_right"]["policy_hash"] == summary["shift_right_policy_hash"]
+               for record in context.consistency_mismatches)
+
+
+@given('I have an untagged template with AES256 buckets "{first}" and "{second}"')
+def step_given_untagged_template(context, first, second):
+    template_dir = _workdir(context) / "templates"
+    template_dir.mkdir()
+    aes256 = {"ServerSideEncryptionConfiguration": [{"ServerSideEncryptionByDefault": {"SSEAlgorithm": "AES256"}}]}
+    resources = {
+        logical_id: {"Type": "AWS::S3::Bucket", "Properties": {"BucketName": name, "BucketEncryption": aes256}}
+        for logical_id, name in (("ArchiveBucket", first), ("ScratchBucket", second))
+    }
+    (template_dir / "aes-stack.json").write_text(json.dumps({"Resources": resources}))
+    context.consistency_templates = template_dir
+    context.consistency_policies = None
+
+
+@given('I have an untagged template with an AES256 bucket named "{name}"')
+def step_given_untagged_templated_bucket(context, name):
+    template_dir = _workdir(context) / "templates"
+    template_dir.mkdir()
+    aes256 = {"ServerSideEncryptionConfiguration": [{"ServerSideEncryptionByDefault": {"SSEAlgorithm": "AES256"}}]}
+    resources = {"LogsBucket": {"Type": "AWS::S3::Bucket",
+                                "Properties": {"BucketName": {"Fn::Sub": name}, "BucketEncryption": aes256}}}
+    (template_dir / "logs-stack.json").write_text(json.dumps({"Resources": resources}))
+    context.consistency_templates = template_dir
+    context.consistency_policies = None
+
+
+def _aes256_inventory(context, buckets):
+    context.consistency_inventory = []
+    for name, environment in buckets:
+        attrs = {"name": name, "encryption_enabled": True, "encryption_algorithm": "AES256",
+                 "resource_type": "bucket"}
+        if environment:
+            attrs["environment"] = environment
+        context.consistency_inventory.append(
+            {"uid": {"type": "S3Resource", "id": name}, "attrs": attrs, "parents": []})
+
+
+@given('the live buckets are evaluated with a policy set that does not parse')
+def step_given_broken_policies(context):
+    policy_dir = _workdir(context) / "broken-policies"
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", policy_dir)
+    (policy_dir / "zz-broken.cedar").write_text("permit(principal, action, resource\n")
+    context.consistency_policies = str(policy_dir)
+
+
+@then('no bucket should be reported as drifted')
+def step_then_no_drift(context):
+    drifted = [record for record in context.consistency_mismatches
+               if record["mismatch"] in (TEMPLATE_COMPLIANT, LIVE_COMPLIANT)]
+    assert not drifted, drifted
+    assert context.consistency_summary["mismatches"] == 0, context.consistency_summary
+
+
+@then('"{bucket}" should be reported with an unknown environment')
+def step_then_environment_unknown(context, bucket):
+    reported = {record["bucket"]: record["mismatch"] for record in context.consistency_mismatches}
+    assert reported == {bucket: ENVIRONMENT_UNKNOWN}, reported
+    assert context.consistency_summary["environment_unknown"] == 1, context.consistency_summary
+
+
+@then('the summary should count {count:d} template evaluated with the live environment')
+@then('the summary should count {count:d} templates evaluated with the live environment')
+def step_then_environment_from_live(context, count):
+    summary = context.consistency_summary
+    assert summary["environment_from_live"] == count, summary
+    assert summary["consistent"] == count, summary
+
+
+@then('every matched bucket should be reported as an evaluation error')
+def step_then_all_errors(context):
+    summary = context.consistency_summary
+    assert summary["errors"] == summary["matched"] == len(TEMPLATE_BUCKETS), summary
+    for record in context.consistency_mismatches:
+        assert record["mismatch"] == EVALUATION_ERROR, record
+        assert record["shift_right"]["decision"] == "ERROR", record
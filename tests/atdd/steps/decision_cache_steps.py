@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the decision cache tests.
+
+These step definitions implement the scenarios defined in
+decision_cache.feature using the behave framework.
+"""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_policy_runner import CedarPolicyRunner
+from cedar_test_files import iter_suite_cases
+from decision_cache import DecisionCache
+from differential_harness import PROJECT_ROOT
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+KMS_REQUEST = PROJECT_ROOT / "tests" / "s3_encryption_suite" / "ALLOW" / "runtime-bucket-kms.json"
+
+
+def _copy_policies(target: Path) -> Path:
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", target / "cedar_policies")
+    shutil.copy(PROJECT_ROOT / "schema.cedarschema", target / "schema.cedarschema")
+    return target
+
+
+def _request_key(cache: DecisionCache) -> str:
+    request = json.loads(KMS_REQUEST.read_text())
+    return cache.key(request["principal"], request["action"], request["resource"],
+                     str(FIXTURE_ENTITIES), request["context"])
+
+
+def _bucket_key(index: int) -> str:
+    return f"bucket-{index}"
+
+
+@when('I authorize every suite request twice on the python backend with a decision cache')
+def step_when_authorize_twice(context):
+    cache = DecisionCache(PROJECT_ROOT / "cedar_policies", PROJECT_ROOT / "schema.cedarschema")
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python", decision_cache=cache)
+    requests = [case["request"] for case in iter_suite_cases(PROJECT_ROOT / "tests", FIXTURE_ENTITIES)]
+    context.cache_passes = [list(runner.authorize_batch(requests, str(FIXTURE_ENTITIES))) for _ in range(2)]
+    context.cache = cache
+    runner.close()
+
+
+@then('the first pass should be all cache misses and the second all cache hits')
+def step_then_misses_then_hits(context):
+    first, second = context.cache_passes
+    assert not any(result["cache_hit"] for result in first), [r["request"]["resource"] for r in first if r["cache_hit"]]
+    assert all(result["cache_hit"] for result in second), [r["request"]["resource"] for r in second if not r["cache_hit"]]
+    stats = context.cache.stats()
+    assert stats["hits"] == len(second) and stats["misses"] == len(first), stats
+
+
+@then('both passes should return the same decisions')
+def step_then_same_decisions(context):
+    first, second = context.cache_passes
+    assert [r["decision"] for r in first] == [r["decision"] for r in second]
+
+
+@given('a decision cache holding at most {count:d} entries')
+def step_given_small_cache(context, count):
+    context.cache = DecisionCache(PROJECT_ROOT / "cedar_policies", PROJECT_ROOT / "schema.cedarschema",
+                                  max_entries=count)
+
+
+@when('I store decisions for 3 buckets, read the first one and store a fourth')
+def step_when_store_and_read(context):
+    for index in (1, 2, 3):
+        context.cache.put(_bucket_key(index), {"decision": "ALLOW", "bucket": index})
+    assert context.cache.get(_bucket_key(1)) is not None
+    context.cache.put(_bucket_key(4), {"decision": "DENY", "bucket": 4})
+
+
+@then('the second bucket should have been evicted')
+def step_then_second_evicted(context):
+    assert context.cache.get(_bucket_key(2)) is None
+    assert context.cache.stats()["evictions"] == 1, context.cache.stats()
+
+
+@then('the first, third and fourth buckets should still be cached')
+def step_then_others_cached(context):
+    for index in (1, 3, 4):
+        assert context.cache.get(_bucket_key(index))["bucket"] == index
+
+
+@given('a copy of the policy set with a decision cache over it')
+def step_given_cache_over_copy(context):
+    context.cache_workdir = scenario_workdir(context, "decision-cache")
+    context.cache_checkout = _copy_policies(context.cache_workdir / "checkout-a")
+    context.cache_dir = context.cache_workdir / "cache"
+    context.cache = DecisionCache(context.cache_checkout / "cedar_policies",
+                                  context.cache_checkout / "schema.cedarschema",
+                                  cache_dir=str(context.cache_dir), check_interval=0)
+
+
+@given('a decision cached for the runtime KMS bucket request')
+def step_given_cached_decision(context):
+    context.cache_key = _request_key(context.cache)
+    assert context.cache.get(context.cache_key) is None
+    context.cache.put(context.cache_key, {"decision": "ALLOW", "stdout": "ALLOW\n"})
+    assert context.cache.get(context.cache_key)["decision"] == "ALLOW"
+
+
+@when('a forbid policy is added to the copied policy set')
+def step_when_add_forbid(context):
+    (context.cache_checkout / "cedar_policies" / "zz-forbid.cedar").write_text(
+        'forbid (principal, action, resource == S3Resource::"prod-secure-bucket");\n')
+
+
+@then('the request should get a different cache key')
+def step_then_different_key(context):
+    new_key = _request_key(context.cache)
+    assert new_key != context.cache_key
+    assert context.cache.get(new_key) is None
+
+
+@then('the cache should report one invalidation and no cached entries')
+def step_then_invalidated(context):
+    stats = context.cache.stats()
+    assert stats["invalidations"] == 1 and stats["entries"] == 0, stats
+
+
+@when('a new decision cache over a second copy of the policy set opens the same cache directory')
+def step_when_second_checkout(context):
+    checkout = _copy_policies(context.cache_workdir / "checkout-b")
+    context.second_cache = DecisionCache(checkout / "cedar_policies", checkout / "schema.cedarschema",
+                                         cache_dir=str(context.cache_dir), check_interval=0)
+
+
+@then('the policy fingerprints of both copies should be equal')
+def step_then_same_fingerprint(context):
+    assert context.second_cache.fingerprint.current()[0] == context.cache.fingerprint.current()[0]
+
+
+@then('the request should be answered from disk by the new cache')
+def step_then_disk_hit(context):
+    key = _request_key(context.second_cache)
+    assert key == context.cache_key
+    assert context.second_cache.get(key)["decision"] == "ALLOW"
+    assert context.second_cache.stats()["disk_hits"] == 1, context.second_cache.stats()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the decision audit log tests.
+
+These step definitions implement the scenarios defined in
+decision_log.feature using the behave framework.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from decision_log import DecisionLog, SEGMENT_PATTERN, query, read_catalog
+from step_fixtures import scenario_workdir
+
+DENY_STDOUT = "DENY\n\nnote: this decision was due to the following policies:\n  policy5\n"
+
+
+def _log_dir(context) -> Path:
+    return scenario_workdir(context, "decision-log") / "decisions"
+
+
+def _log_synthetic(log: DecisionLog, count: int, buckets: int, offset: int = 0) -> None:
+    """Log count decisions spread over buckets; every third one is a DENY."""
+    for index in range(offset, offset + count):
+        deny = index % 3 == 0
+        result = {"decision": "DENY" if deny else "ALLOW", "stdout": DENY_STDOUT if deny else "ALLOW\n",
+                  "context": "shift-right", "execution_time_seconds": 0.0002, "phases": {"evaluate": 0.00003}}
+        log.record('ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
+                   'Action::"config:EvaluateCompliance"', f'S3Resource::"bucket-{index % buckets}"',
+                   {"validation_type": "shift-right", "sequence": index}, result, "ab" * 32)
+
+
+def _full_scan(log_dir: Path):
+    records = []
+    for path in sorted(log_dir.iterdir()):
+        if SEGMENT_PATTERN.match(path.name):
+            with open(path) as handle:
+                records.extend(json.loads(line) for line in handle if line.endswith("\n"))
+    return records
+
+
+@given('a decision log rotating segments every {size:d} KB')
+def step_given_rotating_log(context, size):
+    context.log_dir = _log_dir(context)
+    context.decision_log = DecisionLog(str(context.log_dir), segment_bytes=size * 1024)
+    context.add_cleanup(context.decision_log.close)
+
+
+@when('{count:d} decisions for {buckets:d} buckets are logged before and after a cutoff time')
+def step_when_log_around_cutoff(context, count, buckets):
+    log = context.decision_log
+    _log_synthetic(log, count // 2, buckets)
+    log.flush()
+    time.sleep(0.01)
+    context.log_cutoff = time.time()
+    _log_synthetic(log, count - count // 2, buckets, offset=count // 2)
+    log.close()
+    context.log_records = _full_scan(context.log_dir)
+    assert len(context.log_records) == count, len(context.log_records)
+
+
+@then('the log should have been sealed into several indexed segments')
+def step_then_several_segments(context):
+    catalog = read_catalog(context.log_dir)
+    assert len(catalog) > 2, catalog
+    for entry in catalog:
+        assert (context.log_dir / entry["segment"].replace(".jsonl", ".idx.json")).exists(), entry
+    assert sum(entry["records"] for entry in catalog) == len(context.log_records)
+
+
+@then('asking for every DENY for bucket "{bucket}" since the cutoff should match a full scan')
+def step_then_deny_query(context, bucket):
+    found = list(query(str(context.log_dir), decision="DENY", resource=bucket, since=context.log_cutoff))
+    expected = [record for record in context.log_records if record["decision"] == "DENY"
+                and record["resource"] == f'S3Resource::"{bucket}"' and record["ts"] >= context.log_cutoff]
+    assert found and found == expected, (len(found), len(expected))
+    assert all(record["policies"] == ["policy5"] for record in found)
+
+
+@then('asking for every ALLOW since the cutoff should match a full scan')
+def step_then_allow_query(context):
+    found = list(query(str(context.log_dir), decision="ALLOW", since=context.log_cutoff))
+    expected = [record for record in context.log_records
+                if record["decision"] == "ALLOW" and record["ts"] >= context.log_cutoff]
+    assert found and found == expected, (len(found), len(expected))
+
+
+@given('a decision log directory holding an unsealed segment with a torn final line')
+def step_given_unsealed_segment(context):
+    context.log_dir = _log_dir(context)
+    log = DecisionLog(str(context.log_dir))
+    _log_synthetic(log, 10, 5)
+    log.close()
+    # A writer that crashed mid-write: complete records followed by half a line
+    segment = context.log_dir / "decisions-000002.jsonl"
+    lines = (context.log_dir / "decisions-000001.jsonl").read_text().splitlines(keepends=True)
+    segment.write_text("".join(lines[:4]) + lines[4][:20])
+    context.log_unsealed = segment.name
+
+
+@when('a decision log writer keeping {kept:d} segments opens it and logs {count:d} decisions')
+def step_when_writer_with_retention(context, kept, count):
+    log = DecisionLog(str(context.log_dir), segment_bytes=64 * 1024, max_segments=kept)
+    context.log_recovered = read_catalog(context.log_dir)
+    _log_synthetic(log, count, 50)
+    log.close()
+
+
+@then('the unsealed segment should have been indexed without its torn line')
+def step_then_recovered(context):
+    entry = next(entry for entry in context.log_recovered if entry["segment"] == context.log_unsealed)
+    assert entry["records"] == 4, entry
+
+
+@then('only the {kept:d} newest segments should remain')
+def step_then_retention(context, kept):
+    catalog = read_catalog(context.log_dir)
+    segments = sorted(path.name for path in context.log_dir.iterdir() if SEGMENT_PATTERN.match(path.name))
+    assert len(catalog) == kept, catalog
+    assert segments == [entry["segment"] for entry in catalog], segments
+    assert context.log_unsealed not in segments
+
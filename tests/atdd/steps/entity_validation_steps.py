@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the entity validation tests.
+
+These step definitions implement the scenarios defined in
+entity_validation.feature using the behave framework.
+"""
+
+import copy
+import json
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_policy_runner import CedarPolicyRunner
+from cedar_schema import CedarSchema
+from cedar_test_files import iter_suite_cases
+from differential_harness import PROJECT_ROOT
+from entity_validator import EntityValidator
+from indexed_entity_store import IndexedEntityStore
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+from workload_generator import WorkloadGenerator
+
+SCHEMA_FILE = PROJECT_ROOT / "schema.cedarschema"
+
+# defect -> (how to break a well-formed bucket, text the error must contain)
+DEFECTS = {
+    "missing environment": (lambda entity: entity["attrs"].pop("environment"), "'environment'"),
+    "missing resource_type": (lambda entity: entity["attrs"].pop("resource_type"), "'resource_type'"),
+    "encryption_enabled as the string true": (
+        lambda entity: entity["attrs"].update(encryption_enabled="true"), "expected Bool"),
+    "parents omitted": (lambda entity: entity.pop("parents"), '"parents"'),
+    "undeclared attribute": (lambda entity: entity["attrs"].update(owner="team-a"), "'owner'"),
+    "duplicate uid": (lambda entity: None, "duplicate uid"),
+}
+
+
+def _fixtures():
+    return json.loads(FIXTURE_ENTITIES.read_text())
+
+
+def _bucket(bucket: str, defect: str):
+    entity = copy.deepcopy(next(item for item in _fixtures() if item["uid"]["type"] == "S3Resource"))
+    entity["uid"]["id"] = entity["attrs"]["name"] = bucket
+    DEFECTS[defect][0](entity)
+    return entity
+
+
+@given('the fixture entities plus these malformed S3 buckets')
+def step_given_malformed(context):
+    context.malformed = {row["bucket"]: row["defect"] for row in context.table}
+    context.entity_batch = _fixtures() + [_bucket(bucket, defect) for bucket, defect in context.malformed.items()]
+
+
+@when('I validate the batch against the schema')
+def step_when_validate(context):
+    context.validation = EntityValidator.for_schema(SCHEMA_FILE).validate_batch(context.entity_batch)
+
+
+@then('every fixture entity should be kept')
+def step_then_fixtures_kept(context):
+    assert context.validation.valid == _fixtures(), [error for error in context.validation.rejected
+                                                      if error.index < len(_fixtures())]
+
+
+@then('each malformed bucket should be rejected with an error naming its defect')
+def step_then_rejected(context):
+    rejected = {error.uid: error for error in context.validation.rejected}
+    assert len(rejected) == len(context.malformed), rejected
+    for bucket, defect in context.malformed.items():
+        error = rejected[f'S3Resource::"{bucket}"']
+        expected = DEFECTS[defect][1]
+        assert any(expected in problem for problem in error.errors), (defect, error.errors)
+
+
+@given('an entities file with the fixtures and a bucket whose encryption flag is the string "true"')
+def step_given_entities_file(context):
+    context.entities_file = scenario_workdir(context, "entity-validation") / "entities.json"
+    context.bad_bucket = "string-flag-bucket"
+    entities = _fixtures() + [_bucket(context.bad_bucket, "encryption_enabled as the string true")]
+    context.entities_file.write_text(json.dumps(entities))
+
+
+@when('I authorize every suite request plus one for that bucket with prevalidation on the python backend')
+def step_when_prevalidated_batch(context):
+    requests = [case["request"] for case in iter_suite_cases(PROJECT_ROOT / "tests", FIXTURE_ENTITIES)]
+    requests.append({
+        "principal": 'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
+        "action": 'Action::"config:EvaluateCompliance"',
+        "resource": f'S3Resource::"{context.bad_bucket}"',
+        "context": {"validation_type": "shift-right"},
+    })
+    context.prevalidating_runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python", prevalidate=True)
+    context.add_cleanup(context.prevalidating_runner.close)
+    plain = CedarPolicyRunner(policy_dir="cedar_policies", backend="python")
+    entities = str(context.entities_file)
+    context.prevalidated = list(context.prevalidating_runner.authorize_batch(requests[:-1], entities))
+    context.plain = list(plain.authorize_batch(requests[:-1], entities))
+    context.bad_bucket_result = next(context.prevalidating_runner.authorize_batch(requests[-1:], entities))
+
+
+@then('the suite decisions should match a run without prevalidation')
+def step_then_same_decisions(context):
+    assert [result["decision"] for result in context.prevalidated] == \
+        [result["decision"] for result in context.plain]
+    assert "validate" in context.prevalidated[0]["phases"]
+
+
+@then('the runner should report the bucket as a dropped entity')
+def step_then_dropped(context):
+    rejected = context.prevalidating_runner.entity_rejections[str(context.entities_file)]
+    assert [error.uid for error in rejected] == [f'S3Resource::"{context.bad_bucket}"'], rejected
+    assert "expected Bool" in rejected[0].errors[0], rejected
+
+
+@then('the request for that bucket should be answered ERROR naming the schema error')
+def step_then_dropped_request_error(context):
+    result = context.bad_bucket_result
+    assert result["decision"] == "ERROR", result
+    assert f'S3Resource::"{context.bad_bucket}"' in result["error"], result
+    assert "expected Bool" in result["error"], result
+    assert "evaluate" not in result["phases"], result["phases"]
+
+
+@then('a request with a principal type the action does not allow should be answered ERROR without evaluation')
+def step_then_invalid_request(context):
+    result = context.prevalidating_runner.authorize_batch([(
+        'Human::"alice"', 'Action::"config:EvaluateCompliance"', 'S3Resource::"dev-data-bucket"')],
+        str(context.entities_file))
+    result = next(result)
+    assert result["decision"] == "ERROR", result
+    assert "principal type Human is not valid" in result["error"], result
+    assert "evaluate" not in result["phases"], result["phases"]
+
+
+@when('I build an indexed entity store from them with the schema')
+def step_when_build_store(context):
+    workdir = scenario_workdir(context, "entity-validation")
+    inventory = workdir / "inventory.jsonl"
+    inventory.write_text("".join(json.dumps(entity) + "\n" for entity in context.entity_batch))
+    context.store = IndexedEntityStore.build([str(inventory)], workdir / "store",
+                                             validator=EntityValidator.for_schema(SCHEMA_FILE))
+    context.add_cleanup(context.store.close)
+
+
+@then('the store metadata should count {count:d} rejected entities')
+def step_then_store_rejected(context, count):
+    assert context.store.meta["rejected"] == count, context.store.meta
+
+
+@then('the store should hold every fixture entity but none of the malformed buckets')
+def step_then_store_contents(context):
+    for entity in _fixtures():
+        assert context.store.get(entity["uid"]["type"], entity["uid"]["id"]) == entity, entity["uid"]
+    for bucket in context.malformed:
+        assert context.store.get("S3Resource", bucket) is None, bucket
+
+
+@when('I validate {count:d} generated inventory entities twice')
+def step_when_validate_generated(context, count):
+    generator = WorkloadGenerator(CedarSchema.from_file(SCHEMA_FILE), seed=18)
+    entities = []
+    for template_entity, buckets in generator.templates(count):
+        entities.append(template_entity)
+        entities.extend(buckets)
+    context.generated = entities[:count]
+    context.validators, context.validation_runs = [], []
+    for _ in range(2):
+        validator = EntityValidator.for_schema(SCHEMA_FILE)
+        context.validation_runs.append(validator.validate_batch(context.generated))
+        context.validators.append(validator)
+
+
+@then('both passes should use the same compiled validator')
+def step_then_same_validator(context):
+    assert context.validators[0] is context.validators[1]
+
+
+@then('every generated entity should be valid')
+def step_then_generated_valid(context):
+    for result in context.validation_runs:
+        assert not result.rejected, result.rejected[:3]
+        assert len(result.valid) == len(context.generated)
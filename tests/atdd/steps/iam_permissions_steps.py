@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the compiled IAM permission checker tests.
+
+These step definitions implement the scenarios defined in
+iam_permissions.feature using the behave framework.
+"""
+
+import fnmatch
+import json
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from differential_harness import PROJECT_ROOT
+from iam_permissions import POLICIES_DIR, PolicySet, check_requirements, check_templates, scan_requirements
+from step_fixtures import scenario_workdir
+
+TEMPLATE = """AWSTemplateFormatVersion: '2010-09-09'
+Parameters:
+  Environment:
+    Type: String
+    Default: {environment}
+Resources:
+  ArtifactBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: !Sub '{bucket}-${{AWS::AccountId}}'
+{extra}"""
+
+KMS_KEY = """  ArtifactKey:
+    Type: AWS::KMS::Key
+    Properties:
+      Description: !Sub 'Key for ${Environment}'
+"""
+
+IAM_ROLE = """  DeployRole:
+    Type: AWS::IAM::Role
+    Properties:
+      RoleName: !Sub 'cedar-${Environment}-deploy'
+      AssumeRolePolicyDocument: {}
+"""
+
+
+def _by_template(context):
+    return {result["template_id"]: result for result in context.iam_results}
+
+
+def _grants(result, role):
+    return {grant["action"]: grant for grant in result["roles"][role]["grants"]}
+
+
+def _reference_decision(documents, action, resource):
+    """Evaluate one action by walking every statement, with fnmatch wildcards."""
+    allowed = denied = False
+    for document in documents:
+        for statement in document["Statement"]:
+            not_action = "NotAction" in statement
+            patterns = statement["NotAction" if not_action else "Action"]
+            patterns = [patterns] if isinstance(patterns, str) else patterns
+            hit = any(fnmatch.fnmatchcase(action.lower(), p.lower()) for p in patterns)
+            if hit == not_action:
+                continue
+            resources = statement.get("Resource", "*")
+            resources = [resources] if isinstance(resources, str) else resources
+            if resource is None:
+                covers = statement["Effect"] == "Allow" or "*" in resources
+            else:
+                covers = any(fnmatch.fnmatchcase(resource, p) for p in resources)
+            if not covers:
+                continue
+            if statement["Effect"] == "Deny" and not statement.get("Condition"):
+                denied = True
+            elif statement["Effect"] == "Allow":
+                allowed = True
+    return "denied" if denied else "missing" if not allowed else "granted"
+
+
+@when('I check the repository CloudFormation templates against aws_iam_policies')
+def step_when_check_repository(context):
+    context.iam_results = check_templates(
+        [str(PROJECT_ROOT / "cf" / "avp-stack.yaml"), str(PROJECT_ROOT / "examples" / "cloudformation")],
+        root=str(PROJECT_ROOT), workers=1)
+    context.iam_role = POLICIES_DIR.name
+    assert len(context.iam_results) == 4, [r["template"] for r in context.iam_results]
+
+
+@then('every template should be reported compliant')
+def step_then_all_compliant(context):
+    for result in context.iam_results:
+        problems = [g for g in result["roles"][context.iam_role]["grants"] if g["decision"] in ("missing", "denied")]
+        assert result["compliant"], f"{result['template']}: {problems or result['error']}"
+
+
+@then('"{action}" should be reported conditional on "{condition}" for "{template}"')
+def step_then_conditional(context, action, condition, template):
+    grant = _grants(_by_template(context)[template], context.iam_role)[action]
+    assert grant["decision"] == "conditional", grant
+    assert condition in grant["conditions"], grant
+
+
+@then('the S3 actions for "{template}" should be scoped to its bucket ARN')
+def step_then_scoped_to_bucket(context, template):
+    result = _by_template(context)[template]
+    s3_grants = [g for g in result["roles"][context.iam_role]["grants"] if g["action"].startswith("s3:")]
+    assert s3_grants, result
+    for grant in s3_grants:
+        assert grant["resource"] == "arn:aws:s3:::cedar-demo-encrypted-*", grant
+        assert grant["decision"] == "allowed", grant
+
+
+@given('a role policy with these statements')
+def step_given_role_policy(context):
+    statements = []
+    for row in context.table:
+        statement = {"Effect": row["effect"], "Resource": row["resource"].strip()}
+        action = row["action"].strip()
+        if action.startswith("NOT "):
+            statement["NotAction"] = [a.strip() for a in action[4:].split(",")]
+        else:
+            statement["Action"] = action
+        statements.append(statement)
+    context.iam_workdir = scenario_workdir(context, "iam")
+    policy_file = context.iam_workdir / "test-role.json"
+    policy_file.write_text(json.dumps({"Version": "2012-10-17", "Statement": statements}))
+    context.iam_policy_set = PolicySet.load(str(policy_file))
+
+
+@when('I check these templates against that role')
+def step_when_check_against_role(context):
+    tree = context.iam_workdir / "templates"
+    tree.mkdir()
+    for row in context.table:
+        (tree / f"{row['template']}.yaml").write_text(
+            TEMPLATE.format(environment="dev", bucket=row["bucket"], extra=KMS_KEY))
+    context.iam_results = check_requirements(scan_requirements([str(tree)], str(tree), 1),
+                                             [context.iam_policy_set])
+
+
+@when('I check a template with role "{role}" and a bucket named "{bucket}" plus the account ID against that role')
+def step_when_check_account_scoped(context, role, bucket):
+    tree = context.iam_workdir / "templates"
+    tree.mkdir()
+    (tree / "app-stack.yaml").write_text(TEMPLATE.format(environment="prod", bucket=bucket, extra=IAM_ROLE)
+                                         .replace("cedar-${Environment}-deploy", role))
+    context.iam_results = check_requirements(scan_requirements([str(tree)], str(tree), 1),
+                                             [context.iam_policy_set])
+
+
+@then('the permissions should be reported as')
+def step_then_permissions(context):
+    results = _by_template(context)
+    for row in context.table:
+        grant = _grants(results[f"{row['template']}.yaml"], context.iam_policy_set.name)[row["action"].strip()]
+        assert grant["decision"] == row["decision"], f"{row['template']}: {grant}"
+
+
+@then('no template should be reported compliant')
+def step_then_none_compliant(context):
+    assert not any(result["compliant"] for result in context.iam_results), context.iam_results
+
+
+@given('a generated tree of {count:d} CloudFormation templates')
+def step_given_template_tree(context, count):
+    context.iam_workdir = scenario_workdir(context, "iam")
+    context.iam_tree = context.iam_workdir / "templates"
+    context.iam_with_key = set()
+    for index in range(count):
+        team = context.iam_tree / f"team-{index % 20:02d}"
+        team.mkdir(parents=True, exist_ok=True)
+        extra = ""
+        if index % 3 == 0:
+            extra += KMS_KEY
+            context.iam_with_key.add(f"team-{index % 20:02d}/stack-{index:04d}.yaml")
+        if index % 4 == 0:
+            extra += IAM_ROLE
+        bucket = f"cedar-app-{index:04d}" if index % 10 else f"legacy-app-{index:04d}"
+        (team / f"stack-{index:04d}.yaml").write_text(
+            TEMPLATE.format(environment=("dev", "staging", "prod")[index % 3], bucket=bucket, extra=extra))
+    context.iam_template_count = count
+
+
+@when('I check the tree against aws_iam_policies and a second role without KMS permissions')
+def step_when_check_tree(context):
+    role_dir = context.iam_workdir / "no-kms-role"
+    role_dir.mkdir()
+    for policy_file in POLICIES_DIR.glob("*.json"):
+        if policy_file.name != "kms.json":
+            (role_dir / policy_file.name).write_text(policy_file.read_text())
+    context.iam_roles = [str(POLICIES_DIR), str(role_dir)]
+    context.iam_results = check_templates([str(context.iam_tree)], context.iam_roles,
+                                          root=str(context.iam_tree))
+
+
+@then('every template should have a result for both roles')
+def step_then_both_roles(context):
+    assert len(context.iam_results) == context.iam_template_count, len(context.iam_results)
+    for result in context.iam_results:
+        assert result["error"] is None, result
+        assert set(result["roles"]) == {POLICIES_DIR.name, "no-kms-role"}, result["roles"].keys()
+
+
+@then('the decisions should match a statement-by-statement evaluation of each action')
+def step_then_match_reference(context):
+    for role in context.iam_roles:
+        documents = [json.loads(p.read_text()) for p in sorted(Path(role).glob("*.json"))]
+        for result in context.iam_results:
+            for grant in result["roles"][Path(role).name]["grants"]:
+                expected = _reference_decision(documents, grant["action"], grant["resource"])
+                actual = "granted" if grant["decision"] in ("allowed", "conditional") else grant["decision"]
+                assert actual == expected, f"{result['template_id']} {role}: {grant} expected {expected}"
+
+
+@then('only templates with a KMS key should be missing permissions for the second role')
+def step_then_kms_missing(context):
+    for result in context.iam_results:
+        missing = {g["action"] for g in result["roles"]["no-kms-role"]["grants"] if g["decision"] == "missing"}
+        kms_missing = {action for action in missing if action.startswith("kms:")}
+        has_key = result["template_id"] in context.iam_with_key
+        assert bool(kms_missing) == has_key, f"{result['template_id']}: {missing}"
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the indexed entity store tests.
+
+These step definitions implement the scenarios defined in
+indexed_entity_store.feature using the behave framework.
+"""
+
+import json
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_policy_runner import CedarPolicyRunner
+from cedar_test_files import iter_suite_cases
+from cloudformation_entities import scan_templates
+from differential_harness import PROJECT_ROOT
+from indexed_entity_store import IndexedEntityStore
+from s3_inventory import CONFIG_EVALUATION, compliance_request, config_evaluation_entity
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+
+@given('I have built an indexed entity store from the fixtures and example templates')
+def step_given_indexed_store(context):
+    """Ingest the fixture entities plus the example template entities as JSONL."""
+    workdir = scenario_workdir(context, "entity-store")
+
+    context.template_results = [
+        parsed for parsed in scan_templates([str(PROJECT_ROOT / "examples" / "cloudformation")], workers=1)
+        if not parsed["error"]
+    ]
+    inventory = workdir / "templates.jsonl"
+    with open(inventory, "w") as handle:
+        handle.write(json.dumps(config_evaluation_entity()) + "\n")
+        for parsed in context.template_results:
+            for entity in parsed["entities"]:
+                handle.write(json.dumps(entity) + "\n")
+        # Evaluation records pointing at the principal, as an audit trail would
+        context.principal_referrers = []
+        for number in range(5):
+            record = {"uid": {"type": "ConfigEvaluationRecord", "id": f"run-{number}"},
+                      "attrs": {"evaluated_by": {"__entity": CONFIG_EVALUATION}}, "parents": []}
+            context.principal_referrers.append(record["uid"])
+            handle.write(json.dumps(record) + "\n")
+
+    context.entity_store = IndexedEntityStore.build(
+        [str(FIXTURE_ENTITIES), str(inventory)], workdir / "store", run_size=8
+    )
+    context.add_cleanup(context.entity_store.close)
+
+
+@when('I slice the store for a Config compliance check on a template bucket')
+def step_when_slice_bucket(context):
+    """Slice for config:EvaluateCompliance on the first template bucket."""
+    parsed = next(p for p in context.template_results if p["buckets"])
+    context.sliced_template = parsed
+    context.sliced_bucket = parsed["buckets"][0]["uid"]
+    request = compliance_request({"uid": context.sliced_bucket})
+    context.entity_slice = context.entity_store.slice_request(
+        request["principal"], request["action"], request["resource"], request["context"]
+    )
+
+
+@then('the slice should contain the S3Resource, its CloudFormationTemplate and the ConfigEvaluation principal')
+def step_then_slice_contents(context):
+    """The slice holds the request entities plus the referencing template."""
+    uids = {(e["uid"]["type"], e["uid"]["id"]) for e in context.entity_slice}
+    expected = {
+        ("S3Resource", context.sliced_bucket["id"]),
+        ("CloudFormationTemplate", context.sliced_template["template_id"]),
+        (CONFIG_EVALUATION["type"], CONFIG_EVALUATION["id"]),
+    }
+    assert expected <= uids, f"Missing {expected - uids} from slice {uids}"
+
+
+@then('the slice should not contain unrelated S3 resources')
+def step_then_slice_is_small(context):
+    """Only the requested bucket is included, not the rest of the inventory."""
+    buckets = [e for e in context.entity_slice if e["uid"]["type"] == "S3Resource"]
+    assert [b["uid"] for b in buckets] == [context.sliced_bucket], \
+        f"Unexpected S3 resources in slice: {[b['uid'] for b in buckets]}"
+    assert len(context.entity_slice) < len(context.entity_store), "Slice is as large as the store"
+
+
+@then('the slice should not contain the entities that only reference the ConfigEvaluation principal')
+def step_then_no_principal_referrers(context):
+    """Only the resource's referrers belong in a slice; a principal can be referenced by any number."""
+    assert context.entity_store.referrers(CONFIG_EVALUATION["type"], CONFIG_EVALUATION["id"])
+    leaked = [e["uid"] for e in context.entity_slice if e["uid"] in context.principal_referrers]
+    assert not leaked, f"Principal referrers in slice: {leaked}"
+
+
+@when('I replay every suite request against the store and against the entities file')
+def step_when_replay_against_store(context):
+    """Evaluate each suite request against both entity sources with the python backend."""
+    cases = list(iter_suite_cases(PROJECT_ROOT / "tests", FIXTURE_ENTITIES))
+    requests = [case["request"] for case in cases]
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python")
+    context.store_decisions = [r["decision"] for r in runner.authorize_batch(
+        requests, str(context.entity_store.store_dir))]
+    context.file_decisions = [r["decision"] for r in runner.authorize_batch(
+        requests, str(FIXTURE_ENTITIES))]
+    context.replayed_cases = cases
+
+
+@then('every decision should match between the store and the entities file')
+def step_then_store_decisions_match(context):
+    """Slicing must never change a decision."""
+    assert context.replayed_cases, "No suite requests were discovered"
+    mismatches = [
+        f"{case['name']}: store={store} file={whole}"
+        for case, store, whole in zip(context.replayed_cases, context.store_decisions, context.file_decisions)
+        if store != whole
+    ]
+    assert not mismatches, "Slicing changed decisions:\n" + "\n".join(mismatches)
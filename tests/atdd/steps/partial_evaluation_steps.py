@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the partial evaluation tests.
+
+These step definitions implement the scenarios defined in
+partial_evaluation.feature using the behave framework.
+"""
+
+import contextlib
+import io
+import itertools
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_evaluator import CedarEvaluator, EntityStore, EntityUID
+from cedar_policy_runner import CedarPolicyRunner, main as runner_main
+from differential_harness import PROJECT_ROOT
+from partial_evaluation import KNOWN_ENVIRONMENTS, Facts, ResidualEvaluator, policy_to_cedar
+from s3_inventory import CONFIG_EVALUATION
+
+CONFIG_PRINCIPAL = EntityUID(CONFIG_EVALUATION["type"], CONFIG_EVALUATION["id"])
+ENCRYPTION_SETTINGS = {
+    "encryption_enabled": [True, False, None],
+    "encryption_algorithm": ["AES256", "aws:kms", "aws:kms:dsse", "DES", None],
+    "kms_key_id": ["arn:aws:kms:us-east-1:123456789012:key/example", None],
+    "bucket_policy_enforces_encryption": [True, False, None],
+}
+
+
+@given('I have precomputed residual policies for the repository policy set')
+def step_given_residuals(context):
+    context.full_evaluator = CedarEvaluator.from_files(
+        PROJECT_ROOT / "cedar_policies", PROJECT_ROOT / "schema.cedarschema")
+    context.residual_evaluator = ResidualEvaluator(context.full_evaluator)
+
+
+@when('I render the residual policies for config:EvaluateCompliance in production')
+def step_when_render_production(context):
+    facts = Facts("ConfigEvaluation", EntityUID("Action", "config:EvaluateCompliance"), "S3Resource", "production")
+    residual = context.residual_evaluator.residuals[facts]
+    assert residual.live_policies, "No residual policies left for production compliance checks"
+    context.residual_text = "\n".join(policy_to_cedar(policy) for policy in residual.live_policies)
+
+
+@then('the residual policies should not reference resource.environment')
+def step_then_no_environment(context):
+    assert "environment" not in context.residual_text, context.residual_text
+
+
+@then('the residual policies should still check encryption_enabled, encryption_algorithm and kms_key_id')
+def step_then_encryption_attributes(context):
+    for attr in ("encryption_enabled", "encryption_algorithm", "kms_key_id"):
+        assert attr in context.residual_text, f"{attr} missing from residuals:\n{context.residual_text}"
+
+
+@when('I evaluate every combination of bucket encryption settings in every environment '
+      'with residuals and with the full policy set')
+def step_when_evaluate_settings(context):
+    """Missing attributes are included so evaluation errors are compared as well."""
+    actions = [EntityUID("Action", name) for name in ("config:EvaluateCompliance", "s3:CreateBucket")]
+    principals = {"config:EvaluateCompliance": CONFIG_PRINCIPAL, "s3:CreateBucket": EntityUID("User", "alice")}
+    context.residual_comparisons = []
+    for environment in KNOWN_ENVIRONMENTS + ("sandbox",):
+        for values in itertools.product(*ENCRYPTION_SETTINGS.values()):
+            attrs = {key: value for key, value in zip(ENCRYPTION_SETTINGS, values) if value is not None}
+            attrs.update({"name": "bucket", "environment": environment, "resource_type": "bucket"})
+            resource = EntityUID("S3Resource", "bucket")
+            for action in actions:
+                principal = principals[action.id]
+                entities = EntityStore.from_json([
+                    {"uid": {"type": principal.type, "id": principal.id}, "attrs": {}, "parents": []},
+                    {"uid": {"type": "S3Resource", "id": "bucket"}, "attrs": attrs, "parents": []},
+                ])
+                context.residual_comparisons.append((
+                    f"{action.id} {attrs}",
+                    context.residual_evaluator.is_authorized(principal, action, resource, {}, entities),
+                    context.full_evaluator.is_authorized(principal, action, resource, {}, entities),
+                ))
+
+
+@then('every residual response should match the full policy set response')
+def step_then_residuals_match(context):
+    mismatches = [f"{name}: residual={a} full={b}" for name, a, b in context.residual_comparisons if a != b]
+    assert not mismatches, "Residuals changed responses:\n" + "\n".join(mismatches[:10])
+    decisions = {response.decision for _, response, _ in context.residual_comparisons}
+    assert decisions == {"ALLOW", "DENY"}, f"Expected both decisions, got {decisions}"
+
+
+@then('requests for unknown environments should fall back to the full policy set')
+def step_then_fallbacks(context):
+    evaluator = context.residual_evaluator
+    expected = sum(1 for name, _, _ in context.residual_comparisons if "'sandbox'" in name)
+    assert evaluator.fallbacks == expected, f"{evaluator.fallbacks} fallbacks, expected {expected}"
+    assert evaluator.residual_hits == len(context.residual_comparisons) - expected
+
+
+@when('I build the partial evaluation report')
+def step_when_report(context):
+    context.residual_report = context.residual_evaluator.report()
+
+
+@then('cloudformation:ValidateTemplate should be always-allow in every known environment')
+def step_then_always_allow(context):
+    rows = [row for row in context.residual_report["combinations"]
+            if row["action"] == "cloudformation:ValidateTemplate"]
+    assert rows and all(row["outcome"] == "always-allow" for row in rows), rows
+    assert all(row in context.residual_report["always_allow"] for row in rows)
+
+
+@then('s3:GetBucketEncryption by a Human should be always-deny outside production')
+def step_then_always_deny(context):
+    rows = {row["environment"]: row["outcome"] for row in context.residual_report["combinations"]
+            if row["action"] == "s3:GetBucketEncryption" and row["principal_type"] == "Human"}
+    assert rows["development"] == rows["staging"] == "always-deny", rows
+    assert rows["production"] == "conditional", rows
+
+
+@when('I run the batch command with --residuals on the "{backend}" backend')
+def step_when_batch_residuals(context, backend):
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        try:
+            runner_main(["batch", "--entities", "entities.json", "--backend", backend, "--residuals"])
+        except SystemExit as e:
+            context.batch_exit = e.code
+        else:
+            context.batch_exit = None
+    context.batch_stderr = stderr.getvalue()
+
+
+@then('the batch command should fail with a usage error naming "{option}"')
+def step_then_batch_usage_error(context, option):
+    assert context.batch_exit == 2, f"exit {context.batch_exit}: {context.batch_stderr}"
+    assert option in context.batch_stderr, context.batch_stderr
+
+
+@then('a runner asking for residuals on the "{backend}" backend should be refused')
+def step_then_runner_refused(context, backend):
+    try:
+        CedarPolicyRunner(backend=backend, residuals=True)
+    except ValueError as e:
+        assert "python backend" in str(e), e
+    else:
+        raise AssertionError(f"residuals were accepted on the {backend} backend")
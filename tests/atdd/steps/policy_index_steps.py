@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the policy index tests.
+
+These step definitions implement the scenarios defined in
+policy_index.feature using the behave framework.
+"""
+
+import itertools
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_evaluator import CedarEvaluator, EntityStore, EntityUID
+from cedar_schema import CedarSchema
+from differential_harness import PROJECT_ROOT
+from policy_index import condition_type
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+SCHEMA_FILE = PROJECT_ROOT / "schema.cedarschema"
+UNREACHABLE_POLICY = "unreachable-bucket-policy"
+
+
+@given('I have the repository policies plus generated per-account policies')
+def step_given_generated_policies(context):
+    """Copy cedar_policies/ and add scoped policies over every appliesTo combination."""
+    policy_dir = scenario_workdir(context, "policy-index")
+    for policy_file in sorted((PROJECT_ROOT / "cedar_policies").glob("*.cedar")):
+        (policy_dir / policy_file.name).write_text(policy_file.read_text())
+
+    schema = CedarSchema.from_file(SCHEMA_FILE)
+    generated = []
+    for index, (name, declared) in enumerate(sorted(schema.actions.items()) * 20):
+        principal_type = declared.principal_types[index % len(declared.principal_types)]
+        resource_type = declared.resource_types[index % len(declared.resource_types)]
+        generated.append(f'permit(principal == {principal_type}::"account-{index}", '
+                         f'action == Action::"{name}", resource is {resource_type});')
+        generated.append(f'forbid(principal is {principal_type}, action == Action::"{name}", '
+                         f'resource is {resource_type}) when {{ principal has tags }};')
+        # Type tests in conditions: only the first is a sound index key, the
+        # others are evaluated for every type and error on the missing attribute
+        generated.append(f'permit(principal, action == Action::"{name}", resource) '
+                         f'when {{ resource is {resource_type} && principal has tags }};')
+        generated.append(f'forbid(principal, action == Action::"{name}", resource) '
+                         f'unless {{ resource.missing_{index} }} when {{ resource is {resource_type} }};')
+        generated.append(f'forbid(principal, action == Action::"{name}", resource) '
+                         f'when {{ resource.missing_{index} && resource is {resource_type} }};')
+        generated.append(f'forbid(principal, action == Action::"{name}", resource) '
+                         f'when {{ resource is {resource_type} || resource.missing_{index} }};')
+    # s3:PutObject only applies to Bucket resources, so no valid request reaches this policy
+    generated.append(f'@id("{UNREACHABLE_POLICY}")\n'
+                     f'permit(principal, action == Action::"s3:PutObject", resource is S3Resource);')
+    (policy_dir / "zz-generated.cedar").write_text("\n".join(generated) + "\n")
+    context.index_policy_dir = policy_dir
+
+
+@when('I evaluate every combination of fixture principal, action and resource with and without the index')
+def step_when_evaluate_combinations(context):
+    """Without a schema, type-mismatched requests reach evaluation too."""
+    entities = EntityStore.from_file(str(FIXTURE_ENTITIES))
+    actions = [EntityUID("Action", name) for name in sorted(CedarSchema.from_file(SCHEMA_FILE).actions)]
+    subjects = [uid for uid in entities.entities if uid.type != "Action"]
+
+    context.index_comparisons = []
+    for schema_file in (SCHEMA_FILE, None):
+        indexed = CedarEvaluator.from_files(context.index_policy_dir, schema_file)
+        full = CedarEvaluator.from_files(context.index_policy_dir, schema_file, use_index=False)
+        for principal, action, resource in itertools.product(subjects, actions, subjects):
+            context.index_comparisons.append((
+                f"{principal} {action} {resource} schema={bool(schema_file)}",
+                indexed.is_authorized(principal, action, resource, {}, entities),
+                full.is_authorized(principal, action, resource, {}, entities),
+            ))
+
+
+@then('every response should be identical with and without the index')
+def step_then_identical_responses(context):
+    """Decision, determining policies and errors must all match."""
+    assert context.index_comparisons, "No requests were evaluated"
+    mismatches = [f"{name}: indexed={a} full={b}" for name, a, b in context.index_comparisons if a != b]
+    assert not mismatches, "Index changed responses:\n" + "\n".join(mismatches[:10])
+    allowed = sum(1 for _, response, _ in context.index_comparisons if response.decision == "ALLOW")
+    assert allowed, "No request was allowed, so the comparison proves little"
+
+
+@when('I build the policy index selectivity report')
+def step_when_selectivity_report(context):
+    evaluator = CedarEvaluator.from_files(context.index_policy_dir, SCHEMA_FILE)
+    context.selectivity = evaluator.index.selectivity()
+
+
+@then('every appliesTo combination should evaluate less than half of the policy set')
+def step_then_selective(context):
+    report = context.selectivity
+    assert report["combinations"], "The schema declares no appliesTo combinations"
+    wide = [row for row in report["combinations"] if row["fraction"] >= 0.5]
+    assert not wide, f"Combinations evaluating half the policy set or more: {wide}"
+
+
+@then('policies whose scope no declared action accepts should be reported as unreachable')
+def step_then_unreachable(context):
+    assert UNREACHABLE_POLICY in context.selectivity["unreachable"], \
+        f"Expected {UNREACHABLE_POLICY} in {context.selectivity['unreachable']}"
+
+
+@then('policies opening their first when clause with "resource is" should be candidates for that type only')
+def step_then_condition_keyed(context):
+    evaluator = CedarEvaluator.from_files(context.index_policy_dir, SCHEMA_FILE)
+    keyed = {id(policy): condition_type(policy, "resource") for policy in evaluator.policies
+             if policy.resource.op is None and condition_type(policy, "resource")}
+    repository = [policy for policy in evaluator.policies
+                  if id(policy) in keyed and policy.source.endswith("s3-encryption-enforcement.cedar")]
+    assert repository, "No repository policy is keyed by a condition type"
+    for key in evaluator.index.declared_keys():
+        forbids, permits = evaluator.index.candidates(*key)
+        for policy in forbids + permits:
+            if id(policy) in keyed:
+                assert keyed[id(policy)] == key[2], f"{policy.policy_id} is a candidate for {key}"
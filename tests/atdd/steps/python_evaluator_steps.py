@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the Python Cedar evaluator differential tests.
+
+These step definitions implement the scenarios defined in
+python_evaluator_differential.feature using the behave framework.
+"""
+
+import shutil
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_evaluator import CedarEvaluator
+from cedar_policy_runner import CedarPolicyRunner
+from differential_harness import PROJECT_ROOT, run_differential
+
+
+@given('I have the repository Cedar policy for S3 encryption enforcement')
+def step_given_repository_policy(context):
+    """Build a runner over cedar_policies and verify the S3 encryption policy is there."""
+    userdata = context.config.userdata
+    context.cedar_runner = CedarPolicyRunner(
+        policy_dir="cedar_policies",
+        backend=userdata.get('cedar_backend', 'cli'),
+        request_timeout=float(userdata.get('cedar_timeout', 10))
+    )
+    assert context.cedar_runner.validate_policy_exists('s3-encryption-enforcement'), \
+        "S3 encryption enforcement policy not found in cedar_policies"
+    context.policy_content = context.cedar_runner.get_policy_content('s3-encryption-enforcement')
+
+
+@given('I have the Python Cedar evaluator loaded with the repository policies')
+def step_given_python_evaluator(context):
+    """Compile the repository policy set with the Python evaluator."""
+    context.python_evaluator = CedarEvaluator.from_files(
+        PROJECT_ROOT / "cedar_policies",
+        PROJECT_ROOT / "schema.cedarschema"
+    )
+    assert context.python_evaluator.policies, "No policies were compiled"
+
+
+@when('I replay every suite request and inline test case against both engines')
+def step_when_replay_differential(context):
+    """Evaluate every discovered test case with both engines."""
+    if shutil.which("cedar") is None:
+        context.scenario.skip("cedar CLI is not installed")
+        return
+    context.differential_results = run_differential(
+        PROJECT_ROOT / "tests",
+        PROJECT_ROOT / "cedar_policies",
+        PROJECT_ROOT / "schema.cedarschema",
+        PROJECT_ROOT / "tests" / "fixtures" / "entities.json"
+    )
+
+
+@when('I run the shift-right validation with the python backend')
+def step_when_run_python_backend(context):
+    """Execute shift-right validation with the in-process evaluator."""
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python")
+    context.s3_result = runner.validate_s3_bucket(context.bucket_name, str(context.entities_file))
+
+
+@then('every decision should match between the Python evaluator and the cedar CLI')
+def step_then_engines_agree(context):
+    """Fail on any decision disagreement between the engines."""
+    results = context.differential_results
+    assert results, "No test cases were discovered"
+
+    disagreements = [
+        f"{result['name']}: python={result['python']} cli={result['cli']}"
+        for result in results if not result["agree"]
+    ]
+    assert not disagreements, "Engines disagree:\n" + "\n".join(disagreements)
+
+
+@then('the result should include decision, compliant, execution time and context')
+def step_then_result_shape(context):
+    """Verify the python backend returns the same keys as the CLI backend."""
+    for key in ("decision", "compliant", "execution_time_seconds", "context"):
+        assert key in context.s3_result, f"Missing '{key}' in result: {context.s3_result}"
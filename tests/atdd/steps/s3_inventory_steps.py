@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the concurrent S3 inventory collector tests.
+
+These step definitions implement the scenarios defined in
+s3_inventory_collector.feature using the behave framework. The collector
+talks to fake_s3_endpoint.py, so no AWS account is needed.
+"""
+
+import io
+import json
+import os
+import sys
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from fake_s3_endpoint import FakeS3Server, FakeS3State, seeded_buckets
+from s3_inventory import S3InventoryCollector, evaluate_inventory, write_inventory
+
+
+@given('I have a fake S3 endpoint with {count:d} seeded buckets')
+def step_given_fake_s3_endpoint(context, count):
+    """Start a local S3/STS stand-in seeded with a reproducible bucket mix."""
+    context.fake_s3_state = FakeS3State(seeded_buckets(count))
+    context.fake_s3_server = FakeS3Server(context.fake_s3_state).start()
+    context.add_cleanup(context.fake_s3_server.stop)
+
+
+@given('the fake S3 endpoint throttles {percent:d} percent of calls')
+def step_given_fake_s3_throttling(context, percent):
+    """Answer a fraction of S3 calls with 503 SlowDown."""
+    context.fake_s3_state.throttle_rate = percent / 100.0
+
+
+@when('I collect the S3 inventory through the fake endpoint')
+def step_when_collect_inventory(context):
+    """Run a full sweep against the fake endpoint and keep the JSONL output."""
+    # The fake endpoint ignores signatures, but botocore still needs credentials
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        if name not in os.environ:
+            os.environ[name] = "testing"
+            context.add_cleanup(os.environ.pop, name, None)
+    try:
+        collector = S3InventoryCollector(
+            endpoint_url=context.fake_s3_server.endpoint_url,
+            max_concurrency=16,
+            backoff_base=0.01
+        )
+    except ImportError:
+        context.scenario.skip("boto3 is not installed")
+        return
+
+    output = io.StringIO()
+    write_inventory(collector.collect(), output)
+    context.s3_collector = collector
+    context.s3_inventory = [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+@when('I evaluate the inventory in one batch')
+def step_when_evaluate_inventory(context):
+    """Evaluate every inventoried bucket with the in-process evaluator."""
+    context.s3_outcomes = {
+        outcome["bucket"]: outcome
+        for outcome in evaluate_inventory(context.s3_inventory, backend="python")
+    }
+
+
+@then('every seeded bucket should appear in the inventory exactly once')
+def step_then_inventory_complete(context):
+    """Compare inventoried bucket names with the seeded buckets."""
+    names = [entity["uid"]["id"] for entity in context.s3_inventory]
+    assert sorted(names) == sorted(context.fake_s3_state.buckets), \
+        f"Inventory has {len(names)} entries for {len(context.fake_s3_state.buckets)} buckets"
+    assert not context.s3_collector.errors, f"Collector errors: {context.s3_collector.errors[:5]}"
+
+
+@then('the caller identity should have been looked up once')
+def step_then_single_identity_lookup(context):
+    """The shell script called sts get-caller-identity once per bucket."""
+    calls = context.fake_s3_state.calls.get("GetCallerIdentity", 0)
+    assert calls == 1, f"Expected one GetCallerIdentity call, got {calls}"
+
+
+@then('each bucket should cost one encryption and one policy call')
+def step_then_calls_per_bucket(context):
+    """Nothing beyond the policy attributes is fetched per bucket."""
+    calls = context.fake_s3_state.calls
+    buckets = len(context.fake_s3_state.buckets)
+    assert calls.get("GetBucketEncryption") == buckets and calls.get("GetBucketPolicy") == buckets, calls
+    assert "GetBucketLocation" not in calls, calls
+
+
+@then('every inventory entity should match its seeded bucket configuration')
+def step_then_inventory_matches(context):
+    """Check the S3Resource attributes against what the endpoint served."""
+    for entity in context.s3_inventory:
+        attrs = entity["attrs"]
+        bucket = context.fake_s3_state.buckets[entity["uid"]["id"]]
+        assert attrs["encryption_enabled"] == bool(bucket["algorithm"]), entity
+        assert attrs.get("encryption_algorithm") == bucket["algorithm"], entity
+        assert attrs.get("kms_key_id") == bucket["kms_key_id"], entity
+        assert attrs.get("bucket_policy_enforces_encryption", False) == bool(bucket["policy"]), entity
+        assert attrs["resource_type"] == "bucket", entity
+
+
+@then('throttled calls should have been retried')
+def step_then_throttles_retried(context):
+    """Every SlowDown the endpoint returned was seen and retried by the collector."""
+    throttled = context.fake_s3_state.throttled
+    assert throttled > 0, "The fake endpoint did not throttle any calls"
+    assert context.s3_collector.limiter.throttles == throttled, \
+        f"Endpoint throttled {throttled} calls, collector saw {context.s3_collector.limiter.throttles}"
+
+
+@then('buckets with KMS encryption and a key should be marked as COMPLIANT')
+def step_then_kms_buckets_compliant(context):
+    """Production buckets with KMS and a key ID satisfy the policy."""
+    for name, bucket in context.fake_s3_state.buckets.items():
+        if bucket["algorithm"] in ("aws:kms", "aws:kms:dsse") and bucket["kms_key_id"]:
+            assert context.s3_outcomes[name]["compliant"], f"{name} should be compliant"
+
+
+@then('buckets without encryption should be marked as NON-COMPLIANT')
+def step_then_unencrypted_buckets_non_compliant(context):
+    """Production buckets without default encryption violate the policy."""
+    for name, bucket in context.fake_s3_state.buckets.items():
+        if bucket["algorithm"] is None:
+            assert not context.s3_outcomes[name]["compliant"], f"{name} should be non-compliant"
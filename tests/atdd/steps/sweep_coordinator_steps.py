@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the sharded compliance sweep tests.
+
+These step definitions implement the scenarios defined in
+sweep_coordinator.feature using the behave framework.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_schema import CedarSchema
+from differential_harness import PROJECT_ROOT
+from s3_inventory import evaluate_inventory
+from step_fixtures import scenario_workdir
+from sweep_coordinator import merge, plan, run_workers, status, work
+from workload_generator import WorkloadGenerator
+
+
+def _result_file(context, shard: int) -> Path:
+    return Path(context.sweep_dir) / "results" / f"{shard:06d}.json"
+
+
+@given('a generated inventory of {count:d} S3 buckets')
+def step_given_inventory(context, count):
+    context.sweep_workdir = scenario_workdir(context, "sweep")
+    generator = WorkloadGenerator(CedarSchema.from_file(PROJECT_ROOT / "schema.cedarschema"), seed=19)
+    context.sweep_buckets = []
+    for _, buckets in generator.templates(count):
+        context.sweep_buckets.extend(buckets)
+    context.sweep_buckets = context.sweep_buckets[:count]
+    context.sweep_inventory = context.sweep_workdir / "inventory.jsonl"
+    context.sweep_inventory.write_text("".join(json.dumps(bucket) + "\n" for bucket in context.sweep_buckets))
+
+
+@given('a sweep of that inventory planned in shards of {size:d} buckets')
+def step_given_plan(context, size):
+    context.sweep_dir = str(context.sweep_workdir / "sweep")
+    context.sweep_manifest = plan(context.sweep_dir, [context.sweep_inventory], shard_size=size)
+    assert context.sweep_manifest["shards"] == len(context.sweep_buckets) // size, context.sweep_manifest
+
+
+@when('{workers:d} local worker processes run the sweep')
+@when('{workers:d} local worker processes run the sweep again')
+def step_when_run_workers(context, workers):
+    run_workers(context.sweep_dir, workers)
+    context.sweep_summary = merge(context.sweep_dir)
+
+
+@then('every shard should have exactly one checkpointed result')
+def step_then_one_result_per_shard(context):
+    results = sorted(Path(context.sweep_dir, "results").glob("*.json"))
+    assert len(results) == context.sweep_manifest["shards"], len(results)
+    assert not list(Path(context.sweep_dir, "claims").iterdir()), "claims left behind"
+    assert sum(json.loads(path.read_text())["entities"] for path in results) == len(context.sweep_buckets)
+
+
+def _expected(context):
+    if not hasattr(context, "sweep_expected"):
+        context.sweep_expected = list(evaluate_inventory(context.sweep_buckets))
+    return context.sweep_expected
+
+
+@then('the merged compliant and non-compliant counts should match a single-process evaluation')
+def step_then_counts_match(context):
+    expected = _expected(context)
+    summary = context.sweep_summary
+    assert summary["buckets"] == len(expected)
+    assert summary["compliant"] == sum(outcome["compliant"] for outcome in expected), summary
+    assert summary["non_compliant"] == sum(not outcome["compliant"] for outcome in expected), summary
+    assert summary["compliant"] and summary["non_compliant"], summary
+    assert summary["errors"] == 0, summary
+
+
+@then('the non-compliant bucket list should name every non-compliant bucket')
+def step_then_non_compliant_list(context):
+    listed = Path(context.sweep_dir, "non-compliant.txt").read_text().split()
+    assert sorted(listed) == sorted(outcome["bucket"] for outcome in _expected(context) if not outcome["compliant"])
+
+
+@given('{count:d} buckets of shard 0 have the string "true" as their encryption flag')
+def step_given_malformed_shard(context, count):
+    shard = Path(context.sweep_dir, "shards", "000000.jsonl")
+    entities = [json.loads(line) for line in shard.read_text().splitlines()]
+    for entity in entities[:count]:
+        entity["attrs"]["encryption_enabled"] = "true"
+    shard.write_text("".join(json.dumps(entity) + "\n" for entity in entities))
+    context.sweep_malformed = sorted(entity["uid"]["id"] for entity in entities[:count])
+
+
+@when('a worker sweeps every shard with prevalidation')
+def step_when_sweep_prevalidated(context):
+    work(context.sweep_dir, "atdd:prevalidate", prevalidate=True)
+    context.sweep_summary = merge(context.sweep_dir)
+
+
+@then('the summary should count {count:d} errors')
+def step_then_error_count(context, count):
+    summary = context.sweep_summary
+    assert summary["errors"] == count, summary
+    assert summary["compliant"] + summary["non_compliant"] + summary["errors"] == summary["buckets"], summary
+
+
+@then('the error list should name exactly those {count:d} buckets')
+def step_then_error_list(context, count):
+    listed = Path(context.sweep_dir, "errors.txt").read_text().split()
+    assert sorted(listed) == context.sweep_malformed and len(listed) == count, listed
+
+
+@then('the non-compliant bucket list should have one line per non-compliant bucket')
+def step_then_non_compliant_lines(context):
+    listed = Path(context.sweep_dir, "non-compliant.txt").read_text().split()
+    assert len(listed) == context.sweep_summary["non_compliant"], (len(listed), context.sweep_summary)
+    assert not set(listed) & set(context.sweep_malformed), listed
+
+
+@when('a worker stops after finishing {count:d} shards')
+def step_when_partial(context, count):
+    assert work(context.sweep_dir, "atdd:first", max_shards=count) == count
+    context.sweep_first = {path.name: (path.stat().st_mtime_ns, path.read_text())
+                           for path in Path(context.sweep_dir, "results").glob("*.json")}
+
+
+@then('the sweep status should show {finished:d} finished and {pending:d} pending shards')
+def step_then_status(context, finished, pending):
+    progress = status(context.sweep_dir)
+    assert (progress["finished"], progress["pending"]) == (finished, pending), progress
+
+
+@then('the {count:d} shards finished first should not have been evaluated again')
+def step_then_not_redone(context, count):
+    assert len(context.sweep_first) == count
+    for name, (mtime, text) in context.sweep_first.items():
+        path = Path(context.sweep_dir, "results", name)
+        assert (path.stat().st_mtime_ns, path.read_text()) == (mtime, text), name
+        assert json.loads(text)["worker"] == "atdd:first"
+    assert context.sweep_summary["workers"]["atdd:first"] == count, context.sweep_summary["workers"]
+
+
+def _claim(context, shard: int, worker: str, age: float) -> None:
+    path = Path(context.sweep_dir, "claims", f"{shard:06d}.claim")
+    path.write_text(json.dumps({"worker": worker, "claimed": time.time() - age}))
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+@given('shard 0 is claimed by a worker that stopped refreshing its lease an hour ago')
+def step_given_stale_claim(context):
+    _claim(context, 0, "atdd:dead", 3600)
+
+
+@given('shard 1 is claimed by a worker that is still running')
+def step_given_live_claim(context):
+    _claim(context, 1, "atdd:alive", 0)
+
+
+@when('a worker sweeps every shard it can claim')
+def step_when_sweep_claimable(context):
+    shards = context.sweep_manifest["shards"]
+    assert work(context.sweep_dir, "atdd:new", lease_seconds=600, max_shards=shards - 1) == shards - 1
+
+
+@then('shard 0 should have been evaluated by the new worker')
+def step_then_stale_taken_over(context):
+    assert json.loads(_result_file(context, 0).read_text())["worker"] == "atdd:new"
+    assert not Path(context.sweep_dir, "claims", "000000.claim").exists()
+
+
+@then('shard 1 should still be pending under its live claim')
+def step_then_live_claim_kept(context):
+    assert not _result_file(context, 1).exists()
+    claim = json.loads(Path(context.sweep_dir, "claims", "000001.claim").read_text())
+    assert claim["worker"] == "atdd:alive"
+    progress = status(context.sweep_dir)
+    assert (progress["pending"], progress["claimed"]) == (1, 1), progress
+
+
+@given('a second checkout of the repository in another directory')
+def step_given_second_checkout(context):
+    context.sweep_checkout = context.sweep_workdir / "host-b"
+    ignore = shutil.ignore_patterns("__pycache__")
+    shutil.copytree(PROJECT_ROOT / "tests" / "atdd" / "support", context.sweep_checkout / "tests" / "atdd" / "support",
+                    ignore=ignore)
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", context.sweep_checkout / "cedar_policies")
+    shutil.copy(PROJECT_ROOT / "schema.cedarschema", context.sweep_checkout / "schema.cedarschema")
+
+
+@when('a worker started from the second checkout runs the sweep')
+def step_when_second_checkout_works(context):
+    coordinator = context.sweep_checkout / "tests" / "atdd" / "support" / "sweep_coordinator.py"
+    completed = subprocess.run([sys.executable, str(coordinator), "work", context.sweep_dir, "--workers", "1"],
+                               capture_output=True, text=True, timeout=300)
+    assert completed.returncode in (0, 1), completed.stderr
+    assert "Policies changed" not in completed.stderr, completed.stderr
+    context.sweep_summary = merge(context.sweep_dir)
+
+
+@given('a sweep planned against a copy of the policies')
+def step_given_copied_policies(context):
+    context.sweep_policies = context.sweep_workdir / "policies"
+    shutil.copytree(PROJECT_ROOT / "cedar_policies", context.sweep_policies)
+    context.sweep_dir = str(context.sweep_workdir / "policy-sweep")
+    plan(context.sweep_dir, [context.sweep_inventory], shard_size=200, policy_dir=str(context.sweep_policies))
+
+
+@when('the copied policies change before a worker starts')
+def step_when_policies_change(context):
+    (context.sweep_policies / "zz-extra.cedar").write_text(
+        'forbid(principal, action, resource == S3Resource::"quarantined-bucket");\n')
+
+
+@then('the worker should refuse to evaluate the sweep')
+def step_then_refused(context):
+    try:
+        work(context.sweep_dir, "atdd:late")
+    except RuntimeError as e:
+        assert "Policies changed" in str(e), e
+    else:
+        raise AssertionError("worker evaluated a sweep planned against other policies")
+    assert status(context.sweep_dir)["finished"] == 0
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the warm worker pool tests.
+
+These step definitions implement the scenarios defined in
+worker_pool.feature using the behave framework.
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from behave import given, when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_policy_runner import CedarPolicyRunner
+from cedar_test_files import iter_suite_cases
+from cedar_worker_pool import CedarWorkerPool, WorkerTimeout, create_evaluator
+from differential_harness import PROJECT_ROOT
+from step_fixtures import FIXTURE_ENTITIES, scenario_workdir
+
+POLICIES_DIR = PROJECT_ROOT / "cedar_policies"
+SCHEMA_FILE = PROJECT_ROOT / "schema.cedarschema"
+
+
+def _pool(context, pool_size, max_requests_per_worker=1000):
+    context.pool = CedarWorkerPool(str(POLICIES_DIR), str(SCHEMA_FILE), pool_size=pool_size,
+                                   max_requests_per_worker=max_requests_per_worker, engine="auto")
+    context.add_cleanup(context.pool.close)
+    context.pool_requests = []
+    context.pool_responses = []
+
+
+def _authorize(context, requests):
+    for request in requests:
+        context.pool_requests.append(request)
+        context.pool_responses.append(context.pool.authorize(
+            request["principal"], request["action"], request["resource"], str(FIXTURE_ENTITIES),
+            context=request.get("context")))
+
+
+def _exited(pid):
+    """True once a process is gone or a zombie waiting to be reaped by the pool."""
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            return handle.read().rsplit(") ", 1)[1][0] in "ZX"
+    except FileNotFoundError:
+        return True
+
+
+def _suite_requests():
+    return [case["request"] for case in iter_suite_cases(PROJECT_ROOT / "tests", FIXTURE_ENTITIES)]
+
+
+@given('a worker pool of {size:d} workers on the repository policies')
+@given('a worker pool of {size:d} worker on the repository policies')
+def step_given_pool(context, size):
+    _pool(context, size)
+
+
+@given('a worker pool of {size:d} worker recycled every {count:d} requests')
+def step_given_recycling_pool(context, size, count):
+    _pool(context, size, max_requests_per_worker=count)
+
+
+@when('I authorize every suite request through the pool')
+def step_when_authorize_suite(context):
+    _authorize(context, _suite_requests())
+
+
+@when('I authorize {count:d} suite requests through the pool')
+def step_when_authorize_some(context, count):
+    _authorize(context, _suite_requests()[:count])
+
+
+@when('I send a request whose entities never arrive with a {seconds:d} second timeout')
+def step_when_request_hangs(context, seconds):
+    # Opening a FIFO for reading blocks until a writer appears, which never happens
+    fifo = scenario_workdir(context, "worker-pool") / "entities.json"
+    os.mkfifo(fifo)
+    request = _suite_requests()[0]
+    started = time.perf_counter()
+    try:
+        context.pool.authorize(request["principal"], request["action"], request["resource"], str(fifo),
+                               context=request.get("context"), timeout=seconds)
+        context.pool_error = None
+    except WorkerTimeout as e:
+        context.pool_error = e
+    context.pool_elapsed = time.perf_counter() - started
+    context.pool_timeout = seconds
+
+
+@when('the idle worker is killed')
+def step_when_kill_idle_worker(context):
+    pids = context.pool.idle_worker_pids()
+    assert len(pids) == 1, pids
+    os.kill(pids[0], signal.SIGKILL)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not _exited(pids[0]):
+        time.sleep(0.01)
+
+
+@then('the auto engine should be in-process')
+def step_then_in_process(context):
+    evaluator = create_evaluator("auto", POLICIES_DIR, SCHEMA_FILE, timeout=10)
+    try:
+        try:
+            import cedarpy  # noqa: F401
+            expected = "cedarpy"
+        except ImportError:
+            expected = "python"
+        assert evaluator.name == expected, evaluator.name
+    finally:
+        evaluator.close()
+
+
+@then('every decision should match the python backend')
+def step_then_match_python(context):
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python")
+    expected = [result["decision"] for result in runner.authorize_batch(context.pool_requests, str(FIXTURE_ENTITIES))]
+    actual = [response["decision"] for response in context.pool_responses]
+    assert actual == expected, list(zip(actual, expected))
+
+
+@then('every request should have been answered')
+def step_then_answered(context):
+    assert context.pool_responses, "No requests were sent"
+    for response in context.pool_responses:
+        assert response["decision"] in ("ALLOW", "DENY") and not response["error"], response
+
+
+@then('the request should fail with a worker timeout')
+def step_then_timeout(context):
+    assert isinstance(context.pool_error, WorkerTimeout), context.pool_error
+    assert context.pool_elapsed < context.pool_timeout + 2, f"{context.pool_elapsed:.1f}s"
+
+
+@then('{spawned:d} workers should have been spawned, {recycled:d} recycled and {replaced:d} replaced')
+def step_then_pool_stats(context, spawned, recycled, replaced):
+    expected = {"spawned": spawned, "recycled": recycled, "replaced": replaced}
+    assert context.pool.stats == expected, context.pool.stats
+
+
+@given('a runner on the pool backend with {size:d} workers')
+def step_given_pool_runner(context, size):
+    context.pool_runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="pool", pool_size=size)
+    context.add_cleanup(context.pool_runner.close)
+
+
+@when('{count:d} threads ask it for its worker pool at the same time')
+def step_when_concurrent_get_pool(context, count):
+    import cedar_worker_pool
+    context.runner_pools = []
+
+    class SlowStartPool(CedarWorkerPool):
+        """Widens the window between checking for a pool and storing the new one."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            context.runner_pools.append(self)
+            context.add_cleanup(self.close)
+            time.sleep(0.05)
+
+    cedar_worker_pool.CedarWorkerPool = SlowStartPool
+    context.add_cleanup(setattr, cedar_worker_pool, "CedarWorkerPool", CedarWorkerPool)
+    barrier = threading.Barrier(count)
+    context.pools_returned = []
+
+    def first_request():
+        barrier.wait()
+        context.pools_returned.append(context.pool_runner._get_pool())
+
+    threads = [threading.Thread(target=first_request) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@then('they should all get the same pool')
+def step_then_same_pool(context):
+    assert len(context.runner_pools) == 1, f"{len(context.runner_pools)} pools were started"
+    assert all(pool is context.runner_pools[0] for pool in context.pools_returned), context.pools_returned
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Step definitions for the workload generator tests.
+
+These step definitions implement the scenarios defined in
+workload_generator.feature using the behave framework.
+"""
+
+import filecmp
+import json
+import sys
+from pathlib import Path
+from behave import when, then
+
+sys.path.append(str(Path(__file__).parent.parent / "support"))
+from cedar_policy_runner import CedarPolicyRunner
+from cedar_schema import CedarSchema
+from cloudformation_entities import scan_templates
+from differential_harness import PROJECT_ROOT
+from step_fixtures import scenario_workdir
+from workload_generator import WorkloadGenerator, WorkloadMix, write_corpus
+
+SCHEMA = CedarSchema.from_file(PROJECT_ROOT / "schema.cedarschema")
+
+
+def _corpus_dir(context, name: str) -> Path:
+    if not hasattr(context, "workload_dir"):
+        context.workload_dir = scenario_workdir(context, "workload")
+    return context.workload_dir / name
+
+
+def _buckets(corpus: Path):
+    with open(corpus / "entities.jsonl") as handle:
+        for line in handle:
+            entity = json.loads(line)
+            if entity["uid"]["type"] == "S3Resource":
+                yield entity
+
+
+@when('I generate a corpus of {buckets:d} buckets with seed {seed:d} twice')
+def step_when_generate_twice(context, buckets, seed):
+    for name in ("first", "second"):
+        write_corpus(WorkloadGenerator(SCHEMA, seed=seed), buckets, _corpus_dir(context, name), templates=True)
+
+
+@when('I generate a corpus of {buckets:d} buckets with seed {seed:d}')
+def step_when_generate_other_seed(context, buckets, seed):
+    write_corpus(WorkloadGenerator(SCHEMA, seed=seed), buckets, _corpus_dir(context, "other"))
+
+
+@then('both seed 7 corpora should be byte-for-byte identical')
+def step_then_identical(context):
+    first, second = _corpus_dir(context, "first"), _corpus_dir(context, "second")
+    assert filecmp.cmp(first / "entities.jsonl", second / "entities.jsonl", shallow=False)
+    comparison = filecmp.dircmp(first / "templates" / "00000", second / "templates" / "00000")
+    assert not comparison.diff_files and not comparison.left_only and not comparison.right_only, \
+        comparison.diff_files
+    assert len(comparison.same_files) == 100, len(comparison.same_files)
+
+
+@then('the seed 8 corpus should differ')
+def step_then_differs(context):
+    first = [bucket["attrs"] for bucket in _buckets(_corpus_dir(context, "first"))]
+    other = [bucket["attrs"] for bucket in _buckets(_corpus_dir(context, "other"))]
+    assert len(first) == len(other) == 500
+    assert [a["encryption_enabled"] for a in first] != [a["encryption_enabled"] for a in other]
+
+
+@then('every entity should only use attributes declared in the schema')
+def step_then_schema_attributes(context):
+    with open(_corpus_dir(context, "first") / "entities.jsonl") as handle:
+        for line in handle:
+            entity = json.loads(line)
+            declared = SCHEMA.entity_types[entity["uid"]["type"]].attributes
+            required = {name for name, (_, is_required) in declared.items() if is_required}
+            assert set(entity["attrs"]) <= set(declared), entity
+            assert required <= set(entity["attrs"]), entity
+
+
+@when('I generate 1000 production buckets with only AES256 and unencrypted buckets and no KMS keys')
+def step_when_generate_mix(context):
+    mix = WorkloadMix(algorithms={"AES256": 1, "none": 1}, environments={"production": 1}, kms_key=0.0)
+    context.workload_mix_corpus = _corpus_dir(context, "mix")
+    write_corpus(WorkloadGenerator(SCHEMA, mix), 1000, context.workload_mix_corpus)
+    context.workload_mix_buckets = [bucket["attrs"] for bucket in _buckets(context.workload_mix_corpus)]
+
+
+@then('every bucket should be in production')
+def step_then_production(context):
+    assert {attrs["environment"] for attrs in context.workload_mix_buckets} == {"production"}
+
+
+@then('every encryption algorithm should be AES256')
+def step_then_aes256(context):
+    algorithms = {attrs.get("encryption_algorithm") for attrs in context.workload_mix_buckets}
+    assert algorithms <= {"AES256", None}, algorithms
+    assert not any("kms_key_id" in attrs for attrs in context.workload_mix_buckets)
+
+
+@then('roughly half of the buckets should be unencrypted')
+def step_then_half_unencrypted(context):
+    unencrypted = sum(1 for attrs in context.workload_mix_buckets if not attrs["encryption_enabled"])
+    assert 400 <= unencrypted <= 600, unencrypted
+
+
+@when('I generate a corpus of {buckets:d} buckets with templates and {requests:d} labelled requests')
+def step_when_generate_labelled(context, buckets, requests):
+    context.workload_labelled = _corpus_dir(context, "labelled")
+    write_corpus(WorkloadGenerator(SCHEMA), buckets, context.workload_labelled, fmt="json",
+                 templates=True, requests=requests)
+    json_corpus = context.workload_labelled / "entities.json"
+    jsonl_corpus = _corpus_dir(context, "labelled-jsonl")
+    write_corpus(WorkloadGenerator(SCHEMA), buckets, jsonl_corpus)
+    context.workload_labelled_buckets = {bucket["uid"]["id"]: bucket["attrs"] for bucket in _buckets(jsonl_corpus)}
+    assert len(json.loads(json_corpus.read_text())) == len(list(open(jsonl_corpus / "entities.jsonl")))
+
+
+@then('every request in the ALLOW and DENY folders should get that decision from the batch runner')
+def step_then_labels_match(context):
+    suite = context.workload_labelled / "suite"
+    files = [(expected, path) for expected in ("ALLOW", "DENY") for path in sorted((suite / expected).glob("*.json"))]
+    assert len(files) == 90, len(files)
+    assert {expected for expected, _ in files} == {"ALLOW", "DENY"}
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend="python")
+    results = runner.authorize_batch([str(path) for _, path in files],
+                                     str(context.workload_labelled / "entities.json"))
+    for (expected, path), result in zip(files, results):
+        assert result["decision"] == expected, f"{path.name}: expected {expected}, got {result['decision']}"
+
+
+@then('the generated templates should parse to the same encryption settings as the bucket entities')
+def step_then_templates_match(context):
+    templates = context.workload_labelled / "templates"
+    compared = 0
+    for parsed in scan_templates([str(templates)], str(templates), workers=1):
+        assert parsed["error"] is None, parsed["error"]
+        for entity in parsed["entities"][1:]:
+            generated = context.workload_labelled_buckets[entity["attrs"]["name"]]
+            if generated["encryption_enabled"] and "encryption_algorithm" not in generated:
+                continue  # CloudFormation cannot express "enabled without an algorithm"
+            for attr in ("encryption_enabled", "encryption_algorithm", "kms_key_id", "environment"):
+                assert entity["attrs"].get(attr) == generated.get(attr), (attr, entity, generated)
+            assert (entity["attrs"].get("bucket_policy_enforces_encryption", False)
+                    == generated.get("bucket_policy_enforces_encryption", False)), (entity, generated)
+            compared += 1
+    assert compared > 250, compared
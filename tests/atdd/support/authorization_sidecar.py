@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Local Authorization Sidecar
+
+A small asyncio HTTP/1.1 service that answers authorization requests over TCP
+and/or a Unix socket, so pipelines and services get decisions without
+spawning the cedar CLI per check:
+
+    POST /v1/authorize          one --request-json style object
+    POST /v1/authorize/batch    {"requests": [...]} (or a bare list)
+    POST /v1/reload             check policies and schema for changes now
+    GET  /healthz               policy generation, hash and reload status
+    GET  /metrics               Prometheus text format (with --metrics)
+
+Connections are kept alive (HTTP/1.1 default). Requests from all connections
+go through one queue and are coalesced into micro-batches of up to
+--max-batch requests, waiting at most --max-delay-ms for a batch to fill.
+Each batch is evaluated in-process with the Python evaluator against the
+--entities file or indexed entity store directory, off the event loop.
+
+cedar_policies/ and schema.cedarschema are polled every --reload-interval
+seconds. A changed policy set is read once, hashed, parsed, type-checked
+against the schema and compiled in the background, and swapped in only if
+all of that succeeds; a policy set that fails to parse or validate is
+rejected and the current one keeps serving. Every batch runs entirely on the
+generation that was current when it started, so in-flight requests are never
+dropped or split across policy versions. Results carry the generation and
+policy hash that decided them.
+
+Usage:
+    python3 tests/atdd/support/authorization_sidecar.py --entities tests/fixtures/entities.json [--port 8181]
+    python3 tests/atdd/support/authorization_sidecar.py --entities /tmp/entity-store --unix-socket /tmp/cedar.sock
+    ./scripts/sidecar_loadtest.py --spawn --duration 10 --connections 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cedar_policy_runner import CedarPolicyRunner
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+MAX_BODY_BYTES = 16 * 1024 * 1024
+JSON_TYPE = "application/json"
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class PolicyGeneration:
+    """One loaded policy set: a warm python-backend runner and the hash it was built from."""
+
+    def __init__(self, number: int, runner: CedarPolicyRunner, policy_hash: str):
+        self.number = number
+        self.runner = runner
+        self.policy_hash = policy_hash
+        self.loaded_at = time.time()
+
+
+class AuthorizationSidecar:
+    """Micro-batching authorization service with hot policy reload."""
+
+    def __init__(self, entities: str, policy_dir: str = "cedar_policies",
+                 schema_file: str = "schema.cedarschema", max_batch: int = 256,
+                 max_delay: float = 0.001, reload_interval: float = 1.0, metrics=None,
+                 residuals: bool = False, decision_log=None):
+        """
+        Args:
+            entities: Cedar entities JSON file or indexed entity store directory
+            policy_dir: Policy directory relative to the project root
+            schema_file: Cedar schema file relative to the project root
+            max_batch: Most requests evaluated in one micro-batch
+            max_delay: Seconds to wait for a micro-batch to fill after its first request
+            reload_interval: Seconds between policy and schema change checks (0 disables)
+            metrics: Optional MetricsRegistry every result is recorded in
+            residuals: Answer requests from precomputed residual policies
+            decision_log: Optional DecisionLog every decision is appended to, with the
+                hash of the generation that made it
+        """
+        from decision_cache import PolicyFingerprint
+        self.entities = str(entities)
+        self.policy_dir = policy_dir
+        self.schema_file = schema_file
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.reload_interval = reload_interval
+        self.metrics = metrics
+        self.residuals = residuals
+        self.decision_log = decision_log
+        self.fingerprint = PolicyFingerprint(PROJECT_ROOT / policy_dir, PROJECT_ROOT / schema_file,
+                                             check_interval=0)
+        self.generation: Optional[PolicyGeneration] = None
+        self.stats = {"requests": 0, "batches": 0, "reloads": 0, "reload_errors": 0}
+        self.last_reload_error: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._in_flight = 0
+        self._evaluator_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cedar-sidecar")
+        self._reload_lock: Optional[asyncio.Lock] = None
+        self._tasks: List[asyncio.Task] = []
+        self._servers: List[asyncio.AbstractServer] = []
+
+    # -------------------------------------------------------------------------
+    # Policy generations
+    # -------------------------------------------------------------------------
+
+    def _load(self, number: int) -> PolicyGeneration:
+        """
+        Build a generation from one read of the policy files and schema.
+
+        The hash, validation and compiled policies all come from the same
+        bytes, so a file edited mid-load cannot be served under another hash.
+
+        Raises:
+            CedarSyntaxError if the policies or schema do not parse,
+            PolicyValidationError if the policies do not type-check
+        """
+        from cedar_evaluator import parse_policies
+        from cedar_schema import CedarSchema
+        from policy_validator import PolicyValidationError, PolicyValidator
+
+        policy_hash, contents = self.fingerprint.snapshot()
+        policy_dir = self.fingerprint.policy_dir
+        schema_file = self.fingerprint.schema_file
+        # Same files, in the same order, as cedar_evaluator.load_policy_files
+        sources = [(str(path), data.decode()) for path, data in sorted(contents.items())
+                   if path != schema_file and (policy_dir.is_file()
+                                               or (path.parent == policy_dir and path.suffix == ".cedar"))]
+        policies = parse_policies(sources)
+        schema = CedarSchema.parse(contents[schema_file].decode()) if schema_file in contents else None
+        if schema is not None:
+            problems = PolicyValidator(schema).validate(policies)
+            if problems:
+                raise PolicyValidationError(problems)
+
+        runner = CedarPolicyRunner(policy_dir=self.policy_dir, schema_file=self.schema_file, backend="python",
+                                   metrics=self.metrics, residuals=self.residuals)
+        runner.use_policies(policies, schema)
+        return PolicyGeneration(number, runner, policy_hash)
+
+    async def reload(self, force: bool = False) -> bool:
+        """
+        Swap in the current policy set if it changed (or if force is set).
+
+        Returns:
+            True if a new generation is now serving
+        """
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            _, changed = await loop.run_in_executor(None, self.fingerprint.current)
+            if self.generation is not None and not (changed or force):
+                return False
+            number = self.generation.number + 1 if self.generation else 1
+            try:
+                generation = await loop.run_in_executor(None, self._load, number)
+            except Exception as e:
+                if self.generation is None:
+                    raise
+                self.stats["reload_errors"] += 1
+                self.last_reload_error = f"{type(e).__name__}: {e}"
+                print(f"WARNING: keeping generation {self.generation.number}: {self.last_reload_error}",
+                      file=sys.stderr)
+                return False
+            # Batches already running keep their reference to the old generation
+            self.generation = generation
+            if number > 1:
+                self.stats["reloads"] += 1
+                self.last_reload_error = None
+            return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except OSError as e:
+                # Files mid-rename while an editor or deploy writes them; the next check retries
+                print(f"WARNING: policy change check failed: {e}", file=sys.stderr)
+
+    # -------------------------------------------------------------------------
+    # Micro-batching
+    # -------------------------------------------------------------------------
+
+    def _evaluate_batch(self, generation: PolicyGeneration,
+                        requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        for result in generation.runner.authorize_batch(requests, self.entities):
+            request = result.pop("request")
+            if self.decision_log is not None:
+                self.decision_log.record(request["principal"], request["action"], request["resource"],
+                                         request.get("context"), result, generation.policy_hash)
+            result["generation"] = generation.number
+            result["policy_hash"] = generation.policy_hash
+            results.append(result)
+        return results
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+
+            generation = self.generation
+            requests = [request for request, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._evaluator_thread, self._evaluate_batch,
+                                                     generation, requests)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def authorize(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one request for the next micro-batch and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight += 1
+        try:
+            await self._queue.put((request, future))
+            return await future
+        finally:
+            self._in_flight -= 1
+
+    async def authorize_many(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.authorize(request) for request in requests)))
+
+    # -------------------------------------------------------------------------
+    # HTTP
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _check_request(request: Any) -> Dict[str, Any]:
+        if not isinstance(request, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "request must be a JSON object")
+        for field in ("principal", "action", "resource"):
+            if not isinstance(request.get(field), str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"request needs a string '{field}'")
+        if not isinstance(request.get("context") or {}, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "context must be a JSON object")
+        return request
+
+    def health(self) -> Dict[str, Any]:
+        generation = self.generation
+        return dict(
+            self.stats,
+            status="ok",
+            generation=generation.number,
+            policy_hash=generation.policy_hash,
+            loaded_at=generation.loaded_at,
+            last_reload_error=self.last_reload_error,
+            in_flight=self._in_flight,
+        )
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Any, str]:
+        """
+        Route one HTTP request.
+
+        Returns:
+            Tuple of (status, payload, content type); JSON payloads are serialized by the caller
+        """
+        routes = {
+            "/healthz": ("GET",),
+            "/metrics": ("GET",),
+            "/v1/authorize": ("POST",),
+            "/v1/authorize/batch": ("POST",),
+            "/v1/reload": ("POST",),
+        }
+        if path not in routes:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {path}")
+        if method not in routes[path]:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} expects {routes[path][0]}")
+
+        if path == "/healthz":
+            return HTTPStatus.OK, self.health(), JSON_TYPE
+        if path == "/metrics":
+            if self.metrics is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "metrics are disabled (start with --metrics)")
+            return HTTPStatus.OK, self.metrics.to_prometheus(), "text/plain; version=0.0.4"
+        if path == "/v1/reload":
+            await self.reload()
+            return HTTPStatus.OK, self.health(), JSON_TYPE
+
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}")
+        if path == "/v1/authorize":
+            return HTTPStatus.OK, await self.authorize(self._check_request(payload)), JSON_TYPE
+        requests = payload.get("requests") if isinstance(payload, dict) else payload
+        if not isinstance(requests, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "batch body must be a list or {\"requests\": [...]}")
+        results = await self.authorize_many([self._check_request(request) for request in requests])
+        return HTTPStatus.OK, {"results": results}, JSON_TYPE
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = True
+                try:
+                    try:
+                        method, target, version = request_line.decode("latin-1").split()
+                    except ValueError:
+                        keep_alive = False
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line")
+                    headers: Dict[str, str] = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = (connection != "close" if version == "HTTP/1.1"
+                                  else connection == "keep-alive")
+                    length = int(headers.get("content-length") or 0)
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"body over {MAX_BODY_BYTES} bytes")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload, content_type = await self.dispatch(method, target.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload, content_type = e.status, {"error": str(e)}, JSON_TYPE
+                except Exception as e:
+                    status, payload, content_type = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                                     {"error": f"{type(e).__name__}: {e}"}, JSON_TYPE)
+
+                data = (json.dumps(payload) if content_type == JSON_TYPE else payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def start(self, host: Optional[str] = "127.0.0.1", port: Optional[int] = 8181,
+                    unix_socket: Optional[str] = None) -> List[str]:
+        """
+        Load the policy set and start listening.
+
+        Returns:
+            The addresses being served ("http://host:port" and/or "unix:path")
+        """
+        self._queue = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+        await self.reload(force=True)
+        self._tasks.append(asyncio.ensure_future(self._batcher()))
+        if self.reload_interval > 0:
+            self._tasks.append(asyncio.ensure_future(self._watch()))
+
+        addresses = []
+        if port is not None:
+            server = await asyncio.start_server(self._handle_connection, host, port)
+            self._servers.append(server)
+            bound_host, bound_port = server.sockets[0].getsockname()[:2]
+            addresses.append(f"http://{bound_host}:{bound_port}")
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            self._servers.append(await asyncio.start_unix_server(self._handle_connection, unix_socket))
+            addresses.append(f"unix:{unix_socket}")
+        return addresses
+
+    async def stop(self) -> None:
+        """Stop accepting connections, answer queued requests, then shut down."""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        while self._in_flight:
+            await asyncio.sleep(0.01)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._evaluator_thread.shutdown(wait=True)
+
+
+class SidecarClient:
+    """Minimal keep-alive asyncio HTTP client for the sidecar (TCP or Unix socket)."""
+
+    def __init__(self, address: str):
+        """
+        Args:
+            address: "http://host:port" or "unix:/path/to/socket"
+        """
+        self.address = address
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> None:
+        if self.address.startswith("unix:"):
+            self._reader, self._writer = await asyncio.open_unix_connection(self.address[len("unix:"):])
+        else:
+            host, _, port = self.address[len("http://"):].rstrip("/").rpartition(":")
+            self._reader, self._writer = await asyncio.open_connection(host, int(port))
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Tuple[int, Any]:
+        """
+        Send one request on the kept-alive connection.
+
+        Returns:
+            Tuple of (status code, decoded JSON body or text)
+        """
+        if self._writer is None:
+            await self.connect()
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: cedar-sidecar\r\n"
+                           f"Content-Type: {JSON_TYPE}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self._writer.drain()
+
+        status = int((await self._reader.readline()).split()[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        data = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        if headers.get("content-type", "").startswith(JSON_TYPE):
+            return status, json.loads(data)
+        return status, data.decode()
+
+
+async def _serve(args: argparse.Namespace) -> int:
+    metrics = None
+    if args.metrics:
+        from cedar_metrics import MetricsRegistry
+        metrics = MetricsRegistry(service_name="cedar-authorization-sidecar")
+    decision_log = None
+    if args.decision_log:
+        from decision_log import DecisionLog
+        decision_log = DecisionLog(args.decision_log)
+    sidecar = AuthorizationSidecar(args.entities, args.policies, args.schema, max_batch=args.max_batch,
+                                   max_delay=args.max_delay_ms / 1000, reload_interval=args.reload_interval,
+                                   metrics=metrics, residuals=args.residuals, decision_log=decision_log)
+    addresses = await sidecar.start(args.host, None if args.no_tcp else args.port, args.unix_socket)
+    print(json.dumps({"listening": addresses, "policy_hash": sidecar.generation.policy_hash}),
+          file=sys.stderr, flush=True)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    await stopping.wait()
+    await sidecar.stop()
+    if decision_log is not None:
+        decision_log.close()
+    print(json.dumps({"stopped": sidecar.stats}), file=sys.stderr)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve Cedar authorization decisions over HTTP")
+    parser.add_argument("--entities", required=True,
+                        help="Cedar entities JSON file or indexed entity store directory")
+    parser.add_argument("--policies", default="cedar_policies", help="Policy directory relative to the project root")
+    parser.add_argument("--schema", default="schema.cedarschema", help="Schema file relative to the project root")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8181, help="TCP port (0 picks a free port)")
+    parser.add_argument("--no-tcp", action="store_true", help="Only listen on --unix-socket")
+    parser.add_argument("--unix-socket", help="Also listen on this Unix socket path")
+    parser.add_argument("--max-batch", type=int, default=256, help="Most requests per micro-batch")
+    parser.add_argument("--max-delay-ms", type=float, default=1.0,
+                        help="Longest wait for a micro-batch to fill after its first request")
+    parser.add_argument("--reload-interval", type=float, default=1.0,
+                        help="Seconds between policy/schema change checks (0 disables hot reload)")
+    parser.add_argument("--residuals", action="store_true",
+                        help="Use precomputed residual policies per action and environment")
+    parser.add_argument("--metrics", action="store_true", help="Serve Prometheus metrics on /metrics")
+    parser.add_argument("--decision-log", help="Append every decision to the audit log in this directory")
+    args = parser.parse_args(argv)
+    if args.no_tcp and not args.unix_socket:
+        parser.error("--no-tcp needs --unix-socket")
+    return asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
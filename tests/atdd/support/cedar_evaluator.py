@@ -0,0 +1,823 @@
+#!/usr/bin/env python3
+"""
+In-Process Cedar Evaluator
+
+This module parses and evaluates the subset of the Cedar policy language used
+by the policies in cedar_policies/ without spawning the cedar CLI. Each policy
+is compiled once into a Python predicate, so a decision costs microseconds.
+
+Supported language subset:
+- permit/forbid with ==, in and is scope constraints (action in [...])
+- when/unless conditions with &&, ||, !, ==, !=, <, <=, >, >=, +, -, *
+- has, is, in, like, if-then-else, attribute access
+- set and record literals, .contains/.containsAll/.containsAny/.isEmpty
+- forbid-overrides-permit decisions with Cedar's skip-on-error semantics
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from cedar_metrics import span
+
+
+class CedarSyntaxError(Exception):
+    """Raised when policy, schema or literal text cannot be parsed."""
+
+
+class EvaluationError(Exception):
+    """Raised while evaluating a policy condition (the policy is then skipped)."""
+
+
+class EntityUID(NamedTuple):
+    type: str
+    id: str
+
+    def __str__(self) -> str:
+        return f'{self.type}::{json.dumps(self.id)}'
+
+
+# =============================================================================
+# TOKENIZER
+# =============================================================================
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+|//[^\n]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<int>\d+)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>::|==|!=|<=|>=|&&|\|\||[<>!(){}\[\],;.:@+\-*?=|])
+''', re.VERBOSE)
+
+
+class Token(NamedTuple):
+    kind: str
+    value: Any
+    pos: int
+
+
+def tokenize(text: str) -> List[Token]:
+    """Split Cedar policy, schema or literal text into tokens."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise CedarSyntaxError(f"Unexpected character {text[pos]!r} at offset {pos}")
+        kind = match.lastgroup
+        raw = match.group(kind)
+        if kind == "string":
+            tokens.append(Token("string", json.loads(raw), pos))
+        elif kind == "int":
+            tokens.append(Token("int", int(raw), pos))
+        elif kind != "ws":
+            tokens.append(Token(kind, raw, pos))
+        pos = match.end()
+    tokens.append(Token("eof", None, pos))
+    return tokens
+
+
+class TokenStream:
+    """Cursor over a token list with the small helpers the parsers need."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Token:
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def at(self, value: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token.kind in ("op", "ident") and token.value == value
+
+    def accept(self, value: str) -> bool:
+        if self.at(value):
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, value: str) -> Token:
+        token = self.next()
+        if token.kind not in ("op", "ident") or token.value != value:
+            raise CedarSyntaxError(f"Expected {value!r} at offset {token.pos}, found {token.value!r}")
+        return token
+
+    def expect_kind(self, kind: str) -> Token:
+        token = self.next()
+        if token.kind != kind:
+            raise CedarSyntaxError(f"Expected {kind} at offset {token.pos}, found {token.value!r}")
+        return token
+
+    def path(self) -> List[str]:
+        """Parse Ident(::Ident)* stopping before a trailing ::"string"."""
+        parts = [self.expect_kind("ident").value]
+        while self.at("::") and self.peek(1).kind == "ident":
+            self.next()
+            parts.append(self.next().value)
+        return parts
+
+
+def parse_entity_uid(text: str) -> EntityUID:
+    """Parse a request-style entity reference such as 'S3Resource::"bucket"'."""
+    stream = TokenStream(text)
+    parts = stream.path()
+    stream.expect("::")
+    uid = EntityUID("::".join(parts), stream.expect_kind("string").value)
+    stream.expect_kind("eof")
+    return uid
+
+
+# =============================================================================
+# VALUES AND ENTITIES
+# =============================================================================
+
+def to_cedar_value(value: Any) -> Any:
+    """Convert a Cedar JSON attribute value into the evaluator's representation."""
+    if isinstance(value, dict):
+        if "__entity" in value:
+            return EntityUID(value["__entity"]["type"], value["__entity"]["id"])
+        if set(value) == {"type", "id"}:
+            return EntityUID(value["type"], value["id"])
+        return {key: to_cedar_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_cedar_value(item) for item in value]
+    return value
+
+
+def from_cedar_value(value: Any) -> Any:
+    """Convert an evaluator value back into Cedar JSON."""
+    if isinstance(value, EntityUID):
+        return {"__entity": {"type": value.type, "id": value.id}}
+    if isinstance(value, dict):
+        return {key: from_cedar_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_cedar_value(item) for item in value]
+    return value
+
+
+def entity_refs(value: Any) -> Iterable[EntityUID]:
+    """Yield the uid of every entity reference inside a Cedar JSON value."""
+    if isinstance(value, dict):
+        if "__entity" in value:
+            yield EntityUID(value["__entity"]["type"], value["__entity"]["id"])
+        elif set(value) == {"type", "id"}:
+            yield EntityUID(value["type"], value["id"])
+        else:
+            for item in value.values():
+                yield from entity_refs(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from entity_refs(item)
+
+
+class Entity(NamedTuple):
+    uid: EntityUID
+    attrs: Dict[str, Any]
+    parents: Tuple[EntityUID, ...]
+
+
+class EntityStore:
+    """Entity hierarchy keyed by uid with memoised ancestor lookups."""
+
+    def __init__(self, entities: Iterable[Entity] = ()):
+        self.entities: Dict[EntityUID, Entity] = {}
+        self._ancestors: Dict[EntityUID, frozenset] = {}
+        for entity in entities:
+            self.entities[entity.uid] = entity
+
+    @classmethod
+    def from_json(cls, data: List[Dict[str, Any]]) -> "EntityStore":
+        return cls(
+            Entity(
+                EntityUID(item["uid"]["type"], item["uid"]["id"]),
+                {key: to_cedar_value(value) for key, value in item.get("attrs", {}).items()},
+                tuple(EntityUID(parent["type"], parent["id"]) for parent in item.get("parents", [])),
+            )
+            for item in data
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "EntityStore":
+        with open(path) as handle:
+            return cls.from_json(json.load(handle))
+
+    def get(self, uid: EntityUID) -> Optional[Entity]:
+        return self.entities.get(uid)
+
+    def ancestors(self, uid: EntityUID) -> frozenset:
+        cached = self._ancestors.get(uid)
+        if cached is None:
+            found = set()
+            pending = list(self.entities[uid].parents) if uid in self.entities else []
+            while pending:
+                parent = pending.pop()
+                if parent not in found:
+                    found.add(parent)
+                    if parent in self.entities:
+                        pending.extend(self.entities[parent].parents)
+            cached = self._ancestors[uid] = frozenset(found)
+        return cached
+
+
+def _cedar_equal(left: Any, right: Any) -> bool:
+    if isinstance(left, list) and isinstance(right, list):
+        return (all(any(_cedar_equal(a, b) for b in right) for a in left)
+                and all(any(_cedar_equal(b, a) for a in left) for b in right))
+    if isinstance(left, bool) != isinstance(right, bool):
+        return False
+    return left == right
+
+
+def _contains(collection: List[Any], item: Any) -> bool:
+    return any(_cedar_equal(member, item) for member in collection)
+
+
+# =============================================================================
+# EXPRESSION COMPILER
+# =============================================================================
+
+class Env(NamedTuple):
+    principal: EntityUID
+    action: EntityUID
+    resource: EntityUID
+    context: Dict[str, Any]
+    entities: EntityStore
+
+
+Compiled = Callable[[Env], Any]
+
+
+def _expect_type(value: Any, expected: type, operation: str) -> Any:
+    if expected is int and isinstance(value, bool) or not isinstance(value, expected):
+        raise EvaluationError(f"{operation} expected {expected.__name__}, got {type(value).__name__}")
+    return value
+
+
+def _get_attr(value: Any, attr: str, entities: EntityStore) -> Any:
+    if isinstance(value, EntityUID):
+        entity = entities.get(value)
+        if entity is None:
+            raise EvaluationError(f"Entity {value} does not exist")
+        if attr not in entity.attrs:
+            raise EvaluationError(f"Entity {value} has no attribute {attr!r}")
+        return entity.attrs[attr]
+    if isinstance(value, dict):
+        if attr not in value:
+            raise EvaluationError(f"Record has no attribute {attr!r}")
+        return value[attr]
+    raise EvaluationError(f"Cannot access attribute {attr!r} of {type(value).__name__}")
+
+
+def _has_attr(value: Any, attr: str, entities: EntityStore) -> bool:
+    if isinstance(value, EntityUID):
+        entity = entities.get(value)
+        return entity is not None and attr in entity.attrs
+    if isinstance(value, dict):
+        return attr in value
+    raise EvaluationError(f"Cannot test attribute {attr!r} of {type(value).__name__}")
+
+
+def _entity_in(left: Any, right: Any, entities: EntityStore) -> bool:
+    _expect_type(left, EntityUID, "in")
+    targets = right if isinstance(right, list) else [right]
+    ancestors = None
+    for target in targets:
+        _expect_type(target, EntityUID, "in")
+        if target == left:
+            return True
+        if ancestors is None:
+            ancestors = entities.ancestors(left)
+        if target in ancestors:
+            return True
+    return False
+
+
+def _like(value: str, pattern: List[Any]) -> bool:
+    regex = "".join(".*" if part is None else re.escape(part) for part in pattern)
+    return re.fullmatch(regex, value, re.DOTALL) is not None
+
+
+def _compile_binary(op: str, left: Compiled, right: Compiled) -> Compiled:
+    if op == "==":
+        return lambda env: _cedar_equal(left(env), right(env))
+    if op == "!=":
+        return lambda env: not _cedar_equal(left(env), right(env))
+    if op == "in":
+        return lambda env: _entity_in(left(env), right(env), env.entities)
+
+    comparisons = {
+        "<": lambda a, b: a < b,
+        "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b,
+        ">=": lambda a, b: a >= b,
+        "+": lambda a, b: a + b,
+        "-": lambda a, b: a - b,
+        "*": lambda a, b: a * b,
+    }
+    func = comparisons[op]
+    return lambda env: func(_expect_type(left(env), int, op), _expect_type(right(env), int, op))
+
+
+# Expressions parse into tuples whose first element is the node kind:
+#   ("lit", value)  ("var", name)  ("if", test, then, otherwise)
+#   ("&&", left, right)  ("||", left, right)  ("!", operand)  ("neg", operand)
+#   ("has", target, attr)  ("is", target, entity_type, in_target or None)
+#   ("like", target, pattern)  ("binop", op, left, right)  ("attr", target, name)
+#   ("call", target, method, args)  ("set", items)  ("record", ((key, value), ...))
+Node = Tuple[Any, ...]
+
+BOOLEAN_NODES = ("&&", "||", "!", "has", "is", "like")
+BOOLEAN_BINOPS = ("==", "!=", "<", "<=", ">", ">=", "in")
+BOOLEAN_METHODS = ("contains", "containsAll", "containsAny", "isEmpty")
+
+
+def is_boolean_node(node: Node) -> bool:
+    """Whether a node can only evaluate to a boolean (or raise)."""
+    kind = node[0]
+    if kind == "lit":
+        return isinstance(node[1], bool)
+    if kind == "binop":
+        return node[1] in BOOLEAN_BINOPS
+    if kind == "call":
+        return node[2] in BOOLEAN_METHODS
+    return kind in BOOLEAN_NODES
+
+
+def _compile_call(target: Compiled, name: str, args: List[Compiled]) -> Compiled:
+    def as_set(env: Env, func: Compiled = target) -> List[Any]:
+        return _expect_type(func(env), list, name)
+
+    if name == "contains" and len(args) == 1:
+        return lambda env: _contains(as_set(env), args[0](env))
+    if name == "containsAll" and len(args) == 1:
+        return lambda env: all(_contains(as_set(env), item)
+                               for item in _expect_type(args[0](env), list, name))
+    if name == "containsAny" and len(args) == 1:
+        return lambda env: any(_contains(as_set(env), item)
+                               for item in _expect_type(args[0](env), list, name))
+    if name == "isEmpty" and not args:
+        return lambda env: not as_set(env)
+    raise CedarSyntaxError(f"Unsupported method .{name}() with {len(args)} argument(s)")
+
+
+def compile_expression(node: Node) -> Compiled:
+    """Turn an expression node into a closure over Env."""
+    kind = node[0]
+    if kind == "lit":
+        return lambda env, v=node[1]: v
+    if kind == "var":
+        return lambda env, name=node[1]: getattr(env, name)
+    if kind == "if":
+        test, then, otherwise = (compile_expression(child) for child in node[1:])
+        return lambda env: then(env) if _expect_type(test(env), bool, "if") else otherwise(env)
+    if kind == "||":
+        a, b = compile_expression(node[1]), compile_expression(node[2])
+        return lambda env: _expect_type(a(env), bool, "||") or _expect_type(b(env), bool, "||")
+    if kind == "&&":
+        a, b = compile_expression(node[1]), compile_expression(node[2])
+        return lambda env: _expect_type(a(env), bool, "&&") and _expect_type(b(env), bool, "&&")
+    if kind == "!":
+        operand = compile_expression(node[1])
+        return lambda env: not _expect_type(operand(env), bool, "!")
+    if kind == "neg":
+        operand = compile_expression(node[1])
+        return lambda env: -_expect_type(operand(env), int, "-")
+    if kind == "has":
+        target, attr = compile_expression(node[1]), node[2]
+        return lambda env: _has_attr(target(env), attr, env.entities)
+    if kind == "is":
+        target, entity_type = compile_expression(node[1]), node[2]
+        is_check = lambda env: _expect_type(target(env), EntityUID, "is").type == entity_type  # noqa: E731
+        if node[3] is not None:
+            in_target = compile_expression(node[3])
+            return lambda env: is_check(env) and _entity_in(target(env), in_target(env), env.entities)
+        return is_check
+    if kind == "like":
+        target, pattern = compile_expression(node[1]), node[2]
+        return lambda env: _like(_expect_type(target(env), str, "like"), pattern)
+    if kind == "binop":
+        return _compile_binary(node[1], compile_expression(node[2]), compile_expression(node[3]))
+    if kind == "attr":
+        target, attr = compile_expression(node[1]), node[2]
+        return lambda env: _get_attr(target(env), attr, env.entities)
+    if kind == "call":
+        return _compile_call(compile_expression(node[1]), node[2], [compile_expression(arg) for arg in node[3]])
+    if kind == "set":
+        items = [compile_expression(item) for item in node[1]]
+        return lambda env: [item(env) for item in items]
+    if kind == "record":
+        fields = [(key, compile_expression(value)) for key, value in node[1]]
+        return lambda env: {key: func(env) for key, func in fields}
+    raise ValueError(f"Unknown expression node {kind!r}")
+
+
+class ExpressionParser:
+    """Recursive-descent parser that turns Cedar expressions into nodes."""
+
+    VARIABLES = ("principal", "action", "resource", "context")
+
+    def __init__(self, stream: TokenStream):
+        self.stream = stream
+
+    def expression(self) -> Node:
+        if self.stream.accept("if"):
+            test = self.expression()
+            self.stream.expect("then")
+            then = self.expression()
+            self.stream.expect("else")
+            otherwise = self.expression()
+            return ("if", test, then, otherwise)
+        return self.or_expr()
+
+    def or_expr(self) -> Node:
+        left = self.and_expr()
+        while self.stream.accept("||"):
+            left = ("||", left, self.and_expr())
+        return left
+
+    def and_expr(self) -> Node:
+        left = self.relation()
+        while self.stream.accept("&&"):
+            left = ("&&", left, self.relation())
+        return left
+
+    def relation(self) -> Node:
+        left = self.additive()
+        stream = self.stream
+        if stream.accept("has"):
+            token = stream.next()
+            if token.kind not in ("ident", "string"):
+                raise CedarSyntaxError(f"Expected attribute name after 'has' at offset {token.pos}")
+            return ("has", left, token.value)
+        if stream.accept("is"):
+            entity_type = "::".join(stream.path())
+            target = self.additive() if stream.accept("in") else None
+            return ("is", left, entity_type, target)
+        if stream.accept("like"):
+            return ("like", left, self._like_pattern(stream.expect_kind("string")))
+        for op in ("==", "!=", "<=", ">=", "<", ">", "in"):
+            if stream.accept(op):
+                return ("binop", op, left, self.additive())
+        return left
+
+    @staticmethod
+    def _like_pattern(token: Token) -> List[Any]:
+        # The tokenizer already unescaped the string; a literal '*' in a like
+        # pattern must be written as '\*', which JSON decoding rejects, so only
+        # unescaped wildcards are supported here.
+        parts: List[Any] = []
+        for index, chunk in enumerate(token.value.split("*")):
+            if index:
+                parts.append(None)
+            if chunk:
+                parts.append(chunk)
+        return parts
+
+    def additive(self) -> Node:
+        left = self.multiplicative()
+        while self.stream.peek().value in ("+", "-") and self.stream.peek().kind == "op":
+            op = self.stream.next().value
+            left = ("binop", op, left, self.multiplicative())
+        return left
+
+    def multiplicative(self) -> Node:
+        left = self.unary()
+        while self.stream.at("*"):
+            self.stream.next()
+            left = ("binop", "*", left, self.unary())
+        return left
+
+    def unary(self) -> Node:
+        if self.stream.accept("!"):
+            return ("!", self.unary())
+        if self.stream.accept("-"):
+            return ("neg", self.unary())
+        return self.member()
+
+    def member(self) -> Node:
+        value = self.primary()
+        stream = self.stream
+        while True:
+            if stream.accept("."):
+                name = stream.expect_kind("ident").value
+                if stream.accept("("):
+                    value = ("call", value, name, tuple(self._arguments(")")))
+                else:
+                    value = ("attr", value, name)
+            elif stream.at("[") and stream.peek(1).kind == "string":
+                stream.next()
+                name = stream.next().value
+                stream.expect("]")
+                value = ("attr", value, name)
+            else:
+                return value
+
+    def _arguments(self, closing: str) -> List[Node]:
+        args = []
+        if not self.stream.accept(closing):
+            args.append(self.expression())
+            while self.stream.accept(","):
+                if self.stream.at(closing):
+                    break
+                args.append(self.expression())
+            self.stream.expect(closing)
+        return args
+
+    def primary(self) -> Node:
+        stream = self.stream
+        token = stream.peek()
+        if token.kind in ("string", "int"):
+            stream.next()
+            return ("lit", token.value)
+        if stream.accept("("):
+            inner = self.expression()
+            stream.expect(")")
+            return inner
+        if stream.accept("["):
+            return ("set", tuple(self._arguments("]")))
+        if stream.accept("{"):
+            fields = []
+            while not stream.accept("}"):
+                key = stream.next()
+                if key.kind not in ("ident", "string"):
+                    raise CedarSyntaxError(f"Expected record key at offset {key.pos}")
+                stream.expect(":")
+                fields.append((key.value, self.expression()))
+                if not stream.accept(","):
+                    stream.expect("}")
+                    break
+            return ("record", tuple(fields))
+        if token.kind == "ident":
+            if token.value in ("true", "false"):
+                stream.next()
+                return ("lit", token.value == "true")
+            if token.value in self.VARIABLES and not stream.at("::", 1):
+                stream.next()
+                return ("var", token.value)
+            parts = stream.path()
+            stream.expect("::")
+            return ("lit", EntityUID("::".join(parts), stream.expect_kind("string").value))
+        raise CedarSyntaxError(f"Unexpected token {token.value!r} at offset {token.pos}")
+
+
+# =============================================================================
+# POLICIES
+# =============================================================================
+
+class ScopeConstraint(NamedTuple):
+    """One scope clause: op is None, "==", "in" or "is" (with optional in_target)."""
+    op: Optional[str]
+    target: Any = None
+    entity_type: Optional[str] = None
+
+    def matches(self, uid: EntityUID, entities: EntityStore) -> bool:
+        if self.op is None:
+            return True
+        if self.op == "==":
+            return uid == self.target
+        if self.op == "is":
+            return uid.type == self.entity_type and (
+                self.target is None or _entity_in(uid, self.target, entities))
+        return _entity_in(uid, self.target, entities)
+
+
+class Policy:
+    """A compiled permit/forbid policy."""
+
+    def __init__(self, policy_id: str, effect: str, principal: ScopeConstraint,
+                 action: ScopeConstraint, resource: ScopeConstraint,
+                 conditions: List[Tuple[str, Compiled]], annotations: Dict[str, str],
+                 source: str = "", condition_nodes: Optional[List[Tuple[str, Node]]] = None):
+        self.policy_id = policy_id
+        self.effect = effect
+        self.principal = principal
+        self.action = action
+        self.resource = resource
+        self.conditions = conditions
+        self.annotations = annotations
+        self.source = source
+        self.condition_nodes = condition_nodes or []
+
+    def scope_matches(self, env: Env) -> bool:
+        return (self.principal.matches(env.principal, env.entities)
+                and self.action.matches(env.action, env.entities)
+                and self.resource.matches(env.resource, env.entities))
+
+    def satisfied(self, env: Env) -> bool:
+        """Return whether the policy applies; raises EvaluationError on errors."""
+        if not self.scope_matches(env):
+            return False
+        for kind, condition in self.conditions:
+            result = _expect_type(condition(env), bool, kind)
+            if result != (kind == "when"):
+                return False
+        return True
+
+
+class PolicyParser:
+    """Parse a Cedar policy set into compiled Policy objects."""
+
+    def __init__(self, text: str, source: str = ""):
+        self.stream = TokenStream(text)
+        self.expressions = ExpressionParser(self.stream)
+        self.source = source
+
+    def policies(self, start_index: int = 0) -> List[Policy]:
+        policies = []
+        while self.stream.peek().kind != "eof":
+            policies.append(self.policy(f"policy{start_index + len(policies)}"))
+        return policies
+
+    def _annotations(self) -> Dict[str, str]:
+        annotations = {}
+        while self.stream.accept("@"):
+            name = self.stream.expect_kind("ident").value
+            value = ""
+            if self.stream.accept("("):
+                value = self.stream.expect_kind("string").value
+                self.stream.expect(")")
+            annotations[name] = value
+        return annotations
+
+    def policy(self, default_id: str) -> Policy:
+        stream = self.stream
+        annotations = self._annotations()
+        effect = stream.expect_kind("ident").value
+        if effect not in ("permit", "forbid"):
+            raise CedarSyntaxError(f"Expected permit or forbid, found {effect!r}")
+        stream.expect("(")
+        principal = self._scope("principal")
+        stream.expect(",")
+        action = self._scope("action")
+        stream.expect(",")
+        resource = self._scope("resource")
+        stream.accept(",")
+        stream.expect(")")
+
+        condition_nodes = []
+        while stream.at("when") or stream.at("unless"):
+            kind = stream.next().value
+            stream.expect("{")
+            condition_nodes.append((kind, self.expressions.expression()))
+            stream.expect("}")
+        stream.expect(";")
+
+        conditions = [(kind, compile_expression(node)) for kind, node in condition_nodes]
+        return Policy(annotations.get("id", default_id), effect, principal, action,
+                      resource, conditions, annotations, self.source, condition_nodes)
+
+    def _entity_literal(self) -> EntityUID:
+        parts = self.stream.path()
+        self.stream.expect("::")
+        return EntityUID("::".join(parts), self.stream.expect_kind("string").value)
+
+    def _scope(self, variable: str) -> ScopeConstraint:
+        stream = self.stream
+        stream.expect(variable)
+        if stream.accept("=="):
+            return ScopeConstraint("==", self._entity_literal())
+        if stream.accept("is"):
+            entity_type = "::".join(stream.path())
+            target = self._entity_literal() if stream.accept("in") else None
+            return ScopeConstraint("is", target, entity_type)
+        if stream.accept("in"):
+            if stream.accept("["):
+                targets = []
+                while not stream.accept("]"):
+                    targets.append(self._entity_literal())
+                    if not stream.accept(","):
+                        stream.expect("]")
+                        break
+                return ScopeConstraint("in", targets)
+            return ScopeConstraint("in", self._entity_literal())
+        return ScopeConstraint(None)
+
+
+def load_policy_files(policy_dir: Path) -> List[Tuple[str, str]]:
+    """Return (source, text) for a policy file or every .cedar file in a directory."""
+    policy_dir = Path(policy_dir)
+    if policy_dir.is_file():
+        return [(str(policy_dir), policy_dir.read_text())]
+    return [(str(path), path.read_text()) for path in sorted(policy_dir.glob("*.cedar"))]
+
+
+def parse_policies(sources: Iterable[Tuple[str, str]]) -> List[Policy]:
+    """Parse and compile policies from (source, text) pairs in order."""
+    policies: List[Policy] = []
+    for source, text in sources:
+        policies.extend(PolicyParser(text, source).policies(len(policies)))
+    return policies
+
+
+# =============================================================================
+# AUTHORIZER
+# =============================================================================
+
+class Response(NamedTuple):
+    decision: str
+    determining_policies: List[str]
+    errors: List[str]
+
+
+class CedarEvaluator:
+    """Authorize requests against a compiled policy set."""
+
+    def __init__(self, policies: List[Policy], schema=None, use_index: bool = True):
+        """
+        Args:
+            policies: Compiled policies in policy-set order
+            schema: Optional CedarSchema requests are validated against
+            use_index: Evaluate only the policies a PolicyIndex selects for each request
+        """
+        self.policies = policies
+        self.schema = schema
+        self.permits = [policy for policy in policies if policy.effect == "permit"]
+        self.forbids = [policy for policy in policies if policy.effect == "forbid"]
+        self.index = None
+        if use_index:
+            from policy_index import PolicyIndex
+            self.index = PolicyIndex(policies, schema)
+
+    @classmethod
+    def from_files(cls, policy_dir: Path, schema_file: Optional[Path] = None,
+                   use_index: bool = True) -> "CedarEvaluator":
+        schema = None
+        if schema_file and os.path.exists(schema_file):
+            from cedar_schema import CedarSchema
+            schema = CedarSchema.from_file(schema_file)
+        return cls(parse_policies(load_policy_files(policy_dir)), schema, use_index)
+
+    def is_authorized(self, principal: EntityUID, action: EntityUID, resource: EntityUID,
+                      context: Optional[Dict[str, Any]], entities: EntityStore) -> Response:
+        """
+        Evaluate one request: any satisfied forbid denies, otherwise any satisfied permit allows.
+
+        Returns:
+            Response with the decision, determining policy IDs and evaluation errors
+        """
+        if self.schema is not None:
+            with span("validate"):
+                problem = self.schema.request_error(principal, action, resource)
+            if problem:
+                return Response("DENY", [], [problem])
+
+        with span("evaluate"):
+            return self._evaluate(principal, action, resource, context, entities)
+
+    def _evaluate(self, principal: EntityUID, action: EntityUID, resource: EntityUID,
+                  context: Optional[Dict[str, Any]], entities: EntityStore) -> Response:
+        env = Env(principal, action, resource, to_cedar_value(context or {}), entities)
+        errors: List[str] = []
+
+        def satisfied(policies: List[Policy]) -> List[str]:
+            matched = []
+            for policy in policies:
+                try:
+                    if policy.satisfied(env):
+                        matched.append(policy.policy_id)
+                except EvaluationError as e:
+                    errors.append(f"{policy.policy_id}: {e}")
+            return matched
+
+        if self.index is not None:
+            candidate_forbids, candidate_permits = self.index.candidates(principal.type, action, resource.type)
+        else:
+            candidate_forbids, candidate_permits = self.forbids, self.permits
+
+        forbids = satisfied(candidate_forbids)
+        if forbids:
+            return Response("DENY", forbids, errors)
+        permits = satisfied(candidate_permits)
+        if permits:
+            return Response("ALLOW", permits, errors)
+        return Response("DENY", [], errors)
+
+    def authorize_request(self, request: Dict[str, Any], entities: EntityStore) -> Response:
+        """Evaluate a --request-json style dict."""
+        return self.is_authorized(
+            parse_entity_uid(request["principal"]),
+            parse_entity_uid(request["action"]),
+            parse_entity_uid(request["resource"]),
+            request.get("context"),
+            entities,
+        )
+
+
+def format_response(response: Response) -> str:
+    """Render a response the way the cedar CLI prints its decision."""
+    lines = [response.decision]
+    if response.determining_policies:
+        lines.append("\nnote: this decision was due to the following policies:")
+        lines.extend(f"  {policy_id}" for policy_id in response.determining_policies)
+    if response.errors:
+        lines.append("\nerrors:")
+        lines.extend(f"  {error}" for error in response.errors)
+    return "\n".join(lines) + "\n"
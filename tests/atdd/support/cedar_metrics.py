@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Per-Phase Timing and Metrics for Cedar Authorizations
+
+Every authorization made through CedarPolicyRunner runs inside a Trace that
+collects per-phase durations:
+
+    spawn         starting a cedar CLI process (or a new pool worker); for the
+                  CLI this covers its internal parsing and evaluation too
+    queue         waiting for a free pool worker
+    ipc           pool round trip not accounted for by the worker's own phases
+    parse         parsing and compiling policies and schema
+    validate      checking the request against the schema
+    entity_load   loading or slicing entities
+    evaluate      evaluating policies
+    result_parse  turning the engine output into a result
+    cache_lookup  decision cache key computation and lookup
+
+Code records phases with `with span("evaluate"):`; outside a trace span() is
+a no-op, so instrumented code costs two perf_counter() calls per phase.
+
+MetricsRegistry aggregates results into histograms and counters and renders
+them as Prometheus text exposition format or OTLP/JSON metrics, both written
+atomically to local files.
+
+Usage:
+    python3 tests/atdd/support/cedar_policy_runner.py batch --entities entities.json \
+        --requests requests.jsonl --metrics-prom metrics.prom --metrics-otlp metrics.json
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_utils import atomic_write
+
+PHASES = ("spawn", "queue", "ipc", "parse", "validate", "entity_load", "evaluate", "result_parse",
+          "cache_lookup")
+DURATION_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+
+# =============================================================================
+# TRACES AND SPANS
+# =============================================================================
+
+class Trace:
+    """Phase durations (seconds) for one authorization."""
+
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+def start_trace() -> Tuple[Trace, Optional[Trace]]:
+    """
+    Make a new trace current for this thread.
+
+    Returns:
+        Tuple of (new trace, previous trace) - pass the previous one to end_trace()
+    """
+    previous = getattr(_local, "trace", None)
+    trace = Trace()
+    _local.trace = trace
+    return trace, previous
+
+
+def end_trace(previous: Optional[Trace]) -> None:
+    _local.trace = previous
+
+
+def record(phase: str, seconds: float) -> None:
+    """Add an externally measured duration to the current trace, if any."""
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.add(phase, seconds)
+
+
+class span:
+    """Context manager timing one phase into the current trace."""
+
+    __slots__ = ("phase", "trace", "start")
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self) -> "span":
+        self.trace = getattr(_local, "trace", None)
+        if self.trace is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.trace is not None:
+            self.trace.add(self.phase, time.perf_counter() - self.start)
+
+
+# =============================================================================
+# AGGREGATION
+# =============================================================================
+
+class Histogram:
+    """Fixed-bucket histogram (non-cumulative counts, +Inf bucket last)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DURATION_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters fed from CedarPolicyRunner results."""
+
+    def __init__(self, service_name: str = "cedar-policy-runner"):
+        self.service_name = service_name
+        self.start_time_ns = time.time_ns()
+        self._lock = threading.Lock()
+        self._durations: Dict[Tuple[Tuple[str, str], ...], Histogram] = {}
+        self._phases: Dict[Tuple[Tuple[str, str], ...], Histogram] = {}
+        self._decisions: Dict[Tuple[Tuple[str, str], ...], int] = {}
+        self._errors: Dict[Tuple[Tuple[str, str], ...], int] = {}
+        self._cache: Dict[Tuple[Tuple[str, str], ...], int] = {}
+
+    def observe(self, result: Dict[str, Any], backend: str = "") -> None:
+        """Record one runner result (decision, timing, phases, error and cache outcome)."""
+        decision_labels = (("backend", backend), ("context", str(result.get("context", ""))),
+                           ("decision", result["decision"]))
+        with self._lock:
+            self._decisions[decision_labels] = self._decisions.get(decision_labels, 0) + 1
+
+            duration_labels = (("backend", backend),)
+            histogram = self._durations.get(duration_labels)
+            if histogram is None:
+                histogram = self._durations[duration_labels] = Histogram()
+            histogram.observe(result.get("execution_time_seconds", 0.0))
+
+            for phase, seconds in result.get("phases", {}).items():
+                phase_labels = (("backend", backend), ("phase", phase))
+                histogram = self._phases.get(phase_labels)
+                if histogram is None:
+                    histogram = self._phases[phase_labels] = Histogram()
+                histogram.observe(seconds)
+
+            if result.get("error"):
+                kind = "timeout" if result["error"] == "Command timed out" else "error"
+                error_labels = (("backend", backend), ("kind", kind))
+                self._errors[error_labels] = self._errors.get(error_labels, 0) + 1
+
+            if "cache_hit" in result:
+                cache_labels = (("result", "hit" if result["cache_hit"] else "miss"),)
+                self._cache[cache_labels] = self._cache.get(cache_labels, 0) + 1
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            copy = lambda histograms: {  # noqa: E731
+                labels: (list(h.counts), h.sum, h.count, h.bounds) for labels, h in histograms.items()
+            }
+            return {
+                "durations": copy(self._durations),
+                "phases": copy(self._phases),
+                "decisions": dict(self._decisions),
+                "errors": dict(self._errors),
+                "cache": dict(self._cache),
+            }
+
+    # -------------------------------------------------------------------------
+    # Prometheus text exposition format
+    # -------------------------------------------------------------------------
+
+    def to_prometheus(self) -> str:
+        snapshot = self._snapshot()
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series: Dict) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, (counts, total, count, bounds) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(list(bounds) + ["+Inf"], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {total:.9f}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+
+        def counter(name: str, help_text: str, series: Dict) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_label_text(labels)} {value}")
+
+        histogram("cedar_authorization_duration_seconds", "End-to-end authorization latency.",
+                  snapshot["durations"])
+        histogram("cedar_phase_duration_seconds", "Time spent per authorization phase.", snapshot["phases"])
+        counter("cedar_decisions_total", "Authorization results by decision.", snapshot["decisions"])
+        counter("cedar_errors_total", "Authorization errors by kind (error, timeout).", snapshot["errors"])
+        counter("cedar_cache_lookups_total", "Decision cache lookups by result.", snapshot["cache"])
+        return "\n".join(lines) + "\n"
+
+    # -------------------------------------------------------------------------
+    # OTLP/JSON
+    # -------------------------------------------------------------------------
+
+    def to_otlp(self) -> Dict[str, Any]:
+        snapshot = self._snapshot()
+        now = str(time.time_ns())
+        start = str(self.start_time_ns)
+
+        def attributes(labels) -> List[Dict[str, Any]]:
+            return [{"key": key, "value": {"stringValue": value}} for key, value in labels]
+
+        def histogram(name: str, description: str, series: Dict) -> Dict[str, Any]:
+            return {
+                "name": name,
+                "description": description,
+                "unit": "s",
+                "histogram": {
+                    "aggregationTemporality": 2,  # cumulative
+                    "dataPoints": [{
+                        "attributes": attributes(labels),
+                        "startTimeUnixNano": start,
+                        "timeUnixNano": now,
+                        "count": str(count),
+                        "sum": total,
+                        "bucketCounts": [str(c) for c in counts],
+                        "explicitBounds": list(bounds),
+                    } for labels, (counts, total, count, bounds) in sorted(series.items())],
+                },
+            }
+
+        def counter(name: str, description: str, series: Dict) -> Dict[str, Any]:
+            return {
+                "name": name,
+                "description": description,
+                "unit": "1",
+                "sum": {
+                    "aggregationTemporality": 2,
+                    "isMonotonic": True,
+                    "dataPoints": [{
+                        "attributes": attributes(labels),
+                        "startTimeUnixNano": start,
+                        "timeUnixNano": now,
+                        "asInt": str(value),
+                    } for labels, value in sorted(series.items())],
+                },
+            }
+
+        return {"resourceMetrics": [{
+            "resource": {"attributes": attributes((("service.name", self.service_name),))},
+            "scopeMetrics": [{
+                "scope": {"name": "cedar_metrics"},
+                "metrics": [
+                    histogram("cedar.authorization.duration", "End-to-end authorization latency.",
+                              snapshot["durations"]),
+                    histogram("cedar.phase.duration", "Time spent per authorization phase.", snapshot["phases"]),
+                    counter("cedar.decisions", "Authorization results by decision.", snapshot["decisions"]),
+                    counter("cedar.errors", "Authorization errors by kind (error, timeout).", snapshot["errors"]),
+                    counter("cedar.cache.lookups", "Decision cache lookups by result.", snapshot["cache"]),
+                ],
+            }],
+        }]}
+
+    def write_prometheus(self, path: Path) -> None:
+        atomic_write(path, self.to_prometheus())
+
+    def write_otlp(self, path: Path) -> None:
+        atomic_write(path, json.dumps(self.to_otlp()))
+
+
+class MetricsExporter:
+    """Write a registry to Prometheus and/or OTLP files, at most once per interval."""
+
+    def __init__(self, registry: MetricsRegistry, prometheus_file: Optional[str] = None,
+                 otlp_file: Optional[str] = None, interval: float = 10.0):
+        self.registry = registry
+        self.prometheus_file = Path(prometheus_file) if prometheus_file else None
+        self.otlp_file = Path(otlp_file) if otlp_file else None
+        self.interval = interval
+        self._written_at = 0.0
+
+    def write(self) -> None:
+        self._written_at = time.monotonic()
+        if self.prometheus_file:
+            self.registry.write_prometheus(self.prometheus_file)
+        if self.otlp_file:
+            self.registry.write_otlp(self.otlp_file)
+
+    def maybe_write(self) -> None:
+        if time.monotonic() - self._written_at >= self.interval:
+            self.write()
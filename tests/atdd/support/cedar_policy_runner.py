@@ -6,79 +6,415 @@ This module provides a wrapper around the Cedar CLI for use in ATDD test scenari
 It handles both shift-left (CloudFormation) and shift-right (runtime) validation.
 """
 
+import argparse
 import subprocess
 import json
+import sys
+import tempfile
+import threading
 import time
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from cedar_metrics import end_trace, span, start_trace
+
+# A batch request is a --request-json style file, an equivalent dict, or a
+# (principal, action, resource[, context]) tuple.
+BatchRequest = Union[str, Path, Dict[str, Any], Tuple]
 
 class CedarPolicyRunner:
-    def __init__(self, policy_dir: str = "policies", schema_file: str = "schema.cedarschema"):
+    BACKENDS = ("cli", "pool", "python")
+
+    def __init__(self, policy_dir: str = "policies", schema_file: str = "schema.cedarschema",
+                 backend: str = "cli", pool_size: int = 4,
+                 max_requests_per_worker: int = 1000, request_timeout: float = 10.0,
+                 decision_cache=None, metrics=None, residuals: bool = False, decision_log=None,
+                 prevalidate: bool = False):
+        """
+        Args:
+            policy_dir: Policy directory relative to the project root
+            schema_file: Cedar schema file relative to the project root
+            backend: "cli" spawns cedar per request, "pool" uses warm workers,
+                "python" evaluates in-process with the Python evaluator
+            pool_size: Number of warm workers for the pool backend
+            max_requests_per_worker: Requests served before a worker is recycled
+            request_timeout: Per-request timeout in seconds
+            decision_cache: Optional DecisionCache consulted before evaluating
+            metrics: Optional MetricsRegistry every result is recorded in
+            residuals: Answer requests on resources with a
+                known environment from precomputed residual policies (python backend only)
+            decision_log: Optional DecisionLog every decision is appended to
+            prevalidate: Check requests and entities files against the schema first,
+                answering invalid requests with ERROR and dropping invalid entities
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
+        if residuals and backend != "python":
+            raise ValueError("residuals need the python backend")
         self.policy_dir = Path(policy_dir)
         self.schema_file = Path(schema_file)
         self.project_root = Path(__file__).parent.parent.parent.parent
-        
-    def validate_cloudformation_template(self, template_path: str, entities_file: str) -> Dict[str, Any]:
+        self.backend = backend
+        self.pool_size = pool_size
+        self.max_requests_per_worker = max_requests_per_worker
+        self.request_timeout = request_timeout
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._evaluator = None
+        self._entity_stores: Dict[str, Tuple[float, Any]] = {}
+        self.decision_cache = decision_cache
+        self.metrics = metrics
+        self.residuals = residuals
+        self.decision_log = decision_log
+        self.prevalidate = prevalidate
+        self.entity_rejections: Dict[str, List[Any]] = {}
+        self._dropped: Dict[str, Dict[str, Any]] = {}
+        self._validated: Dict[str, Tuple[int, str]] = {}
+        self._validation_lock = threading.Lock()
+        self._validation_dir = None
+
+    def _get_pool(self):
+        """Start the warm worker pool on first use."""
+        with self._pool_lock:
+            if self._pool is None:
+                from cedar_worker_pool import CedarWorkerPool
+                self._pool = CedarWorkerPool(
+                    self.project_root / self.policy_dir,
+                    self.project_root / self.schema_file,
+                    pool_size=self.pool_size,
+                    max_requests_per_worker=self.max_requests_per_worker,
+                    request_timeout=self.request_timeout,
+                )
+            return self._pool
+
+    def _get_evaluator(self):
+        """Parse and compile the policy set and schema on first use."""
+        if self._evaluator is None:
+            from cedar_evaluator import CedarEvaluator
+            with span("parse"):
+                self._evaluator = CedarEvaluator.from_files(
+                    self.project_root / self.policy_dir,
+                    self.project_root / self.schema_file
+                )
+                if self.residuals:
+                    from partial_evaluation import ResidualEvaluator
+                    self._evaluator = ResidualEvaluator(self._evaluator)
+        return self._evaluator
+
+    def use_policies(self, policies, schema=None) -> None:
         """
-        Perform shift-left validation on CloudFormation template using Cedar policies.
-        
+        Evaluate an already parsed policy set instead of reading policy_dir.
+
+        Lets a caller that hashed and validated exactly these policies serve
+        them even if the files change again before the first request.
+
         Args:
-            template_path: Path to CloudFormation template
-            entities_file: Path to Cedar entities JSON file
-            
+            policies: Compiled policies in policy-set order
+            schema: Optional CedarSchema requests are validated against
+        """
+        if self.backend != "python":
+            raise ValueError("use_policies needs the python backend")
+        from cedar_evaluator import CedarEvaluator
+        evaluator = CedarEvaluator(policies, schema)
+        if self.residuals:
+            from partial_evaluation import ResidualEvaluator
+            evaluator = ResidualEvaluator(evaluator)
+        self._evaluator = evaluator
+
+    def _get_entity_store(self, entities_file: str):
+        """Load an entities file once, reloading it only when it changes."""
+        from cedar_evaluator import EntityStore
+        mtime = os.path.getmtime(entities_file)
+        cached = self._entity_stores.get(entities_file)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, EntityStore.from_file(entities_file))
+            self._entity_stores[entities_file] = cached
+        return cached[1]
+
+    def _run_python(self, principal: str, action: str, resource: str, entities_file: str,
+                    request_context: Optional[Dict[str, Any]] = None,
+                    entities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Evaluate one request with the in-process Python evaluator."""
+        from cedar_evaluator import EntityStore, format_response
+        evaluator = self._get_evaluator()
+        with span("entity_load"):
+            store = EntityStore.from_json(entities) if entities is not None else self._get_entity_store(entities_file)
+        response = evaluator.authorize_request(
+            {"principal": principal, "action": action, "resource": resource, "context": request_context},
+            store
+        )
+        with span("result_parse"):
+            return {
+                "decision": response.decision,
+                "stdout": format_response(response),
+                "stderr": "",
+                "error": None
+            }
+
+    def warm(self) -> None:
+        """
+        Load the backend now instead of on the first request.
+
+        With the python backend this parses and compiles the policy set and
+        schema, raising CedarSyntaxError (or OSError) if either is invalid.
+        """
+        if self.backend == "python":
+            self._get_evaluator()
+        elif self.backend == "pool":
+            self._get_pool()
+
+    def close(self) -> None:
+        """Shut down any warm workers owned by this runner."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+        if self._validation_dir is not None:
+            self._validation_dir.cleanup()
+            self._validation_dir = None
+            self._validated.clear()
+
+    def _validated_entities(self, entities_file: str) -> str:
+        """
+        Path of entities_file with the entities the schema rejects removed.
+
+        Files are validated once per modification; the original path is returned
+        when nothing was rejected. Indexed entity stores are returned unchanged
+        (validate them when building with --schema).
+        """
+        if os.path.isdir(entities_file):
+            return entities_file
+        mtime = os.stat(entities_file).st_mtime_ns
+        with self._validation_lock:
+            cached = self._validated.get(entities_file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            from entity_validator import validate_entities_file
+            valid, rejected = validate_entities_file(entities_file, self.project_root / self.schema_file)
+            self.entity_rejections[entities_file] = rejected
+            self._dropped[entities_file] = {error.uid: error for error in rejected}
+            path = entities_file
+            if rejected:
+                print(f"WARNING: dropped {len(rejected)} entities that do not match the schema from "
+                      f"{entities_file}, e.g. {rejected[0].uid}: {'; '.join(rejected[0].errors)}", file=sys.stderr)
+                if self._validation_dir is None:
+                    self._validation_dir = tempfile.TemporaryDirectory(prefix="cedar-validated-")
+                fd, path = tempfile.mkstemp(dir=self._validation_dir.name, suffix=".json")
+                with os.fdopen(fd, "w") as handle:
+                    json.dump(valid, handle)
+            self._validated[entities_file] = (mtime, path)
+            return path
+
+    def _run_cli(self, principal: str, action: str, resource: str, entities_file: str,
+                 request_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Evaluate one request with a fresh cedar CLI process."""
+        cmd = [
+            "cedar", "authorize",
+            "--policies", str(self.project_root / self.policy_dir),
+            "--schema", str(self.project_root / self.schema_file),
+            "--entities", entities_file,
+            "--principal", principal,
+            "--action", action,
+            "--resource", resource
+        ]
+
+        context_file = None
+        if request_context:
+            with tempfile.NamedTemporaryFile("w", prefix="cedar-atdd-context-",
+                                             suffix=".json", delete=False) as handle:
+                json.dump(request_context, handle)
+                context_file = handle.name
+            cmd += ["--context", context_file]
+
+        try:
+            # The CLI parses, validates and evaluates inside the child process,
+            # so all of that is attributed to the spawn phase
+            with span("spawn"):
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.request_timeout)
+        finally:
+            if context_file:
+                os.unlink(context_file)
+
+        # Parse Cedar CLI output
+        with span("result_parse"):
+            return {
+                "decision": "ALLOW" if result.returncode == 0 else "DENY",
+                "stdout": result.stdout,
+                "stderr": result.stderr,
+                "error": None
+            }
+
+    def _evaluate(self, principal: str, action: str, resource: str, entities_file: str,
+                  request_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Dispatch one request to the configured backend."""
+        # Pool workers slice indexed entity stores themselves
+        if self.backend != "pool" and os.path.isdir(entities_file):
+            return self._evaluate_slice(principal, action, resource, entities_file, request_context)
+        if self.backend == "pool":
+            from cedar_worker_pool import WorkerTimeout
+            try:
+                return self._get_pool().authorize(
+                    principal, action, resource, entities_file, context=request_context
+                )
+            except WorkerTimeout:
+                raise subprocess.TimeoutExpired("cedar-worker", self.request_timeout)
+        if self.backend == "python":
+            return self._run_python(principal, action, resource, entities_file, request_context)
+        return self._run_cli(principal, action, resource, entities_file, request_context)
+
+    def _evaluate_slice(self, principal: str, action: str, resource: str, store_dir: str,
+                        request_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Evaluate against only the entities this request reaches in an indexed entity store."""
+        from indexed_entity_store import open_store
+        with span("entity_load"):
+            entities = open_store(store_dir).slice_request(principal, action, resource, request_context)
+        if self.backend == "python":
+            return self._run_python(principal, action, resource, store_dir, request_context, entities)
+
+        with span("entity_load"), tempfile.NamedTemporaryFile("w", prefix="cedar-atdd-slice-", suffix=".json",
+                                                              delete=False) as handle:
+            json.dump(entities, handle)
+            slice_file = handle.name
+        try:
+            return self._run_cli(principal, action, resource, slice_file, request_context)
+        finally:
+            os.unlink(slice_file)
+
+    def _authorize(self, principal: str, action: str, resource: str, entities_file: str,
+                   context: str, resource_type: str,
+                   request_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run one authorization on the configured backend.
+
         Returns:
-            Dict containing validation result and timing information
+            Dict containing validation result, timing information and per-phase
+            durations in seconds under "phases"
         """
+        trace, previous = start_trace()
+        try:
+            result = self._authorize_traced(principal, action, resource, entities_file, context,
+                                            resource_type, request_context)
+        finally:
+            end_trace(previous)
+        result["phases"] = trace.phases
+        if self.metrics is not None:
+            self.metrics.observe(result, self.backend)
+        if self.decision_log is not None:
+            self.decision_log.record(principal, action, resource, request_context, result)
+        return result
+
+    def _authorize_traced(self, principal: str, action: str, resource: str, entities_file: str,
+                          context: str, resource_type: str,
+                          request_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Body of _authorize, run with a trace current for this thread."""
         start_time = time.time()
-        
+        cache_hit = None
+
         try:
-            # Run Cedar authorization command
-            cmd = [
-                "cedar", "authorize",
-                "--policies", str(self.project_root / self.policy_dir),
-                "--schema", str(self.project_root / self.schema_file),
-                "--entities", entities_file,
-                "--principal", 'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
-                "--action", 'Action::"cloudformation:ValidateTemplate"',
-                "--resource", 'CloudFormationTemplate::"encrypted-s3-bucket-template"'
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            end_time = time.time()
-            execution_time = end_time - start_time
-            
-            # Parse Cedar CLI output
-            is_compliant = result.returncode == 0
-            decision = "ALLOW" if is_compliant else "DENY"
-            
-            return {
-                "decision": decision,
+            if self.prevalidate:
+                from entity_validator import EntityValidator
+                with span("validate"):
+                    validated_file = self._validated_entities(entities_file)
+                    problems = EntityValidator.for_schema(self.project_root / self.schema_file).request_errors(
+                        {"principal": principal, "action": action, "resource": resource, "context": request_context})
+                if problems:
+                    return {
+                        "decision": "ERROR",
+                        "compliant": False,
+                        "execution_time_seconds": time.time() - start_time,
+                        "error": f"Request does not match the schema: {'; '.join(problems)}",
+                        "context": context
+                    }
+                # A dropped principal or resource would otherwise evaluate to a silent DENY
+                dropped = self._dropped.get(entities_file, {})
+                problems = [f"{uid}: {'; '.join(dropped[uid].errors)}" for uid in (principal, resource)
+                            if uid in dropped]
+                if problems:
+                    return {
+                        "decision": "ERROR",
+                        "compliant": False,
+                        "execution_time_seconds": time.time() - start_time,
+                        "error": f"Request entity does not match the schema: {'; '.join(problems)}",
+                        "context": context
+                    }
+                entities_file = validated_file
+
+            if self.decision_cache is not None:
+                with span("cache_lookup"):
+                    cache_key = self.decision_cache.key(principal, action, resource, entities_file, request_context)
+                    outcome = self.decision_cache.get(cache_key)
+                cache_hit = outcome is not None
+                if outcome is None:
+                    outcome = self._evaluate(principal, action, resource, entities_file, request_context)
+                    if not outcome.get("error"):
+                        self.decision_cache.put(cache_key, outcome)
+            else:
+                outcome = self._evaluate(principal, action, resource, entities_file, request_context)
+
+            execution_time = time.time() - start_time
+
+            if outcome.get("error"):
+                return {
+                    "decision": "ERROR",
+                    "compliant": False,
+                    "execution_time_seconds": execution_time,
+                    "error": outcome["error"],
+                    "context": context
+                }
+
+            is_compliant = outcome["decision"] == "ALLOW"
+            result = {
+                "decision": outcome["decision"],
                 "compliant": is_compliant,
                 "execution_time_seconds": execution_time,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "context": "shift-left",
-                "resource_type": "cloudformation_template"
+                "stdout": outcome["stdout"],
+                "stderr": outcome["stderr"],
+                "context": context,
+                "resource_type": resource_type
             }
-            
+            if cache_hit is not None:
+                result["cache_hit"] = cache_hit
+            return result
+
         except subprocess.TimeoutExpired:
             return {
                 "decision": "ERROR",
                 "compliant": False,
                 "execution_time_seconds": time.time() - start_time,
                 "error": "Command timed out",
-                "context": "shift-left"
+                "context": context
             }
         except Exception as e:
             return {
-                "decision": "ERROR", 
+                "decision": "ERROR",
                 "compliant": False,
                 "execution_time_seconds": time.time() - start_time,
                 "error": str(e),
-                "context": "shift-left"
+                "context": context
             }
+
+    def validate_cloudformation_template(self, template_path: str, entities_file: str) -> Dict[str, Any]:
+        """
+        Perform shift-left validation on CloudFormation template using Cedar policies.
+        
+        Args:
+            template_path: Path to CloudFormation template
+            entities_file: Path to Cedar entities JSON file
+            
+        Returns:
+            Dict containing validation result and timing information
+        """
+        return self._authorize(
+            'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
+            'Action::"cloudformation:ValidateTemplate"',
+            'CloudFormationTemplate::"encrypted-s3-bucket-template"',
+            entities_file,
+            context="shift-left",
+            resource_type="cloudformation_template"
+        )
     
     def validate_s3_bucket(self, bucket_name: str, entities_file: str) -> Dict[str, Any]:
         """
@@ -91,56 +427,117 @@ class CedarPolicyRunner:
         Returns:
             Dict containing validation result and timing information
         """
-        start_time = time.time()
-        
-        try:
-            # Run Cedar authorization command for S3 bucket
-            cmd = [
-                "cedar", "authorize",
-                "--policies", str(self.project_root / self.policy_dir),
-                "--schema", str(self.project_root / self.schema_file),
-                "--entities", entities_file,
-                "--principal", 'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
-                "--action", 'Action::"config:EvaluateCompliance"',
-                "--resource", f'S3Resource::"{bucket_name}"'
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            end_time = time.time()
-            execution_time = end_time - start_time
-            
-            # Parse Cedar CLI output
-            is_compliant = result.returncode == 0
-            decision = "ALLOW" if is_compliant else "DENY"
-            
-            return {
-                "decision": decision,
-                "compliant": is_compliant,
-                "execution_time_seconds": execution_time,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "context": "shift-right",
-                "resource_type": "s3_bucket"
-            }
-            
-        except subprocess.TimeoutExpired:
-            return {
-                "decision": "ERROR",
-                "compliant": False,
-                "execution_time_seconds": time.time() - start_time,
-                "error": "Command timed out",
-                "context": "shift-right"
-            }
-        except Exception as e:
-            return {
-                "decision": "ERROR",
-                "compliant": False,
-                "execution_time_seconds": time.time() - start_time,
-                "error": str(e),
-                "context": "shift-right"
-            }
+        return self._authorize(
+            'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"',
+            'Action::"config:EvaluateCompliance"',
+            f'S3Resource::"{bucket_name}"',
+            entities_file,
+            context="shift-right",
+            resource_type="s3_bucket"
+        )
     
+    @staticmethod
+    def _normalize_request(item: BatchRequest) -> Dict[str, Any]:
+        """
+        Turn a request file, dict or tuple into a --request-json style dict.
+
+        Raises:
+            OSError, ValueError or TypeError when the item cannot be read or is
+            not a request (a ValueError item, as yielded for an unparseable
+            JSONL line, is raised as is)
+        """
+        if isinstance(item, ValueError):
+            raise item
+        if isinstance(item, (str, Path)):
+            with open(item) as handle:
+                request = json.load(handle)
+            if not isinstance(request, dict):
+                raise ValueError(f"{item} does not contain a request object")
+            request["source"] = str(item)
+        elif isinstance(item, dict):
+            request = dict(item)
+        else:
+            principal, action, resource = item[:3]
+            context = item[3] if len(item) > 3 else {}
+            request = {"principal": principal, "action": action, "resource": resource, "context": context}
+
+        missing = [key for key in ("principal", "action", "resource") if not isinstance(request.get(key), str)]
+        if missing:
+            raise ValueError(f"Request has no {', '.join(missing)}")
+        if not isinstance(request.get("context") or {}, dict):
+            raise ValueError("Request context must be an object")
+        return request
+
+    @staticmethod
+    def _request_source(item: Any) -> Dict[str, Any]:
+        """Best-effort description of a batch item that could not be normalized."""
+        if isinstance(item, dict):
+            return item
+        return {"source": str(item)}
+
+    def authorize_batch(self, requests: Iterable[BatchRequest], entities_file: str) -> Iterator[Dict[str, Any]]:
+        """
+        Authorize many requests against one policy, schema and entity load.
+
+        Results are yielded in request order as they complete. With the pool
+        backend requests are spread across the warm workers.
+
+        Args:
+            requests: Request files, request dicts or (principal, action, resource[, context]) tuples
+            entities_file: Path to Cedar entities JSON file (or indexed entity store
+                directory) shared by every request
+
+        Returns:
+            Iterator of result dicts, each carrying the originating request.
+            Items that cannot be read or are not requests yield an ERROR
+            record in their place instead of ending the batch.
+        """
+        workers = self.pool_size if self.backend == "pool" else 1
+        entities_file = str(entities_file)
+
+        def evaluate(item: BatchRequest) -> Dict[str, Any]:
+            start_time = time.time()
+            try:
+                request = self._normalize_request(item)
+            except (OSError, ValueError, TypeError) as e:
+                return {
+                    "decision": "ERROR",
+                    "compliant": False,
+                    "execution_time_seconds": time.time() - start_time,
+                    "error": f"Invalid request: {e}",
+                    "context": "batch",
+                    "request": self._request_source(item)
+                }
+            request_context = request.get("context") or {}
+            result = self._authorize(
+                request["principal"],
+                request["action"],
+                request["resource"],
+                entities_file,
+                context=request_context.get("validation_type", "batch"),
+                resource_type=request["resource"].split("::", 1)[0],
+                request_context=request_context
+            )
+            result["request"] = request
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for item in requests:
+                in_flight.append(executor.submit(evaluate, item))
+                # Bound the window so huge request streams are not held in memory
+                if len(in_flight) >= workers * 4:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def policy_hash(self) -> str:
+        """Content hash of this runner's policy directory and schema."""
+        from decision_cache import PolicyFingerprint
+        fingerprint = PolicyFingerprint(self.project_root / self.policy_dir,
+                                        self.project_root / self.schema_file, check_interval=0)
+        return fingerprint.current()[0]
+
     def compare_policy_consistency(self, cf_result: Dict[str, Any], s3_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Compare policy decisions between shift-left and shift-right contexts.
@@ -149,11 +546,21 @@ class CedarPolicyRunner:
             cf_result: Result from CloudFormation validation
             s3_result: Result from S3 bucket validation
             
+        Either result may carry a "policy_hash" (see policy_hash()) recording the
+        policy set it was evaluated with; results without one are assumed to come
+        from this runner's policy set.
+
         Returns:
             Dict containing consistency analysis
         """
         decisions_match = cf_result["decision"] == s3_result["decision"]
         compliant_match = cf_result["compliant"] == s3_result["compliant"]
+        if "policy_hash" in cf_result and "policy_hash" in s3_result:
+            shift_left_hash, shift_right_hash = cf_result["policy_hash"], s3_result["policy_hash"]
+        else:
+            own_hash = self.policy_hash()
+            shift_left_hash = cf_result.get("policy_hash", own_hash)
+            shift_right_hash = s3_result.get("policy_hash", own_hash)
         
         return {
             "consistent": decisions_match and compliant_match,
@@ -163,8 +570,10 @@ class CedarPolicyRunner:
             "shift_right_decision": s3_result["decision"],
             "shift_left_time": cf_result["execution_time_seconds"],
             "shift_right_time": s3_result["execution_time_seconds"],
+            "shift_left_policy_hash": shift_left_hash,
+            "shift_right_policy_hash": shift_right_hash,
             "analysis": {
-                "same_policy_file": True,  # Always true in our case
+                "same_policy_file": shift_left_hash == shift_right_hash,
                 "same_reasoning_logic": decisions_match,
                 "no_security_gaps": decisions_match and compliant_match
             }
@@ -187,8 +596,8 @@ class CedarPolicyRunner:
         schema_path = self.project_root / self.schema_file
         return schema_path.exists()
 
-if __name__ == "__main__":
-    # Simple test of the Cedar Policy Runner
+def _run_self_check(args: argparse.Namespace) -> int:
+    """Simple test of the Cedar Policy Runner."""
     runner = CedarPolicyRunner()
     
     print("Cedar Policy Runner Test")
@@ -200,4 +609,120 @@ if __name__ == "__main__":
     if runner.validate_policy_exists('s3-encryption-enforcement'):
         print("\nPolicy content preview:")
         content = runner.get_policy_content('s3-encryption-enforcement')
-        print(content[:200] + "..." if len(content) > 200 else content)
\ No newline at end of file
+        print(content[:200] + "..." if len(content) > 200 else content)
+    return 0
+
+
+def _iter_batch_requests(args: argparse.Namespace) -> Iterator[BatchRequest]:
+    """
+    Yield requests from --request-json files and --requests JSONL input.
+
+    A line that is not valid JSON is yielded as the ValueError describing it,
+    so authorize_batch reports it as an ERROR record in its place.
+    """
+    for request_file in args.request_json:
+        yield request_file
+    if args.requests:
+        handle = sys.stdin if args.requests == "-" else open(args.requests)
+        try:
+            for number, line in enumerate(handle, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield ValueError(f"{args.requests}:{number}: {e}")
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    """Stream one JSONL decision per request to stdout."""
+    decision_cache = None
+    if args.cache_size or args.cache_dir:
+        from decision_cache import DecisionCache
+        root = Path(__file__).parent.parent.parent.parent
+        decision_cache = DecisionCache(
+            root / args.policies,
+            root / args.schema,
+            max_entries=args.cache_size or 10000,
+            cache_dir=args.cache_dir
+        )
+    metrics = exporter = None
+    if args.metrics_prom or args.metrics_otlp:
+        from cedar_metrics import MetricsExporter, MetricsRegistry
+        metrics = MetricsRegistry()
+        exporter = MetricsExporter(metrics, args.metrics_prom, args.metrics_otlp, args.metrics_interval)
+    decision_log = None
+    if args.decision_log:
+        from decision_log import DecisionLog
+        root = Path(__file__).parent.parent.parent.parent
+        decision_log = DecisionLog(args.decision_log, root / args.policies, root / args.schema,
+                                   segment_bytes=args.decision_log_segment_mb * 1024 * 1024)
+    runner = CedarPolicyRunner(
+        policy_dir=args.policies,
+        schema_file=args.schema,
+        backend=args.backend,
+        pool_size=args.pool_size,
+        request_timeout=args.timeout,
+        decision_cache=decision_cache,
+        metrics=metrics,
+        residuals=args.residuals,
+        decision_log=decision_log,
+        prevalidate=args.prevalidate
+    )
+    errors = 0
+    try:
+        for result in runner.authorize_batch(_iter_batch_requests(args), args.entities):
+            errors += result["decision"] == "ERROR"
+            print(json.dumps(result), flush=True)
+            if exporter is not None:
+                exporter.maybe_write()
+    finally:
+        runner.close()
+        if exporter is not None:
+            exporter.write()
+        if decision_log is not None:
+            decision_log.close()
+    if decision_cache is not None:
+        print(json.dumps({"cache": decision_cache.stats()}), file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cedar Policy Runner")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Authorize many requests and stream JSONL decisions")
+    batch.add_argument("--entities", required=True,
+                       help="Cedar entities JSON file or indexed entity store directory")
+    batch.add_argument("--request-json", nargs="*", default=[], help="Cedar --request-json style files")
+    batch.add_argument("--requests", help="JSONL file of request objects ('-' for stdin)")
+    batch.add_argument("--policies", default="cedar_policies", help="Policy directory relative to the project root")
+    batch.add_argument("--schema", default="schema.cedarschema", help="Schema file relative to the project root")
+    batch.add_argument("--backend", default="pool", choices=CedarPolicyRunner.BACKENDS)
+    batch.add_argument("--pool-size", type=int, default=os.cpu_count() or 4)
+    batch.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    batch.add_argument("--cache-size", type=int, default=0, help="Enable an in-memory decision cache of this many entries")
+    batch.add_argument("--cache-dir", help="Persist cached decisions in this directory (shared across runs)")
+    batch.add_argument("--residuals", action="store_true",
+                       help="Use precomputed residual policies per action and environment (needs --backend python)")
+    batch.add_argument("--metrics-prom", help="Write Prometheus text-format metrics to this file")
+    batch.add_argument("--metrics-otlp", help="Write OTLP/JSON metrics to this file")
+    batch.add_argument("--metrics-interval", type=float, default=10.0,
+                       help="Seconds between metrics file rewrites during a batch")
+    batch.add_argument("--prevalidate", action="store_true",
+                       help="Check requests and entities against the schema first and drop invalid entities")
+    batch.add_argument("--decision-log", help="Append every decision to the audit log in this directory")
+    batch.add_argument("--decision-log-segment-mb", type=int, default=64,
+                       help="Rotate decision log segments at this size")
+    batch.set_defaults(handler=_run_batch)
+
+    args = parser.parse_args(argv)
+    if args.command == "batch" and args.residuals and args.backend != "python":
+        batch.error("--residuals needs --backend python")
+    return getattr(args, "handler", _run_self_check)(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Cedar Schema Parser
+
+Parses the human-readable Cedar schema format (schema.cedarschema) into entity
+type and action definitions so Python tooling can check requests against the
+action appliesTo declarations without calling the cedar CLI.
+
+Types are represented as tuples:
+    ("String",), ("Long",), ("Bool",), ("Set", element_type),
+    ("Record", {attr: (type, required)}), ("Entity", type_name)
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cedar_evaluator import CedarSyntaxError, EntityUID, TokenStream
+
+PRIMITIVE_TYPES = ("String", "Long", "Bool")
+
+
+class EntityType:
+    def __init__(self, name: str, attributes: Dict[str, Tuple[Any, bool]], member_of: List[str]):
+        self.name = name
+        self.attributes = attributes
+        self.member_of = member_of
+
+
+class ActionType:
+    def __init__(self, name: str, principal_types: List[str], resource_types: List[str],
+                 context: Optional[Any], member_of: List[EntityUID]):
+        self.name = name
+        self.principal_types = principal_types
+        self.resource_types = resource_types
+        self.context = context
+        self.member_of = member_of
+
+
+class CedarSchema:
+    """Entity types and actions declared in a Cedar schema."""
+
+    def __init__(self, entity_types: Dict[str, EntityType], actions: Dict[str, ActionType]):
+        self.entity_types = entity_types
+        self.actions = actions
+
+    @classmethod
+    def from_file(cls, path) -> "CedarSchema":
+        return cls.parse(Path(path).read_text())
+
+    @classmethod
+    def parse(cls, text: str) -> "CedarSchema":
+        return _SchemaParser(text).schema()
+
+    def action(self, uid: EntityUID) -> Optional[ActionType]:
+        if uid.type != "Action" and not uid.type.endswith("::Action"):
+            return None
+        return self.actions.get(uid.id)
+
+    def request_error(self, principal: EntityUID, action: EntityUID, resource: EntityUID) -> Optional[str]:
+        """Return a description of why a request violates the schema, or None."""
+        declared = self.action(action)
+        if declared is None:
+            return f"request's action {action} is not declared in the schema"
+        if principal.type not in declared.principal_types:
+            return (f"principal type {principal.type} is not valid for {action}, "
+                    f"expected one of {declared.principal_types}")
+        if resource.type not in declared.resource_types:
+            return (f"resource type {resource.type} is not valid for {action}, "
+                    f"expected one of {declared.resource_types}")
+        return None
+
+
+class _SchemaParser:
+    def __init__(self, text: str):
+        self.stream = TokenStream(text)
+        self.common_types: Dict[str, Any] = {}
+        self.entity_types: Dict[str, EntityType] = {}
+        self.actions: Dict[str, ActionType] = {}
+
+    def schema(self) -> CedarSchema:
+        stream = self.stream
+        while stream.peek().kind != "eof":
+            self._skip_annotations()
+            if stream.accept("namespace"):
+                stream.path()
+                stream.expect("{")
+                while not stream.accept("}"):
+                    self._declaration()
+            else:
+                self._declaration()
+        for entity in self.entity_types.values():
+            entity.attributes = {name: (self._resolve(attr_type), required)
+                                 for name, (attr_type, required) in entity.attributes.items()}
+        for action in self.actions.values():
+            if action.context is not None:
+                action.context = self._resolve(action.context)
+        return CedarSchema(self.entity_types, self.actions)
+
+    def _skip_annotations(self) -> None:
+        while self.stream.accept("@"):
+            self.stream.expect_kind("ident")
+            if self.stream.accept("("):
+                self.stream.expect_kind("string")
+                self.stream.expect(")")
+
+    def _declaration(self) -> None:
+        stream = self.stream
+        self._skip_annotations()
+        keyword = stream.expect_kind("ident").value
+        if keyword == "entity":
+            self._entity()
+        elif keyword == "action":
+            self._action()
+        elif keyword == "type":
+            name = stream.expect_kind("ident").value
+            stream.expect("=")
+            self.common_types[name] = self._type()
+        else:
+            raise CedarSyntaxError(f"Unexpected schema keyword {keyword!r}")
+        stream.expect(";")
+
+    def _names(self, kind: str) -> List[str]:
+        names = [self.stream.expect_kind(kind).value]
+        while self.stream.accept(","):
+            names.append(self.stream.expect_kind(kind).value)
+        return names
+
+    def _type_list(self) -> List[str]:
+        if self.stream.accept("["):
+            names = []
+            while not self.stream.accept("]"):
+                names.append("::".join(self.stream.path()))
+                if not self.stream.accept(","):
+                    self.stream.expect("]")
+                    break
+            return names
+        return ["::".join(self.stream.path())]
+
+    def _entity(self) -> None:
+        stream = self.stream
+        names = self._names("ident")
+        member_of = self._type_list() if stream.accept("in") else []
+        stream.accept("=")
+        attributes = self._record_body() if stream.accept("{") else {}
+        if stream.accept("tags"):
+            self._type()
+        for name in names:
+            self.entity_types[name] = EntityType(name, dict(attributes), member_of)
+
+    def _action(self) -> None:
+        stream = self.stream
+        names = []
+        while True:
+            token = stream.next()
+            if token.kind not in ("string", "ident"):
+                raise CedarSyntaxError(f"Expected action name at offset {token.pos}")
+            names.append(token.value)
+            if not stream.accept(","):
+                break
+
+        member_of: List[EntityUID] = []
+        if stream.accept("in"):
+            refs = []
+            bracketed = stream.accept("[")
+            while True:
+                token = stream.next()
+                if token.kind == "string":
+                    refs.append(EntityUID("Action", token.value))
+                else:
+                    parts = [token.value]
+                    while stream.accept("::"):
+                        nxt = stream.next()
+                        if nxt.kind == "string":
+                            refs.append(EntityUID("::".join(parts), nxt.value))
+                            break
+                        parts.append(nxt.value)
+                if not bracketed or not stream.accept(","):
+                    break
+            if bracketed:
+                stream.expect("]")
+            member_of = refs
+
+        principal_types: List[str] = []
+        resource_types: List[str] = []
+        context = None
+        if stream.accept("appliesTo"):
+            stream.expect("{")
+            while not stream.accept("}"):
+                key = stream.expect_kind("ident").value
+                stream.expect(":")
+                if key == "principal":
+                    principal_types = self._type_list()
+                elif key == "resource":
+                    resource_types = self._type_list()
+                elif key == "context":
+                    context = self._type()
+                else:
+                    raise CedarSyntaxError(f"Unexpected appliesTo key {key!r}")
+                if not stream.accept(","):
+                    stream.expect("}")
+                    break
+
+        for name in names:
+            self.actions[name] = ActionType(name, principal_types, resource_types, context, member_of)
+
+    def _record_body(self) -> Dict[str, Tuple[Any, bool]]:
+        stream = self.stream
+        attributes: Dict[str, Tuple[Any, bool]] = {}
+        while not stream.accept("}"):
+            self._skip_annotations()
+            token = stream.next()
+            if token.kind not in ("ident", "string"):
+                raise CedarSyntaxError(f"Expected attribute name at offset {token.pos}")
+            required = not stream.accept("?")
+            stream.expect(":")
+            attributes[token.value] = (self._type(), required)
+            if not stream.accept(","):
+                stream.expect("}")
+                break
+        return attributes
+
+    def _type(self) -> Any:
+        stream = self.stream
+        if stream.accept("{"):
+            return ("Record", self._record_body())
+        name = "::".join(stream.path())
+        if name.startswith("__cedar::"):
+            name = name[len("__cedar::"):]
+        if name == "Set":
+            stream.expect("<")
+            element = self._type()
+            stream.expect(">")
+            return ("Set", element)
+        if name in ("Bool", "Boolean"):
+            return ("Bool",)
+        if name in PRIMITIVE_TYPES:
+            return (name,)
+        return ("Name", name)
+
+    def _resolve(self, attr_type: Any) -> Any:
+        kind = attr_type[0]
+        if kind == "Set":
+            return ("Set", self._resolve(attr_type[1]))
+        if kind == "Record":
+            return ("Record", {name: (self._resolve(inner), required)
+                               for name, (inner, required) in attr_type[1].items()})
+        if kind == "Name":
+            name = attr_type[1]
+            if name in self.common_types:
+                return self._resolve(self.common_types[name])
+            return ("Entity", name)
+        return attr_type
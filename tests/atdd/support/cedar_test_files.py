@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Cedar Test File Loader
+
+Reads the test cases used to exercise the policies:
+- --request-json style suites (tests/<suite>/ALLOW/*.json, tests/<suite>/DENY/*.json)
+  evaluated against tests/fixtures/entities.json
+- inline test blocks in *.test files, e.g. tests/s3-encryption.test:
+
+    test "name" {
+      entities: [ { uid: Type::"id", attrs: { ... } } ],
+      principal: Type::"id",
+      action: Action::"name",
+      resource: Type::"id",
+      decision: Allow
+    }
+
+- assertion test blocks in *.test files, e.g. tests/s3-write.test:
+
+    test("name") {
+      principal User { uid: "Alice", department: "operations" };
+      resource Bucket { uid: "project-artifacts" };
+      assert allow(principal, "s3:PutObject", resource);
+    }
+
+Every case is returned as a plain dict with name, source, request, entities
+(Cedar JSON) or entities_file, and the expected decision.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from cedar_evaluator import CedarSyntaxError, EntityUID, TokenStream, from_cedar_value
+
+_HASH_COMMENT = re.compile(r'^\s*#.*$', re.MULTILINE)
+
+
+def _literal(stream: TokenStream) -> Any:
+    """Parse a Cedar-style literal; bare identifiers such as Allow become strings."""
+    token = stream.peek()
+    if token.kind in ("string", "int"):
+        return stream.next().value
+    if stream.accept("["):
+        items = []
+        while not stream.accept("]"):
+            items.append(_literal(stream))
+            if not stream.accept(","):
+                stream.expect("]")
+                break
+        return items
+    if stream.accept("{"):
+        record = {}
+        while not stream.accept("}"):
+            key = stream.next()
+            if key.kind not in ("ident", "string"):
+                raise CedarSyntaxError(f"Expected record key at offset {key.pos}")
+            stream.expect(":")
+            record[key.value] = _literal(stream)
+            if not stream.accept(","):
+                stream.expect("}")
+                break
+        return record
+    if token.kind == "ident":
+        if token.value in ("true", "false"):
+            stream.next()
+            return token.value == "true"
+        parts = stream.path()
+        if stream.accept("::"):
+            return EntityUID("::".join(parts), stream.expect_kind("string").value)
+        return "::".join(parts)
+    raise CedarSyntaxError(f"Unexpected token {token.value!r} at offset {token.pos}")
+
+
+def _entity_json(entity: Dict[str, Any]) -> Dict[str, Any]:
+    uid = entity["uid"]
+    return {
+        "uid": {"type": uid.type, "id": uid.id},
+        "attrs": from_cedar_value(entity.get("attrs", {})),
+        "parents": [{"type": parent.type, "id": parent.id} for parent in entity.get("parents", [])],
+    }
+
+
+def _record_block(stream: TokenStream, name: str, source: str) -> List[Dict[str, Any]]:
+    body = _literal(stream)
+    return [{
+        "name": name,
+        "source": source,
+        "request": {
+            "principal": str(body["principal"]),
+            "action": str(body["action"]),
+            "resource": str(body["resource"]),
+            "context": from_cedar_value(body.get("context", {})),
+        },
+        "entities": [_entity_json(entity) for entity in body.get("entities", [])],
+        "expected": str(body["decision"]).upper(),
+    }]
+
+
+def _assert_block(stream: TokenStream, name: str, source: str) -> List[Dict[str, Any]]:
+    declared: Dict[str, EntityUID] = {}
+    entities: List[Dict[str, Any]] = []
+    cases = []
+    stream.expect("{")
+    while not stream.accept("}"):
+        keyword = stream.expect_kind("ident").value
+        if keyword in ("principal", "action", "resource"):
+            entity_type = "::".join(stream.path())
+            attrs = _literal(stream)
+            uid = EntityUID(entity_type, attrs.pop("uid"))
+            parents = attrs.pop("parents", [])
+            declared[keyword] = uid
+            entities.append(_entity_json({"uid": uid, "attrs": attrs, "parents": parents}))
+        elif keyword == "assert":
+            expected = stream.expect_kind("ident").value.upper()
+            stream.expect("(")
+            args = []
+            while not stream.accept(")"):
+                value = _literal(stream)
+                args.append(declared.get(value, value) if isinstance(value, str) else value)
+                if not stream.accept(","):
+                    stream.expect(")")
+                    break
+            principal, action, resource = args[:3]
+            if not isinstance(action, EntityUID):
+                action = EntityUID("Action", action)
+            cases.append({
+                "name": name if not cases else f"{name} #{len(cases) + 1}",
+                "source": source,
+                "request": {
+                    "principal": str(principal),
+                    "action": str(action),
+                    "resource": str(resource),
+                    "context": from_cedar_value(args[3]) if len(args) > 3 else {},
+                },
+                "entities": list(entities),
+                "expected": expected,
+            })
+        else:
+            raise CedarSyntaxError(f"Unexpected statement {keyword!r} in test {name!r}")
+        stream.expect(";")
+    return cases
+
+
+def parse_test_blocks(text: str, source: str = "") -> List[Dict[str, Any]]:
+    """Parse every test block in a .test file, in either supported format."""
+    stream = TokenStream(_HASH_COMMENT.sub("", text))
+    cases = []
+    while stream.peek().kind != "eof":
+        stream.expect("test")
+        if stream.accept("("):
+            name = stream.expect_kind("string").value
+            stream.expect(")")
+            cases.extend(_assert_block(stream, name, source))
+        else:
+            name = stream.expect_kind("string").value
+            cases.extend(_record_block(stream, name, source))
+    return cases
+
+
+def iter_suite_cases(tests_dir: Path, entities_file: Path) -> Iterator[Dict[str, Any]]:
+    """Yield --request-json cases from every tests/<suite>/{ALLOW,DENY} directory."""
+    for suite in sorted(path for path in Path(tests_dir).iterdir() if path.is_dir()):
+        for expected in ("ALLOW", "DENY"):
+            for request_file in sorted((suite / expected).glob("*.json")):
+                with open(request_file) as handle:
+                    request = json.load(handle)
+                yield {
+                    "name": f"{suite.name}/{expected}/{request_file.stem}",
+                    "source": str(request_file),
+                    "request": request,
+                    "entities_file": str(entities_file),
+                    "expected": expected,
+                }
+
+
+def iter_test_file_cases(test_files: List[Path]) -> Iterator[Dict[str, Any]]:
+    """Yield inline cases from .test files."""
+    for test_file in test_files:
+        yield from parse_test_blocks(Path(test_file).read_text(), str(test_file))
+
+
+def discover_cases(tests_dir: Path, entities_file: Path,
+                   test_files: Optional[List[Path]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield every suite request and inline .test case under tests_dir."""
+    yield from iter_suite_cases(tests_dir, entities_file)
+    if test_files is None:
+        test_files = sorted(Path(tests_dir).glob("*.test"))
+    yield from iter_test_file_cases(test_files)
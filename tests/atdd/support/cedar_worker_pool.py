@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Persistent Cedar Evaluation Worker Pool
+
+This module keeps a pool of long-lived worker processes that load the Cedar
+policy set and schema once and then answer authorization requests over a
+line-delimited JSON protocol on stdin/stdout. It lets CedarPolicyRunner avoid
+re-reading policies and schema for every single decision.
+
+Protocol (one JSON object per line):
+    worker -> pool:  {"ready": true, "engine": "<engine name>"}
+    pool -> worker:  {"id": 1, "principal": "...", "action": "...",
+                      "resource": "...", "context": {...},
+                      "entities_file": "/path/to/entities.json"}
+                     (entities_file may also be an indexed entity store
+                     directory; the worker then evaluates the request's slice)
+    worker -> pool:  {"id": 1, "decision": "ALLOW", "stdout": "...",
+                      "stderr": "...", "error": null,
+                      "spans": {"entity_load": 0.0001, "evaluate": 0.0002, ...}}
+
+The pool folds the worker's spans into the caller's cedar_metrics trace and
+attributes the rest of the round trip to "ipc".
+"""
+
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from cedar_metrics import end_trace, record, span, start_trace
+
+
+def load_policy_text(policy_dir: Path) -> str:
+    """Read every .cedar file under policy_dir into a single policy set."""
+    if policy_dir.is_file():
+        return policy_dir.read_text()
+    parts = [path.read_text() for path in sorted(policy_dir.glob("*.cedar"))]
+    return "\n".join(parts)
+
+
+# =============================================================================
+# WORKER SIDE: evaluators that live inside a worker process
+# =============================================================================
+
+class CliEvaluator:
+    """Evaluate requests with the cedar CLI against a pre-bundled policy file."""
+
+    name = "cli"
+
+    def __init__(self, policy_text: str, schema_file: Optional[Path], timeout: float):
+        self.schema_file = schema_file
+        self.timeout = timeout
+        bundle = tempfile.NamedTemporaryFile(
+            "w", prefix="cedar-pool-policies-", suffix=".cedar", delete=False
+        )
+        bundle.write(policy_text)
+        bundle.close()
+        self.policy_bundle = bundle.name
+
+    def authorize(self, request: Dict[str, Any], entities_file: str,
+                  entities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        slice_file = None
+        if entities is not None:
+            with span("entity_load"), tempfile.NamedTemporaryFile(
+                "w", prefix="cedar-pool-slice-", suffix=".json", delete=False
+            ) as handle:
+                json.dump(entities, handle)
+                slice_file = entities_file = handle.name
+
+        cmd = [
+            "cedar", "authorize",
+            "--policies", self.policy_bundle,
+            "--entities", entities_file,
+            "--principal", request["principal"],
+            "--action", request["action"],
+            "--resource", request["resource"],
+        ]
+        if self.schema_file:
+            cmd[4:4] = ["--schema", str(self.schema_file)]
+
+        context_file = None
+        if request.get("context"):
+            with tempfile.NamedTemporaryFile(
+                "w", prefix="cedar-pool-context-", suffix=".json", delete=False
+            ) as handle:
+                json.dump(request["context"], handle)
+                context_file = handle.name
+            cmd += ["--context", context_file]
+
+        try:
+            with span("spawn"):
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        finally:
+            for path in (context_file, slice_file):
+                if path:
+                    os.unlink(path)
+
+        return {
+            "decision": "ALLOW" if result.returncode == 0 else "DENY",
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+        }
+
+    def close(self) -> None:
+        if os.path.exists(self.policy_bundle):
+            os.unlink(self.policy_bundle)
+
+
+class CedarpyEvaluator:
+    """Evaluate requests in-process with the optional cedarpy bindings."""
+
+    name = "cedarpy"
+
+    def __init__(self, policy_text: str, schema_file: Optional[Path]):
+        import cedarpy  # optional dependency, only needed for this engine
+
+        self._cedarpy = cedarpy
+        self.policy_text = policy_text
+        self.schema = schema_file.read_text() if schema_file else None
+        self._entities_cache: Dict[str, Any] = {}
+
+    def _load_entities(self, entities_file: str) -> List[Dict[str, Any]]:
+        mtime = os.path.getmtime(entities_file)
+        cached = self._entities_cache.get(entities_file)
+        if cached is None or cached[0] != mtime:
+            with open(entities_file) as handle:
+                cached = (mtime, json.load(handle))
+            self._entities_cache[entities_file] = cached
+        return cached[1]
+
+    def authorize(self, request: Dict[str, Any], entities_file: str,
+                  entities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        with span("entity_load"):
+            if entities is None:
+                entities = self._load_entities(entities_file)
+        # cedarpy parses the policy set, validates and evaluates in one call
+        with span("evaluate"):
+            result = self._cedarpy.is_authorized(
+                {
+                    "principal": request["principal"],
+                    "action": request["action"],
+                    "resource": request["resource"],
+                    "context": request.get("context") or {},
+                },
+                self.policy_text,
+                entities,
+                schema=self.schema,
+            )
+        decision = "ALLOW" if result.allowed else "DENY"
+        return {"decision": decision, "stdout": decision, "stderr": ""}
+
+    def close(self) -> None:
+        pass
+
+
+class PythonEvaluator:
+    """Evaluate requests in-process with the pure-Python Cedar evaluator."""
+
+    name = "python"
+
+    def __init__(self, policy_dir: Path, schema_file: Optional[Path]):
+        from cedar_evaluator import CedarEvaluator
+
+        self.evaluator = CedarEvaluator.from_files(policy_dir, schema_file)
+        self._entities_cache: Dict[str, Any] = {}
+
+    def authorize(self, request: Dict[str, Any], entities_file: str,
+                  entities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        from cedar_evaluator import EntityStore, format_response
+
+        with span("entity_load"):
+            if entities is not None:
+                store = EntityStore.from_json(entities)
+            else:
+                mtime = os.path.getmtime(entities_file)
+                cached = self._entities_cache.get(entities_file)
+                if cached is None or cached[0] != mtime:
+                    cached = (mtime, EntityStore.from_file(entities_file))
+                    self._entities_cache[entities_file] = cached
+                store = cached[1]
+        response = self.evaluator.authorize_request(request, store)
+        with span("result_parse"):
+            return {"decision": response.decision, "stdout": format_response(response), "stderr": ""}
+
+    def close(self) -> None:
+        pass
+
+
+def create_evaluator(engine: str, policy_dir: Path, schema_file: Optional[Path], timeout: float):
+    """
+    Build the evaluator a worker uses, preferring in-process engines.
+
+    "auto" uses cedarpy when it is installed and the Python evaluator
+    otherwise; the cedar CLI is only used when asked for, or when the policies
+    use syntax the Python evaluator does not support.
+    """
+    if engine == "python":
+        return PythonEvaluator(policy_dir, schema_file)
+    policy_text = load_policy_text(policy_dir)
+    if engine in ("auto", "cedarpy"):
+        try:
+            return CedarpyEvaluator(policy_text, schema_file)
+        except ImportError:
+            if engine == "cedarpy":
+                raise
+    if engine == "auto":
+        from cedar_evaluator import CedarSyntaxError
+        try:
+            return PythonEvaluator(policy_dir, schema_file)
+        except CedarSyntaxError:
+            pass
+    return CliEvaluator(policy_text, schema_file, timeout)
+
+
+def worker_main(engine: str, policy_dir: str, schema_file: Optional[str], timeout: float) -> int:
+    """Serve authorization requests from stdin until it is closed."""
+    evaluator = create_evaluator(
+        engine, Path(policy_dir), Path(schema_file) if schema_file else None, timeout
+    )
+    print(json.dumps({"ready": True, "engine": evaluator.name}), flush=True)
+
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            trace, previous = start_trace()
+            try:
+                entities = None
+                if os.path.isdir(request["entities_file"]):
+                    from indexed_entity_store import open_store
+                    with span("entity_load"):
+                        entities = open_store(request["entities_file"]).slice_request(
+                            request["principal"], request["action"], request["resource"], request.get("context")
+                        )
+                response = evaluator.authorize(request, request["entities_file"], entities)
+                response["error"] = None
+            except Exception as e:
+                response = {"decision": "ERROR", "stdout": "", "stderr": "", "error": str(e)}
+            finally:
+                end_trace(previous)
+            response["id"] = request.get("id")
+            response["spans"] = trace.phases
+            print(json.dumps(response), flush=True)
+    finally:
+        evaluator.close()
+    return 0
+
+
+# =============================================================================
+# POOL SIDE: process management used by CedarPolicyRunner
+# =============================================================================
+
+class WorkerTimeout(Exception):
+    """Raised when a worker does not answer within the request timeout."""
+
+
+class _Worker:
+    """A single worker process plus a reader thread draining its stdout."""
+
+    def __init__(self, cmd: List[str], startup_timeout: float):
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self.responses: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.requests_served = 0
+        self._reader = threading.Thread(target=self._drain, daemon=True)
+        self._reader.start()
+
+        ready = self._read(startup_timeout)
+        self.engine = ready.get("engine", "unknown")
+
+    def _drain(self) -> None:
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)
+
+    def _read(self, timeout: float) -> Dict[str, Any]:
+        try:
+            line = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise WorkerTimeout(f"Worker did not respond within {timeout}s")
+        if line is None:
+            raise RuntimeError("Worker process exited unexpectedly")
+        return json.loads(line)
+
+    def call(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        self.process.stdin.write(json.dumps(payload) + "\n")
+        self.process.stdin.flush()
+        response = self._read(timeout)
+        self.requests_served += 1
+        return response
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        if self.alive():
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+
+    def kill(self) -> None:
+        if self.alive():
+            self.process.kill()
+            self.process.wait()
+
+
+class CedarWorkerPool:
+    """
+    Pool of warm Cedar evaluators.
+
+    Workers are started lazily up to pool_size, recycled after
+    max_requests_per_worker requests, and replaced whenever one times out
+    or dies. stats counts workers spawned, recycled and replaced.
+    """
+
+    def __init__(self, policy_dir: str, schema_file: Optional[str] = None,
+                 pool_size: int = 4, max_requests_per_worker: int = 1000,
+                 request_timeout: float = 10.0, engine: str = "auto"):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.policy_dir = str(policy_dir)
+        self.schema_file = str(schema_file) if schema_file else None
+        self.pool_size = pool_size
+        self.max_requests_per_worker = max_requests_per_worker
+        self.request_timeout = request_timeout
+        self.engine = engine
+
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self._closed = False
+        self.stats = {"spawned": 0, "recycled": 0, "replaced": 0}
+
+    def _worker_command(self) -> List[str]:
+        cmd = [
+            sys.executable, str(Path(__file__).resolve()), "--worker",
+            "--engine", self.engine,
+            "--policies", self.policy_dir,
+            "--timeout", str(self.request_timeout),
+        ]
+        if self.schema_file:
+            cmd += ["--schema", self.schema_file]
+        return cmd
+
+    def _checkout(self) -> _Worker:
+        if self._closed:
+            raise RuntimeError("Worker pool is closed")
+        with span("queue"):
+            self._slots.acquire()
+        try:
+            while True:
+                worker = self._idle.get_nowait()
+                if worker.alive():
+                    return worker
+                self._count("replaced")
+        except queue.Empty:
+            pass
+        try:
+            with span("spawn"):
+                worker = _Worker(self._worker_command(), self.request_timeout)
+        except Exception:
+            self._slots.release()
+            raise
+        self._count("spawned")
+        return worker
+
+    def _checkin(self, worker: _Worker) -> None:
+        if (not worker.alive() or self._closed
+                or worker.requests_served >= self.max_requests_per_worker):
+            if worker.requests_served >= self.max_requests_per_worker:
+                self._count("recycled")
+            worker.close()
+        else:
+            self._idle.put(worker)
+        self._slots.release()
+
+    def _discard(self, worker: _Worker) -> None:
+        worker.kill()
+        self._count("replaced")
+        self._slots.release()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def idle_worker_pids(self) -> List[int]:
+        """Process ids of the workers currently waiting for a request."""
+        return [worker.process.pid for worker in list(self._idle.queue)]
+
+    def authorize(self, principal: str, action: str, resource: str,
+                  entities_file: str, context: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Evaluate one request on a warm worker.
+
+        Returns:
+            Dict with decision, stdout, stderr and error keys
+
+        Raises:
+            WorkerTimeout: if the worker does not answer in time
+        """
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+
+        payload = {
+            "id": request_id,
+            "principal": principal,
+            "action": action,
+            "resource": resource,
+            "context": context or {},
+            "entities_file": str(entities_file),
+        }
+
+        worker = self._checkout()
+        started = time.perf_counter()
+        try:
+            response = worker.call(payload, timeout or self.request_timeout)
+        except Exception:
+            self._discard(worker)
+            raise
+        round_trip = time.perf_counter() - started
+        self._checkin(worker)
+
+        spans = response.pop("spans", None) or {}
+        for phase, seconds in spans.items():
+            record(phase, seconds)
+        record("ipc", max(round_trip - sum(spans.values()), 0.0))
+        return response
+
+    def close(self) -> None:
+        """Stop all idle workers; busy workers stop when checked back in."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close()
+
+    def __enter__(self) -> "CedarWorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Persistent Cedar evaluation worker")
+    parser.add_argument("--worker", action="store_true", help="Run as a pool worker")
+    parser.add_argument("--engine", default="auto", help="Evaluator engine (auto, cli, cedarpy, python)")
+    parser.add_argument("--policies", required=True, help="Policy directory or file")
+    parser.add_argument("--schema", help="Cedar schema file")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    args = parser.parse_args(argv)
+
+    if not args.worker:
+        parser.error("this module only runs standalone as a pool worker (--worker)")
+    return worker_main(args.engine, args.policies, args.schema, args.timeout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+CloudFormation Template to Cedar Entity Pipeline
+
+Loads CloudFormation templates (YAML or JSON, including the short-form
+intrinsic tags such as !Ref, !Sub, !GetAtt and !If), extracts every
+AWS::S3::Bucket resource and emits Cedar entities as defined in
+schema.cedarschema:
+
+- one S3Resource per AWS::S3::Bucket (resource_type "template_resource")
+- one CloudFormationTemplate per template, listing its buckets in s3_resources
+
+Whole directory trees are parsed across worker processes and evaluated in a
+single batch, replacing the per-file grep pipeline in
+scripts/validate-cloudformation-s3.sh.
+
+Usage:
+    python3 tests/atdd/support/cloudformation_entities.py [PATH ...] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+TEMPLATE_SUFFIXES = (".yaml", ".yml", ".json", ".template")
+VALIDATOR = {"type": "Human", "id": "validator"}
+
+
+# =============================================================================
+# TEMPLATE LOADING
+# =============================================================================
+
+_BaseLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class CfnLoader(_BaseLoader):
+    """YAML loader that understands CloudFormation short-form intrinsic tags."""
+
+
+def _construct_intrinsic(loader: yaml.Loader, tag_suffix: str, node: yaml.Node) -> Dict[str, Any]:
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+    elif isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+    else:
+        value = loader.construct_mapping(node, deep=True)
+
+    if tag_suffix == "Ref":
+        return {"Ref": value}
+    if tag_suffix == "Condition":
+        return {"Condition": value}
+    if tag_suffix == "GetAtt" and isinstance(value, str):
+        value = value.split(".", 1)
+    return {f"Fn::{tag_suffix}": value}
+
+
+CfnLoader.add_multi_constructor("!", _construct_intrinsic)
+
+
+def _is_cloudformation(document: Any) -> bool:
+    return isinstance(document, dict) and isinstance(document.get("Resources"), dict)
+
+
+def _looks_like_cloudformation(text: str) -> bool:
+    return "AWSTemplateFormatVersion" in text or "AWS::" in text
+
+
+def load_template(path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Load a template, returning None for files that are not CloudFormation.
+
+    Multi-document YAML yields its first CloudFormation document; files that
+    fail to parse are only reported when they look like CloudFormation, so
+    Kubernetes manifests, Helm charts and other YAML in the tree are skipped.
+    """
+    text = Path(path).read_text()
+    try:
+        if Path(path).suffix == ".json":
+            documents = [json.loads(text)]
+        else:
+            documents = yaml.load_all(text, Loader=CfnLoader)
+        for document in documents:
+            if _is_cloudformation(document):
+                return document
+    except (yaml.YAMLError, ValueError):
+        if _looks_like_cloudformation(text):
+            raise
+    return None
+
+
+# =============================================================================
+# INTRINSIC RESOLUTION
+# =============================================================================
+
+class TemplateContext:
+    """Parameter defaults and conditions used to resolve intrinsic functions."""
+
+    def __init__(self, template: Dict[str, Any]):
+        parameters = template.get("Parameters") or {}
+        self.parameters = {
+            name: spec.get("Default") for name, spec in parameters.items()
+            if isinstance(spec, dict) and "Default" in spec
+        }
+        self.conditions = template.get("Conditions") or {}
+        self.resources = template.get("Resources") or {}
+
+    def resolve(self, value: Any) -> Any:
+        """Resolve a value to a literal where possible, otherwise return None."""
+        if not isinstance(value, dict):
+            return value
+        if len(value) != 1:
+            return value
+        (function, argument), = value.items()
+        if function == "Ref":
+            if argument in self.parameters:
+                return self.parameters[argument]
+            return None
+        if function == "Fn::Sub":
+            return self._sub(argument)
+        if function == "Fn::Join" and isinstance(argument, list) and len(argument) == 2:
+            parts = [self.resolve(part) for part in argument[1] or []]
+            if any(part is None for part in parts):
+                return None
+            return str(argument[0]).join(str(part) for part in parts)
+        if function == "Fn::If" and isinstance(argument, list) and len(argument) == 3:
+            return self.resolve(argument[1] if self.condition(argument[0]) else argument[2])
+        return value if not function.startswith("Fn::") and function != "Ref" else None
+
+    def literal_or_description(self, value: Any) -> str:
+        """Resolve a value, falling back to a description of the selected Fn::If branch."""
+        while isinstance(value, dict) and isinstance(value.get("Fn::If"), list) and len(value["Fn::If"]) == 3:
+            condition, when_true, when_false = value["Fn::If"]
+            value = when_true if self.condition(condition) else when_false
+        resolved = self.resolve(value)
+        if isinstance(resolved, (str, int, float)) and not isinstance(resolved, bool) and resolved != "":
+            return str(resolved)
+        return describe(value)
+
+    def _sub(self, argument: Any) -> Optional[str]:
+        if isinstance(argument, list):
+            text, variables = argument[0], argument[1] if len(argument) > 1 else {}
+        else:
+            text, variables = argument, {}
+        if not isinstance(text, str):
+            return None
+        for name, value in {**self.parameters, **variables}.items():
+            resolved = self.resolve(value)
+            if resolved is not None:
+                text = text.replace("${" + name + "}", str(resolved))
+        return text
+
+    def condition(self, condition: Any) -> bool:
+        """Evaluate a condition name or expression; unknowns default to True."""
+        if isinstance(condition, str):
+            if condition not in self.conditions:
+                return True
+            return self.condition(self.conditions[condition])
+        if not isinstance(condition, dict) or len(condition) != 1:
+            return True
+        (function, argument), = condition.items()
+        if function == "Condition":
+            return self.condition(argument)
+        if function == "Fn::Equals" and isinstance(argument, list) and len(argument) == 2:
+            left, right = (self.resolve(item) for item in argument)
+            return True if left is None or right is None else str(left) == str(right)
+        if function == "Fn::Not" and isinstance(argument, list) and argument:
+            return not self.condition(argument[0])
+        if function == "Fn::And" and isinstance(argument, list):
+            return all(self.condition(item) for item in argument)
+        if function == "Fn::Or" and isinstance(argument, list):
+            return any(self.condition(item) for item in argument)
+        return True
+
+
+def describe(value: Any) -> str:
+    """Render an unresolved intrinsic compactly, e.g. GetAtt(S3EncryptionKey.Arn)."""
+    if isinstance(value, dict) and len(value) == 1:
+        (function, argument), = value.items()
+        name = function.replace("Fn::", "")
+        if isinstance(argument, list) and all(isinstance(item, str) for item in argument):
+            argument = ".".join(argument)
+        elif not isinstance(argument, str):
+            argument = json.dumps(argument, sort_keys=True, default=str)
+        return f"{name}({argument})"
+    return str(value)
+
+
+# =============================================================================
+# ENTITY EXTRACTION
+# =============================================================================
+
+def _tags(properties: Dict[str, Any], context: TemplateContext) -> Dict[str, Any]:
+    tags = {}
+    for tag in properties.get("Tags") or []:
+        if isinstance(tag, dict) and "Key" in tag:
+            tags[tag["Key"]] = context.resolve(tag.get("Value"))
+    return tags
+
+
+def _bucket_policy_enforces_encryption(logical_id: str, context: TemplateContext) -> bool:
+    """True if a BucketPolicy on this bucket denies PutObject without SSE headers."""
+    for resource in context.resources.values():
+        if not isinstance(resource, dict) or resource.get("Type") != "AWS::S3::BucketPolicy":
+            continue
+        properties = resource.get("Properties") or {}
+        if properties.get("Bucket") != {"Ref": logical_id}:
+            continue
+        statements = (properties.get("PolicyDocument") or {}).get("Statement") or []
+        if isinstance(statements, dict):
+            statements = [statements]
+        for statement in statements:
+            actions = statement.get("Action", [])
+            actions = [actions] if isinstance(actions, str) else actions
+            if (statement.get("Effect") == "Deny"
+                    and any(action in ("s3:PutObject", "s3:*", "*") for action in actions)
+                    and "s3:x-amz-server-side-encryption" in json.dumps(statement.get("Condition", {}))):
+                return True
+    return False
+
+
+def bucket_entity(template_id: str, logical_id: str, resource: Dict[str, Any],
+                  context: TemplateContext, default_environment: str) -> Dict[str, Any]:
+    """Build the S3Resource entity for one AWS::S3::Bucket resource."""
+    properties = resource.get("Properties") or {}
+    bucket_name = context.resolve(properties.get("BucketName"))
+    tags = _tags(properties, context)
+
+    attrs: Dict[str, Any] = {
+        "name": bucket_name if isinstance(bucket_name, str) and bucket_name else logical_id,
+        "encryption_enabled": False,
+        "environment": tags.get("Environment") or context.parameters.get("Environment") or default_environment,
+        "resource_type": "template_resource",
+    }
+
+    encryption = (properties.get("BucketEncryption") or {}).get("ServerSideEncryptionConfiguration") or []
+    for rule in encryption if isinstance(encryption, list) else []:
+        default = (rule or {}).get("ServerSideEncryptionByDefault") or {}
+        if "SSEAlgorithm" not in default:
+            continue
+        attrs["encryption_enabled"] = True
+        attrs["encryption_algorithm"] = context.literal_or_description(default["SSEAlgorithm"])
+        if default.get("KMSMasterKeyID") not in (None, ""):
+            attrs["kms_key_id"] = context.literal_or_description(default["KMSMasterKeyID"])
+        break
+
+    if _bucket_policy_enforces_encryption(logical_id, context):
+        attrs["bucket_policy_enforces_encryption"] = True
+
+    return {
+        "uid": {"type": "S3Resource", "id": f"{template_id}/{logical_id}"},
+        "attrs": attrs,
+        "parents": [],
+    }
+
+
+def template_id_for(path: Path, root: Optional[Path]) -> str:
+    """Path of the template relative to root, keeping the extension so a.yaml and a.json stay distinct."""
+    path = Path(path).resolve()
+    try:
+        relative = path.relative_to(root.resolve()) if root else Path(path.name)
+    except ValueError:
+        relative = Path(path.name)
+    return str(relative).replace(os.sep, "/")
+
+
+def parse_template(path: str, root: Optional[str] = None,
+                   default_environment: str = "development") -> Dict[str, Any]:
+    """
+    Turn one template into Cedar entities.
+
+    Returns:
+        Dict with template path, template_id, buckets (logical_id, bucket_name,
+        entity uid), entities and an error message if the file could not be parsed
+    """
+    result: Dict[str, Any] = {"template": str(path), "template_id": None,
+                              "buckets": [], "entities": [], "error": None}
+    try:
+        template = load_template(Path(path))
+    except (yaml.YAMLError, ValueError, OSError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    if template is None:
+        return result
+
+    template_id = template_id_for(Path(path), Path(root) if root else None)
+    context = TemplateContext(template)
+    result["template_id"] = template_id
+
+    buckets = []
+    for logical_id, resource in context.resources.items():
+        if isinstance(resource, dict) and resource.get("Type") == "AWS::S3::Bucket":
+            entity = bucket_entity(template_id, logical_id, resource, context, default_environment)
+            buckets.append(entity)
+            properties = resource.get("Properties") or {}
+            result["buckets"].append({
+                "logical_id": logical_id,
+                "bucket_name": entity["attrs"]["name"],
+                "uid": entity["uid"],
+                # No Environment tag or parameter: environment is default_environment
+                "environment_defaulted": not (_tags(properties, context).get("Environment")
+                                              or context.parameters.get("Environment")),
+            })
+
+    environment = context.parameters.get("Environment") or (
+        buckets[0]["attrs"]["environment"] if buckets else default_environment)
+    result["entities"] = [{
+        "uid": {"type": "CloudFormationTemplate", "id": template_id},
+        "attrs": {
+            "template_name": Path(path).name,
+            "stack_name": Path(path).stem,
+            "environment": environment,
+            "s3_resources": [bucket["uid"] for bucket in buckets],
+        },
+        "parents": [],
+    }] + buckets
+    return result
+
+
+def iter_template_files(paths: Iterable[str]) -> Iterator[Path]:
+    """Yield candidate template files from files and directory trees."""
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.endswith(TEMPLATE_SUFFIXES):
+                    yield Path(dirpath) / filename
+
+
+def _parse_chunk(args) -> List[Dict[str, Any]]:
+    paths, root, default_environment = args
+    return [parse_template(path, root, default_environment) for path in paths]
+
+
+def scan_templates(paths: Iterable[str], root: Optional[str] = None, workers: Optional[int] = None,
+                   default_environment: str = "development", chunk_size: int = 64) -> Iterator[Dict[str, Any]]:
+    """Parse templates across worker processes, yielding one result per CloudFormation template."""
+    files = [str(path) for path in iter_template_files(paths)]
+    chunks = [(files[i:i + chunk_size], root, default_environment) for i in range(0, len(files), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        parsed = map(_parse_chunk, chunks)
+        for chunk in parsed:
+            yield from (r for r in chunk if r["template_id"] or r["error"])
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in executor.map(_parse_chunk, chunks):
+            yield from (r for r in chunk if r["template_id"] or r["error"])
+
+
+# =============================================================================
+# BATCH EVALUATION
+# =============================================================================
+
+def bucket_request(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """The s3:CreateBucket request that decides whether one template bucket is compliant."""
+    return {
+        "principal": 'Human::"validator"',
+        "action": 'Action::"s3:CreateBucket"',
+        "resource": f'S3Resource::{json.dumps(bucket["uid"]["id"])}',
+        "context": {},
+    }
+
+
+def evaluation_requests(parsed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Requests that decide template compliance (the checks the shell script made)."""
+    requests = [{
+        "principal": 'Human::"validator"',
+        "action": 'Action::"cloudformation:ValidateTemplate"',
+        "resource": f'CloudFormationTemplate::{json.dumps(parsed["template_id"])}',
+        "context": {},
+    }]
+    requests.extend(bucket_request(bucket) for bucket in parsed["buckets"])
+    return requests
+
+
+def validator_entity() -> Dict[str, Any]:
+    return {
+        "uid": VALIDATOR,
+        "attrs": {"role": "Developer", "team": "platform", "department": "engineering",
+                  "email": "validator@example.com"},
+        "parents": [],
+    }
+
+
+def evaluate_templates(parsed_templates: List[Dict[str, Any]], backend: str = "python",
+                       pool_size: int = 4) -> List[Dict[str, Any]]:
+    """
+    Evaluate every template with one entity load and one batch.
+
+    Returns:
+        One summary dict per template with compliant flag and per-bucket decisions
+    """
+    from cedar_policy_runner import CedarPolicyRunner
+
+    entities = [validator_entity()]
+    requests = []
+    owners = []
+    for index, parsed in enumerate(parsed_templates):
+        if parsed["error"]:
+            continue
+        entities.extend(parsed["entities"])
+        for request in evaluation_requests(parsed):
+            requests.append(request)
+            owners.append(index)
+
+    with tempfile.NamedTemporaryFile("w", prefix="cedar-cf-entities-", suffix=".json", delete=False) as handle:
+        json.dump(entities, handle)
+        entities_file = handle.name
+
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend=backend, pool_size=pool_size)
+    summaries = [{
+        "template": parsed["template"],
+        "template_id": parsed["template_id"],
+        "error": parsed["error"],
+        "template_decision": None,
+        "buckets": [],
+        "compliant": False,
+    } for parsed in parsed_templates]
+    try:
+        for owner, result in zip(owners, runner.authorize_batch(requests, entities_file)):
+            summary = summaries[owner]
+            request = result["request"]
+            if request["action"].endswith('"cloudformation:ValidateTemplate"'):
+                summary["template_decision"] = result["decision"]
+            else:
+                summary["buckets"].append({
+                    "resource": request["resource"],
+                    "decision": result["decision"],
+                })
+    finally:
+        runner.close()
+        os.unlink(entities_file)
+
+    for summary in summaries:
+        summary["compliant"] = (summary["error"] is None
+                                and all(bucket["decision"] == "ALLOW" for bucket in summary["buckets"]))
+    return summaries
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate CloudFormation S3 encryption with Cedar")
+    parser.add_argument("paths", nargs="*", default=[str(PROJECT_ROOT / "examples" / "cloudformation")],
+                        help="Template files or directories (default: examples/cloudformation)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parser processes")
+    parser.add_argument("--backend", default="python", choices=("python", "pool", "cli"))
+    parser.add_argument("--environment", default="development",
+                        help="Environment for buckets without an Environment tag or parameter")
+    parser.add_argument("--entities-out", help="Write the generated Cedar entities to this file")
+    parser.add_argument("--json", action="store_true", help="Print one JSON summary per template")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-evaluate templates whose content (or the policy set) changed")
+    parser.add_argument("--manifest", help="Manifest file for --incremental (default: .cedar-cf-manifest.json)")
+    args = parser.parse_args(argv)
+
+    root = os.path.commonpath([os.path.abspath(p) for p in args.paths])
+    if os.path.isfile(root):
+        root = os.path.dirname(root)
+
+    if args.incremental:
+        from template_manifest import DEFAULT_MANIFEST, validate_incremental
+        outcome = validate_incremental(
+            args.paths, root, Path(args.manifest or DEFAULT_MANIFEST),
+            PROJECT_ROOT / "cedar_policies", PROJECT_ROOT / "schema.cedarschema",
+            workers=args.workers, default_environment=args.environment, backend=args.backend
+        )
+        summaries = outcome["summaries"]
+        print(f"Incremental: {len(outcome['evaluated'])} evaluated, {len(outcome['skipped'])} skipped, "
+              f"{len(outcome['removed'])} removed"
+              + (f" ({outcome['full_reason']}, full re-evaluation)" if outcome["full_reason"] else ""),
+              file=sys.stderr)
+        if args.entities_out:
+            from template_manifest import TemplateManifest
+            manifest = TemplateManifest(Path(args.manifest or DEFAULT_MANIFEST))
+            entities = [validator_entity()] + [e for t in manifest.templates.values() for e in t["entities"]]
+            Path(args.entities_out).write_text(json.dumps(entities, indent=2))
+    else:
+        parsed = list(scan_templates(args.paths, root, args.workers, args.environment))
+
+        if args.entities_out:
+            entities = [validator_entity()] + [e for p in parsed if not p["error"] for e in p["entities"]]
+            Path(args.entities_out).write_text(json.dumps(entities, indent=2))
+
+        summaries = evaluate_templates(parsed, backend=args.backend, pool_size=args.workers)
+    compliant = sum(1 for s in summaries if s["compliant"])
+    errors = sum(1 for s in summaries if s["error"])
+
+    for summary in summaries:
+        if args.json:
+            print(json.dumps(summary))
+        elif summary["error"]:
+            print(f"ERROR          {summary['template']}: {summary['error']}")
+        else:
+            status = "COMPLIANT" if summary["compliant"] else "NON-COMPLIANT"
+            print(f"{status:14} {summary['template']} ({len(summary['buckets'])} bucket(s))")
+
+    if not args.json:
+        print(f"\nCompliant templates: {compliant}")
+        print(f"Non-compliant templates: {len(summaries) - compliant - errors}")
+        if errors:
+            print(f"Unparseable templates: {errors}")
+    return 0 if compliant == len(summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
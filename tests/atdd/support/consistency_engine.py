@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Bulk Shift-Left vs Shift-Right Consistency Engine
+
+Joins a tree of CloudFormation templates with a live S3 inventory and reports
+every bucket whose template decision (s3:CreateBucket) and live decision
+(config:EvaluateCompliance) disagree:
+
+    template_compliant_live_noncompliant   drift or an out-of-band change
+    live_compliant_template_noncompliant   the template would be rejected today
+
+Live buckets are joined to template buckets by, in order:
+
+    bucket_name      the template's literal BucketName
+    name_pattern     a BucketName with unresolved ${...} references, such as
+                     ${AWS::AccountId}, each matching any text
+    generated_name   a CloudFormation generated name, <stack>-<logicalid>-<suffix>
+    logical_id       the bucket name equals the logical ID (case-insensitive)
+
+A key claimed by more than one template bucket (the same logical ID in two
+stacks) joins neither.
+
+A template bucket without an Environment tag or parameter is re-evaluated
+with the environment of the live bucket it joins, so an untagged template is
+not reported as drifted just because --environment differs from the
+account. If the live bucket has no environment either, the bucket is
+reported as environment_unknown. Buckets where either side evaluated to
+ERROR are reported as evaluation_error. Neither kind counts as a mismatch.
+
+Both sides are evaluated in batches of --chunk-size. Only a compact row per
+template bucket (ids and decision, plus its entities when the environment was
+defaulted) is kept for the join; the inventory is
+streamed chunk by chunk and only mismatches are written out, so memory stays
+bounded by the template index plus one chunk. Every mismatch records the
+hash of the policy set and schema used on each side.
+
+Usage:
+    python3 tests/atdd/support/consistency_engine.py examples/cloudformation --inventory /tmp/s3-inventory.jsonl
+    python3 tests/atdd/support/consistency_engine.py templates/ --inventory - --out mismatches.jsonl
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cloudformation_entities import PROJECT_ROOT, bucket_request, scan_templates, validator_entity
+from s3_inventory import compliance_request, config_evaluation_entity
+
+PLACEHOLDER = re.compile(r"\$\{[^}]*\}")
+TEMPLATE_COMPLIANT = "template_compliant_live_noncompliant"
+LIVE_COMPLIANT = "live_compliant_template_noncompliant"
+ENVIRONMENT_UNKNOWN = "environment_unknown"
+EVALUATION_ERROR = "evaluation_error"
+AMBIGUOUS = -1
+
+
+class TemplateBucket(NamedTuple):
+    template: str
+    template_id: str
+    logical_id: str
+    bucket_name: str
+    decision: str
+    # Template and bucket entities, kept only when the environment was defaulted
+    entities: Optional[Tuple[Dict[str, Any], ...]] = None
+
+
+def _write_chunk(path: Path, entities: List[Dict[str, Any]], generation: int) -> None:
+    """
+    Rewrite the per-side entities file for the next chunk.
+
+    The runner and pool workers cache entity loads by path and mtime; reusing one
+    path keeps those caches at one entry, and stamping a strictly increasing mtime
+    makes sure every chunk is reloaded even on filesystems with coarse timestamps.
+    """
+    with open(path, "w") as handle:
+        json.dump(entities, handle)
+    stamp = time.time_ns() + generation * 1_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+class ConsistencyEngine:
+    """Evaluate templates and a live inventory in batches and yield the buckets they disagree on."""
+
+    def __init__(self, shift_left_policies: str = "cedar_policies",
+                 shift_right_policies: Optional[str] = None,
+                 schema_file: str = "schema.cedarschema", backend: str = "python",
+                 pool_size: int = 4, chunk_size: int = 1000):
+        """
+        Args:
+            shift_left_policies: Policy directory templates are evaluated with
+            shift_right_policies: Policy directory live buckets are evaluated with
+                (default: the same as shift_left_policies)
+            schema_file: Cedar schema file relative to the project root
+            backend: CedarPolicyRunner backend for both sides
+            pool_size: Warm workers per side for the pool backend
+            chunk_size: Buckets per entities file and batch
+        """
+        from cedar_policy_runner import CedarPolicyRunner
+        self.shift_left = CedarPolicyRunner(policy_dir=shift_left_policies, schema_file=schema_file,
+                                            backend=backend, pool_size=pool_size)
+        self.shift_right = CedarPolicyRunner(policy_dir=shift_right_policies or shift_left_policies,
+                                             schema_file=schema_file, backend=backend, pool_size=pool_size)
+        self.shift_left_hash = self.shift_left.policy_hash()
+        self.shift_right_hash = self.shift_right.policy_hash()
+        self.chunk_size = chunk_size
+        self._workdir = Path(tempfile.mkdtemp(prefix="cedar-consistency-"))
+        self._generation = 0
+
+        self.buckets: List[TemplateBucket] = []
+        self._by_name: Dict[str, int] = {}
+        self._by_logical_id: Dict[str, int] = {}
+        self._by_prefix: Dict[str, List[Tuple["re.Pattern", int]]] = {}
+        self._matched = bytearray()
+        self.counts = {
+            "templates": 0,
+            "template_errors": 0,
+            "ambiguous_keys": 0,
+            "live_buckets": 0,
+            "matched": 0,
+            "consistent": 0,
+            "mismatches": 0,
+            "environment_from_live": 0,
+            "environment_unknown": 0,
+            "errors": 0,
+            "unmatched_live": 0,
+        }
+
+    def close(self) -> None:
+        self.shift_left.close()
+        self.shift_right.close()
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+    def __enter__(self) -> "ConsistencyEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _evaluate(self, runner, name: str, entities: List[Dict[str, Any]],
+                  requests: List[Dict[str, Any]]) -> Iterator[str]:
+        """Decisions for one chunk, in request order."""
+        self._generation += 1
+        entities_file = self._workdir / f"{name}.json"
+        _write_chunk(entities_file, entities, self._generation)
+        for result in runner.authorize_batch(requests, str(entities_file)):
+            yield result["decision"]
+
+    # -------------------------------------------------------------------------
+    # Shift-left: template index
+    # -------------------------------------------------------------------------
+
+    def _add_key(self, index: Dict[str, int], key: str, position: int) -> None:
+        """Index a join key; a key claimed by two template buckets joins neither."""
+        existing = index.get(key)
+        if existing is None:
+            index[key] = position
+        elif existing not in (position, AMBIGUOUS):
+            index[key] = AMBIGUOUS
+            self.counts["ambiguous_keys"] += 1
+
+    def _add_pattern(self, bucket_name: str, position: int) -> None:
+        """Index a name with ${...} references under the literal text before the first one."""
+        literals = PLACEHOLDER.split(bucket_name)
+        pattern = re.compile(".+".join(re.escape(literal) for literal in literals) + r"\Z")
+        self._by_prefix.setdefault(literals[0], []).append((pattern, position))
+
+    def _index_chunk(self, parsed_templates: List[Dict[str, Any]]) -> None:
+        entities = [validator_entity()]
+        requests = []
+        pending: List[Tuple[Dict[str, Any], Dict[str, Any], str]] = []
+        for parsed in parsed_templates:
+            entities.extend(parsed["entities"])
+            stack_name = parsed["entities"][0]["attrs"]["stack_name"]
+            for bucket in parsed["buckets"]:
+                requests.append(bucket_request(bucket))
+                pending.append((parsed, bucket, stack_name))
+
+        for (parsed, bucket, stack_name), decision in zip(
+                pending, self._evaluate(self.shift_left, "shift-left", entities, requests)):
+            position = len(self.buckets)
+            kept = None
+            if bucket["environment_defaulted"]:
+                kept = (parsed["entities"][0],) + tuple(
+                    entity for entity in parsed["entities"][1:] if entity["uid"] == bucket["uid"])
+            self.buckets.append(TemplateBucket(parsed["template"], parsed["template_id"],
+                                               bucket["logical_id"], bucket["bucket_name"], decision, kept))
+            if PLACEHOLDER.search(bucket["bucket_name"]):
+                self._add_pattern(bucket["bucket_name"], position)
+            elif bucket["bucket_name"] != bucket["logical_id"]:
+                self._add_key(self._by_name, bucket["bucket_name"], position)
+            self._add_key(self._by_logical_id, bucket["logical_id"].lower(), position)
+            self._add_key(self._by_logical_id, f"{stack_name}-{bucket['logical_id']}".lower(), position)
+        self._matched.extend(bytes(len(pending)))
+
+    def index_templates(self, paths: Iterable[str], root: Optional[str] = None,
+                        workers: Optional[int] = None, default_environment: str = "development") -> int:
+        """
+        Parse and evaluate every template bucket, keeping one TemplateBucket row each.
+
+        Returns:
+            Number of template buckets indexed
+        """
+        chunk: List[Dict[str, Any]] = []
+        chunk_buckets = 0
+        for parsed in scan_templates(paths, root, workers, default_environment):
+            self.counts["templates"] += 1
+            if parsed["error"]:
+                self.counts["template_errors"] += 1
+                print(f"WARNING: {parsed['template']}: {parsed['error']}", file=sys.stderr)
+                continue
+            chunk.append(parsed)
+            chunk_buckets += len(parsed["buckets"])
+            if chunk_buckets >= self.chunk_size:
+                self._index_chunk(chunk)
+                chunk, chunk_buckets = [], 0
+        if chunk:
+            self._index_chunk(chunk)
+        return len(self.buckets)
+
+    def lookup(self, bucket_name: str) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Find the template bucket a live bucket was deployed from.
+
+        Returns:
+            Tuple of (position in self.buckets, join key kind), or (None, None)
+        """
+        position = self._by_name.get(bucket_name, AMBIGUOUS)
+        if position != AMBIGUOUS:
+            return position, "bucket_name"
+        if self._by_prefix:
+            for end in range(len(bucket_name), -1, -1):
+                for pattern, position in self._by_prefix.get(bucket_name[:end], ()):
+                    if pattern.match(bucket_name):
+                        return position, "name_pattern"
+        if "-" in bucket_name:
+            position = self._by_logical_id.get(bucket_name.rsplit("-", 1)[0].lower(), AMBIGUOUS)
+            if position != AMBIGUOUS:
+                return position, "generated_name"
+        position = self._by_logical_id.get(bucket_name.lower(), AMBIGUOUS)
+        if position != AMBIGUOUS:
+            return position, "logical_id"
+        return None, None
+
+    # -------------------------------------------------------------------------
+    # Shift-right: streamed inventory
+    # -------------------------------------------------------------------------
+
+    def _reevaluate_templates(self, joined: List[Tuple[int, int, str]]) -> Dict[int, str]:
+        """
+        Template decisions for defaulted-environment buckets, one per live bucket.
+
+        One template bucket can match several live buckets (a name with
+        ${AWS::AccountId} deployed to many accounts), so each live bucket gets
+        its own copy of the template bucket, with its own uid and environment.
+
+        Args:
+            joined: (index of the live bucket in the chunk, template position, live environment)
+
+        Returns:
+            Template decision by index of the live bucket in the chunk
+        """
+        templates: Dict[str, Dict[str, Any]] = {}
+        buckets = []
+        requests = []
+        for index, position, environment in joined:
+            template_entity, bucket_entity = self.buckets[position].entities
+            uid = dict(bucket_entity["uid"], id=f"{bucket_entity['uid']['id']}#{index}")
+            bucket_entity = dict(bucket_entity, uid=uid, attrs=dict(bucket_entity["attrs"], environment=environment))
+            template = templates.setdefault(template_entity["uid"]["id"], dict(
+                template_entity, attrs=dict(template_entity["attrs"], s3_resources=[])))
+            template["attrs"]["s3_resources"].append(uid)
+            buckets.append(bucket_entity)
+            requests.append(bucket_request(bucket_entity))
+        entities = [validator_entity()] + list(templates.values()) + buckets
+        decisions = self._evaluate(self.shift_left, "shift-left-live-environment", entities, requests)
+        return {index: decision for (index, _, _), decision in zip(joined, decisions)}
+
+    def _record(self, bucket_name: str, kind: str, matched_by: str, template: TemplateBucket,
+                template_decision: str, live_decision: str) -> Dict[str, Any]:
+        return {
+            "bucket": bucket_name,
+            "mismatch": kind,
+            "matched_by": matched_by,
+            "template": template.template,
+            "template_id": template.template_id,
+            "logical_id": template.logical_id,
+            "shift_left": {"decision": template_decision, "compliant": template_decision == "ALLOW",
+                           "policy_hash": self.shift_left_hash},
+            "shift_right": {"decision": live_decision, "compliant": live_decision == "ALLOW",
+                            "policy_hash": self.shift_right_hash},
+        }
+
+    def _compare_chunk(self, live: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        requests = [compliance_request(entity) for entity in live]
+        decisions = list(self._evaluate(self.shift_right, "shift-right",
+                                        [config_evaluation_entity()] + live, requests))
+        joined = [(entity, decision) + self.lookup(entity["uid"]["id"]) for entity, decision in zip(live, decisions)]
+        live_environments = [(index, position, entity["attrs"]["environment"])
+                             for index, (entity, _, position, _) in enumerate(joined)
+                             if position is not None and self.buckets[position].entities is not None
+                             and entity.get("attrs", {}).get("environment")]
+        relabelled = self._reevaluate_templates(live_environments) if live_environments else {}
+
+        for index, (entity, live_decision, position, matched_by) in enumerate(joined):
+            bucket_name = entity["uid"]["id"]
+            if position is None:
+                self.counts["unmatched_live"] += 1
+                continue
+            self._matched[position] = 1
+            self.counts["matched"] += 1
+
+            template = self.buckets[position]
+            template_decision = template.decision
+            if template.entities is not None:
+                if index not in relabelled:
+                    self.counts["environment_unknown"] += 1
+                    yield self._record(bucket_name, ENVIRONMENT_UNKNOWN, matched_by, template,
+                                       template_decision, live_decision)
+                    continue
+                self.counts["environment_from_live"] += 1
+                template_decision = relabelled[index]
+            if "ERROR" in (template_decision, live_decision):
+                self.counts["errors"] += 1
+                yield self._record(bucket_name, EVALUATION_ERROR, matched_by, template,
+                                   template_decision, live_decision)
+                continue
+            if (template_decision == "ALLOW") == (live_decision == "ALLOW"):
+                self.counts["consistent"] += 1
+                continue
+            self.counts["mismatches"] += 1
+            yield self._record(bucket_name, TEMPLATE_COMPLIANT if template_decision == "ALLOW" else LIVE_COMPLIANT,
+                               matched_by, template, template_decision, live_decision)
+
+    def mismatches(self, inventory: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluate live buckets chunk by chunk and yield one record per mismatch,
+        evaluation error or bucket whose environment is unknown on both sides.
+
+        Args:
+            inventory: S3Resource entities (inventory file lines) or collector
+                items of the form {"entity": ..., "account_id": ...}
+        """
+        chunk: List[Dict[str, Any]] = []
+        for item in inventory:
+            chunk.append(item.get("entity", item))
+            self.counts["live_buckets"] += 1
+            if len(chunk) >= self.chunk_size:
+                yield from self._compare_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._compare_chunk(chunk)
+
+    def summary(self) -> Dict[str, Any]:
+        return dict(
+            self.counts,
+            template_buckets=len(self.buckets),
+            unmatched_template=len(self._matched) - sum(self._matched),
+            shift_left_policy_hash=self.shift_left_hash,
+            shift_right_policy_hash=self.shift_right_hash,
+            same_policy_set=self.shift_left_hash == self.shift_right_hash,
+        )
+
+
+def _read_jsonl(handle: IO[str]) -> Iterator[Dict[str, Any]]:
+    for line in handle:
+        if line.strip():
+            yield json.loads(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report buckets whose template and live decisions disagree")
+    parser.add_argument("paths", nargs="*", default=[str(PROJECT_ROOT / "examples" / "cloudformation")],
+                        help="Template files or directories (default: examples/cloudformation)")
+    parser.add_argument("--inventory", required=True,
+                        help="JSONL S3 inventory from s3_inventory.py ('-' for stdin)")
+    parser.add_argument("--out", default="-",
+                        help="JSONL output of mismatches, evaluation errors and unknown environments ('-' for stdout)")
+    parser.add_argument("--policies", default="cedar_policies", help="Policy directory for templates")
+    parser.add_argument("--live-policies", help="Policy directory for live buckets (default: --policies)")
+    parser.add_argument("--backend", default="python", choices=("python", "pool", "cli"))
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Buckets per evaluation batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Template parser processes")
+    parser.add_argument("--environment", default="development",
+                        help="Environment for template buckets without an Environment tag or parameter")
+    args = parser.parse_args(argv)
+
+    root = os.path.commonpath([os.path.abspath(p) for p in args.paths])
+    if os.path.isfile(root):
+        root = os.path.dirname(root)
+
+    start = time.time()
+    with ConsistencyEngine(args.policies, args.live_policies, backend=args.backend,
+                           pool_size=args.pool_size, chunk_size=args.chunk_size) as engine:
+        engine.index_templates(args.paths, root, args.workers, args.environment)
+        inventory = sys.stdin if args.inventory == "-" else open(args.inventory)
+        out = sys.stdout if args.out == "-" else open(args.out, "w")
+        try:
+            for record in engine.mismatches(_read_jsonl(inventory)):
+                out.write(json.dumps(record) + "\n")
+        finally:
+            if inventory is not sys.stdin:
+                inventory.close()
+            if out is not sys.stdout:
+                out.close()
+        summary = dict(engine.summary(), seconds=round(time.time() - start, 3))
+
+    print(json.dumps({"consistency": summary}), file=sys.stderr)
+    if not summary["same_policy_set"]:
+        print("WARNING: templates and live buckets were evaluated with different policy sets", file=sys.stderr)
+    if summary["errors"]:
+        print(f"WARNING: {summary['errors']} bucket(s) could not be evaluated on one side", file=sys.stderr)
+    return 1 if summary["mismatches"] or summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Decision Cache
+
+Caches authorization outcomes keyed by a SHA-256 over the policy set, the
+schema, the canonicalised slice of entities the request can reach, and the
+request itself. Identical checks (same bucket configuration under the same
+policy revision) are answered without evaluating again.
+
+- Bounded in-memory LRU
+- Optional on-disk store that can be shared across CI runs
+- Automatic invalidation when any policy file or the schema changes
+- Hit/miss counters exposed through stats()
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cedar_evaluator import entity_refs, parse_entity_uid
+from file_utils import atomic_write
+
+
+def entity_slice(entities: Dict[Tuple[str, str], Dict[str, Any]],
+                 roots: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Return the transitive closure of entities reachable from roots.
+
+    Parents and entity references in attributes are followed, so the slice
+    contains everything a policy evaluation for the request could read.
+    """
+    seen = set()
+    pending = list(roots)
+    found = []
+    while pending:
+        uid = pending.pop()
+        if uid in seen:
+            continue
+        seen.add(uid)
+        entity = entities.get(uid)
+        if entity is None:
+            continue
+        found.append(entity)
+        pending.extend((parent["type"], parent["id"]) for parent in entity.get("parents", []))
+        pending.extend(entity_refs(entity.get("attrs", {})))
+    return sorted(found, key=lambda entity: (entity["uid"]["type"], entity["uid"]["id"]))
+
+
+class PolicyFingerprint:
+    """Content hash of the policy directory and schema, refreshed when files change."""
+
+    def __init__(self, policy_dir: Path, schema_file: Optional[Path], check_interval: float = 1.0):
+        self.policy_dir = Path(policy_dir)
+        self.schema_file = Path(schema_file) if schema_file else None
+        self.check_interval = check_interval
+        self._signature = None
+        self._digest = ""
+        self._checked_at = 0.0
+
+    def _files(self) -> List[Path]:
+        if self.policy_dir.is_file():
+            files = [self.policy_dir]
+        else:
+            files = sorted(path for path in self.policy_dir.rglob("*") if path.is_file())
+        if self.schema_file and self.schema_file.exists():
+            files.append(self.schema_file)
+        return files
+
+    def current(self) -> Tuple[str, bool]:
+        """
+        Returns:
+            Tuple of (digest, changed) where changed is True if files changed since the last call
+        """
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.check_interval:
+            return self._digest, False
+        self._checked_at = now
+
+        files = self._files()
+        signature = tuple((str(path), path.stat().st_mtime_ns, path.stat().st_size) for path in files)
+        if signature == self._signature:
+            return self._digest, False
+
+        changed = self._signature is not None
+        self._signature = signature
+        self._digest = self.digest({self._name(path): path.read_bytes() for path in files})
+        return self._digest, changed
+
+    def snapshot(self) -> Tuple[str, Dict[Path, bytes]]:
+        """
+        Read every file once, for callers that must hash exactly what they load.
+
+        Returns:
+            Tuple of (digest of these bytes, {path: bytes})
+        """
+        contents = {path: path.read_bytes() for path in self._files()}
+        return self.digest({self._name(path): data for path, data in contents.items()}), contents
+
+    def _name(self, path: Path) -> str:
+        """Checkout-independent name: relative to policy_dir, schema by file name."""
+        if self.schema_file is not None and path == self.schema_file:
+            return f"schema/{path.name}"
+        if self.policy_dir.is_file():
+            return path.name
+        return path.relative_to(self.policy_dir).as_posix()
+
+    @staticmethod
+    def digest(contents: Dict[str, bytes]) -> str:
+        """SHA-256 over (name, content) pairs, the same wherever the files are checked out."""
+        digest = hashlib.sha256()
+        for name in sorted(contents):
+            digest.update(name.encode())
+            digest.update(b"\0")
+            digest.update(contents[name])
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+class DecisionCache:
+    """Bounded LRU of authorization outcomes with an optional on-disk store."""
+
+    def __init__(self, policy_dir: Path, schema_file: Optional[Path] = None,
+                 max_entries: int = 10000, cache_dir: Optional[str] = None,
+                 check_interval: float = 1.0):
+        self.fingerprint = PolicyFingerprint(policy_dir, schema_file, check_interval)
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._entity_files: Dict[str, Tuple[int, Dict[Tuple[str, str], Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _load_entities(self, entities_file: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        mtime = os.stat(entities_file).st_mtime_ns
+        cached = self._entity_files.get(entities_file)
+        if cached is None or cached[0] != mtime:
+            with open(entities_file) as handle:
+                data = json.load(handle)
+            index = {(item["uid"]["type"], item["uid"]["id"]): item for item in data}
+            cached = (mtime, index)
+            self._entity_files[entities_file] = cached
+        return cached[1]
+
+    def _policy_digest(self) -> str:
+        digest, changed = self.fingerprint.current()
+        if changed:
+            with self._lock:
+                self._memory.clear()
+                self.invalidations += 1
+        return digest
+
+    def key(self, principal: str, action: str, resource: str, entities_file: str,
+            context: Optional[Dict[str, Any]] = None) -> str:
+        """Compute the content address for one request."""
+        if os.path.isdir(entities_file):
+            from indexed_entity_store import open_store
+            entities = open_store(entities_file).slice_request(principal, action, resource, context)
+        else:
+            roots = [parse_entity_uid(principal), parse_entity_uid(action), parse_entity_uid(resource)]
+            roots.extend(entity_refs(context or {}))
+            entities = entity_slice(self._load_entities(entities_file), roots)
+        material = {
+            "policies": self._policy_digest(),
+            "entities": entities,
+            "request": [principal, action, resource, context or {}],
+        }
+        encoded = json.dumps(material, sort_keys=True, separators=(",", ":")).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            outcome = self._memory.get(key)
+            if outcome is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return outcome
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key)) as handle:
+                    outcome = json.load(handle)
+            except (OSError, ValueError):
+                outcome = None
+            if outcome is not None:
+                self._remember(key, outcome)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return outcome
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, outcome: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = outcome
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key: str, outcome: Dict[str, Any]) -> None:
+        self._remember(key, outcome)
+        if self.cache_dir:
+            # Write then rename so concurrent CI jobs never read a partial file
+            atomic_write(self._disk_path(key), json.dumps(outcome))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+        }
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Append-Only Decision Audit Log
+
+Records every authorization decision as one compact JSON line:
+
+    {"ts": 1736416800.123, "request": "<request hash>", "policy": "<policy-set hash>",
+     "decision": "DENY", "policies": ["policy0"], "context": "shift-right",
+     "principal": "...", "action": "...", "resource": "S3Resource::\\"bucket\\"",
+     "seconds": 0.00041, "phases": {"evaluate": 0.00012, ...}}
+
+Hashes are the first 16 hex digits of the SHA-256 of the canonical request
+(principal, action, resource, context) and of the policy directory and schema.
+
+Writes are buffered: record() only appends to an in-memory list, and a
+background thread serializes the buffer and appends it to the current segment
+in a single write every flush_records records or flush_interval seconds.
+Segments (decisions-NNNNNN.jsonl) rotate at a size or age limit; when a segment
+is sealed its sidecar index (decisions-NNNNNN.idx.json) maps every resource to
+the byte offsets of its records and one summary line (time range, record and
+decision counts) is appended to catalog.jsonl. Queries use the catalog to skip
+segments outside the time range or without the decision asked for, and the
+index to seek straight to a resource's records instead of scanning segments.
+Only the unsealed segment of a running writer is scanned.
+
+One writer per log directory. A writer starts a new segment on open and seals
+segments left unsealed by a previous writer that did not close cleanly.
+
+Usage:
+    python3 tests/atdd/support/cedar_policy_runner.py batch --entities entities.json \
+        --requests requests.jsonl --decision-log /tmp/decisions
+    python3 tests/atdd/support/decision_log.py query /tmp/decisions --decision DENY \
+        --resource insecure-bucket --since 2025-01-09
+    python3 tests/atdd/support/decision_log.py stats /tmp/decisions
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from file_utils import atomic_write
+
+SEGMENT_PATTERN = re.compile(r"^decisions-(\d{6})\.jsonl$")
+CATALOG = "catalog.jsonl"
+HASH_DIGITS = 16
+DETERMINING_NOTE = "note: this decision was due to the following policies:"
+
+
+def request_hash(principal: str, action: str, resource: str, context: Optional[Dict[str, Any]]) -> str:
+    """Short content hash identifying one authorization request."""
+    material = json.dumps([principal, action, resource, context or {}], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode()).hexdigest()[:HASH_DIGITS]
+
+
+def determining_policies(stdout: str) -> List[str]:
+    """Policy IDs listed in cedar CLI style output after the determining-policies note."""
+    policies = []
+    listing = False
+    for line in (stdout or "").splitlines():
+        if line.strip() == DETERMINING_NOTE:
+            listing = True
+        elif listing:
+            if not line.startswith("  "):
+                break
+            policies.append(line.strip())
+    return policies
+
+
+def parse_time(value: str) -> float:
+    """Epoch seconds from epoch seconds or an ISO 8601 date/time (UTC when no offset is given)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _segment_name(number: int) -> str:
+    return f"decisions-{number:06d}.jsonl"
+
+
+def _index_name(segment: str) -> str:
+    return segment[:-len(".jsonl")] + ".idx.json"
+
+
+# =============================================================================
+# SEGMENT INDEX
+# =============================================================================
+
+class SegmentIndex:
+    """Time range, decision counts and per-resource record offsets of one segment."""
+
+    def __init__(self, segment: str):
+        self.segment = segment
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.records = 0
+        self.bytes = 0
+        self.decisions: Dict[str, int] = {}
+        self.resources: Dict[str, List[int]] = {}
+
+    def add(self, record: Dict[str, Any], offset: int, length: int) -> None:
+        ts = record["ts"]
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.records += 1
+        self.bytes = offset + length
+        self.decisions[record["decision"]] = self.decisions.get(record["decision"], 0) + 1
+        self.resources.setdefault(record["resource"], []).append(offset)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"segment": self.segment, "first_ts": self.first_ts, "last_ts": self.last_ts,
+                "records": self.records, "bytes": self.bytes, "decisions": self.decisions}
+
+    @classmethod
+    def scan(cls, path: Path) -> "SegmentIndex":
+        """Index a segment by reading it, ignoring a torn final line."""
+        index = cls(path.name)
+        offset = 0
+        with open(path, "rb") as handle:
+            for line in handle:
+                if line.endswith(b"\n"):
+                    try:
+                        index.add(json.loads(line), offset, len(line))
+                    except (ValueError, KeyError):
+                        pass
+                offset += len(line)
+        return index
+
+
+
+# =============================================================================
+# WRITER
+# =============================================================================
+
+class DecisionLog:
+    """Buffered, segmented, append-only writer of decision records."""
+
+    def __init__(self, log_dir: str, policy_dir: Optional[Path] = None, schema_file: Optional[Path] = None,
+                 segment_bytes: int = 64 * 1024 * 1024, segment_seconds: float = 3600.0,
+                 max_segments: int = 0, flush_records: int = 1024, flush_interval: float = 1.0,
+                 max_pending: int = 100000, fsync: bool = False):
+        """
+        Args:
+            log_dir: Directory holding the segments, their indexes and the catalog
+            policy_dir: Policy directory hashed for records logged without a policy hash
+            schema_file: Cedar schema hashed together with policy_dir
+            segment_bytes: Rotate the current segment once it reaches this size
+            segment_seconds: Rotate the current segment once it is this old (0 disables)
+            max_segments: Delete the oldest sealed segments beyond this many (0 keeps all)
+            flush_records: Wake the writer once this many records are buffered
+            flush_interval: Longest time a record stays buffered
+            max_pending: record() waits for the writer while this many records are buffered
+            fsync: fsync every flush, trading throughput for durability across power loss
+        """
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = None
+        if policy_dir is not None:
+            from decision_cache import PolicyFingerprint
+            self.fingerprint = PolicyFingerprint(policy_dir, schema_file, check_interval=1.0)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_segments = max_segments
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.stats = {"records": 0, "flushes": 0, "segments": 0, "stalls": 0, "write_errors": 0}
+
+        self._pending: List[Tuple] = []
+        self._recorded = 0
+        self._done = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._handle = None
+        self._index: Optional[SegmentIndex] = None
+        self._opened_at = 0.0
+
+        existing = sorted(int(match.group(1)) for match in
+                          (SEGMENT_PATTERN.match(path.name) for path in self.log_dir.iterdir()) if match)
+        self._recover(existing)
+        self._number = existing[-1] if existing else 0
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="cedar-decision-log", daemon=True)
+        self._thread.start()
+
+    # -------------------------------------------------------------------------
+    # Authorization path
+    # -------------------------------------------------------------------------
+
+    def record(self, principal: str, action: str, resource: str, request_context: Optional[Dict[str, Any]],
+               result: Dict[str, Any], policy_hash: Optional[str] = None) -> None:
+        """Buffer one decision; serialization and I/O happen on the writer thread."""
+        if policy_hash is None and self.fingerprint is not None:
+            policy_hash = self.fingerprint.current()[0]
+        entry = (time.time(), principal, action, resource, request_context, result, policy_hash)
+        with self._lock:
+            self._pending.append(entry)
+            self._recorded += 1
+            pending = len(self._pending)
+        if pending >= self.flush_records:
+            self._wake.set()
+        if pending >= self.max_pending:
+            self.stats["stalls"] += 1
+            while len(self._pending) >= self.max_pending and self._thread.is_alive():
+                self._wake.set()
+                time.sleep(0.001)
+
+    def flush(self) -> None:
+        """Wait until everything recorded so far has been written (or dropped on a write error)."""
+        target = self._recorded
+        while self._done < target and self._thread.is_alive():
+            self._wake.set()
+            time.sleep(0.001)
+
+    def close(self) -> None:
+        """Flush buffered records and seal the current segment."""
+        if self._closing:
+            return
+        self._closing = True
+        self._wake.set()
+        self._thread.join()
+        self._seal()
+
+    # -------------------------------------------------------------------------
+    # Writer thread
+    # -------------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closing
+            self._drain()
+            if closing:
+                return
+            if self.segment_seconds and time.time() - self._opened_at >= self.segment_seconds \
+                    and self._index.records:
+                self._rotate()
+
+    def _drain(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        records = [self._to_record(*entry) for entry in pending]
+        lines = [(json.dumps(record, separators=(",", ":")) + "\n").encode() for record in records]
+        start = 0
+        while start < len(lines):
+            # Fill the current segment up to segment_bytes, then continue in a new one
+            end, size = start, self._index.bytes
+            while end < len(lines) and (end == start or size + len(lines[end]) <= self.segment_bytes):
+                size += len(lines[end])
+                end += 1
+            self._write(records[start:end], lines[start:end])
+            start = end
+            if self._index.bytes >= self.segment_bytes or start < len(lines):
+                self._rotate()
+
+    def _write(self, records: List[Dict[str, Any]], lines: List[bytes]) -> None:
+        try:
+            offset = self._index.bytes
+            self._handle.write(b"".join(lines))
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            self._done += len(lines)
+            print(f"WARNING: decision log dropped {len(lines)} record(s): {e}", file=sys.stderr)
+            return
+        for record, line in zip(records, lines):
+            self._index.add(record, offset, len(line))
+            offset += len(line)
+        self.stats["records"] += len(records)
+        self.stats["flushes"] += 1
+        self._done += len(records)
+
+    @staticmethod
+    def _to_record(ts: float, principal: str, action: str, resource: str,
+                   request_context: Optional[Dict[str, Any]], result: Dict[str, Any],
+                   policy_hash: Optional[str]) -> Dict[str, Any]:
+        record = {
+            "ts": round(ts, 6),
+            "request": request_hash(principal, action, resource, request_context),
+            "policy": (policy_hash or "")[:HASH_DIGITS],
+            "decision": result["decision"],
+            "policies": determining_policies(result.get("stdout", "")),
+            "context": result.get("context"),
+            "principal": principal,
+            "action": action,
+            "resource": resource,
+            "seconds": round(result.get("execution_time_seconds", 0.0), 6),
+            "phases": {phase: round(seconds, 6) for phase, seconds in result.get("phases", {}).items()},
+        }
+        if result.get("error"):
+            record["error"] = result["error"]
+        return record
+
+    # -------------------------------------------------------------------------
+    # Segments
+    # -------------------------------------------------------------------------
+
+    def _open_segment(self) -> None:
+        self._number += 1
+        name = _segment_name(self._number)
+        self._handle = open(self.log_dir / name, "ab")
+        self._index = SegmentIndex(name)
+        self._opened_at = time.time()
+        self.stats["segments"] += 1
+
+    def _seal(self) -> None:
+        with self._lock:
+            handle, self._handle = self._handle, None
+        if handle is None:
+            return
+        handle.close()
+        self._seal_index(self._index)
+
+    def _seal_index(self, index: SegmentIndex) -> None:
+        path = self.log_dir / index.segment
+        if not index.records:
+            path.unlink()
+            return
+        data = index.summary()
+        data["resources"] = index.resources
+        atomic_write(self.log_dir / _index_name(index.segment), json.dumps(data, separators=(",", ":")))
+        with open(self.log_dir / CATALOG, "a") as catalog:
+            catalog.write(json.dumps(index.summary(), separators=(",", ":")) + "\n")
+        if self.max_segments:
+            self._expire()
+
+    def _rotate(self) -> None:
+        self._seal()
+        self._open_segment()
+
+    def _recover(self, numbers: List[int]) -> None:
+        """Seal segments a previous writer left without an index."""
+        for number in numbers:
+            name = _segment_name(number)
+            if not (self.log_dir / _index_name(name)).exists():
+                self._seal_index(SegmentIndex.scan(self.log_dir / name))
+
+    def _expire(self) -> None:
+        catalog = read_catalog(self.log_dir)
+        if len(catalog) <= self.max_segments:
+            return
+        expired, kept = catalog[:-self.max_segments], catalog[-self.max_segments:]
+        atomic_write(self.log_dir / CATALOG, "".join(json.dumps(entry, separators=(",", ":")) + "\n"
+                                                      for entry in kept))
+        for entry in expired:
+            for name in (entry["segment"], _index_name(entry["segment"])):
+                try:
+                    (self.log_dir / name).unlink()
+                except FileNotFoundError:
+                    pass
+
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def read_catalog(log_dir: Path) -> List[Dict[str, Any]]:
+    """Summaries of the sealed segments, oldest first."""
+    path = Path(log_dir) / CATALOG
+    if not path.exists():
+        return []
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _resource_matches(key: str, resource: str) -> bool:
+    """Match a full entity UID, or just the entity ID when resource has no type."""
+    if "::" in resource:
+        return key == resource
+    return key.endswith(f'::"{resource}"')
+
+
+def query(log_dir: str, decision: Optional[str] = None, resource: Optional[str] = None,
+          since: Optional[float] = None, until: Optional[float] = None, policy: Optional[str] = None,
+          context: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield matching records, oldest segment first.
+
+    Args:
+        log_dir: Decision log directory
+        decision: Only this decision (ALLOW, DENY or ERROR)
+        resource: Only this resource UID, or any resource with this entity ID
+        since: Only records at or after this epoch time
+        until: Only records before this epoch time
+        policy: Only records whose policy-set hash starts with this
+        context: Only this validation context (shift-left, shift-right, ...)
+        limit: Stop after this many records
+    """
+    log_dir = Path(log_dir)
+
+    def wanted(record: Dict[str, Any]) -> bool:
+        return ((decision is None or record["decision"] == decision)
+                and (resource is None or _resource_matches(record["resource"], resource))
+                and (since is None or record["ts"] >= since)
+                and (until is None or record["ts"] < until)
+                and (policy is None or record["policy"].startswith(policy[:HASH_DIGITS]))
+                and (context is None or record["context"] == context))
+
+    def segment_records(entry: Optional[Dict[str, Any]], name: str) -> Iterator[Dict[str, Any]]:
+        path = log_dir / name
+        if entry is not None and resource is not None:
+            with open(log_dir / _index_name(name)) as handle:
+                resources = json.load(handle)["resources"]
+            offsets = sorted(offset for key, positions in resources.items()
+                             if _resource_matches(key, resource) for offset in positions)
+            with open(path, "rb") as handle:
+                for offset in offsets:
+                    handle.seek(offset)
+                    yield json.loads(handle.readline())
+            return
+        with open(path, "rb") as handle:
+            for line in handle:
+                if line.endswith(b"\n"):
+                    yield json.loads(line)
+
+    catalog = read_catalog(log_dir)
+    sealed = {entry["segment"] for entry in catalog}
+    plan = [(entry, entry["segment"]) for entry in catalog
+            if not ((since is not None and entry["last_ts"] < since)
+                    or (until is not None and entry["first_ts"] >= until)
+                    or (decision is not None and not entry["decisions"].get(decision)))]
+    plan += [(None, path.name) for path in sorted(log_dir.iterdir())
+             if SEGMENT_PATTERN.match(path.name) and path.name not in sealed]
+
+    found = 0
+    for entry, name in plan:
+        try:
+            for record in segment_records(entry, name):
+                if wanted(record):
+                    yield record
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+        except FileNotFoundError:
+            # Expired by retention while we were reading
+            continue
+
+
+def log_stats(log_dir: str) -> Dict[str, Any]:
+    """Totals over the sealed segments."""
+    catalog = read_catalog(Path(log_dir))
+    decisions: Dict[str, int] = {}
+    for entry in catalog:
+        for decision, count in entry["decisions"].items():
+            decisions[decision] = decisions.get(decision, 0) + count
+    return {
+        "segments": len(catalog),
+        "records": sum(entry["records"] for entry in catalog),
+        "bytes": sum(entry["bytes"] for entry in catalog),
+        "first_ts": min((entry["first_ts"] for entry in catalog), default=None),
+        "last_ts": max((entry["last_ts"] for entry in catalog), default=None),
+        "decisions": decisions,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Query the Cedar decision audit log")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = subparsers.add_parser("query", help="Print matching decision records as JSONL")
+    query_parser.add_argument("log_dir")
+    query_parser.add_argument("--decision", choices=("ALLOW", "DENY", "ERROR"))
+    query_parser.add_argument("--resource", help='Resource UID (S3Resource::"name") or entity ID')
+    query_parser.add_argument("--since", help="ISO 8601 date/time or epoch seconds")
+    query_parser.add_argument("--until", help="ISO 8601 date/time or epoch seconds")
+    query_parser.add_argument("--policy", help="Policy-set hash (or prefix)")
+    query_parser.add_argument("--context", help="Validation context, e.g. shift-left or shift-right")
+    query_parser.add_argument("--limit", type=int)
+
+    stats_parser = subparsers.add_parser("stats", help="Print segment, record and decision totals")
+    stats_parser.add_argument("log_dir")
+
+    args = parser.parse_args(argv)
+    if args.command == "stats":
+        print(json.dumps(log_stats(args.log_dir), indent=2))
+        return 0
+    records = query(args.log_dir, decision=args.decision, resource=args.resource,
+                    since=parse_time(args.since) if args.since else None,
+                    until=parse_time(args.until) if args.until else None,
+                    policy=args.policy, context=args.context, limit=args.limit)
+    for record in records:
+        print(json.dumps(record, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
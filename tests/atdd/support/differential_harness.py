@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Differential Harness: Python Evaluator vs Cedar CLI
+
+Replays every request in the tests/<suite>/{ALLOW,DENY} directories and every
+inline test block in tests/*.test against both the in-process Python evaluator
+and the cedar CLI, and fails on any disagreement between the two engines.
+
+Usage:
+    python3 tests/atdd/support/differential_harness.py [--tests tests] [--json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cedar_evaluator import CedarEvaluator, EntityStore, load_policy_files
+from cedar_test_files import discover_cases
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+
+class CliOracle:
+    """Evaluate cases with the cedar CLI against the same policy bundle."""
+
+    def __init__(self, policy_dir: Path, schema_file: Optional[Path], timeout: float = 10.0):
+        self.schema_file = schema_file
+        self.timeout = timeout
+        self.workdir = tempfile.mkdtemp(prefix="cedar-differential-")
+        # Bundle the files in the order the Python evaluator reads them so
+        # positional policy IDs line up between the two engines.
+        self.policy_bundle = os.path.join(self.workdir, "policies.cedar")
+        with open(self.policy_bundle, "w") as handle:
+            handle.write("\n".join(text for _, text in load_policy_files(policy_dir)))
+
+    def decide(self, case: Dict[str, Any]) -> Dict[str, Any]:
+        request_file = os.path.join(self.workdir, "request.json")
+        with open(request_file, "w") as handle:
+            json.dump(case["request"], handle)
+
+        entities_file = case.get("entities_file")
+        if entities_file is None:
+            entities_file = os.path.join(self.workdir, "entities.json")
+            with open(entities_file, "w") as handle:
+                json.dump(case["entities"], handle)
+
+        cmd = ["cedar", "authorize", "--policies", self.policy_bundle,
+               "--entities", entities_file, "--request-json", request_file]
+        if self.schema_file:
+            cmd += ["--schema", str(self.schema_file)]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        return {
+            "decision": "ALLOW" if result.returncode == 0 else "DENY",
+            "detail": (result.stdout + result.stderr).strip(),
+        }
+
+    def close(self) -> None:
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def run_differential(tests_dir: Path, policy_dir: Path, schema_file: Optional[Path],
+                     entities_file: Path) -> List[Dict[str, Any]]:
+    """
+    Evaluate every discovered case with both engines.
+
+    Returns:
+        One dict per case with the python and cli decisions and an agree flag
+    """
+    evaluator = CedarEvaluator.from_files(policy_dir, schema_file)
+    oracle = CliOracle(policy_dir, schema_file)
+    entity_cache: Dict[str, EntityStore] = {}
+    results = []
+
+    try:
+        for case in discover_cases(tests_dir, entities_file):
+            if "entities_file" in case:
+                path = case["entities_file"]
+                if path not in entity_cache:
+                    entity_cache[path] = EntityStore.from_file(path)
+                entities = entity_cache[path]
+            else:
+                entities = EntityStore.from_json(case["entities"])
+
+            python_response = evaluator.authorize_request(case["request"], entities)
+            cli_response = oracle.decide(case)
+            results.append({
+                "name": case["name"],
+                "source": case["source"],
+                "expected": case["expected"],
+                "python": python_response.decision,
+                "python_policies": python_response.determining_policies,
+                "python_errors": python_response.errors,
+                "cli": cli_response["decision"],
+                "cli_detail": cli_response["detail"],
+                "agree": python_response.decision == cli_response["decision"],
+            })
+    finally:
+        oracle.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the Python Cedar evaluator with the cedar CLI")
+    parser.add_argument("--tests", default=str(PROJECT_ROOT / "tests"), help="Tests directory")
+    parser.add_argument("--policies", default=str(PROJECT_ROOT / "cedar_policies"), help="Policy directory")
+    parser.add_argument("--schema", default=str(PROJECT_ROOT / "schema.cedarschema"), help="Schema file")
+    parser.add_argument("--entities", default=str(PROJECT_ROOT / "tests" / "fixtures" / "entities.json"),
+                        help="Entities file for --request-json suites")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args(argv)
+
+    if shutil.which("cedar") is None:
+        print("cedar CLI not found; install it with ./scripts/install-cedar-fast.sh", file=sys.stderr)
+        return 2
+
+    schema = Path(args.schema) if args.schema and os.path.exists(args.schema) else None
+    results = run_differential(Path(args.tests), Path(args.policies), schema, Path(args.entities))
+
+    disagreements = [result for result in results if not result["agree"]]
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            status = "AGREE" if result["agree"] else "DISAGREE"
+            print(f"{status:9} {result['name']}: python={result['python']} cli={result['cli']}")
+            if not result["agree"]:
+                print(f"          python policies={result['python_policies']} errors={result['python_errors']}")
+                print(f"          cli output: {result['cli_detail']}")
+
+    if not args.json:
+        print(f"\n{len(results)} cases, {len(disagreements)} disagreement(s)")
+    return 1 if disagreements else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
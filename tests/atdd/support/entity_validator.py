@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Schema-Aware Entity and Request Pre-Validation
+
+Checks Cedar entities and requests against schema.cedarschema in-process, so
+malformed inventory records are reported and dropped before they reach an
+evaluator instead of costing a cedar round trip or quietly turning into DENY.
+
+The schema is parsed once per file version and compiled into per-entity-type
+attribute checks (EntityValidator.for_schema caches them by path and mtime).
+validate_batch() groups a batch by entity type and runs each compiled check
+down the column of that attribute's values, so the per-entity work is a dict
+lookup and a type test per attribute. It reports, per entity:
+
+    - a missing or malformed uid, or an entity type the schema does not declare
+    - a missing "parents" list, or parents of types the schema does not allow
+    - missing required attributes, undeclared attributes and wrongly typed
+      values (a Bool given as "true", a Long as 3.0, a Set as a string, ...)
+    - a uid defined more than once in the batch (unless duplicates are allowed,
+      as when building an indexed store where later definitions win)
+
+and returns the valid entities with the bad ones removed.
+
+Usage:
+    python3 tests/atdd/support/entity_validator.py inventory.jsonl [--schema schema.cedarschema]
+    python3 tests/atdd/support/entity_validator.py inventory.jsonl --out valid.json --errors rejected.jsonl
+    python3 tests/atdd/support/indexed_entity_store.py build inventory.jsonl --out /tmp/store --schema schema.cedarschema
+    python3 tests/atdd/support/cedar_policy_runner.py batch --entities inventory.json --requests r.jsonl --prevalidate
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cedar_evaluator import CedarSyntaxError, parse_entity_uid
+from cedar_schema import CedarSchema
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+DEFAULT_BATCH_SIZE = 4096
+MISSING = object()
+
+# A compiled check returns None for a valid value or a short description of the problem
+Check = Callable[[Any], Optional[str]]
+
+
+class EntityError(NamedTuple):
+    index: int
+    uid: str
+    errors: List[str]
+
+
+class BatchResult(NamedTuple):
+    valid: List[Dict[str, Any]]
+    rejected: List[EntityError]
+
+
+def _uid_text(uid: Any) -> str:
+    if isinstance(uid, dict) and isinstance(uid.get("type"), str) and isinstance(uid.get("id"), str):
+        return f'{uid["type"]}::"{uid["id"]}"'
+    return json.dumps(uid)
+
+
+def _describe(value: Any) -> str:
+    text = json.dumps(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+
+# =============================================================================
+# COMPILED TYPE CHECKS
+# =============================================================================
+
+def compile_type(attr_type: Any) -> Check:
+    """Build a check for one resolved schema type tuple."""
+    kind = attr_type[0]
+    if kind == "String":
+        return lambda value: None if type(value) is str else f"expected String, got {_describe(value)}"
+    if kind == "Long":
+        return lambda value: None if type(value) is int else f"expected Long, got {_describe(value)}"
+    if kind == "Bool":
+        return lambda value: None if type(value) is bool else f"expected Bool, got {_describe(value)}"
+    if kind == "Entity":
+        entity_type = attr_type[1]
+
+        def check_entity(value: Any) -> Optional[str]:
+            uid = value.get("__entity", value) if isinstance(value, dict) else None
+            if not isinstance(uid, dict) or not isinstance(uid.get("id"), str):
+                return f"expected {entity_type} entity reference, got {_describe(value)}"
+            if uid.get("type") != entity_type:
+                return f"expected {entity_type} entity reference, got {_uid_text(uid)}"
+            return None
+        return check_entity
+    if kind == "Set":
+        element = compile_type(attr_type[1])
+
+        def check_set(value: Any) -> Optional[str]:
+            if not isinstance(value, list):
+                return f"expected Set, got {_describe(value)}"
+            for item in value:
+                problem = element(item)
+                if problem:
+                    return f"set element: {problem}"
+            return None
+        return check_set
+    if kind == "Record":
+        fields = [(name, required, compile_type(inner)) for name, (inner, required) in attr_type[1].items()]
+        declared = frozenset(attr_type[1])
+
+        def check_record(value: Any) -> Optional[str]:
+            if not isinstance(value, dict):
+                return f"expected Record, got {_describe(value)}"
+            for name, required, check in fields:
+                item = value.get(name, MISSING)
+                if item is MISSING:
+                    if required:
+                        return f"missing required field {name!r}"
+                    continue
+                problem = check(item)
+                if problem:
+                    return f"field {name!r}: {problem}"
+            extra = value.keys() - declared
+            return f"undeclared field(s) {sorted(extra)}" if extra else None
+        return check_record
+    raise ValueError(f"Unsupported schema type {attr_type!r}")
+
+
+class _CompiledEntityType(NamedTuple):
+    attributes: List[Tuple[str, bool, Check]]
+    declared: frozenset
+    parent_types: frozenset
+
+
+# =============================================================================
+# VALIDATOR
+# =============================================================================
+
+_cache: Dict[Tuple[str, int], "EntityValidator"] = {}
+_cache_lock = threading.Lock()
+
+
+class EntityValidator:
+    """Entity and request checks compiled once from a Cedar schema."""
+
+    def __init__(self, schema: CedarSchema):
+        self.schema = schema
+        self.entity_types: Dict[str, _CompiledEntityType] = {
+            name: _CompiledEntityType(
+                [(attr, required, compile_type(attr_type))
+                 for attr, (attr_type, required) in entity.attributes.items()],
+                frozenset(entity.attributes),
+                frozenset(entity.member_of),
+            )
+            for name, entity in schema.entity_types.items()
+        }
+        self.action_parents = {name: frozenset(parent.type for parent in action.member_of)
+                               for name, action in schema.actions.items()}
+        self._contexts = {name: compile_type(action.context) for name, action in schema.actions.items()
+                          if action.context is not None}
+
+    @classmethod
+    def for_schema(cls, schema_file: Any = PROJECT_ROOT / "schema.cedarschema") -> "EntityValidator":
+        """Parse and compile schema_file once, recompiling only after it changes."""
+        path = os.path.abspath(str(schema_file))
+        key = (path, os.stat(path).st_mtime_ns)
+        with _cache_lock:
+            validator = _cache.get(key)
+            if validator is None:
+                validator = _cache[key] = cls(CedarSchema.from_file(path))
+        return validator
+
+    def validate_batch(self, entities: List[Dict[str, Any]], allow_duplicates: bool = False) -> BatchResult:
+        """
+        Validate a batch of Cedar JSON entities.
+
+        Returns:
+            BatchResult with the valid entities in their original order and an
+            EntityError (batch index, uid, problems) for every rejected one
+        """
+        problems: Dict[int, List[str]] = {}
+        groups: Dict[str, List[int]] = {}
+        seen: Dict[Tuple[str, str], int] = {}
+
+        # Pass 1: structure, uniqueness and grouping by entity type
+        for index, entity in enumerate(entities):
+            if not isinstance(entity, dict):
+                problems[index] = [f"expected an entity object, got {_describe(entity)}"]
+                continue
+            uid = entity.get("uid")
+            if not (isinstance(uid, dict) and isinstance(uid.get("type"), str) and isinstance(uid.get("id"), str)):
+                problems[index] = ["missing or malformed uid"]
+                continue
+            entity_type = uid["type"]
+            key = (entity_type, uid["id"])
+            if key in seen and not allow_duplicates:
+                problems.setdefault(index, []).append(f"duplicate uid, first defined at index {seen[key]}")
+            else:
+                seen[key] = index
+            if "parents" not in entity:
+                problems.setdefault(index, []).append('missing "parents" list')
+            elif not isinstance(entity["parents"], list):
+                problems.setdefault(index, []).append(f'"parents" must be a list, got {_describe(entity["parents"])}')
+            if "attrs" in entity and not isinstance(entity["attrs"], dict):
+                problems.setdefault(index, []).append(f'"attrs" must be an object, got {_describe(entity["attrs"])}')
+                continue
+            groups.setdefault(entity_type, []).append(index)
+
+        # Pass 2: one column of attribute values at a time per entity type
+        for entity_type, indexes in groups.items():
+            if entity_type == "Action" or entity_type.endswith("::Action"):
+                self._check_actions(entities, indexes, problems)
+                continue
+            compiled = self.entity_types.get(entity_type)
+            if compiled is None:
+                for index in indexes:
+                    problems.setdefault(index, []).append(f"entity type {entity_type} is not declared in the schema")
+                continue
+            rows = [entities[index].get("attrs") or {} for index in indexes]
+            for attr, required, check in compiled.attributes:
+                for index, attrs in zip(indexes, rows):
+                    value = attrs.get(attr, MISSING)
+                    if value is MISSING:
+                        if required:
+                            problems.setdefault(index, []).append(f"missing required attribute {attr!r}")
+                        continue
+                    problem = check(value)
+                    if problem:
+                        problems.setdefault(index, []).append(f"attribute {attr!r}: {problem}")
+            declared = compiled.declared
+            for index, attrs in zip(indexes, rows):
+                extra = attrs.keys() - declared
+                if extra:
+                    problems.setdefault(index, []).append(f"undeclared attribute(s) {sorted(extra)}")
+            self._check_parents(entities, indexes, compiled.parent_types, problems)
+
+        valid = [entity for index, entity in enumerate(entities) if index not in problems]
+        rejected = [EntityError(index, _uid_text(entities[index].get("uid") if isinstance(entities[index], dict)
+                                                 else entities[index]), errors)
+                    for index, errors in sorted(problems.items())]
+        return BatchResult(valid, rejected)
+
+    def _check_actions(self, entities: List[Dict[str, Any]], indexes: List[int],
+                       problems: Dict[int, List[str]]) -> None:
+        for index in indexes:
+            action_id = entities[index]["uid"]["id"]
+            if action_id not in self.action_parents:
+                problems.setdefault(index, []).append(f"action {action_id!r} is not declared in the schema")
+            else:
+                self._check_parents(entities, [index], self.action_parents[action_id], problems)
+
+    @staticmethod
+    def _check_parents(entities: List[Dict[str, Any]], indexes: List[int], allowed: frozenset,
+                       problems: Dict[int, List[str]]) -> None:
+        for index in indexes:
+            parents = entities[index].get("parents")
+            if not isinstance(parents, list):
+                continue
+            for parent in parents:
+                if not (isinstance(parent, dict) and isinstance(parent.get("type"), str)
+                        and isinstance(parent.get("id"), str)):
+                    problems.setdefault(index, []).append(f"malformed parent {_describe(parent)}")
+                elif parent["type"] not in allowed:
+                    problems.setdefault(index, []).append(
+                        f"parent {_uid_text(parent)} is not allowed, expected one of {sorted(allowed)}")
+
+    def iter_valid(self, entities: Iterable[Dict[str, Any]], rejected: Optional[List[EntityError]] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE, allow_duplicates: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the valid entities of a large input, validating batch_size at a time.
+
+        Rejected entities are appended to rejected (with indexes into the whole
+        stream) when a list is given. Duplicate uids are only detected within a batch.
+        """
+        batch: List[Dict[str, Any]] = []
+        start = 0
+        for entity in entities:
+            batch.append(entity)
+            if len(batch) >= batch_size:
+                yield from self._flush(batch, start, rejected, allow_duplicates)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield from self._flush(batch, start, rejected, allow_duplicates)
+
+    def _flush(self, batch: List[Dict[str, Any]], start: int,
+               rejected: Optional[List[EntityError]], allow_duplicates: bool) -> List[Dict[str, Any]]:
+        result = self.validate_batch(batch, allow_duplicates)
+        if rejected is not None:
+            rejected.extend(error._replace(index=error.index + start) for error in result.rejected)
+        return result.valid
+
+    def request_errors(self, request: Dict[str, Any]) -> List[str]:
+        """Problems with a --request-json style request (empty when it is valid)."""
+        try:
+            principal, action, resource = (parse_entity_uid(request[field])
+                                           for field in ("principal", "action", "resource"))
+        except KeyError as e:
+            return [f"missing request field {e.args[0]!r}"]
+        except (CedarSyntaxError, TypeError) as e:
+            return [f"malformed entity uid: {e}"]
+        problem = self.schema.request_error(principal, action, resource)
+        if problem:
+            return [problem]
+        check = self._contexts.get(action.id)
+        if check is not None:
+            problem = check(request.get("context") or {})
+            if problem:
+                return [f"context: {problem}"]
+        return []
+
+
+def validate_entities_file(entities_file: str, schema_file: Any = PROJECT_ROOT / "schema.cedarschema",
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[List[Dict[str, Any]], List[EntityError]]:
+    """Validate an entities.json array or JSONL file, returning (valid entities, rejected)."""
+    from indexed_entity_store import iter_entities
+    rejected: List[EntityError] = []
+    validator = EntityValidator.for_schema(schema_file)
+    valid = list(validator.iter_valid(iter_entities(str(entities_file)), rejected, batch_size))
+    return valid, rejected
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate Cedar entities against the schema")
+    parser.add_argument("entities", help="entities.json array or JSONL file")
+    parser.add_argument("--schema", default=str(PROJECT_ROOT / "schema.cedarschema"))
+    parser.add_argument("--out", help="Write the valid entities here as a JSON array")
+    parser.add_argument("--errors", help="Write one JSON line per rejected entity here")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    valid, rejected = validate_entities_file(args.entities, args.schema, args.batch_size)
+    if args.out:
+        with open(args.out, "w") as handle:
+            json.dump(valid, handle)
+    if args.errors:
+        with open(args.errors, "w") as handle:
+            for error in rejected:
+                handle.write(json.dumps(error._asdict()) + "\n")
+    for error in rejected[:20]:
+        print(f"{error.uid} (#{error.index}): {'; '.join(error.errors)}", file=sys.stderr)
+    if len(rejected) > 20:
+        print(f"... and {len(rejected) - 20} more", file=sys.stderr)
+    print(json.dumps({"valid": len(valid), "rejected": len(rejected)}))
+    return 1 if rejected and not args.out else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
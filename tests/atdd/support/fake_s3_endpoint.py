@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Fake S3 / STS Endpoint
+
+A small local stand-in for the handful of S3 and STS calls the shift-right
+inventory collector makes, so sweeps can be exercised offline:
+
+- ListBuckets                  GET  /
+- GetBucketEncryption          GET  /<bucket>?encryption
+- GetBucketPolicy              GET  /<bucket>?policy
+- GetBucketLocation            GET  /<bucket>?location
+- sts:GetCallerIdentity        POST /  (Action=GetCallerIdentity)
+
+Requests are path-style and unauthenticated. S3 calls beyond a configurable
+number in flight (and, optionally, a random fraction of all S3 calls) are
+answered with 503 SlowDown to exercise throttling backoff, and every
+operation is counted so tests can assert how many calls were made.
+
+Usage:
+    python3 tests/atdd/support/fake_s3_endpoint.py --buckets 5000 [--port 0] [--capacity 16] [--throttle-rate 0.01]
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+ACCOUNT_ID = "123456789012"
+S3_XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+STS_XMLNS = "https://sts.amazonaws.com/doc/2011-06-15/"
+
+ENCRYPTION_POLICY = json.dumps({
+    "Version": "2012-10-17",
+    "Statement": [{
+        "Sid": "DenyUnencryptedUploads",
+        "Effect": "Deny",
+        "Principal": "*",
+        "Action": "s3:PutObject",
+        "Resource": "arn:aws:s3:::{bucket}/*",
+        "Condition": {"StringNotEquals": {"s3:x-amz-server-side-encryption": "AES256"}},
+    }],
+})
+
+
+def seeded_buckets(count: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Build a reproducible mix of bucket configurations.
+
+    Returns:
+        Dict of bucket name -> {"algorithm", "kms_key_id", "policy", "region"}
+    """
+    rng = random.Random(seed)
+    regions = ["us-east-1", "us-west-2", "eu-west-1"]
+    buckets = {}
+    for index in range(count):
+        name = f"inventory-bucket-{index:05d}"
+        algorithm = rng.choice(["AES256", "aws:kms", "aws:kms:dsse", None, None])
+        kms_key_id = (f"arn:aws:kms:us-east-1:{ACCOUNT_ID}:key/{index:08d}"
+                      if algorithm and algorithm.startswith("aws:kms") else None)
+        policy = ENCRYPTION_POLICY.replace("{bucket}", name) if rng.random() < 0.2 else None
+        buckets[name] = {"algorithm": algorithm, "kms_key_id": kms_key_id,
+                         "policy": policy, "region": rng.choice(regions)}
+    return buckets
+
+
+class FakeS3State:
+    """Bucket configurations, throttling settings and per-operation call counts."""
+
+    def __init__(self, buckets: Dict[str, Dict[str, Any]], throttle_rate: float = 0.0,
+                 capacity: Optional[int] = None, seed: int = 0):
+        self.buckets = buckets
+        self.throttle_rate = throttle_rate
+        self.capacity = capacity
+        self.calls: Dict[str, int] = {}
+        self.throttled = 0
+        self.in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def begin(self, operation: str) -> bool:
+        """Count a call and decide whether to throttle it; pair with end() unless throttled."""
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            throttle = operation != "GetCallerIdentity" and (
+                (self.capacity is not None and self.in_flight >= self.capacity)
+                or self._rng.random() < self.throttle_rate
+            )
+            if throttle:
+                self.throttled += 1
+            else:
+                self.in_flight += 1
+            return throttle
+
+    def end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeS3Server"
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "application/xml") -> None:
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("x-amz-request-id", "FAKE")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, code: str, message: str) -> None:
+        self._send(status, f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                           f"<Error><Code>{code}</Code><Message>{escape(message)}</Message>"
+                           f"<RequestId>FAKE</RequestId></Error>")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        if form.get("Action", [""])[0] != "GetCallerIdentity":
+            self._error(400, "InvalidAction", "Only GetCallerIdentity is supported")
+            return
+        self.server.state.begin("GetCallerIdentity")
+        self.server.state.end()
+        self._send(200, f'<GetCallerIdentityResponse xmlns="{STS_XMLNS}"><GetCallerIdentityResult>'
+                        f"<Arn>arn:aws:iam::{ACCOUNT_ID}:user/inventory</Arn>"
+                        f"<UserId>AIDAFAKE</UserId><Account>{ACCOUNT_ID}</Account>"
+                        f"</GetCallerIdentityResult><ResponseMetadata><RequestId>FAKE</RequestId>"
+                        f"</ResponseMetadata></GetCallerIdentityResponse>", "text/xml")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        bucket_name = unquote(url.path.strip("/"))
+        query = parse_qs(url.query, keep_blank_values=True)
+        state = self.server.state
+
+        if not bucket_name:
+            operation = "ListBuckets"
+        elif "encryption" in query:
+            operation = "GetBucketEncryption"
+        elif "policy" in query:
+            operation = "GetBucketPolicy"
+        elif "location" in query:
+            operation = "GetBucketLocation"
+        else:
+            self._error(400, "NotImplemented", f"Unsupported request {self.path}")
+            return
+
+        if state.begin(operation):
+            self._error(503, "SlowDown", "Please reduce your request rate.")
+            return
+        try:
+            self._respond(state, operation, bucket_name)
+        finally:
+            state.end()
+
+    def _respond(self, state: FakeS3State, operation: str, bucket_name: str) -> None:
+        if operation == "ListBuckets":
+            entries = "".join(f"<Bucket><Name>{escape(name)}</Name>"
+                              f"<CreationDate>2025-01-01T00:00:00.000Z</CreationDate></Bucket>"
+                              for name in state.buckets)
+            self._send(200, f'<ListAllMyBucketsResult xmlns="{S3_XMLNS}">'
+                            f"<Owner><ID>fake</ID><DisplayName>fake</DisplayName></Owner>"
+                            f"<Buckets>{entries}</Buckets></ListAllMyBucketsResult>")
+            return
+
+        bucket = state.buckets.get(bucket_name)
+        if bucket is None:
+            self._error(404, "NoSuchBucket", "The specified bucket does not exist")
+        elif operation == "GetBucketEncryption":
+            if not bucket["algorithm"]:
+                self._error(404, "ServerSideEncryptionConfigurationNotFoundError",
+                            "The server side encryption configuration was not found")
+                return
+            key = (f"<KMSMasterKeyID>{escape(bucket['kms_key_id'])}</KMSMasterKeyID>"
+                   if bucket["kms_key_id"] else "")
+            self._send(200, f'<ServerSideEncryptionConfiguration xmlns="{S3_XMLNS}"><Rule>'
+                            f"<ApplyServerSideEncryptionByDefault><SSEAlgorithm>{bucket['algorithm']}"
+                            f"</SSEAlgorithm>{key}</ApplyServerSideEncryptionByDefault>"
+                            f"</Rule></ServerSideEncryptionConfiguration>")
+        elif operation == "GetBucketPolicy":
+            if not bucket["policy"]:
+                self._error(404, "NoSuchBucketPolicy", "The bucket policy does not exist")
+                return
+            self._send(200, bucket["policy"], "application/json")
+        else:
+            # us-east-1 is reported as an empty LocationConstraint, as S3 does
+            region = "" if bucket["region"] == "us-east-1" else bucket["region"]
+            self._send(200, f'<LocationConstraint xmlns="{S3_XMLNS}">{region}</LocationConstraint>')
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    """Threaded HTTP server bound to a FakeS3State."""
+
+    daemon_threads = True
+
+    def __init__(self, state: FakeS3State, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.state = state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeS3Server":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeS3Server":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a fake S3/STS endpoint for offline inventory sweeps")
+    parser.add_argument("--buckets", type=int, default=100, help="Number of seeded buckets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 picks a free port)")
+    parser.add_argument("--capacity", type=int, help="S3 calls served concurrently before answering SlowDown")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of S3 calls answered with 503 SlowDown at random")
+    args = parser.parse_args(argv)
+
+    state = FakeS3State(seeded_buckets(args.buckets, args.seed), args.throttle_rate, args.capacity, args.seed)
+    server = FakeS3Server(state, args.host, args.port)
+    print(f"Fake S3 endpoint listening on {server.endpoint_url} with {args.buckets} bucket(s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps({"calls": state.calls, "throttled": state.throttled}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
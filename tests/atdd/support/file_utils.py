@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+File Helpers
+
+Small filesystem helpers shared by the support modules that persist state
+(decision cache, metrics exports, decision log, sweep checkpoints and the
+template manifest).
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+
+def atomic_write(path: Union[str, Path], text: str) -> None:
+    """
+    Replace path with text so that readers never see a partial file.
+
+    The text is written to a temporary file in the same directory and renamed
+    over path; the parent directory is created if needed.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            handle.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
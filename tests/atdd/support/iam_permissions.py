@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Compiled IAM Permission Checker
+
+Loads every IAM policy document in aws_iam_policies/ once and compiles the
+Action/NotAction and Resource/NotResource patterns of each statement into an
+index: exact actions in a hash table, trailing-wildcard actions such as
+"s3:Get*" or "kms:*" in a prefix trie, and any other wildcard as a regex.
+The actions each CloudFormation template needs (derived from its resource
+types, with the bucket or role ARN where the name resolves) are then checked
+against that index in bulk, with explicit Deny overriding any Allow.
+
+This replaces the per-action grep over aws_iam_policies/*.json in
+scripts/validate-iam-permissions.sh, which only found actions spelled out
+literally and ignored wildcards, Deny statements and resource scoping.
+
+Decisions per required action:
+  allowed      an unconditional Allow matches and no Deny applies
+  conditional  only Allow statements with a Condition match, or a Deny with a
+               Condition may apply; reported, but not counted as missing
+  denied       an unconditional Deny matches
+  missing      no Allow statement matches
+
+Usage:
+    python3 tests/atdd/support/iam_permissions.py [TEMPLATE_OR_DIR ...] [--policies DIR_OR_FILE ...]
+                                                  [--json FILE] [--quiet] [--common]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import yaml
+
+from cloudformation_entities import TemplateContext, iter_template_files, load_template, template_id_for
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+POLICIES_DIR = PROJECT_ROOT / "aws_iam_policies"
+DEFAULT_TEMPLATES = (PROJECT_ROOT / "cf" / "avp-stack.yaml", PROJECT_ROOT / "examples" / "cloudformation")
+
+GREEN = "\033[0;32m"
+RED = "\033[0;31m"
+YELLOW = "\033[1;33m"
+BLUE = "\033[0;34m"
+NC = "\033[0m"
+
+# Actions CloudFormation needs from the deploying role for each resource type
+REQUIRED_ACTIONS: Dict[str, Tuple[str, ...]] = {
+    "AWS::VerifiedPermissions::PolicyStore": (
+        "verifiedpermissions:CreatePolicyStore",
+        "verifiedpermissions:GetPolicyStore",
+        "verifiedpermissions:PutSchema",
+        "verifiedpermissions:TagResource",
+    ),
+    "AWS::VerifiedPermissions::Policy": (
+        "verifiedpermissions:CreatePolicy",
+        "verifiedpermissions:GetPolicy",
+    ),
+    "AWS::IAM::Role": (
+        "iam:CreateRole",
+        "iam:GetRole",
+        "iam:PassRole",
+        "iam:AttachRolePolicy",
+        "iam:PutRolePolicy",
+        "iam:TagRole",
+    ),
+    "AWS::S3::Bucket": (
+        "s3:CreateBucket",
+        "s3:PutBucketEncryption",
+        "s3:PutBucketPolicy",
+        "s3:PutBucketTagging",
+    ),
+    "AWS::KMS::Key": (
+        "kms:CreateKey",
+        "kms:CreateAlias",
+        "kms:TagResource",
+    ),
+}
+
+# Name property and ARN format for resource types whose ARN can be derived
+# from the template; account and region are left as wildcards
+RESOURCE_ARNS: Dict[str, Tuple[str, str]] = {
+    "AWS::S3::Bucket": ("BucketName", "arn:aws:s3:::{}"),
+    "AWS::IAM::Role": ("RoleName", "arn:aws:iam::*:role/{}"),
+}
+
+# Checked for information only, as in the shell validator
+COMMON_ACTIONS: Dict[str, Tuple[str, ...]] = {
+    "Tag-related permissions": (
+        "verifiedpermissions:TagResource",
+        "iam:TagResource",
+        "s3:TagResource",
+        "kms:TagResource",
+    ),
+    "Read permissions": (
+        "verifiedpermissions:GetPolicyStore",
+        "verifiedpermissions:GetSchema",
+        "iam:GetRole",
+        "s3:GetBucketEncryption",
+        "kms:DescribeKey",
+    ),
+}
+
+_END = ""  # trie key holding the statements whose prefix ends at a node
+_SUBSTITUTION = re.compile(r"\$\{[^}]*\}")
+
+
+# =============================================================================
+# POLICY COMPILATION
+# =============================================================================
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else [str(item) for item in value]
+
+
+def _wildcard_regex(patterns: Iterable[str], any_char: str = ".") -> str:
+    """IAM wildcards (* and ?) as one anchored-by-fullmatch alternation."""
+    return "|".join("".join(".*" if ch == "*" else any_char if ch == "?" else re.escape(ch) for ch in pattern)
+                    for pattern in patterns)
+
+
+def _globs_intersect(left: str, right: str) -> bool:
+    """Whether two wildcard patterns (* and ?) match at least one common string."""
+    seen: Set[Tuple[int, int]] = set()
+    pending = [(0, 0)]
+    while pending:
+        i, j = pending.pop()
+        if (i, j) in seen:
+            continue
+        seen.add((i, j))
+        if i == len(left) and j == len(right):
+            return True
+        if i < len(left) and left[i] == "*":
+            pending.append((i + 1, j))
+            if j < len(right):
+                pending.append((i, j + 1))
+        elif j < len(right) and right[j] == "*":
+            pending.append((i, j + 1))
+            if i < len(left):
+                pending.append((i + 1, j))
+        elif i < len(left) and j < len(right) and (left[i] == right[j] or "?" in (left[i], right[j])):
+            pending.append((i + 1, j + 1))
+    return False
+
+
+class CompiledStatement(NamedTuple):
+    """One policy statement with its resource patterns compiled."""
+    source: str                      # "<file>#<Sid or index>"
+    effect: str                      # "Allow" or "Deny"
+    not_resource: bool
+    any_resource: bool               # Resource contains "*" (or NotResource is empty)
+    resources: Optional[re.Pattern]
+    covers: Optional[re.Pattern]     # matches a derived ARN only if it covers every expansion of its *
+    patterns: Tuple[str, ...]
+    conditions: Tuple[str, ...]      # condition keys, empty when unconditional
+
+    def matches_resource(self, resource: Optional[str]) -> bool:
+        """
+        Whether the statement covers a resource ARN.
+
+        Derived ARNs may hold "*" where the account, region or an unresolved
+        ${...} substitution goes. An Allow applies when it matches at least
+        one ARN the pattern stands for, a Deny only when it matches all of
+        them, so deployable templates are never reported as missing or denied.
+        An unknown resource (None) is the extreme case: any Allow applies and
+        only a Deny on every resource does.
+        """
+        if self.any_resource:
+            return True
+        if resource is None:
+            return self.effect == "Allow"
+        if "*" not in resource:
+            matched = bool(self.resources and self.resources.fullmatch(resource))
+            return not matched if self.not_resource else matched
+        some = any(_globs_intersect(pattern, resource) for pattern in self.patterns)
+        every = bool(self.covers and self.covers.fullmatch(resource))
+        if self.not_resource:
+            # Applies to the ARNs outside the patterns: some exist unless one pattern covers them all
+            return not every if self.effect == "Allow" else not some
+        return some if self.effect == "Allow" else every
+
+
+class ActionIndex:
+    """Statement lookup by action: exact names, a prefix trie and residual regexes."""
+
+    def __init__(self):
+        self.exact: Dict[str, List[int]] = {}
+        self.trie: Dict[str, Any] = {}
+        self.patterns: List[Tuple[re.Pattern, int]] = []
+        self.not_actions: List[Tuple[re.Pattern, int]] = []
+
+    def add(self, pattern: str, statement: int) -> None:
+        pattern = pattern.lower()
+        wildcard = pattern.find("*")
+        if wildcard < 0 and "?" not in pattern:
+            self.exact.setdefault(pattern, []).append(statement)
+        elif wildcard == len(pattern) - 1 and "?" not in pattern:
+            node = self.trie
+            for ch in pattern[:-1]:
+                node = node.setdefault(ch, {})
+            node.setdefault(_END, []).append(statement)
+        else:
+            self.patterns.append((re.compile(_wildcard_regex([pattern])), statement))
+
+    def add_not_action(self, patterns: Sequence[str], statement: int) -> None:
+        self.not_actions.append((re.compile(_wildcard_regex(p.lower() for p in patterns)), statement))
+
+    def lookup(self, action: str) -> Set[int]:
+        """Indexes of every statement whose Action or NotAction covers the action."""
+        action = action.lower()
+        found = set(self.exact.get(action, ()))
+        node = self.trie
+        found.update(node.get(_END, ()))
+        for ch in action:
+            node = node.get(ch)
+            if node is None:
+                break
+            found.update(node.get(_END, ()))
+        found.update(statement for regex, statement in self.patterns if regex.fullmatch(action))
+        found.update(statement for regex, statement in self.not_actions if not regex.fullmatch(action))
+        return found
+
+
+class Grant(NamedTuple):
+    """Outcome for one action on one resource."""
+    decision: str                    # allowed, conditional, denied or missing
+    sources: Tuple[str, ...]         # statements that decided it
+    conditions: Tuple[str, ...] = ()
+
+    @property
+    def granted(self) -> bool:
+        return self.decision in ("allowed", "conditional")
+
+
+class PolicySet:
+    """All statements of one role's policy documents, compiled once."""
+
+    def __init__(self, name: str, documents: Sequence[Tuple[str, Dict[str, Any]]]):
+        self.name = name
+        self.statements: List[CompiledStatement] = []
+        self.index = ActionIndex()
+        self._cache: Dict[Tuple[str, Optional[str]], Grant] = {}
+        for source, document in documents:
+            statements = document.get("Statement") or []
+            if isinstance(statements, dict):
+                statements = [statements]
+            for position, statement in enumerate(statements):
+                self._add(source, position, statement)
+
+    @classmethod
+    def load(cls, path: str, name: Optional[str] = None) -> "PolicySet":
+        """Load a directory of *.json policy documents, or a single document."""
+        path = Path(path)
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        if not files:
+            raise ValueError(f"No IAM policy documents found in {path}")
+        documents = []
+        for policy_file in files:
+            try:
+                documents.append((policy_file.name, json.loads(policy_file.read_text())))
+            except ValueError as e:
+                raise ValueError(f"{policy_file}: {e}") from None
+        return cls(name or (path.name if path.is_dir() else path.stem), documents)
+
+    def _add(self, source: str, position: int, statement: Dict[str, Any]) -> None:
+        effect = statement.get("Effect")
+        if effect not in ("Allow", "Deny"):
+            raise ValueError(f"{source}: statement {position} has Effect {effect!r}")
+        not_action = "NotAction" in statement
+        actions = _as_list(statement.get("NotAction" if not_action else "Action"))
+        not_resource = "NotResource" in statement
+        resources = _as_list(statement.get("NotResource" if not_resource else "Resource"))
+        if not_resource:
+            any_resource = not resources
+        else:
+            any_resource = "*" in resources
+        compiled = CompiledStatement(
+            source=f"{source}#{statement.get('Sid') or position}",
+            effect=effect,
+            not_resource=not_resource,
+            any_resource=any_resource,
+            resources=re.compile(_wildcard_regex(resources)) if resources and not any_resource else None,
+            covers=re.compile(_wildcard_regex(resources, "[^*]")) if resources and not any_resource else None,
+            patterns=tuple(resources),
+            conditions=tuple(sorted(key for operator in (statement.get("Condition") or {}).values()
+                                    if isinstance(operator, dict) for key in operator)),
+        )
+        self.statements.append(compiled)
+        statement_id = len(self.statements) - 1
+        if not_action:
+            self.index.add_not_action(actions, statement_id)
+        else:
+            for action in actions:
+                self.index.add(action, statement_id)
+
+    def evaluate(self, action: str, resource: Optional[str] = None) -> Grant:
+        """Decide one action, with explicit Deny overriding any Allow."""
+        key = (action.lower(), resource)
+        grant = self._cache.get(key)
+        if grant is None:
+            grant = self._cache[key] = self._evaluate(action, resource)
+        return grant
+
+    def _evaluate(self, action: str, resource: Optional[str]) -> Grant:
+        matching = [self.statements[i] for i in sorted(self.index.lookup(action))]
+        matching = [s for s in matching if s.matches_resource(resource)]
+        denies = [s for s in matching if s.effect == "Deny"]
+        allows = [s for s in matching if s.effect == "Allow"]
+
+        hard_denies = [s for s in denies if not s.conditions]
+        if hard_denies:
+            return Grant("denied", tuple(s.source for s in hard_denies))
+        if not allows:
+            return Grant("missing", ())
+        unconditional = [s for s in allows if not s.conditions]
+        if unconditional and not denies:
+            return Grant("allowed", tuple(s.source for s in unconditional))
+        deciding = unconditional or allows
+        conditions = {key for s in (denies if unconditional else allows + denies) for key in s.conditions}
+        return Grant("conditional", tuple(s.source for s in deciding + denies), tuple(sorted(conditions)))
+
+
+# =============================================================================
+# TEMPLATE REQUIREMENTS
+# =============================================================================
+
+def _resource_arn(resource_type: str, properties: Dict[str, Any], context: TemplateContext) -> Optional[str]:
+    if resource_type not in RESOURCE_ARNS:
+        return None
+    name_property, arn_format = RESOURCE_ARNS[resource_type]
+    name = context.resolve(properties.get(name_property))
+    if not isinstance(name, str) or not name:
+        return None
+    return arn_format.format(_SUBSTITUTION.sub("*", name))
+
+
+def required_permissions(path: str, root: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Work out the IAM actions one template needs.
+
+    Returns:
+        Dict with template path, template_id, resource_types (type -> count),
+        required [{action, resource, logical_ids}] and an error message if the
+        file could not be parsed
+    """
+    result: Dict[str, Any] = {"template": str(path), "template_id": None,
+                              "resource_types": {}, "required": [], "error": None}
+    try:
+        template = load_template(Path(path))
+    except (yaml.YAMLError, ValueError, OSError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    if template is None:
+        return result
+
+    result["template_id"] = template_id_for(Path(path), Path(root) if root else None)
+    context = TemplateContext(template)
+    required: Dict[Tuple[str, Optional[str]], List[str]] = {}
+    for logical_id, resource in context.resources.items():
+        if not isinstance(resource, dict) or not isinstance(resource.get("Type"), str):
+            continue
+        resource_type = resource["Type"]
+        result["resource_types"][resource_type] = result["resource_types"].get(resource_type, 0) + 1
+        if resource_type not in REQUIRED_ACTIONS:
+            continue
+        arn = _resource_arn(resource_type, resource.get("Properties") or {}, context)
+        for action in REQUIRED_ACTIONS[resource_type]:
+            required.setdefault((action, arn), []).append(logical_id)
+    result["required"] = [
+        {"action": action, "resource": arn, "logical_ids": logical_ids}
+        for (action, arn), logical_ids in sorted(required.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+    ]
+    return result
+
+
+def _requirements_chunk(args) -> List[Dict[str, Any]]:
+    paths, root = args
+    return [required_permissions(path, root) for path in paths]
+
+
+def scan_requirements(paths: Iterable[str], root: Optional[str] = None, workers: Optional[int] = None,
+                      chunk_size: int = 128) -> List[Dict[str, Any]]:
+    """Parse templates, across worker processes for large trees, keeping CloudFormation ones."""
+    files = [str(path) for path in iter_template_files(paths)]
+    chunks = [(files[i:i + chunk_size], root) for i in range(0, len(files), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        parsed = map(_requirements_chunk, chunks)
+        return [r for chunk in parsed for r in chunk if r["template_id"] or r["error"]]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [r for chunk in executor.map(_requirements_chunk, chunks) for r in chunk
+                if r["template_id"] or r["error"]]
+
+
+# =============================================================================
+# BULK CHECK
+# =============================================================================
+
+def check_requirements(parsed_templates: List[Dict[str, Any]],
+                       policy_sets: Sequence[PolicySet]) -> List[Dict[str, Any]]:
+    """
+    Check every template's required actions against every role's policies.
+
+    Adds to each template result a "roles" mapping of role name to its
+    grants ({action, resource, decision, sources, conditions}) and
+    missing/denied/conditional counts, plus an overall "compliant" flag.
+    """
+    for parsed in parsed_templates:
+        parsed["roles"] = {}
+        compliant = parsed["error"] is None
+        for policy_set in policy_sets:
+            grants = []
+            counts = {"missing": 0, "denied": 0, "conditional": 0}
+            for requirement in parsed["required"]:
+                grant = policy_set.evaluate(requirement["action"], requirement["resource"])
+                if grant.decision in counts:
+                    counts[grant.decision] += 1
+                grants.append(dict(requirement, decision=grant.decision,
+                                   sources=list(grant.sources), conditions=list(grant.conditions)))
+            compliant = compliant and not counts["missing"] and not counts["denied"]
+            parsed["roles"][policy_set.name] = dict(counts, grants=grants)
+        parsed["compliant"] = compliant
+    return parsed_templates
+
+
+def check_templates(paths: Iterable[str], policy_paths: Sequence[str] = (str(POLICIES_DIR),),
+                    root: Optional[str] = None, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Load the role policies once and check every template under paths against them."""
+    policy_sets = [PolicySet.load(path) for path in policy_paths]
+    return check_requirements(scan_requirements(paths, root, workers), policy_sets)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _grant_line(action: str, grant: Grant, resource: Optional[str] = None) -> str:
+    files = ", ".join(sorted({source.split("#", 1)[0] for source in grant.sources}))
+    label = f"{action} on {resource}" if resource else action
+    if grant.decision == "allowed":
+        return f"  ✅ {label} (found in {files})"
+    if grant.decision == "conditional":
+        return f"  {YELLOW}⚠️  {label} (conditional in {files}: {', '.join(grant.conditions)}){NC}"
+    if grant.decision == "denied":
+        return f"  {RED}❌ {label} (DENIED by {', '.join(grant.sources)}){NC}"
+    return f"  {RED}❌ {label} (MISSING){NC}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check CloudFormation templates against IAM policies")
+    parser.add_argument("paths", nargs="*", help="Template files or directories (default: cf/avp-stack.yaml "
+                                                 "and examples/cloudformation)")
+    parser.add_argument("--policies", action="append",
+                        help="Role policy directory or document; repeat to check several roles "
+                             "(default: aws_iam_policies)")
+    parser.add_argument("--root", help="Directory template IDs are relative to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parser processes")
+    parser.add_argument("--json", help="Write per-template results as JSON to this file")
+    parser.add_argument("--quiet", action="store_true", help="Only print templates with problems")
+    parser.add_argument("--common", action="store_true", help="Also report the common permission patterns")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or [str(path) for path in DEFAULT_TEMPLATES if path.exists()]
+    try:
+        policy_sets = [PolicySet.load(path) for path in args.policies or [str(POLICIES_DIR)]]
+    except (OSError, ValueError) as e:
+        print(f"{RED}❌ {e}{NC}", file=sys.stderr)
+        return 1
+    results = check_requirements(scan_requirements(paths, args.root, args.workers), policy_sets)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n")
+
+    for result in results:
+        if args.quiet and result["compliant"]:
+            continue
+        print(f"\n{BLUE}Required IAM actions for {result['template']}:{NC}")
+        if result["error"]:
+            print(f"  {RED}❌ Could not parse template: {result['error']}{NC}")
+            continue
+        for role, checked in result["roles"].items():
+            if len(policy_sets) > 1:
+                print(f"{YELLOW}Role {role}:{NC}")
+            for grant in checked["grants"]:
+                if args.quiet and grant["decision"] in ("allowed", "conditional"):
+                    continue
+                print(_grant_line(grant["action"], Grant(grant["decision"], tuple(grant["sources"]),
+                                                         tuple(grant["conditions"])), grant["resource"]))
+            problems = checked["missing"] + checked["denied"]
+            if problems:
+                print(f"{RED}❌ Missing {problems} permissions{NC}")
+            else:
+                print(f"{GREEN}✅ All required permissions found{NC}")
+
+    if args.common:
+        print(f"\n{BLUE}=== Common Permission Patterns ==={NC}")
+        for heading, actions in COMMON_ACTIONS.items():
+            print(f"\n{YELLOW}{heading}:{NC}")
+            for policy_set in policy_sets:
+                for action in actions:
+                    print(_grant_line(action, policy_set.evaluate(action)))
+
+    failing = [result for result in results if not result["compliant"]]
+    print(f"\n{len(results)} template(s) checked against {len(policy_sets)} role(s): "
+          f"{len(results) - len(failing)} compliant, {len(failing)} with permission issues")
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Indexed Cedar Entity Store
+
+Ingests a large entity inventory (a Cedar entities.json array or JSONL with
+one entity per line) once into a compact on-disk store, then hands each
+authorization only the entities it can reach:
+
+    <store>/entities.dat   compact JSON entities, one per line
+    <store>/uids.idx       sorted (uid hash, offset, length) records
+    <store>/refs.idx       sorted (referenced uid hash, offset, length) records
+    <store>/meta.json      format version and counts
+
+Both indexes are fixed-width and binary-searched through mmap, so lookups
+never load the inventory into memory; the OS page cache keeps hot pages
+resident. Index runs are sorted externally while building, so ingestion
+memory is bounded too.
+
+A request slice contains the transitive closure of the principal, action,
+resource and context entity references (parents and attribute references),
+plus the entities that reference the resource - for example the
+CloudFormationTemplate whose s3_resources lists an S3Resource - with their
+parents.
+
+Usage:
+    python3 tests/atdd/support/indexed_entity_store.py build inventory.jsonl --out /tmp/entity-store \\
+        --schema schema.cedarschema
+    python3 tests/atdd/support/indexed_entity_store.py slice /tmp/entity-store \\
+        --principal 'ConfigEvaluation::"s3-bucket-server-side-encryption-enabled"' \\
+        --action 'Action::"config:EvaluateCompliance"' --resource 'S3Resource::"my-bucket"'
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cedar_evaluator import entity_refs, parse_entity_uid
+
+STORE_VERSION = 1
+RECORD = struct.Struct(">QQI")  # key hash, offset into entities.dat, length
+DEFAULT_RUN_SIZE = 250000
+
+
+def uid_hash(entity_type: str, entity_id: str) -> int:
+    digest = hashlib.blake2b(f"{entity_type}\0{entity_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def is_indexed_store(path: Any) -> bool:
+    """True if path is a directory produced by IndexedEntityStore.build."""
+    return os.path.isfile(os.path.join(str(path), "meta.json"))
+
+
+_open_stores: Dict[str, Tuple[int, "IndexedEntityStore"]] = {}
+_open_stores_lock = threading.Lock()
+
+
+def open_store(path: Any) -> "IndexedEntityStore":
+    """Open a store once per process, reopening it when it is rebuilt."""
+    path = str(path)
+    mtime = os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+    with _open_stores_lock:
+        cached = _open_stores.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, IndexedEntityStore(Path(path)))
+            _open_stores[path] = cached
+        return cached[1]
+
+
+# =============================================================================
+# STREAMING INPUT
+# =============================================================================
+
+def iter_entities(path: str, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """
+    Stream entities from a JSON array or a JSONL file without loading it whole.
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as handle:
+        buffer = handle.read(chunk_size)
+        position = len(buffer) - len(buffer.lstrip())
+        if buffer[position:position + 1] != "[":
+            handle.seek(0)
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        position += 1
+        eof = False
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                entity, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = handle.read(chunk_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            yield entity
+            position = end
+            if position > chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+# =============================================================================
+# EXTERNAL SORT
+# =============================================================================
+
+def _read_records(handle: BinaryIO, batch: int = 4096) -> Iterator[bytes]:
+    while True:
+        block = handle.read(RECORD.size * batch)
+        if not block:
+            return
+        for start in range(0, len(block), RECORD.size):
+            yield block[start:start + RECORD.size]
+
+
+class _RunWriter:
+    """Collect packed records, spilling sorted runs to disk, then merge them into one index."""
+
+    def __init__(self, workdir: str, name: str, run_size: int):
+        self.workdir = workdir
+        self.name = name
+        self.run_size = run_size
+        self.records: List[bytes] = []
+        self.runs: List[str] = []
+        self.count = 0
+
+    def add(self, key: int, offset: int, length: int) -> None:
+        # Big-endian packing makes byte order match numeric order
+        self.records.append(RECORD.pack(key, offset, length))
+        self.count += 1
+        if len(self.records) >= self.run_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        self.records.sort()
+        path = os.path.join(self.workdir, f"{self.name}-run-{len(self.runs)}")
+        with open(path, "wb") as handle:
+            handle.write(b"".join(self.records))
+        self.runs.append(path)
+        self.records = []
+
+    def finish(self, path: Path) -> None:
+        self.records.sort()
+        handles = [open(run, "rb") for run in self.runs]
+        try:
+            with open(path, "wb") as out:
+                for record in heapq.merge(iter(self.records), *(_read_records(h) for h in handles)):
+                    out.write(record)
+        finally:
+            for handle in handles:
+                handle.close()
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class IndexedEntityStore:
+    """Read-only, memory-mapped entity store with uid and reverse-reference indexes."""
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self.meta = json.loads((self.store_dir / "meta.json").read_text())
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported entity store version {self.meta.get('version')!r}")
+        self._files = []
+        self._data = self._map("entities.dat")
+        self._uids = self._map("uids.idx")
+        self._refs = self._map("refs.idx")
+
+    def _map(self, name: str):
+        handle = open(self.store_dir / name, "rb")
+        self._files.append(handle)
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def open(cls, store_dir: Path) -> "IndexedEntityStore":
+        return cls(store_dir)
+
+    @classmethod
+    def build(cls, sources: Iterable[str], store_dir: Path,
+              run_size: int = DEFAULT_RUN_SIZE, validator=None) -> "IndexedEntityStore":
+        """
+        Ingest entity files into store_dir (replacing any previous store).
+
+        Later definitions of the same uid override earlier ones. With an
+        EntityValidator, entities the schema rejects are left out of the store
+        and counted as "rejected" in its metadata.
+        """
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="cedar-entity-store-", dir=store_dir) as workdir:
+            uids = _RunWriter(workdir, "uids", run_size)
+            refs = _RunWriter(workdir, "refs", run_size)
+            offset = 0
+            rejected: List[Any] = []
+            with open(os.path.join(workdir, "entities.dat"), "wb") as data:
+                for source in sources:
+                    entities = iter_entities(str(source))
+                    if validator is not None:
+                        entities = validator.iter_valid(entities, rejected, allow_duplicates=True)
+                    for entity in entities:
+                        line = json.dumps(entity, separators=(",", ":")).encode() + b"\n"
+                        data.write(line)
+                        uid = entity["uid"]
+                        uids.add(uid_hash(uid["type"], uid["id"]), offset, len(line))
+                        for ref_type, ref_id in set(entity_refs(entity.get("attrs", {}))):
+                            refs.add(uid_hash(ref_type, ref_id), offset, len(line))
+                        offset += len(line)
+
+            uids.finish(Path(workdir) / "uids.idx")
+            refs.finish(Path(workdir) / "refs.idx")
+            for name in ("entities.dat", "uids.idx", "refs.idx"):
+                os.replace(os.path.join(workdir, name), store_dir / name)
+        (store_dir / "meta.json").write_text(json.dumps({
+            "version": STORE_VERSION,
+            "records": uids.count,
+            "references": refs.count,
+            "bytes": offset,
+            "rejected": len(rejected),
+        }))
+        for error in rejected[:20]:
+            print(f"WARNING: skipped {error.uid}: {'; '.join(error.errors)}", file=sys.stderr)
+        return cls(store_dir)
+
+    def close(self) -> None:
+        for mapped in (self._data, self._uids, self._refs):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for handle in self._files:
+            handle.close()
+        self._files = []
+
+    def __enter__(self) -> "IndexedEntityStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.meta["records"]
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _matches(index, key: int) -> Iterator[Tuple[int, int]]:
+        """Yield (offset, length) for every record with this key hash."""
+        count = len(index) // RECORD.size
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(index, middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        while low < count:
+            found, offset, length = RECORD.unpack_from(index, low * RECORD.size)
+            if found != key:
+                return
+            yield offset, length
+            low += 1
+
+    def _entity_at(self, offset: int, length: int) -> Dict[str, Any]:
+        return json.loads(self._data[offset:offset + length])
+
+    def get(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        found = None
+        found_offset = -1
+        for offset, length in self._matches(self._uids, uid_hash(entity_type, entity_id)):
+            entity = self._entity_at(offset, length)
+            # Guard against hash collisions; the last definition wins
+            if entity["uid"]["type"] == entity_type and entity["uid"]["id"] == entity_id and offset > found_offset:
+                found, found_offset = entity, offset
+        return found
+
+    def referrers(self, entity_type: str, entity_id: str) -> List[Dict[str, Any]]:
+        """Entities whose attributes reference the given uid."""
+        found = []
+        for offset, length in self._matches(self._refs, uid_hash(entity_type, entity_id)):
+            entity = self._entity_at(offset, length)
+            if (entity_type, entity_id) in set(entity_refs(entity.get("attrs", {}))):
+                current = self.get(entity["uid"]["type"], entity["uid"]["id"])
+                if current == entity:
+                    found.append(entity)
+        return found
+
+    def slice(self, roots: Iterable[Tuple[str, str]],
+              referrers_of: Iterable[Tuple[str, str]] = ()) -> List[Dict[str, Any]]:
+        """
+        Return the entities a request rooted at roots can reach, sorted by uid.
+
+        Parents and attribute references are followed transitively. Entities
+        whose attributes reference one of referrers_of (and their ancestors)
+        are added as well.
+        """
+        seen = set()
+        found = []
+
+        def visit(pending: List[Tuple[str, str]], follow_attrs: bool) -> None:
+            while pending:
+                uid = pending.pop()
+                if uid in seen:
+                    continue
+                seen.add(uid)
+                entity = self.get(*uid)
+                if entity is None:
+                    continue
+                found.append(entity)
+                pending.extend((parent["type"], parent["id"]) for parent in entity.get("parents", []))
+                if follow_attrs:
+                    pending.extend(entity_refs(entity.get("attrs", {})))
+
+        visit(list(roots), follow_attrs=True)
+        for uid in referrers_of:
+            referrers = [(e["uid"]["type"], e["uid"]["id"]) for e in self.referrers(*uid)]
+            visit(referrers, follow_attrs=False)
+        return sorted(found, key=lambda entity: (entity["uid"]["type"], entity["uid"]["id"]))
+
+    def slice_request(self, principal: str, action: str, resource: str,
+                      context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Return the entities one request can read.
+
+        Only the resource's referrers are added, which brings in the
+        CloudFormationTemplate listing a bucket. Referrers of the principal
+        or action could be any number of entities and are left out.
+        """
+        resource_uid = parse_entity_uid(resource)
+        roots = [parse_entity_uid(principal), parse_entity_uid(action), resource_uid]
+        roots.extend(entity_refs(context or {}))
+        return self.slice(roots, referrers_of=[resource_uid])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build and query an indexed Cedar entity store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Ingest entities.json / JSONL files into a store")
+    build.add_argument("sources", nargs="+")
+    build.add_argument("--out", required=True, help="Store directory")
+    build.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE,
+                       help="Index records sorted in memory before spilling to disk")
+    build.add_argument("--schema", help="Leave out entities that do not match this Cedar schema")
+
+    query = subparsers.add_parser("slice", help="Print the entity slice for one request")
+    query.add_argument("store")
+    query.add_argument("--principal", required=True)
+    query.add_argument("--action", required=True)
+    query.add_argument("--resource", required=True)
+    query.add_argument("--context", help="Request context as JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if os.path.isdir(args.out) and not is_indexed_store(args.out) and os.listdir(args.out):
+            print(f"Refusing to overwrite non-store directory {args.out}", file=sys.stderr)
+            return 1
+        validator = None
+        if args.schema:
+            from entity_validator import EntityValidator
+            validator = EntityValidator.for_schema(args.schema)
+        with IndexedEntityStore.build(args.sources, Path(args.out), args.run_size, validator) as store:
+            print(json.dumps(store.meta))
+        return 0
+
+    with IndexedEntityStore.open(Path(args.store)) as store:
+        context = json.loads(args.context) if args.context else {}
+        print(json.dumps(store.slice_request(args.principal, args.action, args.resource, context), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Partial Evaluation of Cedar Policies
+
+Most policies branch on the action, the entity types and resource.environment.
+This module precomputes, for every (principal type, action, resource type)
+combination the schema's appliesTo allows and every known environment, the
+residual policy set that remains once those facts are substituted:
+
+- scope constraints decided by the facts are dropped (or drop the policy)
+- `resource.environment`, `resource has environment`, `action` and
+  `principal/resource is T` become literals and the conditions are simplified
+- policies whose conditions become false are removed; conditions that
+  become true are removed from the policy
+
+Simplification never skips an operand that evaluates first and could raise,
+so residual evaluation returns the same decision, determining policies and
+errors as the full policy set. ResidualEvaluator uses the residuals when the
+request's resource has a known environment and falls back to the full
+evaluator for anything else.
+
+Residual sets that are always-allow (an unconditional permit and no forbids)
+or always-deny (an unconditional forbid or no permits), and policies that
+survive in no combination, are reported for review.
+
+Usage:
+    python3 tests/atdd/support/partial_evaluation.py [--policies cedar_policies] [--schema schema.cedarschema]
+        [--environments development,staging,production] [--out residuals/] [--json]
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from cedar_evaluator import (
+    CedarEvaluator, EntityStore, EntityUID, Env, EvaluationError, Node, Policy, Response,
+    ScopeConstraint, compile_expression, is_boolean_node, parse_entity_uid,
+)
+
+KNOWN_ENVIRONMENTS = ("development", "staging", "production")
+ENVIRONMENT_ATTR = "environment"
+
+_LITERAL_ENV = Env(None, None, None, {}, EntityStore())
+
+
+class Facts(NamedTuple):
+    """What is known about a request before evaluation."""
+    principal_type: str
+    action: EntityUID
+    resource_type: str
+    environment: str
+
+
+# =============================================================================
+# EXPRESSION SIMPLIFICATION
+# =============================================================================
+
+def _is_lit(node: Node, value: bool) -> bool:
+    return node[0] == "lit" and node[1] is value
+
+
+def _fold(node: Node) -> Node:
+    """Evaluate a node over literals, keeping it when evaluation raises so the error happens at runtime."""
+    try:
+        return ("lit", compile_expression(node)(_LITERAL_ENV))
+    except EvaluationError:
+        return node
+
+
+def partially_evaluate(node: Node, facts: Facts) -> Node:
+    """Substitute the facts into an expression node and simplify it."""
+    kind = node[0]
+    if kind == "lit":
+        return node
+    if kind == "var":
+        return ("lit", facts.action) if node[1] == "action" else node
+    if node[1:3] == (("var", "resource"), ENVIRONMENT_ATTR) and kind in ("attr", "has"):
+        return ("lit", facts.environment if kind == "attr" else True)
+
+    if kind in ("&&", "||"):
+        # The left operand is evaluated first, so only it may short-circuit
+        short_circuit = kind == "||"
+        left = partially_evaluate(node[1], facts)
+        if _is_lit(left, short_circuit):
+            return left
+        right = partially_evaluate(node[2], facts)
+        if left[0] == "lit" and right[0] == "lit":
+            return _fold((kind, left, right))
+        if _is_lit(left, not short_circuit) and is_boolean_node(right):
+            return right
+        if _is_lit(right, not short_circuit) and is_boolean_node(left):
+            return left
+        return (kind, left, right)
+
+    if kind == "if":
+        test = partially_evaluate(node[1], facts)
+        if test[0] == "lit" and isinstance(test[1], bool):
+            return partially_evaluate(node[2] if test[1] else node[3], facts)
+        return ("if", test, partially_evaluate(node[2], facts), partially_evaluate(node[3], facts))
+
+    if kind == "is":
+        target = partially_evaluate(node[1], facts)
+        in_target = partially_evaluate(node[3], facts) if node[3] is not None else None
+        known_type = {("var", "principal"): facts.principal_type,
+                      ("var", "resource"): facts.resource_type}.get(target)
+        if known_type is not None and known_type != node[2]:
+            return ("lit", False)
+        if in_target is None:
+            if known_type is not None:
+                return ("lit", True)
+            if target[0] == "lit":
+                return _fold(("is", target, node[2], None))
+        return ("is", target, node[2], in_target)
+
+    if kind in ("!", "neg", "has", "like", "attr"):
+        target = partially_evaluate(node[1], facts)
+        rebuilt = (kind, target) + node[2:]
+        # Attribute access on an entity literal needs the entity store
+        if target[0] == "lit" and not isinstance(target[1], EntityUID):
+            return _fold(rebuilt)
+        return rebuilt
+    if kind == "binop":
+        left, right = partially_evaluate(node[2], facts), partially_evaluate(node[3], facts)
+        rebuilt = ("binop", node[1], left, right)
+        if left[0] == "lit" and right[0] == "lit" and node[1] != "in":
+            return _fold(rebuilt)
+        return rebuilt
+    if kind == "call":
+        target = partially_evaluate(node[1], facts)
+        args = tuple(partially_evaluate(arg, facts) for arg in node[3])
+        rebuilt = ("call", target, node[2], args)
+        if target[0] == "lit" and all(arg[0] == "lit" for arg in args):
+            return _fold(rebuilt)
+        return rebuilt
+    if kind == "set":
+        items = tuple(partially_evaluate(item, facts) for item in node[1])
+        rebuilt = ("set", items)
+        return _fold(rebuilt) if all(item[0] == "lit" for item in items) else rebuilt
+    if kind == "record":
+        fields = tuple((key, partially_evaluate(value, facts)) for key, value in node[1])
+        rebuilt = ("record", fields)
+        return _fold(rebuilt) if all(value[0] == "lit" for _, value in fields) else rebuilt
+    raise ValueError(f"Unknown expression node {kind!r}")
+
+
+# =============================================================================
+# RESIDUAL POLICIES
+# =============================================================================
+
+def _residual_scope(constraint: ScopeConstraint, known: Any) -> Optional[ScopeConstraint]:
+    """
+    Simplify one scope clause given a known entity type (principal/resource) or uid (action).
+
+    Returns:
+        The remaining constraint, ScopeConstraint(None) when it always matches,
+        or None when it can never match
+    """
+    known_type = known.type if isinstance(known, EntityUID) else known
+    if constraint.op is None:
+        return constraint
+    if constraint.op == "==":
+        if constraint.target.type != known_type:
+            return None
+        if isinstance(known, EntityUID):
+            return ScopeConstraint(None) if constraint.target == known else None
+        return constraint
+    if constraint.op == "is":
+        if constraint.entity_type != known_type:
+            return None
+        return ScopeConstraint(None) if constraint.target is None else constraint
+    # `in` is reflexive; anything else depends on the entity hierarchy
+    targets = constraint.target if isinstance(constraint.target, list) else [constraint.target]
+    if isinstance(known, EntityUID) and known in targets:
+        return ScopeConstraint(None)
+    return constraint
+
+
+def residual_policy(policy: Policy, facts: Facts) -> Optional[Policy]:
+    """The policy specialised to the facts, or None if it can never be satisfied under them."""
+    principal = _residual_scope(policy.principal, facts.principal_type)
+    action = _residual_scope(policy.action, facts.action)
+    resource = _residual_scope(policy.resource, facts.resource_type)
+    if principal is None or action is None or resource is None:
+        return None
+
+    remaining: List[Tuple[str, Node]] = []
+    for kind, node in policy.condition_nodes:
+        residual = partially_evaluate(node, facts)
+        if _is_lit(residual, kind == "when"):
+            continue
+        if _is_lit(residual, kind != "when"):
+            if not remaining:
+                return None
+            # Earlier conditions may still raise, so keep them and the final false
+            remaining.append((kind, residual))
+            break
+        remaining.append((kind, residual))
+
+    return Policy(policy.policy_id, policy.effect, principal, action, resource,
+                  [(kind, compile_expression(node)) for kind, node in remaining],
+                  policy.annotations, policy.source, remaining)
+
+
+def is_unconditional(policy: Policy) -> bool:
+    return (policy.principal.op is None and policy.action.op is None
+            and policy.resource.op is None and not policy.condition_nodes)
+
+
+def never_satisfied(policy: Policy) -> bool:
+    """Whether a residual can only evaluate to not-satisfied or an error (e.g. `x && false`)."""
+    for kind, node in policy.condition_nodes:
+        blocking = kind != "when"
+        if _is_lit(node, blocking):
+            return True
+        if node[0] == ("||" if blocking else "&&") and _is_lit(node[2], blocking):
+            return True
+    return False
+
+
+class ResidualSet:
+    """Residual policies for one set of facts."""
+
+    def __init__(self, facts: Facts, policies: List[Policy], removed: List[str]):
+        self.facts = facts
+        self.policies = policies
+        self.removed = removed
+        self.evaluator = CedarEvaluator(policies, use_index=False)
+
+    @property
+    def live_policies(self) -> List[Policy]:
+        """Residuals that can be satisfied; the rest are kept only so errors match full evaluation."""
+        return [policy for policy in self.policies if not never_satisfied(policy)]
+
+    @property
+    def outcome(self) -> str:
+        """"always-allow", "always-deny" or "conditional"."""
+        live = self.live_policies
+        forbids = [policy for policy in live if policy.effect == "forbid"]
+        permits = [policy for policy in live if policy.effect == "permit"]
+        if any(is_unconditional(policy) for policy in forbids) or not permits:
+            return "always-deny"
+        if not forbids and any(is_unconditional(policy) for policy in permits):
+            return "always-allow"
+        return "conditional"
+
+    def is_authorized(self, principal: EntityUID, action: EntityUID, resource: EntityUID,
+                      context: Optional[Dict[str, Any]], entities: EntityStore) -> Response:
+        return self.evaluator.is_authorized(principal, action, resource, context, entities)
+
+
+def residualize(policies: List[Policy], facts: Facts) -> ResidualSet:
+    kept, removed = [], []
+    for policy in policies:
+        residual = residual_policy(policy, facts)
+        if residual is None:
+            removed.append(policy.policy_id)
+        else:
+            kept.append(residual)
+    return ResidualSet(facts, kept, removed)
+
+
+class ResidualEvaluator:
+    """CedarEvaluator front end that answers known-environment requests from precomputed residuals."""
+
+    def __init__(self, evaluator: CedarEvaluator, environments: Tuple[str, ...] = KNOWN_ENVIRONMENTS):
+        self.evaluator = evaluator
+        self.environments = tuple(environments)
+        self.residuals: Dict[Facts, ResidualSet] = {}
+        if evaluator.schema is not None:
+            from policy_index import PolicyIndex
+            for principal_type, action, resource_type in PolicyIndex(evaluator.policies, evaluator.schema).declared_keys():
+                for environment in self.environments:
+                    facts = Facts(principal_type, action, resource_type, environment)
+                    self.residuals[facts] = residualize(evaluator.policies, facts)
+        self.residual_hits = 0
+        self.fallbacks = 0
+
+    @property
+    def policies(self) -> List[Policy]:
+        return self.evaluator.policies
+
+    def is_authorized(self, principal: EntityUID, action: EntityUID, resource: EntityUID,
+                      context: Optional[Dict[str, Any]], entities: EntityStore) -> Response:
+        entity = entities.get(resource)
+        environment = entity.attrs.get(ENVIRONMENT_ATTR) if entity is not None else None
+        residual = None
+        if isinstance(environment, str):
+            # Residual keys come from appliesTo, so a hit is also schema-valid
+            residual = self.residuals.get(Facts(principal.type, action, resource.type, environment))
+        if residual is None:
+            self.fallbacks += 1
+            return self.evaluator.is_authorized(principal, action, resource, context, entities)
+        self.residual_hits += 1
+        return residual.is_authorized(principal, action, resource, context, entities)
+
+    def authorize_request(self, request: Dict[str, Any], entities: EntityStore) -> Response:
+        """Evaluate a --request-json style dict."""
+        return self.is_authorized(
+            parse_entity_uid(request["principal"]),
+            parse_entity_uid(request["action"]),
+            parse_entity_uid(request["resource"]),
+            request.get("context"),
+            entities,
+        )
+
+    def report(self) -> Dict[str, Any]:
+        """Residual outcomes per combination plus policies that apply under no known facts."""
+        surviving = set()
+        combinations = []
+        for facts, residual in self.residuals.items():
+            surviving.update(policy.policy_id for policy in residual.live_policies)
+            combinations.append({
+                "action": facts.action.id,
+                "principal_type": facts.principal_type,
+                "resource_type": facts.resource_type,
+                "environment": facts.environment,
+                "outcome": residual.outcome,
+                "policies": [policy.policy_id for policy in residual.live_policies],
+                "removed": len(residual.removed),
+            })
+        return {
+            "environments": list(self.environments),
+            "combinations": combinations,
+            "always_allow": [c for c in combinations if c["outcome"] == "always-allow"],
+            "always_deny": [c for c in combinations if c["outcome"] == "always-deny"],
+            "dead_policies": [policy.policy_id for policy in self.evaluator.policies
+                              if policy.policy_id not in surviving] if self.residuals else [],
+        }
+
+
+# =============================================================================
+# RENDERING
+# =============================================================================
+
+_PRECEDENCE = {"if": 0, "||": 1, "&&": 2, "binop": 3, "has": 3, "is": 3, "like": 3, "!": 5, "neg": 5}
+
+
+def _literal_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, EntityUID):
+        return str(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(_literal_text(item) for item in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{json.dumps(key)}: {_literal_text(item)}" for key, item in value.items()) + "}"
+    return json.dumps(value)
+
+
+def to_cedar(node: Node, parent: int = 0) -> str:
+    """Render an expression node as Cedar text."""
+    kind = node[0]
+    level = _PRECEDENCE.get(kind, 6)
+    if kind == "lit":
+        text = _literal_text(node[1])
+    elif kind == "var":
+        text = node[1]
+    elif kind == "if":
+        text = f"if {to_cedar(node[1])} then {to_cedar(node[2])} else {to_cedar(node[3])}"
+    elif kind in ("&&", "||"):
+        text = f"{to_cedar(node[1], level)} {kind} {to_cedar(node[2], level + 1)}"
+    elif kind == "!":
+        text = f"!{to_cedar(node[1], level)}"
+    elif kind == "neg":
+        text = f"-{to_cedar(node[1], level)}"
+    elif kind == "has":
+        attr = node[2] if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", node[2]) else json.dumps(node[2])
+        text = f"{to_cedar(node[1], 6)} has {attr}"
+    elif kind == "is":
+        text = f"{to_cedar(node[1], 6)} is {node[2]}"
+        if node[3] is not None:
+            text += f" in {to_cedar(node[3], 4)}"
+    elif kind == "like":
+        pattern = "*".join(json.dumps(part)[1:-1] if part else "" for part in
+                           _split_like(node[2]))
+        text = f'{to_cedar(node[1], 6)} like "{pattern}"'
+    elif kind == "binop":
+        text = f"{to_cedar(node[2], level + 1)} {node[1]} {to_cedar(node[3], level + 1)}"
+    elif kind == "attr":
+        text = f"{to_cedar(node[1], 6)}.{node[2]}"
+    elif kind == "call":
+        text = f"{to_cedar(node[1], 6)}.{node[2]}({', '.join(to_cedar(arg) for arg in node[3])})"
+    elif kind == "set":
+        text = "[" + ", ".join(to_cedar(item) for item in node[1]) + "]"
+    else:
+        text = "{" + ", ".join(f"{json.dumps(key)}: {to_cedar(value)}" for key, value in node[1]) + "}"
+    return f"({text})" if level < parent else text
+
+
+def _split_like(pattern: List[Any]) -> List[str]:
+    """Turn a parsed like pattern (None = wildcard) back into the chunks between wildcards."""
+    chunks = [""]
+    for part in pattern:
+        if part is None:
+            chunks.append("")
+        else:
+            chunks[-1] += part
+    return chunks
+
+
+def _scope_text(variable: str, constraint: ScopeConstraint) -> str:
+    if constraint.op is None:
+        return variable
+    if constraint.op == "is":
+        text = f"{variable} is {constraint.entity_type}"
+        return text + (f" in {constraint.target}" if constraint.target is not None else "")
+    if isinstance(constraint.target, list):
+        return f"{variable} in [{', '.join(str(target) for target in constraint.target)}]"
+    return f"{variable} {constraint.op} {constraint.target}"
+
+
+def policy_to_cedar(policy: Policy) -> str:
+    lines = [f"@id({json.dumps(policy.policy_id)})",
+             f"{policy.effect}({_scope_text('principal', policy.principal)}, "
+             f"{_scope_text('action', policy.action)}, {_scope_text('resource', policy.resource)})"]
+    for kind, node in policy.condition_nodes:
+        lines.append(f"{kind} {{ {to_cedar(node)} }}")
+    return "\n".join(lines) + ";"
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute residual Cedar policies per action and environment")
+    parser.add_argument("--policies", default="cedar_policies", help="Policy directory or file")
+    parser.add_argument("--schema", default="schema.cedarschema", help="Cedar schema file")
+    parser.add_argument("--environments", default=",".join(KNOWN_ENVIRONMENTS),
+                        help="Comma-separated resource.environment values to specialise for")
+    parser.add_argument("--out", help="Write one residual .cedar file per combination into this directory")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    evaluator = ResidualEvaluator(
+        CedarEvaluator.from_files(Path(args.policies), Path(args.schema), use_index=False),
+        tuple(env.strip() for env in args.environments.split(",") if env.strip()),
+    )
+    report = evaluator.report()
+
+    if args.out:
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for facts, residual in evaluator.residuals.items():
+            name = re.sub(r"[^A-Za-z0-9_.-]+", "_", "-".join(
+                (facts.action.id, facts.principal_type, facts.resource_type, facts.environment)))
+            header = (f"// Residual policies for principal is {facts.principal_type}, {facts.action}, "
+                      f"resource is {facts.resource_type}, resource.environment == {json.dumps(facts.environment)}\n"
+                      f"// Outcome: {residual.outcome}\n")
+            body = "\n\n".join(policy_to_cedar(policy) for policy in residual.policies)
+            (out_dir / f"{name}.cedar").write_text(header + body + "\n")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"{'action':34} {'principal':18} {'resource':24} {'environment':12} {'kept':>4}  outcome")
+    for row in report["combinations"]:
+        print(f"{row['action']:34} {row['principal_type']:18} {row['resource_type']:24} "
+              f"{row['environment']:12} {len(row['policies']):4d}  {row['outcome']}")
+    print(f"\n{len(report['always_allow'])} always-allow and {len(report['always_deny'])} always-deny "
+          f"combination(s) out of {len(report['combinations'])}")
+    if report["dead_policies"]:
+        print(f"Policies that apply under no known combination: {', '.join(report['dead_policies'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
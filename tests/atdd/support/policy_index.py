@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Policy Index by Action and Entity Type
+
+Buckets compiled policies by the action and principal/resource entity types
+their scope can match, so CedarEvaluator only evaluates the candidate subset
+for each request instead of the whole policy set.
+
+A policy's keys come from its scope and the head of its first condition:
+
+    action == Action::"x"           indexed under that action
+    principal == T::"id" / is T     indexed under principal type T (same for resource)
+    when { resource is T && ... }   indexed under resource type T (same for principal)
+    anything else (in, unscoped)    candidate for every action / entity type
+
+`in` constraints depend on the entity hierarchy supplied with each request,
+and other conditions are compiled predicates, so both are treated as
+wildcards. A type test counts only as the leftmost conjunct of the first
+clause when that clause is a `when`: it is then the first thing evaluated
+and && short-circuits, so for any other type the policy is false without
+evaluating (or raising from) anything else. Skipped policies are therefore
+exactly those that cannot be satisfied and never raise errors, so
+decisions, determining policies and errors are identical to evaluating the
+full set.
+
+With a schema, the candidate lists for every appliesTo combination are
+built up front and policies whose scope no declared action accepts are
+reported as unreachable.
+
+Usage:
+    python3 tests/atdd/support/policy_index.py [--policies cedar_policies] [--schema schema.cedarschema] [--json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cedar_evaluator import EntityUID, Policy, ScopeConstraint
+
+# (principal type, action, resource type) -> (forbids, permits)
+CandidateKey = Tuple[str, EntityUID, str]
+
+
+def scope_type(constraint: ScopeConstraint) -> Optional[str]:
+    """Entity type a principal/resource scope pins down, or None for any type."""
+    if constraint.op == "==":
+        return constraint.target.type
+    if constraint.op == "is":
+        return constraint.entity_type
+    return None
+
+
+def condition_type(policy: Policy, variable: str) -> Optional[str]:
+    """Entity type a leftmost `variable is T` conjunct of a leading `when` clause requires, or None."""
+    if not policy.condition_nodes or policy.condition_nodes[0][0] != "when":
+        return None
+    node = policy.condition_nodes[0][1]
+    while node[0] == "&&":
+        node = node[1]
+    if node[0] == "is" and node[1] == ("var", variable):
+        return node[2]
+    return None
+
+
+def policy_type(policy: Policy, variable: str) -> Optional[str]:
+    """Entity type the principal or resource of a policy must have, or None for any type."""
+    return scope_type(getattr(policy, variable)) or condition_type(policy, variable)
+
+
+class PolicyIndex:
+    """Candidate policies per (principal type, action, resource type)."""
+
+    def __init__(self, policies: List[Policy], schema=None):
+        self.policies = policies
+        self.schema = schema
+        self._by_action: Dict[EntityUID, List[int]] = {}
+        self._any_action: List[int] = []
+        for position, policy in enumerate(policies):
+            if policy.action.op == "==":
+                self._by_action.setdefault(policy.action.target, []).append(position)
+            else:
+                self._any_action.append(position)
+        self._principal_types = [policy_type(policy, "principal") for policy in policies]
+        self._resource_types = [policy_type(policy, "resource") for policy in policies]
+        self._candidates: Dict[CandidateKey, Tuple[List[Policy], List[Policy]]] = {}
+
+        if schema is not None:
+            for principal_type, action, resource_type in self.declared_keys():
+                self.candidates(principal_type, action, resource_type)
+
+    def declared_keys(self) -> List[CandidateKey]:
+        """Every (principal type, action, resource type) the schema's appliesTo allows."""
+        if self.schema is None:
+            return []
+        return [
+            (principal_type, EntityUID("Action", name), resource_type)
+            for name, declared in sorted(self.schema.actions.items())
+            for principal_type in declared.principal_types
+            for resource_type in declared.resource_types
+        ]
+
+    def candidates(self, principal_type: str, action: EntityUID,
+                   resource_type: str) -> Tuple[List[Policy], List[Policy]]:
+        """
+        Policies whose scope can match a request with these types, in policy-set order.
+
+        Returns:
+            Tuple of (forbids, permits)
+        """
+        key = (principal_type, action, resource_type)
+        cached = self._candidates.get(key)
+        if cached is not None:
+            return cached
+
+        positions = sorted(self._by_action.get(action, []) + self._any_action)
+        forbids: List[Policy] = []
+        permits: List[Policy] = []
+        for position in positions:
+            wanted_principal = self._principal_types[position]
+            wanted_resource = self._resource_types[position]
+            if wanted_principal is not None and wanted_principal != principal_type:
+                continue
+            if wanted_resource is not None and wanted_resource != resource_type:
+                continue
+            policy = self.policies[position]
+            (forbids if policy.effect == "forbid" else permits).append(policy)
+        cached = self._candidates[key] = (forbids, permits)
+        return cached
+
+    def unreachable(self) -> List[Policy]:
+        """Policies no schema-valid request can select (always empty without a schema)."""
+        if self.schema is None:
+            return []
+        reachable = set()
+        for key in self.declared_keys():
+            forbids, permits = self.candidates(*key)
+            reachable.update(id(policy) for policy in forbids + permits)
+        return [policy for policy in self.policies if id(policy) not in reachable]
+
+    def selectivity(self) -> Dict[str, Any]:
+        """
+        Summarize how much of the policy set each request type evaluates.
+
+        Returns:
+            Dict with total policies, wildcard counts, one row per appliesTo
+            combination and the IDs of unreachable policies
+        """
+        total = len(self.policies)
+        rows = []
+        for principal_type, action, resource_type in self.declared_keys():
+            forbids, permits = self.candidates(principal_type, action, resource_type)
+            count = len(forbids) + len(permits)
+            rows.append({
+                "action": action.id,
+                "principal_type": principal_type,
+                "resource_type": resource_type,
+                "candidates": count,
+                "fraction": count / total if total else 0.0,
+            })
+        fractions = [row["fraction"] for row in rows]
+        return {
+            "policies": total,
+            "action_wildcards": len(self._any_action),
+            "principal_type_wildcards": sum(1 for t in self._principal_types if t is None),
+            "resource_type_wildcards": sum(1 for t in self._resource_types if t is None),
+            "mean_fraction": sum(fractions) / len(fractions) if fractions else 1.0,
+            "max_fraction": max(fractions) if fractions else 1.0,
+            "combinations": rows,
+            "unreachable": [policy.policy_id for policy in self.unreachable()],
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report how selective the policy index is per request type")
+    parser.add_argument("--policies", default="cedar_policies", help="Policy directory or file")
+    parser.add_argument("--schema", default="schema.cedarschema", help="Cedar schema file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    from cedar_evaluator import CedarEvaluator
+    evaluator = CedarEvaluator.from_files(Path(args.policies), Path(args.schema))
+    report = evaluator.index.selectivity()
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"Policies: {report['policies']}  (wildcards: action {report['action_wildcards']}, "
+          f"principal type {report['principal_type_wildcards']}, "
+          f"resource type {report['resource_type_wildcards']})")
+    print(f"{'action':34} {'principal':18} {'resource':24} {'candidates':>10} {'fraction':>9}")
+    for row in report["combinations"]:
+        print(f"{row['action']:34} {row['principal_type']:18} {row['resource_type']:24} "
+              f"{row['candidates']:10d} {row['fraction']:9.1%}")
+    print(f"Mean fraction evaluated: {report['mean_fraction']:.1%}  (max {report['max_fraction']:.1%})")
+    if report["unreachable"]:
+        print(f"Unreachable under the schema: {', '.join(report['unreachable'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Schema-Aware Policy Validator
+
+Type-checks compiled policies against schema.cedarschema in-process, the
+way `cedar validate` does in strict mode for the language subset the Python
+evaluator supports. A policy set that parses can still be wrong for the
+schema; this reports, per policy:
+
+    - actions and entity types the schema does not declare
+    - scopes that no declared action's appliesTo can ever match
+    - attributes that are not declared on the entity or record they are read
+      from, and optional attributes read without a `has` guard
+    - operands of the wrong type (a Long compared with a String, `like` on a
+      Bool, `.contains()` on something that is not a set, a condition that
+      is not a Bool, ...)
+
+Conditions are checked once per (principal type, action, resource type)
+request environment the scope admits. As in Cedar, `resource is T` and
+`has` on an undeclared attribute have a known value in each environment, so
+`resource is S3Resource && resource.name == ...` is only checked where the
+resource is an S3Resource.
+
+Usage:
+    python3 tests/atdd/support/policy_validator.py [--policies cedar_policies] [--schema schema.cedarschema]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from cedar_evaluator import (CedarSyntaxError, EntityUID, Node, Policy, ScopeConstraint,
+                             load_policy_files, parse_policies)
+from cedar_schema import CedarSchema
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+# Types are tuples like the schema's, with entity types widened to sets and
+# booleans carrying their value when it is known in the environment:
+#   ("Bool", True | False | None)  ("Long",)  ("String",)  ("Set", element or None)
+#   ("Record", {attr: (type, required)})  ("Entity", frozenset of type names)  ("Any",)
+Type = Tuple[Any, ...]
+BOOL = ("Bool", None)
+LONG = ("Long",)
+STRING = ("String",)
+ANY = ("Any",)
+
+# (repr of the target expression, attribute) pairs a `has` check has proven present
+Capabilities = FrozenSet[Tuple[str, str]]
+NO_CAPABILITIES: Capabilities = frozenset()
+
+
+class RequestEnv(NamedTuple):
+    principal_type: str
+    action: EntityUID
+    resource_type: str
+    context: Type
+
+
+class PolicyProblem(NamedTuple):
+    policy_id: str
+    source: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.policy_id} ({self.source}): {self.message}" if self.source else \
+            f"{self.policy_id}: {self.message}"
+
+
+class PolicyValidationError(Exception):
+    """A policy set that parses but does not type-check against the schema."""
+
+    def __init__(self, problems: List[PolicyProblem]):
+        super().__init__("; ".join(str(problem) for problem in problems))
+        self.problems = problems
+
+
+class _TypeError(Exception):
+    """A problem that makes the rest of one condition impossible to type."""
+
+
+def _from_schema(schema_type: Any) -> Type:
+    kind = schema_type[0]
+    if kind == "Bool":
+        return BOOL
+    if kind == "Entity":
+        return ("Entity", frozenset([schema_type[1]]))
+    if kind == "Set":
+        return ("Set", _from_schema(schema_type[1]))
+    if kind == "Record":
+        return ("Record", {name: (_from_schema(inner), required)
+                           for name, (inner, required) in schema_type[1].items()})
+    return schema_type
+
+
+def _describe(value_type: Type) -> str:
+    kind = value_type[0]
+    if kind == "Entity":
+        return " | ".join(sorted(value_type[1]))
+    if kind == "Set":
+        return f"Set<{_describe(value_type[1]) if value_type[1] else '?'}>"
+    return kind
+
+
+def _lub(left: Type, right: Type) -> Optional[Type]:
+    """Least upper bound of two types, or None when they are incompatible."""
+    if left == ANY or right == ANY:
+        return ANY
+    if left[0] != right[0]:
+        return None
+    kind = left[0]
+    if kind == "Bool":
+        return left if left == right else BOOL
+    if kind == "Entity":
+        return ("Entity", left[1] | right[1])
+    if kind == "Set":
+        if left[1] is None or right[1] is None:
+            return left if right[1] is None else right
+        element = _lub(left[1], right[1])
+        return ("Set", element) if element is not None else None
+    if kind == "Record":
+        if set(left[1]) != set(right[1]):
+            return None
+        fields = {}
+        for name, (inner, required) in left[1].items():
+            merged = _lub(inner, right[1][name][0])
+            if merged is None:
+                return None
+            fields[name] = (merged, required and right[1][name][1])
+        return ("Record", fields)
+    return left
+
+
+class PolicyValidator:
+    """Type-check policies against one CedarSchema."""
+
+    def __init__(self, schema: CedarSchema):
+        self.schema = schema
+
+    @classmethod
+    def from_file(cls, schema_file) -> "PolicyValidator":
+        return cls(CedarSchema.from_file(schema_file))
+
+    # -------------------------------------------------------------------------
+    # Policies and scopes
+    # -------------------------------------------------------------------------
+
+    def validate(self, policies: List[Policy]) -> List[PolicyProblem]:
+        """Every problem found in the policies, in policy order."""
+        problems: List[PolicyProblem] = []
+        for policy in policies:
+            problems.extend(PolicyProblem(policy.policy_id, policy.source, message)
+                            for message in self.policy_errors(policy))
+        return problems
+
+    def policy_errors(self, policy: Policy) -> List[str]:
+        """Problems with one policy, each reported once however many environments hit it."""
+        errors: List[str] = []
+        envs = self._environments(policy, errors)
+        if errors:
+            return errors
+        if not envs:
+            return ["the scope matches no action's appliesTo in the schema"]
+        for env in envs:
+            for kind, node in policy.condition_nodes:
+                try:
+                    condition_type, _ = self._check(node, env, NO_CAPABILITIES)
+                    if condition_type[0] not in ("Bool", "Any"):
+                        raise _TypeError(f"{kind} condition is {_describe(condition_type)}, expected Bool")
+                except _TypeError as e:
+                    if str(e) not in errors:
+                        errors.append(str(e))
+        return errors
+
+    def _declared_type(self, entity_type: str) -> bool:
+        return entity_type in self.schema.entity_types
+
+    def _check_literal(self, uid: EntityUID) -> None:
+        if uid.type == "Action" or uid.type.endswith("::Action"):
+            if uid.id not in self.schema.actions:
+                raise _TypeError(f"unrecognized action {uid}")
+        elif not self._declared_type(uid.type):
+            raise _TypeError(f"unrecognized entity type {uid.type}")
+
+    def _actions_in(self, groups: List[EntityUID]) -> Set[str]:
+        """Declared actions equal to or (transitively) members of any of the groups."""
+        wanted = set(groups)
+        matched: Set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, declared in self.schema.actions.items():
+                uid = EntityUID("Action", name)
+                if name not in matched and (uid in wanted or wanted & set(declared.member_of)):
+                    matched.add(name)
+                    wanted.add(uid)
+                    changed = True
+        return matched
+
+    def _scope_types(self, constraint: ScopeConstraint, errors: List[str]) -> Optional[Set[str]]:
+        """Entity types a principal/resource scope admits, or None for any type."""
+        targets = constraint.target if isinstance(constraint.target, list) else \
+            [constraint.target] if constraint.target is not None else []
+        for target in targets:
+            try:
+                self._check_literal(target)
+            except _TypeError as e:
+                errors.append(str(e))
+        if constraint.op == "is":
+            if not self._declared_type(constraint.entity_type):
+                errors.append(f"unrecognized entity type {constraint.entity_type}")
+            return {constraint.entity_type}
+        if constraint.op == "==":
+            return {constraint.target.type}
+        return None
+
+    def _environments(self, policy: Policy, errors: List[str]) -> List[RequestEnv]:
+        action = policy.action
+        if action.op is None:
+            names = set(self.schema.actions)
+        else:
+            targets = action.target if isinstance(action.target, list) else [action.target]
+            for target in targets:
+                try:
+                    self._check_literal(target)
+                except _TypeError as e:
+                    errors.append(str(e))
+            names = {action.target.id} if action.op == "==" else self._actions_in(targets)
+        principal_types = self._scope_types(policy.principal, errors)
+        resource_types = self._scope_types(policy.resource, errors)
+
+        envs = []
+        for name in sorted(names):
+            declared = self.schema.actions.get(name)
+            if declared is None:
+                continue
+            context = _from_schema(declared.context) if declared.context is not None else ("Record", {})
+            for principal_type in declared.principal_types:
+                if principal_types is not None and principal_type not in principal_types:
+                    continue
+                for resource_type in declared.resource_types:
+                    if resource_types is not None and resource_type not in resource_types:
+                        continue
+                    envs.append(RequestEnv(principal_type, EntityUID("Action", name), resource_type, context))
+        return envs
+
+    # -------------------------------------------------------------------------
+    # Expressions
+    # -------------------------------------------------------------------------
+
+    def _expect(self, node: Node, env: RequestEnv, caps: Capabilities, kind: str,
+                operation: str) -> Tuple[Type, Capabilities]:
+        value_type, proven = self._check(node, env, caps)
+        if value_type[0] not in (kind, "Any"):
+            raise _TypeError(f"{operation} expects {kind}, found {_describe(value_type)}")
+        return value_type, proven
+
+    def _check(self, node: Node, env: RequestEnv, caps: Capabilities) -> Tuple[Type, Capabilities]:
+        """
+        Type of an expression in one request environment.
+
+        Returns:
+            Tuple of the type and the capabilities that hold when the expression is true
+        """
+        kind = node[0]
+        if kind == "lit":
+            value = node[1]
+            if isinstance(value, bool):
+                return ("Bool", value), NO_CAPABILITIES
+            if isinstance(value, int):
+                return LONG, NO_CAPABILITIES
+            if isinstance(value, str):
+                return STRING, NO_CAPABILITIES
+            self._check_literal(value)
+            return ("Entity", frozenset([value.type])), NO_CAPABILITIES
+        if kind == "var":
+            name = node[1]
+            if name == "context":
+                return env.context, NO_CAPABILITIES
+            entity_type = {"principal": env.principal_type, "resource": env.resource_type,
+                           "action": env.action.type}[name]
+            return ("Entity", frozenset([entity_type])), NO_CAPABILITIES
+        if kind == "&&":
+            left, left_caps = self._expect(node[1], env, caps, "Bool", "&&")
+            if left == ("Bool", False):
+                return left, NO_CAPABILITIES
+            right, right_caps = self._expect(node[2], env, caps | left_caps, "Bool", "&&")
+            if right == ("Bool", False):
+                return right, NO_CAPABILITIES
+            value = True if left == right == ("Bool", True) else None
+            return ("Bool", value), left_caps | right_caps
+        if kind == "||":
+            left, left_caps = self._expect(node[1], env, caps, "Bool", "||")
+            if left == ("Bool", True):
+                return left, left_caps
+            right, right_caps = self._expect(node[2], env, caps, "Bool", "||")
+            if left == ("Bool", False):
+                return right, right_caps
+            value = True if right == ("Bool", True) else None
+            return ("Bool", value), left_caps & right_caps
+        if kind == "!":
+            operand, _ = self._expect(node[1], env, caps, "Bool", "!")
+            value = operand[1] if operand[0] == "Bool" else None
+            return ("Bool", None if value is None else not value), NO_CAPABILITIES
+        if kind == "neg":
+            self._expect(node[1], env, caps, "Long", "-")
+            return LONG, NO_CAPABILITIES
+        if kind == "if":
+            test, test_caps = self._expect(node[1], env, caps, "Bool", "if")
+            if test == ("Bool", True):
+                return self._check(node[2], env, caps | test_caps)
+            if test == ("Bool", False):
+                return self._check(node[3], env, caps)
+            then, then_caps = self._check(node[2], env, caps | test_caps)
+            otherwise, otherwise_caps = self._check(node[3], env, caps)
+            merged = _lub(then, otherwise)
+            if merged is None:
+                raise _TypeError(f"if branches have incompatible types {_describe(then)} and "
+                                 f"{_describe(otherwise)}")
+            return merged, then_caps & otherwise_caps
+        if kind == "has":
+            return self._check_has(node, env, caps)
+        if kind == "is":
+            self._expect(node[1], env, caps, "Entity", "is")
+            target, _ = self._check(node[1], env, caps)
+            entity_type = node[2]
+            if not self._declared_type(entity_type):
+                raise _TypeError(f"unrecognized entity type {entity_type}")
+            if node[3] is not None:
+                self._check_in_target(node[3], env, caps, "is ... in")
+            if target == ANY:
+                return BOOL, NO_CAPABILITIES
+            if entity_type not in target[1]:
+                return ("Bool", False), NO_CAPABILITIES
+            return ("Bool", True if target[1] == {entity_type} and node[3] is None else None), NO_CAPABILITIES
+        if kind == "like":
+            self._expect(node[1], env, caps, "String", "like")
+            return BOOL, NO_CAPABILITIES
+        if kind == "binop":
+            return self._check_binop(node, env, caps)
+        if kind == "attr":
+            return self._check_attr(node, env, caps), NO_CAPABILITIES
+        if kind == "call":
+            return self._check_call(node, env, caps), NO_CAPABILITIES
+        if kind == "set":
+            element: Optional[Type] = None
+            for item in node[1]:
+                item_type, _ = self._check(item, env, caps)
+                merged = item_type if element is None else _lub(element, item_type)
+                if merged is None:
+                    raise _TypeError(f"set elements have incompatible types {_describe(element)} and "
+                                     f"{_describe(item_type)}")
+                element = merged
+            return ("Set", element), NO_CAPABILITIES
+        if kind == "record":
+            return ("Record", {key: (self._check(value, env, caps)[0], True)
+                               for key, value in node[1]}), NO_CAPABILITIES
+        raise _TypeError(f"unsupported expression {kind!r}")
+
+    def _attributes(self, target: Type, attr: str) -> List[Tuple[Optional[Tuple[Type, bool]], str]]:
+        """(declaration or None, owner name) of an attribute for every type the target may have."""
+        if target[0] == "Record":
+            declared = target[1].get(attr)
+            return [(declared, "the record")]
+        return [
+            (None if name not in self.schema.entity_types or attr not in self.schema.entity_types[name].attributes
+             else (_from_schema(self.schema.entity_types[name].attributes[attr][0]),
+                   self.schema.entity_types[name].attributes[attr][1]), name)
+            for name in sorted(target[1])
+        ]
+
+    def _check_has(self, node: Node, env: RequestEnv, caps: Capabilities) -> Tuple[Type, Capabilities]:
+        target, _ = self._check(node[1], env, caps)
+        if target == ANY:
+            return BOOL, NO_CAPABILITIES
+        if target[0] not in ("Entity", "Record"):
+            raise _TypeError(f"has expects an entity or record, found {_describe(target)}")
+        attr = node[2]
+        declarations = [declared for declared, _ in self._attributes(target, attr)]
+        if all(declared is None for declared in declarations):
+            return ("Bool", False), NO_CAPABILITIES
+        proven = frozenset([(repr(node[1]), attr)])
+        if all(declared is not None and declared[1] for declared in declarations):
+            return ("Bool", True), proven
+        return BOOL, proven
+
+    def _check_attr(self, node: Node, env: RequestEnv, caps: Capabilities) -> Type:
+        target, _ = self._check(node[1], env, caps)
+        if target == ANY:
+            return ANY
+        if target[0] not in ("Entity", "Record"):
+            raise _TypeError(f"attribute access expects an entity or record, found {_describe(target)}")
+        attr = node[2]
+        result: Optional[Type] = None
+        for declared, owner in self._attributes(target, attr):
+            if declared is None:
+                raise _TypeError(f"attribute '{attr}' is not declared on {owner}")
+            attr_type, required = declared
+            if not required and (repr(node[1]), attr) not in caps:
+                raise _TypeError(f"optional attribute '{attr}' of {owner} is read without a `has` check")
+            result = attr_type if result is None else _lub(result, attr_type)
+            if result is None:
+                raise _TypeError(f"attribute '{attr}' has different types on {_describe(target)}")
+        return result
+
+    def _check_in_target(self, node: Node, env: RequestEnv, caps: Capabilities, operation: str) -> None:
+        target, _ = self._check(node, env, caps)
+        if target[0] == "Set" and (target[1] is None or target[1][0] in ("Entity", "Any")):
+            return
+        if target[0] not in ("Entity", "Any"):
+            raise _TypeError(f"{operation} expects an entity or set of entities, found {_describe(target)}")
+
+    def _check_binop(self, node: Node, env: RequestEnv, caps: Capabilities) -> Tuple[Type, Capabilities]:
+        op = node[1]
+        if op in ("==", "!="):
+            left, _ = self._check(node[2], env, caps)
+            right, _ = self._check(node[3], env, caps)
+            if left[0] == right[0] == "Entity":
+                return BOOL, NO_CAPABILITIES
+            if _lub(left, right) is None:
+                raise _TypeError(f"{op} compares {_describe(left)} with {_describe(right)}")
+            return BOOL, NO_CAPABILITIES
+        if op == "in":
+            self._expect(node[2], env, caps, "Entity", "in")
+            self._check_in_target(node[3], env, caps, "in")
+            return BOOL, NO_CAPABILITIES
+        self._expect(node[2], env, caps, "Long", op)
+        self._expect(node[3], env, caps, "Long", op)
+        return (BOOL if op in ("<", "<=", ">", ">=") else LONG), NO_CAPABILITIES
+
+    def _check_call(self, node: Node, env: RequestEnv, caps: Capabilities) -> Type:
+        name, args = node[2], node[3]
+        target, _ = self._expect(node[1], env, caps, "Set", f".{name}()")
+        element = target[1] if target[0] == "Set" else None
+        if name == "isEmpty" and not args:
+            return BOOL
+        if name == "contains" and len(args) == 1:
+            item, _ = self._check(args[0], env, caps)
+            if element is not None and _lub(element, item) is None:
+                raise _TypeError(f".contains() looks for {_describe(item)} in {_describe(target)}")
+            return BOOL
+        if name in ("containsAll", "containsAny") and len(args) == 1:
+            other, _ = self._expect(args[0], env, caps, "Set", f".{name}()")
+            if element is not None and other[0] == "Set" and other[1] is not None \
+                    and _lub(element, other[1]) is None:
+                raise _TypeError(f".{name}() compares {_describe(target)} with {_describe(other)}")
+            return BOOL
+        raise _TypeError(f"unsupported method .{name}() with {len(args)} argument(s)")
+
+
+def validate_policy_files(policy_dir: Path, schema_file: Path) -> List[PolicyProblem]:
+    """
+    Parse and type-check a policy file or directory.
+
+    Raises:
+        CedarSyntaxError if a policy file does not parse
+    """
+    return PolicyValidator.from_file(schema_file).validate(parse_policies(load_policy_files(policy_dir)))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Type-check Cedar policies against a schema")
+    parser.add_argument("--policies", default=str(PROJECT_ROOT / "cedar_policies"), help="Policy directory or file")
+    parser.add_argument("--schema", default=str(PROJECT_ROOT / "schema.cedarschema"), help="Cedar schema file")
+    args = parser.parse_args(argv)
+
+    try:
+        problems = validate_policy_files(Path(args.policies), Path(args.schema))
+    except CedarSyntaxError as e:
+        print(f"Parse error: {e}", file=sys.stderr)
+        return 1
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"\n{len(problems)} problem(s)")
+        return 1
+    print("Policies validate against the schema")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
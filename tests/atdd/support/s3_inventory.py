@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Concurrent S3 Inventory Collector
+
+Collects the S3Resource attributes used by the shift-right encryption policy
+for every bucket in an account and writes them as a JSONL inventory (one
+Cedar entity per line), replacing the per-bucket AWS CLI loop in
+scripts/check-s3-bucket-compliance.sh.
+
+- One boto3 session and one S3 client shared by a bounded thread pool, with
+  the HTTP connection pool sized to the concurrency so connections are reused
+- One sts:GetCallerIdentity call per sweep instead of one per bucket
+- Adaptive concurrency: throttling responses (SlowDown, 503, ...) halve the
+  number of calls in flight and back off with jitter; successes grow it back
+- --endpoint-url points both clients at a local stand-in (moto server or
+  tests/atdd/support/fake_s3_endpoint.py) for offline runs
+
+The inventory can be evaluated directly (--evaluate) or turned into the
+entities/requests files consumed by `cedar_policy_runner.py batch`.
+
+Usage:
+    python3 tests/atdd/support/s3_inventory.py --inventory inventory.jsonl [--evaluate]
+    python3 tests/atdd/support/s3_inventory.py --endpoint-url http://127.0.0.1:5000 --evaluate
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional
+
+CONFIG_EVALUATION = {"type": "ConfigEvaluation", "id": "s3-bucket-server-side-encryption-enabled"}
+THROTTLE_CODES = {
+    "SlowDown", "Throttling", "ThrottlingException", "ThrottledException",
+    "RequestLimitExceeded", "TooManyRequestsException", "RequestThrottled",
+    "ServiceUnavailable", "503",
+}
+NO_ENCRYPTION_CODES = {"ServerSideEncryptionConfigurationNotFoundError"}
+NO_POLICY_CODES = {"NoSuchBucketPolicy"}
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to throttling (additive increase, multiplicative decrease).
+
+    Callers acquire() a slot before each API call and release() it afterwards,
+    reporting whether the call was throttled. As in TCP congestion control, the
+    limit is halved at most once per window: calls already in flight when the
+    limit dropped do not shrink it again.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None):
+        self.minimum = max(1, minimum)
+        self.maximum = maximum or initial
+        self.limit = float(max(self.minimum, min(initial, self.maximum)))
+        self.in_flight = 0
+        self.throttles = 0
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> int:
+        """Wait for a free slot; returns a ticket to pass back to release()."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self._epoch
+
+    def release(self, ticket: int, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttles += 1
+                if ticket == self._epoch:
+                    self._epoch += 1
+                    self.limit = max(float(self.minimum), self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+def _error_code(error: Exception) -> str:
+    response = getattr(error, "response", None) or {}
+    code = response.get("Error", {}).get("Code")
+    if code:
+        return str(code)
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return str(status) if status else ""
+
+
+class S3InventoryCollector:
+    """Collect S3Resource entities for many buckets through one shared client."""
+
+    def __init__(self, s3_client=None, sts_client=None, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, profile: Optional[str] = None,
+                 max_concurrency: int = 32, max_attempts: int = 8,
+                 environment: str = "production", backoff_base: float = 0.1, backoff_cap: float = 5.0):
+        if s3_client is None or sts_client is None:
+            import boto3  # optional dependency, see tests/atdd/requirements.txt
+            from botocore.config import Config
+
+            session = boto3.session.Session(profile_name=profile, region_name=region or "us-east-1")
+            # Throttling is retried here so the limiter sees it, not inside botocore
+            config = Config(
+                max_pool_connections=max_concurrency,
+                retries={"mode": "standard", "total_max_attempts": 1},
+                s3={"addressing_style": "path"} if endpoint_url else None,
+            )
+            if s3_client is None:
+                s3_client = session.client("s3", endpoint_url=endpoint_url, config=config)
+            if sts_client is None:
+                sts_client = session.client("sts", endpoint_url=endpoint_url, config=config)
+
+        self.s3 = s3_client
+        self.sts = sts_client
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.environment = environment
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limiter = AdaptiveLimiter(max_concurrency, maximum=max_concurrency)
+        self.calls = 0
+        self.errors: List[Dict[str, str]] = []
+        self._account_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _call(self, operation: Callable[..., Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Run one API call under the limiter, retrying throttled calls with jittered backoff."""
+        for attempt in range(self.max_attempts):
+            ticket = self.limiter.acquire()
+            with self._lock:
+                self.calls += 1
+            try:
+                result = operation(**kwargs)
+            except Exception as e:
+                throttled = _error_code(e) in THROTTLE_CODES
+                self.limiter.release(ticket, throttled=throttled)
+                if not throttled or attempt == self.max_attempts - 1:
+                    raise
+                time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+                continue
+            self.limiter.release(ticket)
+            return result
+        raise RuntimeError("unreachable")
+
+    def account_id(self) -> str:
+        """Caller account, looked up once per collector."""
+        if self._account_id is None:
+            self._account_id = self._call(self.sts.get_caller_identity)["Account"]
+        return self._account_id
+
+    def list_buckets(self) -> List[str]:
+        names = []
+        kwargs: Dict[str, Any] = {}
+        while True:
+            response = self._call(self.s3.list_buckets, **kwargs)
+            names.extend(bucket["Name"] for bucket in response.get("Buckets", []))
+            token = response.get("ContinuationToken")
+            if not token:
+                return names
+            kwargs = {"ContinuationToken": token}
+
+    def bucket_entity(self, bucket_name: str) -> Dict[str, Any]:
+        """Build the S3Resource entity for one bucket (same attributes as the shell script)."""
+        attrs: Dict[str, Any] = {"name": bucket_name, "encryption_enabled": False}
+
+        try:
+            encryption = self._call(self.s3.get_bucket_encryption, Bucket=bucket_name)
+        except Exception as e:
+            if _error_code(e) not in NO_ENCRYPTION_CODES:
+                raise
+        else:
+            rules = encryption.get("ServerSideEncryptionConfiguration", {}).get("Rules", [])
+            default = rules[0].get("ApplyServerSideEncryptionByDefault", {}) if rules else {}
+            attrs["encryption_enabled"] = True
+            if default.get("SSEAlgorithm"):
+                attrs["encryption_algorithm"] = default["SSEAlgorithm"]
+            if default.get("SSEAlgorithm", "").startswith("aws:kms") and default.get("KMSMasterKeyID"):
+                attrs["kms_key_id"] = default["KMSMasterKeyID"]
+
+        try:
+            policy = self._call(self.s3.get_bucket_policy, Bucket=bucket_name)
+        except Exception as e:
+            if _error_code(e) not in NO_POLICY_CODES:
+                raise
+        else:
+            if "s3:x-amz-server-side-encryption" in policy.get("Policy", ""):
+                attrs["bucket_policy_enforces_encryption"] = True
+
+        attrs["environment"] = self.environment
+        attrs["resource_type"] = "bucket"
+        return {"uid": {"type": "S3Resource", "id": bucket_name}, "attrs": attrs, "parents": []}
+
+    def _collect_one(self, bucket_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            entity = self.bucket_entity(bucket_name)
+        except Exception as e:
+            with self._lock:
+                self.errors.append({"bucket": bucket_name, "error": _error_code(e) or str(e)})
+            return None
+        return {"entity": entity}
+
+    def collect(self, bucket_names: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield {"entity", "account_id"} for every bucket, in input order.
+
+        Buckets that fail with a non-throttling error are recorded in self.errors
+        and skipped.
+        """
+        account_id = self.account_id()
+        names = list(bucket_names) if bucket_names is not None else self.list_buckets()
+        window = self.max_concurrency * 4
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending = []
+            for name in names:
+                pending.append(executor.submit(self._collect_one, name))
+                if len(pending) >= window:
+                    item = pending.pop(0).result()
+                    if item:
+                        yield dict(item, account_id=account_id)
+            for future in pending:
+                item = future.result()
+                if item:
+                    yield dict(item, account_id=account_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "throttles": self.limiter.throttles,
+            "concurrency_limit": int(self.limiter.limit),
+            "errors": len(self.errors),
+        }
+
+
+# =============================================================================
+# INVENTORY FILES
+# =============================================================================
+
+def write_inventory(items: Iterable[Dict[str, Any]], handle: IO[str]) -> int:
+    """Write one S3Resource entity per line; returns the number of lines written."""
+    count = 0
+    for item in items:
+        handle.write(json.dumps(item["entity"]) + "\n")
+        count += 1
+    return count
+
+
+def read_inventory(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def config_evaluation_entity() -> Dict[str, Any]:
+    return {
+        "uid": CONFIG_EVALUATION,
+        "attrs": {
+            "rule_name": CONFIG_EVALUATION["id"],
+            "evaluation_type": "shift-right",
+            "compliance_status": "EVALUATING",
+        },
+        "parents": [],
+    }
+
+
+def compliance_request(entity: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "principal": f'ConfigEvaluation::{json.dumps(CONFIG_EVALUATION["id"])}',
+        "action": 'Action::"config:EvaluateCompliance"',
+        "resource": f'S3Resource::{json.dumps(entity["uid"]["id"])}',
+        "context": {},
+    }
+
+
+def evaluate_inventory(entities: List[Dict[str, Any]], backend: str = "python",
+                       pool_size: int = 4) -> Iterator[Dict[str, Any]]:
+    """Evaluate every inventoried bucket with one entity load and one batch."""
+    from cedar_policy_runner import CedarPolicyRunner
+
+    with tempfile.NamedTemporaryFile("w", prefix="cedar-s3-inventory-", suffix=".json", delete=False) as handle:
+        json.dump([config_evaluation_entity()] + entities, handle)
+        entities_file = handle.name
+
+    runner = CedarPolicyRunner(policy_dir="cedar_policies", backend=backend, pool_size=pool_size)
+    try:
+        for entity, result in zip(entities, runner.authorize_batch(
+                [compliance_request(entity) for entity in entities], entities_file)):
+            yield {"bucket": entity["uid"]["id"], "decision": result["decision"],
+                   "compliant": result["decision"] == "ALLOW"}
+    finally:
+        runner.close()
+        os.unlink(entities_file)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Collect an S3Resource inventory for shift-right sweeps")
+    parser.add_argument("buckets", nargs="*", help="Bucket names (default: every bucket in the account)")
+    parser.add_argument("--inventory", default="-", help="JSONL inventory output ('-' for stdout)")
+    parser.add_argument("--endpoint-url", help="S3/STS endpoint, e.g. a moto server or fake_s3_endpoint.py")
+    parser.add_argument("--region")
+    parser.add_argument("--profile")
+    parser.add_argument("--concurrency", type=int, default=32, help="Maximum API calls in flight")
+    parser.add_argument("--environment", default="production",
+                        help="environment attribute recorded for every bucket")
+    parser.add_argument("--entities-out", help="Write a Cedar entities file for `cedar_policy_runner.py batch`")
+    parser.add_argument("--requests-out", help="Write compliance requests as JSONL for `cedar_policy_runner.py batch`")
+    parser.add_argument("--evaluate", action="store_true", help="Evaluate the inventory and print a summary")
+    parser.add_argument("--backend", default="python", choices=("python", "pool", "cli"))
+    args = parser.parse_args(argv)
+
+    collector = S3InventoryCollector(endpoint_url=args.endpoint_url, region=args.region,
+                                     profile=args.profile, max_concurrency=args.concurrency,
+                                     environment=args.environment)
+    start = time.time()
+    entities = []
+
+    def keep(items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for item in items:
+            entities.append(item["entity"])
+            yield item
+
+    items = keep(collector.collect(args.buckets or None))
+    if args.inventory == "-":
+        write_inventory(items, sys.stdout)
+    else:
+        with open(args.inventory, "w") as handle:
+            write_inventory(items, handle)
+
+    stats = dict(collector.stats(), account_id=collector.account_id(), buckets=len(entities),
+                 seconds=round(time.time() - start, 3))
+    print(json.dumps({"inventory": stats}), file=sys.stderr)
+    for error in collector.errors:
+        print(f"WARNING: {error['bucket']}: {error['error']}", file=sys.stderr)
+
+    if args.entities_out:
+        Path(args.entities_out).write_text(json.dumps([config_evaluation_entity()] + entities, indent=2))
+    if args.requests_out:
+        with open(args.requests_out, "w") as handle:
+            for entity in entities:
+                handle.write(json.dumps(compliance_request(entity)) + "\n")
+
+    if not args.evaluate:
+        return 1 if collector.errors else 0
+
+    non_compliant = 0
+    for outcome in evaluate_inventory(entities, backend=args.backend, pool_size=args.concurrency):
+        if not outcome["compliant"]:
+            non_compliant += 1
+            print(f"NON-COMPLIANT  {outcome['bucket']}", file=sys.stderr)
+    print(f"\nCompliant buckets: {len(entities) - non_compliant}", file=sys.stderr)
+    print(f"Non-compliant buckets: {non_compliant}", file=sys.stderr)
+    return 1 if non_compliant or collector.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
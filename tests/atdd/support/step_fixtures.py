@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Step Fixtures
+
+Fixtures shared by the behave step definitions: the repository entities file
+most scenarios authorize against and per-scenario temporary directories.
+"""
+
+import tempfile
+from pathlib import Path
+
+from differential_harness import PROJECT_ROOT
+
+FIXTURE_ENTITIES = PROJECT_ROOT / "tests" / "fixtures" / "entities.json"
+
+
+def scenario_workdir(context, name: str) -> Path:
+    """
+    Create a temporary directory that is removed when the scenario ends.
+
+    Args:
+        context: behave context of the running scenario
+        name: Short label for the directory name, e.g. "batch"
+    """
+    workdir = tempfile.TemporaryDirectory(prefix=f"atdd-{name}-")
+    context.add_cleanup(workdir.cleanup)
+    return Path(workdir.name)
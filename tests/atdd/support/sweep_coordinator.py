@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Sharded, Resumable Compliance Sweep Coordinator
+
+Runs the shift-right encryption check over inventories too large for one
+process (many accounts, hundreds of thousands of buckets, including the
+S3Resources generated from CloudFormation templates). The inventory is split
+into shards inside a sweep directory that doubles as the work queue:
+
+    <sweep>/manifest.json        sources, shard size and count, policy-set hash
+    <sweep>/shards/NNNNNN.jsonl  S3Resource entities of one shard
+    <sweep>/claims/NNNNNN.claim  lease held by the worker evaluating the shard
+    <sweep>/results/NNNNNN.json  checkpoint: the shard's counts, non-compliant and error buckets
+    <sweep>/summary.json         merged counts once every shard has a result
+    <sweep>/non-compliant.txt    every non-compliant bucket, one per line
+    <sweep>/errors.txt           every bucket that could not be evaluated, one per line
+
+Workers claim a shard by creating its claim file exclusively, refresh the
+lease while they evaluate it and write the result atomically before
+releasing the claim, so a shard is either finished or not. A worker that
+dies leaves a claim that goes stale after --lease-seconds and is taken over
+by another worker. Re-running a sweep skips every shard that already has a
+result, so a failed run resumes where it stopped.
+
+`run` plans the sweep if needed and evaluates it with --workers local
+processes. To spread a sweep over several hosts, `plan` it once into a shared
+directory (NFS, EFS, ...), start `work` on each host and `merge` (or let the
+last worker merge). Every worker refuses to evaluate against policies whose
+hash differs from the one recorded when the sweep was planned.
+
+Usage:
+    python3 tests/atdd/support/sweep_coordinator.py run /tmp/sweep inventory-*.jsonl --workers 8 --shard-size 5000
+    python3 tests/atdd/support/sweep_coordinator.py plan /shared/sweep inventory-*.jsonl
+    python3 tests/atdd/support/sweep_coordinator.py work /shared/sweep --workers 8    # on each host
+    python3 tests/atdd/support/sweep_coordinator.py status /shared/sweep
+    python3 tests/atdd/support/sweep_coordinator.py merge /shared/sweep
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from file_utils import atomic_write
+from indexed_entity_store import iter_entities
+from s3_inventory import compliance_request, config_evaluation_entity
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+SWEEP_VERSION = 1
+DEFAULT_SHARD_SIZE = 5000
+DEFAULT_LEASE_SECONDS = 300.0
+
+
+def _shard_name(number: int) -> str:
+    return f"{number:06d}"
+
+
+def _policy_hash(policy_dir: str, schema_file: str) -> str:
+    from decision_cache import PolicyFingerprint
+    return PolicyFingerprint(PROJECT_ROOT / policy_dir, PROJECT_ROOT / schema_file, check_interval=0).current()[0]
+
+
+# =============================================================================
+# PLANNING
+# =============================================================================
+
+def plan(sweep_dir: str, sources: Iterable[str], shard_size: int = DEFAULT_SHARD_SIZE,
+         policy_dir: str = "cedar_policies", schema_file: str = "schema.cedarschema") -> Dict[str, Any]:
+    """
+    Split the S3Resource entities of the sources into shards, or reuse an existing plan.
+
+    Returns:
+        The sweep manifest
+    """
+    sweep = Path(sweep_dir)
+    sources = [os.path.abspath(str(source)) for source in sources]
+    manifest_file = sweep / "manifest.json"
+    if manifest_file.exists():
+        manifest = json.loads(manifest_file.read_text())
+        if manifest["sources"] != sources or manifest["shard_size"] != shard_size:
+            raise ValueError(f"{sweep} already holds a sweep of {manifest['sources']} "
+                             f"with shard size {manifest['shard_size']}")
+        return manifest
+
+    for name in ("shards", "claims", "results"):
+        (sweep / name).mkdir(parents=True, exist_ok=True)
+    shards = entities = skipped = 0
+    handle = None
+    try:
+        for source in sources:
+            for entity in iter_entities(source):
+                if entity.get("uid", {}).get("type") != "S3Resource":
+                    skipped += 1
+                    continue
+                if handle is None:
+                    handle = open(sweep / "shards" / f"{_shard_name(shards)}.jsonl", "w")
+                handle.write(json.dumps(entity, separators=(",", ":")) + "\n")
+                entities += 1
+                if entities % shard_size == 0:
+                    handle.close()
+                    handle = None
+                    shards += 1
+    finally:
+        if handle is not None:
+            handle.close()
+            shards += 1
+
+    manifest = {
+        "version": SWEEP_VERSION,
+        "sources": sources,
+        "shard_size": shard_size,
+        "shards": shards,
+        "entities": entities,
+        "skipped": skipped,
+        "policy_dir": policy_dir,
+        "schema_file": schema_file,
+        "policy_hash": _policy_hash(policy_dir, schema_file),
+        "created": time.time(),
+    }
+    # Written last: a sweep directory without a manifest is an interrupted plan and is rebuilt
+    atomic_write(manifest_file, json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(sweep_dir: str) -> Dict[str, Any]:
+    manifest_file = Path(sweep_dir) / "manifest.json"
+    if not manifest_file.exists():
+        raise FileNotFoundError(f"{sweep_dir} has no sweep manifest; run `plan` first")
+    manifest = json.loads(manifest_file.read_text())
+    if manifest.get("version") != SWEEP_VERSION:
+        raise ValueError(f"Unsupported sweep version {manifest.get('version')!r}")
+    return manifest
+
+
+# =============================================================================
+# CLAIMS
+# =============================================================================
+
+class ShardClaim:
+    """Exclusive, expiring lease on one shard, refreshed by a background thread."""
+
+    def __init__(self, path: Path, worker: str, lease_seconds: float):
+        self.path = path
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def acquire(cls, path: Path, worker: str, lease_seconds: float) -> Optional["ShardClaim"]:
+        """Claim the shard, taking over a stale claim; None if another worker holds it."""
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            age = None
+        if age is not None:
+            if age < lease_seconds:
+                return None
+            # Only one worker can rename the stale claim away; the others see it gone
+            stale = path.with_name(f"{path.name}.stale-{worker.replace(':', '-')}")
+            try:
+                os.rename(path, stale)
+            except FileNotFoundError:
+                return None
+            os.unlink(stale)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w") as handle:
+            json.dump({"worker": worker, "claimed": time.time()}, handle)
+        claim = cls(path, worker, lease_seconds)
+        claim._thread = threading.Thread(target=claim._heartbeat, daemon=True)
+        claim._thread.start()
+        return claim
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                return
+
+    def release(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# =============================================================================
+# WORKERS
+# =============================================================================
+
+def evaluate_shard(runner, shard_file: Path) -> Dict[str, Any]:
+    """Evaluate every bucket of one shard with a single entity load and batch."""
+    entities = list(iter_entities(str(shard_file)))
+    with tempfile.NamedTemporaryFile("w", prefix="cedar-sweep-shard-", suffix=".json", delete=False) as handle:
+        json.dump([config_evaluation_entity()] + entities, handle)
+        entities_file = handle.name
+    result: Dict[str, Any] = {"entities": len(entities), "compliant": 0, "non_compliant": 0, "errors": 0,
+                              "by_environment": {}, "by_resource_type": {}, "non_compliant_buckets": [],
+                              "error_buckets": []}
+    try:
+        requests = [compliance_request(entity) for entity in entities]
+        for entity, outcome in zip(entities, runner.authorize_batch(requests, entities_file)):
+            attrs = entity.get("attrs", {})
+            if outcome["decision"] == "ERROR":
+                key = "errors"
+                result["error_buckets"].append(entity["uid"]["id"])
+            elif outcome["compliant"]:
+                key = "compliant"
+            else:
+                key = "non_compliant"
+                result["non_compliant_buckets"].append(entity["uid"]["id"])
+            result[key] += 1
+            for group, value in (("by_environment", attrs.get("environment", "unknown")),
+                                 ("by_resource_type", attrs.get("resource_type", "unknown"))):
+                counts = result[group].setdefault(str(value), {"compliant": 0, "non_compliant": 0, "errors": 0})
+                counts[key] += 1
+    finally:
+        os.unlink(entities_file)
+    return result
+
+
+def work(sweep_dir: str, worker: Optional[str] = None, backend: str = "python", pool_size: int = 4,
+         lease_seconds: float = DEFAULT_LEASE_SECONDS, max_shards: Optional[int] = None,
+         prevalidate: bool = False, poll_interval: float = 0.5) -> int:
+    """
+    Claim and evaluate shards until every shard has a result (or max_shards are done).
+
+    Waits for shards claimed by other workers so their leases can be taken
+    over if those workers die. Returns the number of shards this worker finished.
+    """
+    from cedar_policy_runner import CedarPolicyRunner
+
+    sweep = Path(sweep_dir)
+    manifest = load_manifest(sweep_dir)
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    runner = CedarPolicyRunner(policy_dir=manifest["policy_dir"], schema_file=manifest["schema_file"],
+                               backend=backend, pool_size=pool_size, prevalidate=prevalidate)
+    if runner.policy_hash() != manifest["policy_hash"]:
+        raise RuntimeError(f"Policies changed since the sweep was planned ({manifest['policy_hash'][:12]}); "
+                           "start a new sweep directory")
+    done = 0
+    try:
+        while max_shards is None or done < max_shards:
+            pending = [number for number in range(manifest["shards"])
+                       if not (sweep / "results" / f"{_shard_name(number)}.json").exists()]
+            if not pending:
+                break
+            claimed = False
+            for number in pending:
+                name = _shard_name(number)
+                claim = ShardClaim.acquire(sweep / "claims" / f"{name}.claim", worker, lease_seconds)
+                if claim is None:
+                    continue
+                try:
+                    result_file = sweep / "results" / f"{name}.json"
+                    # Another worker may have finished it between listing and claiming
+                    if not result_file.exists():
+                        start = time.time()
+                        result = evaluate_shard(runner, sweep / "shards" / f"{name}.jsonl")
+                        result.update(shard=number, worker=worker, seconds=round(time.time() - start, 3),
+                                      policy_hash=manifest["policy_hash"])
+                        atomic_write(result_file, json.dumps(result))
+                        done += 1
+                finally:
+                    claim.release()
+                claimed = True
+                break
+            if not claimed:
+                time.sleep(poll_interval)
+    finally:
+        runner.close()
+    return done
+
+
+def _worker_process(sweep_dir: str, index: int, options: Dict[str, Any]) -> None:
+    worker = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    work(sweep_dir, worker, **options)
+
+
+def run_workers(sweep_dir: str, workers: int = 4, **options) -> None:
+    """Evaluate the sweep with local worker processes, one runner each."""
+    if workers <= 1:
+        work(sweep_dir, **options)
+        return
+    processes = [multiprocessing.Process(target=_worker_process, args=(sweep_dir, index, options))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = [process.exitcode for process in processes if process.exitcode]
+    if failed:
+        raise RuntimeError(f"{len(failed)} sweep worker(s) failed with exit codes {failed}")
+
+
+# =============================================================================
+# STATUS AND MERGE
+# =============================================================================
+
+def status(sweep_dir: str) -> Dict[str, Any]:
+    sweep = Path(sweep_dir)
+    manifest = load_manifest(sweep_dir)
+    finished = len(list((sweep / "results").glob("*.json")))
+    claimed = len(list((sweep / "claims").glob("*.claim")))
+    return {"shards": manifest["shards"], "finished": finished, "claimed": claimed,
+            "pending": manifest["shards"] - finished, "entities": manifest["entities"]}
+
+
+def merge(sweep_dir: str) -> Dict[str, Any]:
+    """
+    Combine every shard result into summary.json, non-compliant.txt and errors.txt.
+
+    Raises:
+        RuntimeError: If some shards have no result yet
+    """
+    sweep = Path(sweep_dir)
+    manifest = load_manifest(sweep_dir)
+    summary: Dict[str, Any] = {"shards": manifest["shards"], "buckets": 0, "compliant": 0, "non_compliant": 0,
+                               "errors": 0, "by_environment": {}, "by_resource_type": {}, "workers": {},
+                               "policy_hash": manifest["policy_hash"]}
+    missing = []
+    with open(sweep / "non-compliant.txt.tmp", "w") as listing, open(sweep / "errors.txt.tmp", "w") as errors:
+        for number in range(manifest["shards"]):
+            result_file = sweep / "results" / f"{_shard_name(number)}.json"
+            if not result_file.exists():
+                missing.append(number)
+                continue
+            result = json.loads(result_file.read_text())
+            summary["buckets"] += result["entities"]
+            for key in ("compliant", "non_compliant", "errors"):
+                summary[key] += result[key]
+            for group in ("by_environment", "by_resource_type"):
+                for value, counts in result[group].items():
+                    merged = summary[group].setdefault(value, {"compliant": 0, "non_compliant": 0, "errors": 0})
+                    for key, count in counts.items():
+                        merged[key] += count
+            summary["workers"][result["worker"]] = summary["workers"].get(result["worker"], 0) + 1
+            for bucket in result["non_compliant_buckets"]:
+                listing.write(bucket + "\n")
+            for bucket in result.get("error_buckets", ()):
+                errors.write(bucket + "\n")
+    if missing:
+        os.unlink(sweep / "non-compliant.txt.tmp")
+        os.unlink(sweep / "errors.txt.tmp")
+        raise RuntimeError(f"{len(missing)} of {manifest['shards']} shards have no result yet, e.g. {missing[:5]}")
+    os.replace(sweep / "non-compliant.txt.tmp", sweep / "non-compliant.txt")
+    os.replace(sweep / "errors.txt.tmp", sweep / "errors.txt")
+    atomic_write(sweep / "summary.json", json.dumps(summary, indent=2))
+    return summary
+
+
+def _print_summary(summary: Dict[str, Any], sweep_dir: str) -> None:
+    print(f"Buckets evaluated: {summary['buckets']} in {summary['shards']} shards "
+          f"by {len(summary['workers'])} worker(s)", file=sys.stderr)
+    print(f"Compliant buckets: {summary['compliant']}", file=sys.stderr)
+    print(f"Non-compliant buckets: {summary['non_compliant']}", file=sys.stderr)
+    print(f"Non-compliant bucket list: {Path(sweep_dir) / 'non-compliant.txt'}", file=sys.stderr)
+    if summary["errors"]:
+        print(f"Errors: {summary['errors']}", file=sys.stderr)
+        print(f"Error bucket list: {Path(sweep_dir) / 'errors.txt'}", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sharded, resumable shift-right compliance sweep")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_plan_args(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("sources", nargs="+", help="S3Resource inventories (JSONL or entities.json arrays)")
+        sub.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Buckets per shard")
+        sub.add_argument("--policies", default="cedar_policies", help="Policy directory relative to the project root")
+        sub.add_argument("--schema", default="schema.cedarschema", help="Schema file relative to the project root")
+
+    def add_work_args(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Local worker processes")
+        sub.add_argument("--backend", default="python", choices=("python", "pool", "cli"))
+        sub.add_argument("--pool-size", type=int, default=4, help="Warm cedar workers per process (pool backend)")
+        sub.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                         help="Take over claims not refreshed for this long")
+        sub.add_argument("--max-shards", type=int, help="Stop each worker after this many shards")
+        sub.add_argument("--prevalidate", action="store_true",
+                         help="Report buckets that do not match the schema as errors")
+
+    for name, help_text in (("run", "Plan if needed, evaluate with local workers and merge"),
+                            ("plan", "Split inventories into shards"),
+                            ("work", "Evaluate unfinished shards"),
+                            ("status", "Show shard progress"),
+                            ("merge", "Merge shard results into summary.json")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("sweep_dir")
+        if name in ("run", "plan"):
+            add_plan_args(sub)
+        if name in ("run", "work"):
+            add_work_args(sub)
+    args = parser.parse_args(argv)
+
+    if args.command in ("run", "plan"):
+        manifest = plan(args.sweep_dir, args.sources, args.shard_size, args.policies, args.schema)
+        print(json.dumps({"plan": {key: manifest[key] for key in ("shards", "entities", "skipped")}}),
+              file=sys.stderr)
+        if args.command == "plan":
+            return 0
+    if args.command == "status":
+        print(json.dumps(status(args.sweep_dir), indent=2))
+        return 0
+    if args.command in ("run", "work"):
+        run_workers(args.sweep_dir, args.workers, backend=args.backend, pool_size=args.pool_size,
+                    lease_seconds=args.lease_seconds, max_shards=args.max_shards, prevalidate=args.prevalidate)
+        progress = status(args.sweep_dir)
+        if progress["pending"]:
+            print(json.dumps({"status": progress}), file=sys.stderr)
+            return 0
+    summary = merge(args.sweep_dir)
+    _print_summary(summary, args.sweep_dir)
+    return 1 if summary["non_compliant"] or summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Incremental CloudFormation Validation Manifest
+
+Keeps a local manifest of template content hash -> generated entities ->
+decision so repeated validation runs only re-parse and re-evaluate templates
+whose content changed. Everything is re-evaluated when any of the run
+settings the stored results depend on changes: the policy set or schema
+hash, the default environment, the evaluation backend or the root that
+template IDs are relative to.
+
+Manifest layout (JSON):
+    {
+      "version": 2,
+      "settings": {
+        "policy_hash": "<sha256 of cedar_policies/ and schema.cedarschema>",
+        "default_environment": "development",
+        "backend": "python",
+        "root": "/abs/path"
+      },
+      "templates": {
+        "/abs/path/template.yaml": {
+          "content_hash": "<sha256>",
+          "template_id": "...",
+          "entities": [...],
+          "summary": {...}
+        }
+      }
+    }
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cloudformation_entities import evaluate_templates, iter_template_files, scan_templates
+from decision_cache import PolicyFingerprint
+from file_utils import atomic_write
+
+MANIFEST_VERSION = 2
+DEFAULT_MANIFEST = ".cedar-cf-manifest.json"
+
+
+def content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TemplateManifest:
+    """Content-hash manifest persisted between validation runs."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.loaded = False
+        self.settings: Dict[str, Any] = {}
+        self.templates: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+            except ValueError:
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                self.loaded = True
+                self.settings = data.get("settings", {})
+                self.templates = data.get("templates", {})
+
+    def save(self) -> None:
+        """Write atomically so an interrupted run never leaves a corrupt manifest."""
+        atomic_write(self.path, json.dumps({"version": MANIFEST_VERSION, "settings": self.settings,
+                                            "templates": self.templates}))
+
+    def stale_settings(self, settings: Dict[str, Any]) -> List[str]:
+        """Names of the settings that differ from the ones the stored results were produced with."""
+        return [name for name, value in settings.items() if self.settings.get(name) != value]
+
+
+def validate_incremental(paths: List[str], root: Optional[str], manifest_path: Path,
+                         policy_dir: Path, schema_file: Optional[Path],
+                         workers: Optional[int] = None, default_environment: str = "development",
+                         backend: str = "python") -> Dict[str, Any]:
+    """
+    Validate templates, re-evaluating only those whose content or policies changed.
+
+    Returns:
+        Dict with per-template summaries, evaluated, skipped and removed lists,
+        and full_reason saying why every template was re-evaluated (None when
+        the run was incremental or the manifest is new)
+    """
+    manifest = TemplateManifest(manifest_path)
+    policy_hash, _ = PolicyFingerprint(policy_dir, schema_file, check_interval=0).current()
+    settings = {
+        "policy_hash": policy_hash,
+        "default_environment": default_environment,
+        "backend": backend,
+        "root": os.path.abspath(root) if root else None,
+    }
+    stale = manifest.stale_settings(settings) if manifest.loaded else []
+    if "policy_hash" in stale:
+        full_reason: Optional[str] = "policy set changed"
+    elif stale:
+        full_reason = ", ".join(stale) + " changed"
+    else:
+        full_reason = None
+    reevaluate_all = not manifest.loaded or bool(stale)
+
+    current: Dict[str, str] = {}
+    for template_file in iter_template_files(paths):
+        current[str(template_file.resolve())] = content_hash(template_file)
+
+    changed = [
+        path for path, digest in current.items()
+        if reevaluate_all
+        or path not in manifest.templates
+        or manifest.templates[path]["content_hash"] != digest
+    ]
+    changed_set = set(changed)
+    skipped = [path for path in current if path not in changed_set]
+
+    parsed = list(scan_templates(changed, root, workers, default_environment)) if changed else []
+    parsed_paths = {str(Path(p["template"]).resolve()) for p in parsed}
+    summaries = evaluate_templates(parsed, backend=backend, pool_size=workers or 4) if parsed else []
+
+    for result, summary in zip(parsed, summaries):
+        key = str(Path(result["template"]).resolve())
+        manifest.templates[key] = {
+            "content_hash": current[key],
+            "template_id": result["template_id"],
+            "entities": result["entities"],
+            "summary": summary,
+        }
+    # Changed files that turned out not to be CloudFormation still get recorded
+    for path in changed:
+        if path not in parsed_paths:
+            manifest.templates[path] = {"content_hash": current[path], "template_id": None,
+                                        "entities": [], "summary": None}
+
+    scanned = set(os.path.abspath(p) for p in paths)
+    removed = [
+        path for path in manifest.templates
+        if path not in current and any(path == s or path.startswith(s + os.sep) for s in scanned)
+    ]
+    for path in removed:
+        del manifest.templates[path]
+
+    manifest.settings = settings
+    manifest.save()
+
+    return {
+        "full_reason": full_reason,
+        "evaluated": [p["template"] for p in parsed],
+        "skipped": skipped,
+        "removed": removed,
+        "summaries": [manifest.templates[path]["summary"] for path in current
+                      if manifest.templates[path]["summary"] is not None],
+    }
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Schema-Driven Synthetic Workload Generator
+
+Generates deterministic, seeded corpora for load and scale testing from the
+entity types declared in schema.cedarschema:
+
+- S3Resource entities with a configurable mix of encryption algorithms,
+  environments, KMS key presence, bucket policies and missing optional
+  attributes
+- one CloudFormationTemplate entity per --buckets-per-template buckets,
+  listing them in s3_resources
+- optionally, the matching CloudFormation YAML templates
+- optionally, ALLOW/DENY request files in the tests/<suite>/{ALLOW,DENY}
+  layout, labelled by evaluating each request against cedar_policies/
+
+Every template and its buckets are generated from their own seeded random
+stream, so any slice of the corpus can be regenerated on its own and the
+output is identical across runs and machines. Everything is written as it is
+generated; only one template's buckets are held in memory at a time, so 10M
+entities need no more memory than 10.
+
+Attributes the generator has no rule for (for example a new attribute added
+to the schema) get a random value of their declared type; optional ones are
+present half of the time.
+
+Output layout (--out DIR):
+
+    entities.jsonl            one Cedar entity per line (--format json for a JSON array)
+    templates/NNNNN/*.yaml    with --templates
+    suite/{ALLOW,DENY}/*.json with --requests N
+    manifest.json             seed, mix and counts
+
+Usage:
+    python3 tests/atdd/support/workload_generator.py --entities 1000000 --out /tmp/corpus
+    python3 tests/atdd/support/workload_generator.py --entities 10000 --templates --requests 500 \\
+        --algorithms AES256=2,aws:kms=5,none=1 --environments production=1 --out /tmp/corpus
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+import yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+DEFAULT_ALGORITHMS = {"AES256": 0.35, "aws:kms": 0.35, "aws:kms:dsse": 0.05, "AES128": 0.02, "none": 0.23}
+DEFAULT_ENVIRONMENTS = {"development": 0.5, "staging": 0.2, "production": 0.3}
+KMS_ALGORITHMS = ("aws:kms", "aws:kms:dsse")
+REQUEST_ACTIONS = ("config:EvaluateCompliance", "s3:CreateBucket", "cloudformation:ValidateTemplate")
+TEMPLATES_PER_DIRECTORY = 1000
+BUCKET_RULES = frozenset(("name", "encryption_enabled", "encryption_algorithm", "kms_key_id",
+                          "bucket_policy_enforces_encryption", "environment", "resource_type"))
+TEMPLATE_RULES = frozenset(("template_name", "stack_name", "environment", "s3_resources"))
+
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """Parse "a=1,b=2.5" into {"a": 1.0, "b": 2.5}."""
+    weights = {}
+    for item in text.split(","):
+        name, _, weight = item.strip().rpartition("=")
+        if not name:
+            raise ValueError(f"Expected name=weight, got '{item}'")
+        weights[name] = float(weight)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError(f"Weights must be positive: '{text}'")
+    return weights
+
+
+class WeightedChoice:
+    """Pick from a fixed set of values with a seeded random stream."""
+
+    __slots__ = ("values", "cumulative", "total")
+
+    def __init__(self, weights: Dict[str, float]):
+        self.values = list(weights)
+        self.cumulative = list(accumulate(weights.values()))
+        self.total = self.cumulative[-1]
+
+    def pick(self, rng: random.Random) -> str:
+        return self.values[bisect_right(self.cumulative, rng.random() * self.total)]
+
+
+class WorkloadMix:
+    """Distribution of bucket configurations in a generated corpus."""
+
+    def __init__(self, algorithms: Optional[Dict[str, float]] = None,
+                 environments: Optional[Dict[str, float]] = None, missing_optional: float = 0.03,
+                 kms_key: float = 0.9, bucket_policy: float = 0.1, buckets_per_template: int = 5):
+        """
+        Args:
+            algorithms: Weights per SSE algorithm; "none" means encryption disabled
+            environments: Weights per environment (one environment per template)
+            missing_optional: Probability an encrypted bucket lacks encryption_algorithm
+            kms_key: Probability a KMS-encrypted bucket has a kms_key_id
+            bucket_policy: Probability a bucket has bucket_policy_enforces_encryption
+            buckets_per_template: S3Resource entities per CloudFormationTemplate
+        """
+        if buckets_per_template < 1:
+            raise ValueError("buckets_per_template must be at least 1")
+        self.algorithms = dict(algorithms or DEFAULT_ALGORITHMS)
+        self.environments = dict(environments or DEFAULT_ENVIRONMENTS)
+        self.missing_optional = missing_optional
+        self.kms_key = kms_key
+        self.bucket_policy = bucket_policy
+        self.buckets_per_template = buckets_per_template
+
+    def to_json(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+# =============================================================================
+# ENTITY GENERATION
+# =============================================================================
+
+def random_value(attr_type: Any, name: str, rng: random.Random) -> Any:
+    """A random value of a schema type, for attributes without a generation rule."""
+    kind = attr_type[0]
+    if kind == "String":
+        return f"{name}-{rng.randrange(1000)}"
+    if kind == "Long":
+        return rng.randrange(1000)
+    if kind == "Bool":
+        return rng.random() < 0.5
+    if kind == "Set":
+        return []
+    if kind == "Record":
+        return {attr: random_value(inner, attr, rng) for attr, (inner, required) in attr_type[1].items()
+                if required or rng.random() < 0.5}
+    raise ValueError(f"Cannot generate a value for attribute '{name}' of type {attr_type}")
+
+
+class WorkloadGenerator:
+    """Seeded S3Resource/CloudFormationTemplate corpus shaped by a schema and a WorkloadMix."""
+
+    def __init__(self, schema, mix: Optional[WorkloadMix] = None, seed: int = 0, prefix: str = "synthetic"):
+        for entity_type in ("S3Resource", "CloudFormationTemplate"):
+            if entity_type not in schema.entity_types:
+                raise ValueError(f"Schema does not declare entity type {entity_type}")
+        self.schema = schema
+        self.mix = mix or WorkloadMix()
+        self.seed = seed
+        self.prefix = prefix
+        self._algorithms = WeightedChoice(self.mix.algorithms)
+        self._environments = WeightedChoice(self.mix.environments)
+        self._bucket_attrs = schema.entity_types["S3Resource"].attributes
+        self._template_attrs = schema.entity_types["CloudFormationTemplate"].attributes
+
+    def template_count(self, buckets: int) -> int:
+        return -(-buckets // self.mix.buckets_per_template)
+
+    def _fill(self, attrs: Dict[str, Any], declared: Dict[str, Tuple[Any, bool]], rules: frozenset,
+              rng: random.Random) -> None:
+        """Drop attributes the schema does not declare and fill in the ones without a rule."""
+        for name in [name for name in attrs if name not in declared]:
+            del attrs[name]
+        for name, (attr_type, required) in declared.items():
+            if name not in rules and (required or rng.random() < 0.5):
+                attrs[name] = random_value(attr_type, name, rng)
+
+    def bucket_entity(self, index: int, environment: str, rng: random.Random) -> Dict[str, Any]:
+        name = f"{self.prefix}-{self.seed}-{index:08d}"
+        algorithm = self._algorithms.pick(rng)
+        attrs: Dict[str, Any] = {
+            "name": name,
+            "encryption_enabled": algorithm != "none",
+            "environment": environment,
+            "resource_type": "bucket",
+        }
+        if algorithm != "none" and rng.random() >= self.mix.missing_optional:
+            attrs["encryption_algorithm"] = algorithm
+            if algorithm in KMS_ALGORITHMS and rng.random() < self.mix.kms_key:
+                attrs["kms_key_id"] = f"arn:aws:kms:us-east-1:123456789012:key/{self.seed}-{index:08d}"
+        if rng.random() < self.mix.bucket_policy:
+            attrs["bucket_policy_enforces_encryption"] = rng.random() < 0.8
+        self._fill(attrs, self._bucket_attrs, BUCKET_RULES, rng)
+        return {"uid": {"type": "S3Resource", "id": name}, "attrs": attrs, "parents": []}
+
+    def template(self, template_index: int, buckets: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Generate one template and its buckets from the template's own random stream.
+
+        Args:
+            template_index: Position of the template in the corpus
+            buckets: Total number of buckets in the corpus (the last template may be short)
+
+        Returns:
+            Tuple of (CloudFormationTemplate entity, S3Resource entities)
+        """
+        rng = random.Random(f"{self.seed}/{template_index}")
+        environment = self._environments.pick(rng)
+        first = template_index * self.mix.buckets_per_template
+        bucket_entities = [self.bucket_entity(index, environment, rng)
+                           for index in range(first, min(first + self.mix.buckets_per_template, buckets))]
+        stack_name = f"{self.prefix}-{self.seed}-stack-{template_index:07d}"
+        attrs: Dict[str, Any] = {
+            "template_name": f"{stack_name}.yaml",
+            "stack_name": stack_name,
+            "environment": environment,
+            "s3_resources": [entity["uid"] for entity in bucket_entities],
+        }
+        self._fill(attrs, self._template_attrs, TEMPLATE_RULES, rng)
+        template_entity = {"uid": {"type": "CloudFormationTemplate", "id": stack_name}, "attrs": attrs,
+                           "parents": []}
+        return template_entity, bucket_entities
+
+    def templates(self, buckets: int, start: int = 0,
+                  stop: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Yield templates [start, stop) of a corpus with `buckets` buckets."""
+        stop = self.template_count(buckets) if stop is None else min(stop, self.template_count(buckets))
+        for template_index in range(start, stop):
+            yield self.template(template_index, buckets)
+
+
+# =============================================================================
+# CLOUDFORMATION TEMPLATES
+# =============================================================================
+
+def template_document(template_entity: Dict[str, Any], buckets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The CloudFormation template that declares these buckets (closest equivalent of each entity)."""
+    environment = template_entity["attrs"]["environment"]
+    resources: Dict[str, Any] = {}
+    for position, bucket in enumerate(buckets):
+        attrs = bucket["attrs"]
+        logical_id = f"Bucket{position}"
+        properties: Dict[str, Any] = {
+            "BucketName": attrs["name"],
+            "Tags": [{"Key": "Environment", "Value": {"Ref": "Environment"}}],
+        }
+        if attrs["encryption_enabled"]:
+            default: Dict[str, Any] = {}
+            if "encryption_algorithm" in attrs:
+                default["SSEAlgorithm"] = attrs["encryption_algorithm"]
+            if "kms_key_id" in attrs:
+                default["KMSMasterKeyID"] = attrs["kms_key_id"]
+            properties["BucketEncryption"] = {
+                "ServerSideEncryptionConfiguration": [{"ServerSideEncryptionByDefault": default}]}
+        resources[logical_id] = {"Type": "AWS::S3::Bucket", "Properties": properties}
+        if attrs.get("bucket_policy_enforces_encryption"):
+            resources[f"{logical_id}Policy"] = {
+                "Type": "AWS::S3::BucketPolicy",
+                "Properties": {
+                    "Bucket": {"Ref": logical_id},
+                    "PolicyDocument": {"Statement": [{
+                        "Sid": "DenyUnencryptedUploads",
+                        "Effect": "Deny",
+                        "Principal": "*",
+                        "Action": "s3:PutObject",
+                        "Resource": {"Fn::Sub": f"arn:aws:s3:::{attrs['name']}/*"},
+                        "Condition": {"Null": {"s3:x-amz-server-side-encryption": "true"}},
+                    }]},
+                },
+            }
+    return {
+        "AWSTemplateFormatVersion": "2010-09-09",
+        "Description": f"Synthetic workload stack {template_entity['attrs']['stack_name']}",
+        "Parameters": {"Environment": {"Type": "String", "Default": environment}},
+        "Resources": resources,
+    }
+
+
+# =============================================================================
+# REQUEST SUITE
+# =============================================================================
+
+def _describe(bucket: Dict[str, Any]) -> str:
+    attrs = bucket["attrs"]
+    if not attrs["encryption_enabled"]:
+        encryption = "no encryption"
+    elif "encryption_algorithm" not in attrs:
+        encryption = "encryption enabled but no algorithm"
+    else:
+        encryption = f"{attrs['encryption_algorithm']} encryption"
+        if attrs["encryption_algorithm"] in KMS_ALGORITHMS:
+            encryption += " with a KMS key" if "kms_key_id" in attrs else " without a KMS key"
+    if "bucket_policy_enforces_encryption" in attrs:
+        encryption += (" and a bucket policy enforcing encryption" if attrs["bucket_policy_enforces_encryption"]
+                       else " and a bucket policy not enforcing encryption")
+    return f"Synthetic {attrs['environment']} bucket with {encryption}"
+
+
+def suite_request(action: str, template_entity: Dict[str, Any], bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """A --request-json style request in the tests/<suite> format."""
+    from cloudformation_entities import VALIDATOR
+    from s3_inventory import CONFIG_EVALUATION
+    if action == "config:EvaluateCompliance":
+        return {
+            "description": _describe(bucket) + " (shift-right)",
+            "principal": f'ConfigEvaluation::{json.dumps(CONFIG_EVALUATION["id"])}',
+            "action": f'Action::"{action}"',
+            "resource": f'S3Resource::{json.dumps(bucket["uid"]["id"])}',
+            "context": {"validation_type": "shift-right", "aws_config_rule": CONFIG_EVALUATION["id"]},
+        }
+    if action == "s3:CreateBucket":
+        return {
+            "description": _describe(bucket) + " (creation)",
+            "principal": f'Human::{json.dumps(VALIDATOR["id"])}',
+            "action": f'Action::"{action}"',
+            "resource": f'S3Resource::{json.dumps(bucket["uid"]["id"])}',
+            "context": {"bucket_creation": {"environment": bucket["attrs"]["environment"]}},
+        }
+    return {
+        "description": f"Synthetic {template_entity['attrs']['environment']} template with "
+                       f"{len(template_entity['attrs']['s3_resources'])} bucket(s) (shift-left)",
+        "principal": f'Human::{json.dumps(VALIDATOR["id"])}',
+        "action": f'Action::"{action}"',
+        "resource": f'CloudFormationTemplate::{json.dumps(template_entity["uid"]["id"])}',
+        "context": {"validation_type": "shift-left", "environment": template_entity["attrs"]["environment"]},
+    }
+
+
+def principal_entities() -> List[Dict[str, Any]]:
+    """Principals the generated requests use (written at the start of every entities file)."""
+    from cloudformation_entities import validator_entity
+    from s3_inventory import config_evaluation_entity
+    return [validator_entity(), config_evaluation_entity()]
+
+
+# =============================================================================
+# CORPUS OUTPUT
+# =============================================================================
+
+class _EntityWriter:
+    """Stream entities as JSONL or as one JSON array."""
+
+    def __init__(self, handle: IO[str], fmt: str):
+        self.handle = handle
+        self.fmt = fmt
+        self.count = 0
+        if fmt == "json":
+            handle.write("[\n")
+
+    def write(self, entity: Dict[str, Any]) -> None:
+        if self.fmt == "json":
+            self.handle.write((",\n" if self.count else "") + json.dumps(entity))
+        else:
+            self.handle.write(json.dumps(entity) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self.fmt == "json":
+            self.handle.write("\n]\n")
+
+
+def write_corpus(generator: WorkloadGenerator, buckets: int, out_dir: Path, fmt: str = "jsonl",
+                 templates: bool = False, requests: int = 0,
+                 policies: Path = PROJECT_ROOT / "cedar_policies",
+                 schema_file: Path = PROJECT_ROOT / "schema.cedarschema") -> Dict[str, Any]:
+    """
+    Generate a corpus into out_dir.
+
+    Args:
+        generator: Seeded generator
+        buckets: Number of S3Resource entities
+        out_dir: Output directory (created if missing)
+        fmt: "jsonl" or "json" for the entities file
+        templates: Also write one CloudFormation YAML file per template
+        requests: Number of labelled requests to write under suite/{ALLOW,DENY}
+        policies: Policy set used to label requests
+        schema_file: Schema used to label requests
+
+    Returns:
+        The manifest written to out_dir/manifest.json
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    evaluator = None
+    if requests:
+        from cedar_evaluator import CedarEvaluator
+        evaluator = CedarEvaluator.from_files(Path(policies), Path(schema_file))
+        for decision in ("ALLOW", "DENY"):
+            (out_dir / "suite" / decision).mkdir(parents=True, exist_ok=True)
+    stride = max(1, buckets // requests) if requests else 0
+
+    counts = {"S3Resource": 0, "CloudFormationTemplate": 0, "templates": 0, "ALLOW": 0, "DENY": 0}
+    entities_file = out_dir / f"entities.{fmt}"
+    start = time.time()
+    with open(entities_file, "w") as handle:
+        writer = _EntityWriter(handle, fmt)
+        for entity in principal_entities():
+            writer.write(entity)
+        for template_entity, bucket_entities in generator.templates(buckets):
+            writer.write(template_entity)
+            counts["CloudFormationTemplate"] += 1
+            for bucket in bucket_entities:
+                writer.write(bucket)
+                counts["S3Resource"] += 1
+
+            if templates:
+                template_index = counts["CloudFormationTemplate"] - 1
+                template_dir = out_dir / "templates" / f"{template_index // TEMPLATES_PER_DIRECTORY:05d}"
+                template_dir.mkdir(parents=True, exist_ok=True)
+                with open(template_dir / template_entity["attrs"]["template_name"], "w") as template_handle:
+                    yaml.safe_dump(template_document(template_entity, bucket_entities), template_handle,
+                                   sort_keys=False)
+                counts["templates"] += 1
+
+            if evaluator is not None:
+                first_index = (counts["CloudFormationTemplate"] - 1) * generator.mix.buckets_per_template
+                _write_requests(evaluator, template_entity, bucket_entities, first_index, stride, requests,
+                                out_dir, counts)
+        writer.close()
+
+    manifest = {
+        "seed": generator.seed,
+        "prefix": generator.prefix,
+        "buckets": buckets,
+        "format": fmt,
+        "mix": generator.mix.to_json(),
+        "counts": counts,
+        "seconds": round(time.time() - start, 3),
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n")
+    return manifest
+
+
+def _write_requests(evaluator, template_entity: Dict[str, Any], bucket_entities: List[Dict[str, Any]],
+                    first_index: int, stride: int, limit: int, out_dir: Path, counts: Dict[str, Any]) -> None:
+    """Label the requests for every stride-th bucket of this template and write them to the suite."""
+    from cedar_evaluator import EntityStore
+    for index, bucket in enumerate(bucket_entities, first_index):
+        written = counts["ALLOW"] + counts["DENY"]
+        if index % stride or written >= limit:
+            continue
+        action = REQUEST_ACTIONS[(index // stride) % len(REQUEST_ACTIONS)]
+        request = suite_request(action, template_entity, bucket)
+        store = EntityStore.from_json(principal_entities() + [template_entity] + bucket_entities)
+        decision = evaluator.authorize_request(request, store).decision
+        if decision not in ("ALLOW", "DENY"):
+            continue
+        name = f"{action.split(':')[1].lower()}-{bucket['uid']['id']}.json"
+        (out_dir / "suite" / decision / name).write_text(json.dumps(request, indent=2) + "\n")
+        counts[decision] += 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic Cedar workload from the schema")
+    parser.add_argument("--entities", type=int, default=10000, help="Number of S3Resource entities")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="synthetic", help="Bucket and stack name prefix")
+    parser.add_argument("--schema", default=str(PROJECT_ROOT / "schema.cedarschema"), help="Cedar schema file")
+    parser.add_argument("--policies", default=str(PROJECT_ROOT / "cedar_policies"),
+                        help="Policy set used to label --requests")
+    parser.add_argument("--format", choices=("jsonl", "json"), default="jsonl", help="Entities file format")
+    parser.add_argument("--algorithms", type=parse_weights,
+                        help="SSE algorithm weights, 'none' for unencrypted (default: "
+                             + ",".join(f"{k}={v}" for k, v in DEFAULT_ALGORITHMS.items()) + ")")
+    parser.add_argument("--environments", type=parse_weights,
+                        help="Environment weights (default: "
+                             + ",".join(f"{k}={v}" for k, v in DEFAULT_ENVIRONMENTS.items()) + ")")
+    parser.add_argument("--missing-optional", type=float, default=0.03,
+                        help="Probability an encrypted bucket has no encryption_algorithm")
+    parser.add_argument("--kms-key", type=float, default=0.9,
+                        help="Probability a KMS-encrypted bucket has a kms_key_id")
+    parser.add_argument("--bucket-policy", type=float, default=0.1,
+                        help="Probability a bucket has bucket_policy_enforces_encryption")
+    parser.add_argument("--buckets-per-template", type=int, default=5)
+    parser.add_argument("--templates", action="store_true", help="Also write CloudFormation YAML templates")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="Write this many labelled requests under suite/{ALLOW,DENY}")
+    args = parser.parse_args(argv)
+
+    from cedar_schema import CedarSchema
+    mix = WorkloadMix(args.algorithms, args.environments, args.missing_optional, args.kms_key,
+                      args.bucket_policy, args.buckets_per_template)
+    generator = WorkloadGenerator(CedarSchema.from_file(args.schema), mix, args.seed, args.prefix)
+    manifest = write_corpus(generator, args.entities, Path(args.out), args.format, args.templates,
+                            args.requests, Path(args.policies), Path(args.schema))
+    print(json.dumps(manifest["counts"]), file=sys.stderr)
+    print(f"Wrote {args.out} in {manifest['seconds']}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
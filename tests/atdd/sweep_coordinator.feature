@@ -0,0 +1,56 @@
+# ATDD Test: Sharded, Resumable Compliance Sweeps
+#
+# User Story:
+# As a security engineer sweeping every account in the organization
+# I want the inventory split into shards evaluated by many workers with checkpoints
+# So that org-wide sweeps scale past one process and resume where they stopped after a failure
+
+Feature: Sharded multi-process compliance sweep with resumable checkpoints
+
+  Background:
+    Given a generated inventory of 2400 S3 buckets
+    And a sweep of that inventory planned in shards of 200 buckets
+
+  @sweep @shift-right
+  Scenario: Local worker processes sweep every shard and the merged summary matches one process
+    When 3 local worker processes run the sweep
+    Then every shard should have exactly one checkpointed result
+    And the merged compliant and non-compliant counts should match a single-process evaluation
+    And the non-compliant bucket list should name every non-compliant bucket
+
+  @sweep @errors
+  Scenario: Buckets that cannot be evaluated are listed apart from non-compliant ones
+    Given 3 buckets of shard 0 have the string "true" as their encryption flag
+    When a worker sweeps every shard with prevalidation
+    Then the summary should count 3 errors
+    And the error list should name exactly those 3 buckets
+    And the non-compliant bucket list should have one line per non-compliant bucket
+
+  @sweep @resume
+  Scenario: A sweep that stopped part way resumes without redoing finished shards
+    When a worker stops after finishing 3 shards
+    Then the sweep status should show 3 finished and 9 pending shards
+    When 2 local worker processes run the sweep again
+    Then the 3 shards finished first should not have been evaluated again
+    And the merged compliant and non-compliant counts should match a single-process evaluation
+
+  @sweep @resume
+  Scenario: A shard claimed by a dead worker is taken over once its lease expires
+    Given shard 0 is claimed by a worker that stopped refreshing its lease an hour ago
+    And shard 1 is claimed by a worker that is still running
+    When a worker sweeps every shard it can claim
+    Then shard 0 should have been evaluated by the new worker
+    And shard 1 should still be pending under its live claim
+
+  @sweep @multi-host
+  Scenario: A worker started from another checkout of the repository works the same sweep
+    Given a second checkout of the repository in another directory
+    When a worker started from the second checkout runs the sweep
+    Then every shard should have exactly one checkpointed result
+    And the merged compliant and non-compliant counts should match a single-process evaluation
+
+  @sweep @policy-consistency
+  Scenario: Workers refuse to mix policy versions within one sweep
+    Given a sweep planned against a copy of the policies
+    When the copied policies change before a worker starts
+    Then the worker should refuse to evaluate the sweep
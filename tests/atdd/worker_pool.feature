@@ -0,0 +1,46 @@
+# ATDD Test: Warm Cedar Worker Pool
+#
+# User Story:
+# As a platform engineer running batch authorization in CI
+# I want warm evaluator workers that are recycled, timed out and replaced by the pool itself
+# So that long batches run without the cedar CLI and a stuck or crashed worker never stalls them
+
+Feature: Persistent Cedar evaluation worker pool
+
+  @worker-pool @engine
+  Scenario: The auto engine evaluates in-process and agrees with the python backend
+    Given a worker pool of 2 workers on the repository policies
+    When I authorize every suite request through the pool
+    Then the auto engine should be in-process
+    And every decision should match the python backend
+
+  @worker-pool @recycling
+  Scenario: Workers are recycled after serving their request quota
+    Given a worker pool of 1 worker recycled every 3 requests
+    When I authorize 7 suite requests through the pool
+    Then every request should have been answered
+    And 3 workers should have been spawned, 2 recycled and 0 replaced
+
+  @worker-pool @timeout
+  Scenario: A worker that stops answering times out and is replaced
+    Given a worker pool of 1 worker on the repository policies
+    When I send a request whose entities never arrive with a 1 second timeout
+    Then the request should fail with a worker timeout
+    When I authorize 1 suite requests through the pool
+    Then every request should have been answered
+    And 2 workers should have been spawned, 0 recycled and 1 replaced
+
+  @worker-pool @recovery
+  Scenario: A worker that died while idle is replaced on the next request
+    Given a worker pool of 1 worker on the repository policies
+    When I authorize 1 suite requests through the pool
+    And the idle worker is killed
+    And I authorize 1 suite requests through the pool
+    Then every request should have been answered
+    And 2 workers should have been spawned, 0 recycled and 1 replaced
+
+  @worker-pool @concurrency
+  Scenario: Concurrent first requests on the pool backend share one pool
+    Given a runner on the pool backend with 4 workers
+    When 8 threads ask it for its worker pool at the same time
+    Then they should all get the same pool
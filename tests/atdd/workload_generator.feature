@@ -0,0 +1,29 @@
+# ATDD Test: Synthetic Workload Generator
+#
+# User Story:
+# As a performance engineer benchmarking Cedar authorization at scale
+# I want seeded, schema-driven corpora of buckets, templates and labelled requests
+# So that load tests run against realistic volume that anyone can regenerate exactly
+
+Feature: Schema-driven synthetic workload generation
+
+  @workload-generator
+  Scenario: The same seed always produces the same corpus
+    When I generate a corpus of 500 buckets with seed 7 twice
+    And I generate a corpus of 500 buckets with seed 8
+    Then both seed 7 corpora should be byte-for-byte identical
+    And the seed 8 corpus should differ
+    And every entity should only use attributes declared in the schema
+
+  @workload-generator
+  Scenario: The configured mix shapes the generated buckets
+    When I generate 1000 production buckets with only AES256 and unencrypted buckets and no KMS keys
+    Then every bucket should be in production
+    And every encryption algorithm should be AES256
+    And roughly half of the buckets should be unencrypted
+
+  @workload-generator @python-evaluator
+  Scenario: Labelled requests and templates agree with the policies
+    When I generate a corpus of 300 buckets with templates and 90 labelled requests
+    Then every request in the ALLOW and DENY folders should get that decision from the batch runner
+    And the generated templates should parse to the same encryption settings as the bucket entities